@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from codax.tools.filesystem import FsGlobTool
+
+
+def build_tree(root: Path, files: int, per_dir: int = 100) -> None:
+    """``files`` source files spread over nested packages, plus an ignored dependency dir."""
+    (root / ".gitignore").write_text("build/\n", encoding="utf-8")
+    for index in range(files):
+        package = index // per_dir
+        # One tenth of the tree lives in ignored directories, as vendored code tends to.
+        top = ("node_modules", "build")[package % 2] if package % 10 == 9 else "src"
+        directory = root / top / f"pkg{package // 10}" / f"mod{package % 10}"
+        if index % per_dir == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        suffix = ".py" if index % 3 else ".txt"
+        (directory / f"f{index}{suffix}").touch()
+
+
+def timed(label: str, func: Callable[[], List[str]]) -> None:
+    started = time.perf_counter()
+    count = len(func())
+    print(f"{label:<44} {time.perf_counter() - started:>8.3f}s {count:>9} matches")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="fs_glob against glob.glob on a synthetic tree.")
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--pattern", default="**/*.py")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp).resolve()
+        started = time.perf_counter()
+        build_tree(root, args.files)
+        print(f"built {args.files} files in {time.perf_counter() - started:.1f}s")
+        tool = FsGlobTool(root, use_index=False)
+        pattern = str(root / args.pattern)
+        timed(
+            "glob.glob(recursive=True) + resolve",
+            lambda: [
+                str(Path(match).resolve().relative_to(root))
+                for match in glob.glob(pattern, recursive=True)
+            ],
+        )
+        timed("fs_glob (gitignore pruning)", lambda: tool.run(args.pattern).metadata["matches"])
+        timed(
+            "fs_glob include_ignored",
+            lambda: tool.run(args.pattern, include_ignored=True).metadata["matches"],
+        )
+        timed(
+            f"fs_glob limit={args.limit}",
+            lambda: tool.run(args.pattern, limit=args.limit).metadata["matches"],
+        )
+        timed(
+            f"fs_glob limit={args.limit} sort=mtime",
+            lambda: tool.run(args.pattern, limit=args.limit, sort="mtime").metadata["matches"],
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
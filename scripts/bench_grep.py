@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from codax.grep_engine import grep_files
+
+LINE = "    value = compute_{n}(alpha, beta)  # keep the cache warm for request {n}\n"
+
+
+def build_corpus(root: Path, files: int, lines: int) -> List[str]:
+    """``files`` source files of ``lines`` lines; one in 50 contains the needle."""
+    paths = []
+    for index in range(files):
+        directory = root / f"pkg{index // 500}"
+        if index % 500 == 0:
+            directory.mkdir()
+        body = "".join(LINE.format(n=n) for n in range(lines))
+        if index % 50 == 0:
+            body += "    raise NeedleError('unexpected state')\n"
+        path = directory / f"mod{index}.py"
+        path.write_text(body, encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def legacy(pattern: str, paths: List[str], limit: int) -> List[str]:
+    """The previous fallback: decode every file and re.search it, then truncate."""
+    hits = []
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as handle:
+                if re.search(pattern, handle.read()):
+                    hits.append(path)
+        except Exception:
+            continue
+    return hits[:limit]
+
+
+def timed(label: str, func: Callable[[], List[str]]) -> None:
+    started = time.perf_counter()
+    count = len(func())
+    print(f"{label:<36} {time.perf_counter() - started:>8.3f}s {count:>7} files")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="grep_files fallback engine against rg.")
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--pattern", default=r"Needle\w+\(")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = build_corpus(root, args.files, args.lines)
+        size = sum(os.path.getsize(path) for path in paths) / 2**20
+        print(f"corpus: {args.files} files, {size:.0f} MiB, {os.cpu_count()} CPUs")
+        everything = len(paths)
+        if shutil.which("rg"):
+            timed(
+                "rg --files-with-matches",
+                lambda: subprocess.run(
+                    ["rg", "--files-with-matches", args.pattern, tmp],
+                    capture_output=True,
+                    text=True,
+                ).stdout.splitlines(),
+            )
+        else:
+            print("rg not installed; skipping")
+        timed("legacy decode + re.search", lambda: legacy(args.pattern, paths, everything))
+        timed("engine, in-process", lambda: grep_files(args.pattern, paths, everything, 1))
+        # The first pooled call pays for spawning the workers; report it separately.
+        def pooled(limit: int) -> Callable[[], List[str]]:
+            return lambda: grep_files(args.pattern, paths, limit, args.workers)
+
+        timed("engine, pool start + scan", pooled(everything))
+        timed(f"engine, {args.workers} warm workers", pooled(everything))
+        timed("engine, limit=10", pooled(10))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
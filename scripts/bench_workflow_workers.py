@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from codax.config import Settings
+from codax.workflows.distributed import WorkflowCoordinator, start_local_workers
+from codax.workflows.queue import SqliteStepQueue
+
+# CPU-bound step body; each step is independent so every ready step can run at once.
+BUSY = "python -c \"sum(i * i for i in range({n}))\""
+
+
+def build_definition(steps: int, command: str) -> Dict[str, Any]:
+    return {
+        "steps": [
+            {
+                "id": f"s{index}",
+                "tool": "shell_command",
+                "args": {"command": command},
+                "depends_on": [],  # independent: may run on any worker at once
+            }
+            for index in range(steps)
+        ]
+    }
+
+
+def bench(workers: int, steps: int, command: str, root: Path) -> tuple[float, float]:
+    """Return (start-up seconds, steady-state seconds) for ``steps`` steps on ``workers``."""
+    settings = Settings(
+        workspace_root=root, data_dir=root / "data", config_file=root / "config.toml"
+    )
+    queue_path = root / f"q{workers}.sqlite"
+    queue = SqliteStepQueue(queue_path)
+    coordinator = WorkflowCoordinator(queue, poll_interval=0.005)
+    started = time.perf_counter()
+    processes, stop = start_local_workers(queue_path, settings, workers)
+    try:
+        # Warm-up: one short step per worker so spawn and registry builds are excluded.
+        warm = coordinator.run(build_definition(workers, "sleep 0.2"))
+        warmed = time.perf_counter()
+        result = coordinator.run(build_definition(steps, command))
+        elapsed = time.perf_counter() - warmed
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout=5)
+        queue.close()
+    if not (warm.success and result.success):
+        raise RuntimeError(result.output)
+    return warmed - started, elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Workflow queue throughput, 1..N workers.")
+    parser.add_argument("--steps", type=int, default=32)
+    parser.add_argument("--work", type=int, default=2_000_000, help="Loop size per step")
+    parser.add_argument("--sleep", type=float, default=0.0, help="Use I/O-bound sleep steps")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    command = f"sleep {args.sleep}" if args.sleep > 0 else BUSY.format(n=args.work)
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        print(f"{'workers':>8} {'startup':>9} {'seconds':>9} {'steps/s':>9} {'speedup':>8}")
+        for count in args.workers:
+            startup, elapsed = bench(count, args.steps, command, Path(tmp))
+            baseline = baseline or elapsed
+            print(
+                f"{count:>8} {startup:>9.2f} {elapsed:>9.2f} {args.steps / elapsed:>9.1f} "
+                f"{baseline / elapsed:>7.2f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Dict, Iterable, List
 
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.outputs import ChatResult
 from langchain_core.runnables import Runnable
@@ -10,7 +11,9 @@ from langchain_core.tools import tool
 from langgraph.prebuilt import create_react_agent
 
 from codax.config import Settings
-from codax.tools import build_tool_registry
+from codax.llm_scheduler import LlmScheduler, estimate_tokens, get_scheduler, is_rate_limit_error
+from codax.tools import ReadCache, build_tool_registry
+from codax.tools.retrieval import RetrieveCodeTool
 from codax.tools.search_tool import SearchTool
 from codax.tools.text_tools import AnalyzeTool, SummarizeTool
 
@@ -58,7 +61,8 @@ SYSTEM_PROMPT = (
     "Use the registered tools when they can help, especially: "
     "- search_tool for any real-world, news, or factual lookup. "
     "- fetch_url to retrieve page content. "
-    "- read_file/list_dir for workspace inspection. "
+    "- read_file/read_files/list_dir for workspace inspection. "
+    "- retrieve_code to find the code relevant to a question. "
     "Prefer concise answers; always cite tool-derived info in plain text."
 )
 
@@ -68,7 +72,9 @@ def _lc_tools_from_registry(registry: dict[str, Any]) -> list[Any]:
     summarize: SummarizeTool = registry["summarize"]  # type: ignore[assignment]
     search: SearchTool = registry["search"]  # type: ignore[assignment]
     fs_read = registry.get("fs_read")
+    fs_read_many = registry.get("fs_read_many")
     fs_list = registry.get("fs_list")
+    retrieve = registry.get("retrieve_code")
     http_tool = registry.get("http")
 
     @tool
@@ -79,7 +85,7 @@ def _lc_tools_from_registry(registry: dict[str, Any]) -> list[Any]:
     @tool
     def summarize_tool(text: str, max_tokens: int = 80) -> str:
         """Summarize provided text."""
-        return summarize.run(text, max_tokens=max_tokens).output
+        return summarize.run(text, max_tokens=max_tokens, priority="interactive").output
 
     @tool
     def search_tool(query: str, num_results: int = 3) -> str:
@@ -91,12 +97,41 @@ def _lc_tools_from_registry(registry: dict[str, Any]) -> list[Any]:
 
     if fs_read:
         @tool
-        def read_file(path: str, encoding: str = "utf-8") -> str:
-            """Read a text file from the workspace."""
-            return fs_read.run(path, encoding=encoding).output  # type: ignore[union-attr]
+        def read_file(
+            path: str,
+            encoding: str = "auto",
+            offset: int | None = None,
+            length: int | None = None,
+            tail: int | None = None,
+            lines: int | None = None,
+            fresh: bool = False,
+        ) -> str:
+            """
+            Read a workspace text file; use offset/length, lines or tail on big files.
+
+            A file you already read comes back as "unchanged" or as a diff; pass fresh=True
+            to get the full content again.
+            """
+            return fs_read.run(  # type: ignore[union-attr]
+                path,
+                encoding=encoding,
+                offset=offset,
+                length=length,
+                tail=tail,
+                lines=lines,
+                dedup=not fresh,
+            ).output
 
         tool_list.append(read_file)
 
+    if fs_read_many:
+        @tool
+        def read_files(paths: list[str], fresh: bool = False) -> str:
+            """Read several workspace files at once; prefer this to repeated read_file calls."""
+            return str(fs_read_many.run(paths, dedup=not fresh).output)
+
+        tool_list.append(read_files)
+
     if fs_list:
         @tool
         def list_dir(path: str = ".") -> str:
@@ -105,6 +140,14 @@ def _lc_tools_from_registry(registry: dict[str, Any]) -> list[Any]:
 
         tool_list.append(list_dir)
 
+    if retrieve:
+        @tool
+        def retrieve_code(query: str, k: int = 5) -> str:
+            """Return the k workspace code chunks most relevant to a query (local BM25)."""
+            return str(retrieve.run(query, k=k).output)
+
+        tool_list.append(retrieve_code)
+
     if http_tool:
         @tool
         def fetch_url(url: str, method: str = "GET") -> str:
@@ -121,9 +164,25 @@ def _lc_tools_from_registry(registry: dict[str, Any]) -> list[Any]:
 class AgentGraph:
     settings: Settings
     runnable: Runnable
+    retriever: RetrieveCodeTool | None = None  # set when settings.retrieval_prefetch > 0
+
+    def _prefetch(self, prompt: str) -> tuple[List[HumanMessage], List[Dict[str, Any]]]:
+        """Top retrieved chunks as a message ahead of the prompt, and what was included."""
+        if self.retriever is None or self.settings.retrieval_prefetch <= 0:
+            return [], []
+        result = self.retriever.run(prompt, k=self.settings.retrieval_prefetch)
+        if not result.success:
+            return [], []
+        chunks = (result.metadata or {}).get("chunks", [])
+        message = HumanMessage(
+            content="Workspace code that may be relevant (retrieved automatically):\n\n"
+            + result.output
+        )
+        return [message], chunks
 
     def stream(self, prompt: str, reasoning: str | None = None) -> Iterable[Dict[str, str]]:
-        input_payload = {"messages": [HumanMessage(content=prompt)]}
+        context, _ = self._prefetch(prompt)
+        input_payload = {"messages": [*context, HumanMessage(content=prompt)]}
         for chunk in self.runnable.stream(input_payload):
             if isinstance(chunk, dict) and "messages" in chunk:
                 for msg in chunk["messages"]:
@@ -133,7 +192,8 @@ class AgentGraph:
         yield {"type": "done"}
 
     def run(self, prompt: str, reasoning: str | None = None) -> Dict[str, Any]:
-        input_payload = {"messages": [HumanMessage(content=prompt)]}
+        context, retrieved = self._prefetch(prompt)
+        input_payload = {"messages": [*context, HumanMessage(content=prompt)]}
         result: dict[str, Any] | ChatResult = self.runnable.invoke(input_payload)
         # create_react_agent returns dict with messages
         messages = result.get("messages") if isinstance(result, dict) else []
@@ -147,10 +207,34 @@ class AgentGraph:
             "reasoning": reasoning or self.settings.reasoning_effort,
             "analysis": analysis.output,
             "summary": summary,
-            "metadata": {"analysis": analysis.metadata},
+            "metadata": {"analysis": analysis.metadata, "retrieved": retrieved},
         }
 
 
+class SchedulerCallback(BaseCallbackHandler):
+    """Admits agent model calls through the shared LLM scheduler as interactive traffic."""
+
+    def __init__(self, scheduler: LlmScheduler, model: str) -> None:
+        self.scheduler = scheduler
+        self.model = model
+        self._estimates: Dict[Any, int] = {}
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, **kwargs: Any) -> None:
+        estimate = estimate_tokens(*(m.content for batch in messages for m in batch))
+        self._estimates[kwargs.get("run_id")] = estimate
+        self.scheduler.acquire(self.model, estimate, priority="interactive")
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        estimate = self._estimates.pop(kwargs.get("run_id"), 0)
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        self.scheduler.settle(self.model, estimate, int(usage.get("total_tokens", 0) or 0))
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        self._estimates.pop(kwargs.get("run_id"), None)
+        if is_rate_limit_error(error):
+            self.scheduler.throttled(self.model)
+
+
 def _build_llm(settings: Settings):
     if ChatOpenAI and settings.openai_api_key:
         return ChatOpenAI(
@@ -158,6 +242,7 @@ def _build_llm(settings: Settings):
             temperature=settings.temperature,
             openai_api_key=settings.openai_api_key,
             streaming=True,
+            callbacks=[SchedulerCallback(get_scheduler(settings), settings.model)],
         )
     return HeuristicChatModel(model="heuristic")
 
@@ -166,13 +251,15 @@ def create_agent_graph(settings: Settings) -> AgentGraph:
     """
     Assemble a LangGraph react agent with registered tools.
     """
-    registry = build_tool_registry(settings)
+    read_cache = ReadCache(diffs=settings.read_dedup_diffs) if settings.read_dedup else None
+    registry = build_tool_registry(settings, read_cache=read_cache)
     llm = _build_llm(settings)
     tools = _lc_tools_from_registry(registry)
     runnable = create_react_agent(llm, tools, state_modifier=SYSTEM_PROMPT).with_config(
         {"recursion_limit": 6}
     )
-    return AgentGraph(settings=settings, runnable=runnable)
+    retriever = registry["retrieve_code"] if settings.retrieval_prefetch else None
+    return AgentGraph(settings=settings, runnable=runnable, retriever=retriever)  # type: ignore[arg-type]
 
 
 def run_prompt(
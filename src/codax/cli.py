@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 import typer
 
@@ -10,7 +10,20 @@ from codax.agent.runner import create_agent_graph, run_prompt
 from codax.config import SafetyMode, get_settings, persist_settings
 from codax.logging import RunContext, setup_json_logging
 from codax.tools import build_tool_registry
-from codax.workflows.compiler import load_and_compile
+from codax.tools.base import ToolResult
+from codax.tools.workflow_tools import CancelToken
+from codax.workflows.cache import get_workflow_cache
+from codax.workflows.compiler import CompiledWorkflow, load_and_compile, workflow_cache_dir
+from codax.workflows.distributed import default_queue_path, run_with_workers, run_worker
+from codax.workflows.planner import (
+    latency_history_path,
+    load_history,
+    plan_workflow,
+    record_history,
+)
+from codax.workflows.profiler import WorkflowProfiler
+from codax.workflows.queue import SqliteStepQueue
+from codax.workflows.watch import WatchSession, watch_workflow
 
 app = typer.Typer(help="Codax CLI powered by LangGraph-like planner/executor.")
 
@@ -137,6 +150,15 @@ def _parse_extra_params(args: list[str]) -> dict[str, str]:
     return params
 
 
+def _echo_workflow_event(event: dict[str, object]) -> None:
+    """Report workflow progress events on stderr so stdout stays parseable."""
+    if event.get("type") in {"loop_progress", "loop_done"}:
+        typer.echo(
+            f"[codax] {event['step']}: {event['items']} items / {event['batches']} batches",
+            err=True,
+        )
+
+
 @app.command(
     "workflow",
     context_settings={"allow_extra_args": True, "ignore_unknown_options": True},
@@ -145,6 +167,26 @@ def workflow_run(
     ctx: typer.Context,
     path: str = typer.Argument(..., help="Path to a YAML/JSON workflow definition"),
     param: list[str] | None = typer.Option(None, "--param", "-p", help="key=value parameters"),
+    profile: bool = typer.Option(
+        False, "--profile", help="Profile steps and print a hot-step report"
+    ),
+    profile_out: Path | None = typer.Option(
+        None, "--profile-out", help="Profile JSON path (default: <workflow>.profile.json)"
+    ),
+    profile_top: int = typer.Option(10, "--profile-top", help="Slowest steps shown in the report"),
+    workers: int = typer.Option(
+        0, "--workers", "-w", help="Run steps on N local worker processes via the step queue"
+    ),
+    queue: Path | None = typer.Option(
+        None, "--queue", help="SQLite step queue path (default: per workspace in ~/.codax/queue)"
+    ),
+    watch: bool = typer.Option(
+        False, "--watch", help="Re-run steps affected by file changes until interrupted"
+    ),
+    debounce: float = typer.Option(0.3, "--debounce", help="Quiet seconds before a re-run"),
+    plan: bool = typer.Option(
+        False, "--plan", help="Estimate LLM calls, tokens and wall time without running"
+    ),
 ) -> None:
     """Execute a workflow definition."""
     settings = get_settings()
@@ -159,11 +201,106 @@ def workflow_run(
         if "=" in item:
             key, val = item.split("=", 1)
             kv_params[key] = val
-    compiled = load_and_compile(path, settings=settings)
-    result = compiled.run(params=kv_params)
+    try:
+        compiled = load_and_compile(path, settings=settings)
+    except (FileNotFoundError, ValueError) as exc:
+        typer.echo("[codax] workflow success=False")
+        typer.echo(f"[codax] {exc}")
+        raise typer.Exit(code=1)
+    if plan:
+        estimate = plan_workflow(
+            compiled.definition,
+            settings.workspace_root,
+            params=kv_params,
+            history=load_history(latency_history_path(settings)),
+            loader=get_workflow_cache(workflow_cache_dir(settings)).load,
+            tools=build_tool_registry(settings).keys(),
+        )
+        typer.echo(estimate.report())
+        if estimate.issues:
+            raise typer.Exit(code=1)
+        return
+    if watch:
+        _watch_workflow(compiled, kv_params, debounce, lambda: load_and_compile(path, settings))
+        return
+    cancel = CancelToken()
+    # Steps profiled in worker processes are not reported back; profile in-process runs only.
+    # Profiled runs (or all, with record_latency_history) feed the latency history of --plan.
+    record = profile or settings.record_latency_history
+    profiler = WorkflowProfiler() if workers <= 0 and record else None
+    try:
+        if workers > 0:
+            outcome = run_with_workers(
+                compiled.definition,
+                compiled.settings,
+                workers,
+                queue_path=queue,
+                params=kv_params,
+                cancel=cancel,
+                on_event=_echo_workflow_event,
+            )
+            result = {"success": outcome.success, "metadata": outcome.metadata}
+        else:
+            result = compiled.run(
+                params=kv_params, cancel=cancel, on_event=_echo_workflow_event, profiler=profiler
+            )
+    except KeyboardInterrupt:
+        cancel.cancel()
+        typer.echo("[codax] workflow cancelled")
+        raise typer.Exit(code=130)
     typer.echo(f"[codax] workflow success={result['success']}")
     if result["metadata"]:
         typer.echo(result["metadata"])
+    if profiler is not None:
+        record_history(latency_history_path(settings), profiler.to_dict())
+    if profiler is not None and profile:
+        typer.echo(profiler.report(compiled.definition, top=profile_top))
+        target = profile_out or Path.cwd() / f"{path_obj.stem}.profile.json"
+        typer.echo(f"[codax] profile written to {profiler.write_json(target, compiled.definition)}")
+
+
+def _watch_workflow(
+    compiled: CompiledWorkflow,
+    params: dict[str, str],
+    debounce: float,
+    reload: Callable[[], CompiledWorkflow],
+) -> None:
+    def report(ids: list[str] | None, result: ToolResult) -> None:
+        scope = "all steps" if ids is None else ", ".join(ids)
+        typer.echo(f"[codax] ran {scope}: success={result.success}")
+        if not result.success:
+            typer.echo(f"[codax] {result.output}")
+        typer.echo("[codax] watching for changes (Ctrl-C to stop)", err=True)
+
+    try:
+        watch_workflow(WatchSession(compiled, params), report, debounce=debounce, reload=reload)
+    except KeyboardInterrupt:
+        raise typer.Exit(code=130)
+
+
+@app.command("workflow-worker")
+def workflow_worker(
+    queue: Path | None = typer.Option(
+        None, "--queue", help="SQLite step queue path (default: per workspace in ~/.codax/queue)"
+    ),
+    lease: float = typer.Option(30.0, "--lease", help="Lease seconds, renewed while a step runs"),
+    max_idle: float | None = typer.Option(None, "--max-idle", help="Exit after idle seconds"),
+    workspace: Path | None = typer.Option(
+        None, "--workspace", help="Workspace whose steps to serve (default: current directory)"
+    ),
+) -> None:
+    """Serve queued workflow steps published by `codax workflow --workers`."""
+    settings = get_settings()
+    if workspace is not None:
+        settings.workspace_root = workspace.resolve()
+    step_queue = SqliteStepQueue(queue or default_queue_path(settings))
+    try:
+        processed = run_worker(step_queue, settings, lease_seconds=lease, max_idle=max_idle)
+    except KeyboardInterrupt:
+        raise typer.Exit(code=130)
+    finally:
+        step_queue.close()
+    typer.echo(f"[codax] worker processed {processed} steps")
 
 
 @app.command("tools")
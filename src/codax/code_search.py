@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import ast
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from codax.grep_engine import BINARY_SNIFF
+from codax.sqlite_index import SyncedFileIndex
+
+# Files larger than this, and generated/minified kinds below, are not indexed.
+MAX_FILE_BYTES = 512 * 1024
+SKIP_SUFFIXES = (".lock", ".min.js", ".min.css", ".map", ".svg", ".sqlite", ".db")
+# A chunk is at most this many lines; smaller pieces between boundaries get merged.
+MAX_CHUNK_LINES = 80
+MIN_CHUNK_LINES = 8
+# BM25 parameters (the usual defaults).
+K1 = 1.2
+B = 0.75
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+# Lines starting a definition or section at column 0 in common languages and markdown.
+_BOUNDARY = re.compile(
+    r"(?:(?:export|pub(?:\([\w:]+\))?|public|private|protected|static|async|default|abstract)\s+)*"
+    r"(?:(?:def|class|function|func|fn|interface|struct|enum|impl|trait|type|module)\b|#{1,3}\s)"
+)
+
+# (start_line, end_line, title, length in tokens, term frequencies)
+ChunkRow = Tuple[int, int, str, int, Dict[str, int]]
+
+_SCHEMA = """
+CREATE TABLE chunks (
+    id INTEGER PRIMARY KEY, file_id INTEGER NOT NULL,
+    start_line INTEGER NOT NULL, end_line INTEGER NOT NULL, title TEXT NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX chunks_file ON chunks (file_id);
+CREATE TABLE terms (id INTEGER PRIMARY KEY, term TEXT UNIQUE NOT NULL);
+CREATE TABLE postings (
+    term_id INTEGER NOT NULL, file_id INTEGER NOT NULL, data BLOB NOT NULL,
+    PRIMARY KEY (term_id, file_id)
+) WITHOUT ROWID;
+CREATE INDEX postings_file ON postings (file_id);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased identifiers plus their camelCase/snake_case parts (1-char ones dropped)."""
+    tokens: List[str] = []
+    for word in _WORD.findall(text):
+        if len(word) > 1:
+            tokens.append(word.lower())
+        parts = _PART.findall(word)
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts if len(part) > 1)
+    return tokens
+
+
+def _python_spans(text: str, line_count: int) -> List[Tuple[int, int, str]] | None:
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    spans: List[Tuple[int, int, str]] = []
+
+    def add(node: ast.stmt, prefix: str) -> None:
+        assert isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+        start = min([node.lineno, *(item.lineno for item in node.decorator_list)])
+        end = node.end_lineno or node.lineno
+        title = f"{'class' if isinstance(node, ast.ClassDef) else 'def'} {prefix}{node.name}"
+        methods = [
+            item
+            for item in getattr(node, "body", [])
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+        ]
+        if isinstance(node, ast.ClassDef) and end - start >= MAX_CHUNK_LINES and methods:
+            first = min([methods[0].lineno, *(d.lineno for d in methods[0].decorator_list)])
+            spans.append((start, first - 1, title))  # class header, docstring, attributes
+            for method in methods:
+                add(method, f"{node.name}.")
+        else:
+            spans.append((start, end, title))
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            add(node, "")
+    return _fill_gaps(spans, line_count)
+
+
+def _generic_spans(lines: List[str]) -> List[Tuple[int, int, str]]:
+    starts = [1] + [
+        number
+        for number, line in enumerate(lines, 1)
+        if number > 1 and line[:1].strip() and _BOUNDARY.match(line)
+    ]
+    spans = [(start, end - 1, "") for start, end in zip(starts, [*starts[1:], len(lines) + 1])]
+    merged: List[Tuple[int, int, str]] = []
+    for start, end, title in spans:
+        if merged and (
+            merged[-1][1] - merged[-1][0] + 1 < MIN_CHUNK_LINES
+            and end - merged[-1][0] < MAX_CHUNK_LINES
+        ):
+            merged[-1] = (merged[-1][0], end, merged[-1][2])
+        else:
+            merged.append((start, end, title))
+    return merged
+
+
+def _fill_gaps(spans: List[Tuple[int, int, str]], line_count: int) -> List[Tuple[int, int, str]]:
+    """Module-level code between definitions becomes chunks of its own."""
+    filled: List[Tuple[int, int, str]] = []
+    cursor = 1
+    for start, end, title in sorted(spans):
+        if start > cursor:
+            filled.append((cursor, start - 1, ""))
+        filled.append((start, end, title))
+        cursor = max(cursor, end + 1)
+    if cursor <= line_count:
+        filled.append((cursor, line_count, ""))
+    return filled
+
+
+def chunk_text(rel: str, text: str) -> List[Tuple[int, int, str]]:
+    """
+    ``(start, end, title)`` line spans covering the file: top-level functions and classes
+    (methods of long classes) for Python, definition/heading lines elsewhere, at most
+    ``MAX_CHUNK_LINES`` long.
+    """
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    spans = None
+    if rel.endswith((".py", ".pyi")):
+        spans = _python_spans(text, len(lines))
+    if spans is None:
+        spans = _generic_spans(lines)
+    chunks: List[Tuple[int, int, str]] = []
+    for start, end, title in spans:
+        body = lines[start - 1 : end]
+        if not any(line.strip() for line in body):
+            continue
+        for offset in range(start, end + 1, MAX_CHUNK_LINES):
+            window_end = min(offset + MAX_CHUNK_LINES - 1, end)
+            label = title or next((line.strip() for line in body if line.strip()), "")[:80]
+            chunks.append((offset, window_end, label))
+    return chunks
+
+
+def index_batch(root: str, rels: List[str]) -> List[List[ChunkRow]]:
+    out: List[List[ChunkRow]] = []
+    for rel in rels:
+        try:
+            with open(os.path.join(root, rel), "rb") as handle:
+                if os.fstat(handle.fileno()).st_size > MAX_FILE_BYTES:
+                    out.append([])
+                    continue
+                data = handle.read()
+        except OSError:
+            out.append([])
+            continue
+        if b"\0" in data[:BINARY_SNIFF]:
+            out.append([])
+            continue
+        text = data.decode("utf-8", errors="replace")
+        lines = text.split("\n")
+        path_terms = tokenize(rel)  # every chunk of a file also matches its path
+        rows: List[ChunkRow] = []
+        for start, end, title in chunk_text(rel, text):
+            terms = Counter(tokenize("\n".join(lines[start - 1 : end])))
+            terms.update(path_terms)
+            rows.append((start, end, title, sum(terms.values()), dict(terms)))
+        out.append(rows)
+    return out
+
+
+@dataclass(frozen=True)
+class CodeChunk:
+    path: str  # posix path relative to the workspace root
+    start: int
+    end: int
+    title: str
+    score: float
+
+
+class CodeSearchIndex(SyncedFileIndex[List[ChunkRow]]):
+    """
+    BM25 index over chunks of the workspace's text files, kept on disk in SQLite.
+
+    Postings are stored per (term, file) as packed ``(chunk id, tf, chunk length)``
+    triples, so a changed file only rewrites its own rows.
+    """
+
+    SCHEMA = _SCHEMA
+    SCHEMA_VERSION = 1
+    FILE_TABLES = ("chunks", "postings")
+    extract = staticmethod(index_batch)
+
+    def __init__(self, root: Path, db_path: Path, workers: int = 0) -> None:
+        super().__init__(root, db_path, workers)
+        self._terms: Dict[str, int] | None = None
+
+    def wants(self, rel: str) -> bool:
+        return not rel.endswith(SKIP_SUFFIXES)
+
+    def sync(self) -> bool:
+        try:
+            return super().sync()
+        except BaseException:
+            self._terms = None  # ids cached from a rolled-back transaction
+            raise
+
+    def _term_ids(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        if self._terms is None:
+            self._terms = dict(conn.execute("SELECT term, id FROM terms"))
+        return self._terms
+
+    def _insert(self, conn: sqlite3.Connection, file_id: int, result: List[ChunkRow]) -> None:
+        terms = self._term_ids(conn)
+        postings: Dict[int, array[int]] = {}
+        for start, end, title, length, counts in result:
+            chunk_id = conn.execute(
+                "INSERT INTO chunks (file_id, start_line, end_line, title, length) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (file_id, start, end, title, length),
+            ).lastrowid
+            assert chunk_id is not None
+            for term, count in counts.items():
+                term_id = terms.get(term)
+                if term_id is None:
+                    term_id = conn.execute("INSERT INTO terms (term) VALUES (?)", (term,)).lastrowid
+                    assert term_id is not None
+                    terms[term] = term_id
+                postings.setdefault(term_id, array("I")).extend((chunk_id, count, length))
+        conn.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?)",
+            ((term_id, file_id, data.tobytes()) for term_id, data in postings.items()),
+        )
+
+    def search(self, query: str, k: int = 5) -> List[CodeChunk]:
+        """The ``k`` chunks scoring highest for ``query`` under BM25, best first."""
+        self.sync()
+        words = set(tokenize(query))
+        with self._lock:
+            assert self._conn is not None
+            conn = self._conn
+            total_chunks, total_length = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks"
+            ).fetchone()
+            if not total_chunks or not words:
+                return []
+            average = total_length / total_chunks
+            terms = self._term_ids(conn)
+            scores: Dict[int, float] = {}
+            for word in words:
+                term_id = terms.get(word)
+                if term_id is None:
+                    continue
+                triples = array("I")
+                for (data,) in conn.execute(
+                    "SELECT data FROM postings WHERE term_id = ?", (term_id,)
+                ):
+                    triples.frombytes(data)
+                frequency = len(triples) // 3
+                idf = math.log(1 + (total_chunks - frequency + 0.5) / (frequency + 0.5))
+                for chunk_id, count, length in zip(triples[::3], triples[1::3], triples[2::3]):
+                    norm = count + K1 * (1 - B + B * length / average)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * count * (K1 + 1) / norm
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            if not best:
+                return []
+            rows = {
+                chunk_id: (rel, start, end, title)
+                for chunk_id, rel, start, end, title in conn.execute(
+                    "SELECT c.id, f.rel, c.start_line, c.end_line, c.title "
+                    "FROM chunks c JOIN files f ON f.id = c.file_id "
+                    f"WHERE c.id IN ({','.join('?' * len(best))})",
+                    [chunk_id for chunk_id, _ in best],
+                )
+            }
+        return [CodeChunk(*rows[chunk_id], score) for chunk_id, score in best if chunk_id in rows]
+
+    def close(self) -> None:
+        super().close()
+        self._terms = None
+
+
+_indexes: Dict[Tuple[str, str], CodeSearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_code_search_index(root: Path, db_path: Path, workers: int = 0) -> CodeSearchIndex:
+    """Retrieval index shared by ``retrieve_code`` and prefetching on ``root``."""
+    key = (str(root.resolve()), str(db_path))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = CodeSearchIndex(root, db_path, workers=workers)
+        return index
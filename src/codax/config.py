@@ -44,11 +44,25 @@ class Settings(BaseSettings):
     reasoning_effort: str | None = Field(default=None)
     temperature: float = Field(default=0.2, ge=0.0, le=2.0)
     request_timeout_seconds: int = Field(default=60, ge=1)
+    # LLM admission control shared by all model calls in the process (0 = unlimited)
+    llm_requests_per_minute: int = Field(default=0, ge=0)
+    llm_tokens_per_minute: int = Field(default=0, ge=0)
+    llm_rate_limit_retries: int = Field(default=3, ge=0)
     # Safety & runtime toggles
     safety_mode: str = Field(default=SafetyMode.ON_REQUEST)
     search_backend: str = Field(default="ddg")
     allow_network: bool = Field(default=True)
     allow_git_commits: bool = Field(default=False)
+    process_pool_workers: int = Field(default=0, ge=0)  # 0 = one per CPU
+    workspace_index: bool = Field(default=True)  # shared file index for list/glob/grep
+    trigram_index: bool = Field(default=False)  # on-disk trigram index narrowing grep_files
+    # Agent sessions answer repeated reads of unchanged files with a marker (or a diff)
+    read_dedup: bool = Field(default=True)
+    read_dedup_diffs: bool = Field(default=True)
+    # Top retrieve_code chunks added to the prompt before the first model call (0 = off)
+    retrieval_prefetch: int = Field(default=0, ge=0)
+    # Record per-tool latency of every in-process workflow run for --plan (else --profile only)
+    record_latency_history: bool = Field(default=False)
     # Paths
     workspace_root: Path = Field(default_factory=lambda: Path.cwd())
     data_dir: Path = Field(default=DEFAULT_DATA_DIR)
@@ -103,10 +117,20 @@ class Settings(BaseSettings):
             "reasoning_effort": self.reasoning_effort,
             "temperature": self.temperature,
             "request_timeout_seconds": self.request_timeout_seconds,
+            "llm_requests_per_minute": self.llm_requests_per_minute,
+            "llm_tokens_per_minute": self.llm_tokens_per_minute,
+            "llm_rate_limit_retries": self.llm_rate_limit_retries,
             "safety_mode": self.safety_mode,
             "search_backend": self.search_backend,
             "allow_network": self.allow_network,
             "allow_git_commits": self.allow_git_commits,
+            "process_pool_workers": self.process_pool_workers,
+            "workspace_index": self.workspace_index,
+            "trigram_index": self.trigram_index,
+            "read_dedup": self.read_dedup,
+            "read_dedup_diffs": self.read_dedup_diffs,
+            "retrieval_prefetch": self.retrieval_prefetch,
+            "record_latency_history": self.record_latency_history,
             "workspace_root": str(self.workspace_root),
             "data_dir": str(self.data_dir),
             "config_file": str(self.config_file),
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+# Directories never worth watching or indexing.
+IGNORED_DIRS = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        "node_modules",
+        "__pycache__",
+        ".venv",
+        "venv",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+        ".tox",
+    }
+)
+
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_EVENT = struct.Struct("iIII")
+
+
+def iter_dirs(root: Path, ignored: frozenset[str] = IGNORED_DIRS) -> Iterator[Path]:
+    """Yield ``root`` and every directory below it, pruning ignored names."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        yield current
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.name in ignored:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+        except OSError:
+            continue
+
+
+class FileWatcher(ABC):
+    """Reports paths under ``root`` that were created, modified, moved or deleted."""
+
+    def __init__(self, root: Path, ignored: frozenset[str] = IGNORED_DIRS) -> None:
+        self.root = root
+        self.ignored = ignored
+
+    def _ignored(self, path: Path) -> bool:
+        try:
+            parts = path.relative_to(self.root).parts
+        except ValueError:
+            return True
+        return any(part in self.ignored for part in parts)
+
+    @abstractmethod
+    def changes(self, timeout: float | None = None) -> set[Path]:
+        """Block until something changed (or ``timeout``) and return the changed paths."""
+
+    def close(self) -> None:  # noqa: B027 - optional hook
+        """Release OS resources."""
+
+    def __enter__(self) -> FileWatcher:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class PollingWatcher(FileWatcher):
+    """Portable fallback: compares (mtime, size) snapshots every ``interval`` seconds."""
+
+    def __init__(
+        self, root: Path, interval: float = 0.5, ignored: frozenset[str] = IGNORED_DIRS
+    ) -> None:
+        super().__init__(root, ignored)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot: Dict[Path, Tuple[int, int]] = {}
+        for directory in iter_dirs(self.root, self.ignored):
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name in self.ignored or entry.is_dir(follow_symlinks=False):
+                            continue
+                        try:
+                            stat = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        snapshot[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+        return snapshot
+
+    def changes(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            previous, self._snapshot = self._snapshot, current
+            keys = current.keys() | previous.keys()
+            changed = {path for path in keys if current.get(path) != previous.get(path)}
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            pause = self.interval
+            if deadline is not None:
+                pause = min(pause, max(deadline - time.monotonic(), 0.0))
+            time.sleep(pause)
+
+
+class InotifyWatcher(FileWatcher):
+    """Linux inotify watcher (via libc), with one watch per directory kept up to date."""
+
+    def __init__(self, root: Path, ignored: frozenset[str] = IGNORED_DIRS) -> None:
+        super().__init__(root, ignored)
+        libname = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libname, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, Path] = {}
+        self._lock = threading.Lock()
+        # False once a directory could not be watched (e.g. max_user_watches reached).
+        self.complete = True
+        for directory in iter_dirs(root, ignored):
+            self._watch(directory)
+
+    def _watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+        else:
+            self.complete = False
+
+    def _read(self) -> set[Path]:
+        changed: set[Path] = set()
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                changed.add(self.root)  # events were lost; callers treat root as "anything"
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if self._ignored(path):
+                continue
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                for sub in iter_dirs(path, self.ignored):
+                    self._watch(sub)
+                    changed.update(p for p in sub.iterdir() if p.is_file())
+            changed.add(path)
+        return changed
+
+    def changes(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            ready, _, _ = select.select([self._fd], [], [], wait)
+            if ready:
+                with self._lock:
+                    changed = self._read()
+                if changed:
+                    return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(
+    root: Path, poll_interval: float = 0.5, force_polling: bool = False
+) -> FileWatcher:
+    """inotify on Linux when available, otherwise mtime polling."""
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, interval=poll_interval)
+
+
+def wait_for_changes(
+    watcher: FileWatcher,
+    debounce: float = 0.3,
+    timeout: float | None = None,
+    stop: threading.Event | None = None,
+) -> set[Path]:
+    """
+    Wait for a change, then keep collecting until ``debounce`` seconds pass quietly.
+
+    A burst of saves is returned as one set. ``stop`` is checked at least every second.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    changed: set[Path] = set()
+    while not changed:
+        if stop is not None and stop.is_set():
+            return set()
+        wait = 1.0 if deadline is None else min(1.0, deadline - time.monotonic())
+        if wait <= 0:
+            return set()
+        changed = watcher.changes(wait)
+    while more := watcher.changes(debounce):
+        changed |= more
+    return changed
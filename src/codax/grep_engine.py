@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import atexit
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain
+from re import _constants as sre_constants  # type: ignore[attr-defined]
+from re import _parser as sre_parse  # type: ignore[attr-defined]
+from typing import Any, Deque, Iterable, Iterator, List
+
+# Below this many candidate files (or bytes) the scan runs in-process: spawning and
+# feeding workers costs more than it saves.
+PARALLEL_MIN_FILES = 256
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+# Files per task sent to a worker; small enough that a reached limit stops work quickly.
+BATCH_FILES = 128
+# Bytes sniffed for a NUL to classify a file as binary (as git and rg do).
+BINARY_SNIFF = 1024
+
+
+# Bytes on which a bytes regex can disagree with the same pattern as str: non-ASCII
+# (multi-byte characters, Unicode \w/\s/case folding) and \x1c-\x1f (str \s only).
+_NON_ASCII = re.compile(rb"[\x1c-\x1f\x80-\xff]")
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT)
+_EXACT_ANCHORS = (
+    sre_constants.AT_BEGINNING,
+    sre_constants.AT_BEGINNING_STRING,
+    sre_constants.AT_END,
+    sre_constants.AT_END_STRING,
+)
+
+
+def _byte_exact(items: Any) -> bool:
+    """True if the parsed pattern matches UTF-8 bytes exactly as it matches the decoded text."""
+    for op, arg in items:
+        if op is sre_constants.LITERAL:
+            continue
+        if op is sre_constants.AT:
+            if arg not in _EXACT_ANCHORS:
+                return False
+        elif op is sre_constants.IN:
+            # positive ASCII sets only: a negated set or category also matches non-ASCII
+            if any(
+                not (kind is sre_constants.LITERAL and value < 0x80)
+                and not (kind is sre_constants.RANGE and value[1] < 0x80)
+                for kind, value in arg
+            ):
+                return False
+        elif op is sre_constants.SUBPATTERN:
+            if arg[1] or arg[2] or not _byte_exact(arg[3]):  # inline flags
+                return False
+        elif op in _REPEATS:
+            if not _byte_exact(arg[2]):
+                return False
+        elif op is sre_constants.BRANCH:
+            if not all(_byte_exact(branch) for branch in arg[1]):
+                return False
+        elif op is sre_constants.ATOMIC_GROUP:
+            if not _byte_exact(arg):
+                return False
+        else:  # ANY, CATEGORY, NOT_LITERAL, lookarounds, backreferences, ...
+            return False
+    return True
+
+
+class CompiledPattern:
+    """
+    A text regex for files read as bytes. Where the pattern matches UTF-8 bytes exactly
+    as it matches text (literals, ASCII sets, line anchors) the bytes are searched
+    directly; otherwise the bytes regex only serves files without non-ASCII content,
+    and other files are decoded and searched as text.
+    """
+
+    def __init__(self, pattern: str, flags: int = 0) -> None:
+        self.text = re.compile(pattern, flags)
+        self.raw: re.Pattern[bytes] | None = None
+        self.exact = False
+        try:
+            self.raw = re.compile(pattern.encode("utf-8"), flags)
+        except re.error:  # str-only syntax such as \u00e9
+            return
+        parsed = sre_parse.parse(pattern, flags)
+        self.exact = not parsed.state.flags & re.IGNORECASE and _byte_exact(parsed)
+        if not self.exact and not pattern.isascii():
+            self.raw = None
+
+    def search(self, data: bytes | mmap.mmap) -> bool:
+        if self.raw is not None and (self.exact or _NON_ASCII.search(data) is None):
+            return self.raw.search(data) is not None
+        return self.text.search(data[:].decode("utf-8", errors="replace")) is not None
+
+
+@lru_cache(maxsize=64)
+def compile_pattern(pattern: str, flags: int = 0) -> CompiledPattern:
+    """Compile a text regex for matching raw file bytes (each worker caches its own copy)."""
+    return CompiledPattern(pattern, flags)
+
+
+def file_matches(regex: CompiledPattern, path: str) -> bool:
+    """Search ``path`` through mmap (decoded only if needed); binary and unreadable files miss."""
+    try:
+        with open(path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size == 0:
+                return regex.search(b"")
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data.find(b"\0", 0, BINARY_SNIFF) >= 0:
+                    return False
+                return regex.search(data)
+    except (OSError, ValueError):
+        return False
+
+
+def scan_batch(pattern: str, flags: int, paths: List[str], limit: int) -> List[str]:
+    regex = compile_pattern(pattern, flags)
+    hits: List[str] = []
+    for path in paths:
+        if file_matches(regex, path):
+            hits.append(path)
+            if len(hits) >= limit:
+                break
+    return hits
+
+
+_executor: ProcessPoolExecutor | None = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared spawn pool for file-scanning work (grep, index builds)."""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _executor_workers = workers
+        return _executor
+
+
+@atexit.register
+def shutdown_grep_pool() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _batches(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def grep_files(
+    pattern: str,
+    paths: Iterable[str],
+    limit: int,
+    workers: int = 0,
+    flags: int = 0,
+) -> List[str]:
+    """
+    Paths whose content matches ``pattern``, in ``paths`` order, at most ``limit`` of them.
+
+    The pattern is compiled once (per process) and files are searched as mmapped bytes,
+    decoded only where bytes and text matching could differ (see ``CompiledPattern``).
+    Large candidate sets are split into batches scanned by a process pool (``workers``,
+    0 = one per CPU) with a bounded number in flight; once ``limit`` matches are
+    collected, pending batches are cancelled. ``^`` and ``$`` match at line boundaries,
+    as in rg. Raises ``re.error`` for an invalid pattern.
+    """
+    flags |= re.MULTILINE
+    compile_pattern(pattern, flags)
+    workers = workers or os.cpu_count() or 1
+    candidates = iter(paths)
+    head: List[str] = []
+    head_bytes = 0
+    for path in candidates:
+        head.append(path)
+        try:
+            head_bytes += os.stat(path).st_size
+        except OSError:
+            pass
+        if len(head) >= PARALLEL_MIN_FILES or head_bytes >= PARALLEL_MIN_BYTES:
+            break
+    else:
+        return scan_batch(pattern, flags, head, limit)
+    if workers <= 1:
+        hits = scan_batch(pattern, flags, head, limit)
+        for batch in _batches(candidates, BATCH_FILES):
+            if len(hits) >= limit:
+                break
+            hits.extend(scan_batch(pattern, flags, batch, limit - len(hits)))
+        return hits[:limit]
+
+    executor = get_pool(workers)
+    pending: Deque[Future[List[str]]] = deque()
+    hits = []
+    try:
+        for batch in _batches(chain(head, candidates), BATCH_FILES):
+            pending.append(executor.submit(scan_batch, pattern, flags, batch, limit))
+            if len(pending) < workers * 2:
+                continue
+            hits.extend(pending.popleft().result())
+            if len(hits) >= limit:
+                break
+        while pending and len(hits) < limit:
+            hits.extend(pending.popleft().result())
+    finally:
+        for future in pending:
+            future.cancel()
+    return hits[:limit]
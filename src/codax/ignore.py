@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from codax.fswatch import IGNORED_DIRS
+
+IGNORE_FILES = (".gitignore", ".ignore")
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    """One gitignore line, matched against paths relative to ``base`` (posix, "" = root)."""
+
+    base: str
+    regex: re.Pattern[str]
+    negate: bool
+    dir_only: bool
+
+    def matches(self, rel: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel.startswith(self.base + "/"):
+                return False
+            rel = rel[len(self.base) + 1 :]
+        return self.regex.fullmatch(rel) is not None
+
+
+def _glob_to_regex(pattern: str) -> str:
+    out: List[str] = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif char == "*":
+            out.append("[^/]*")
+            i += 1
+        elif char == "?":
+            out.append("[^/]")
+            i += 1
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end < 0:
+                out.append(re.escape(char))
+                i += 1
+                continue
+            body = pattern[i + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = end + 1
+        elif char == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(char))
+            i += 1
+    return "".join(out)
+
+
+def parse_ignore(text: str, base: str = "") -> List[IgnoreRule]:
+    """Compile gitignore syntax (negation, anchoring, ``dir/``, ``**``) into rules."""
+    rules: List[IgnoreRule] = []
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # A slash anywhere but the end anchors the pattern to the ignore file's directory.
+        anchored = "/" in line
+        line = line.lstrip("/")
+        regex = _glob_to_regex(line)
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        rules.append(IgnoreRule(base, re.compile(regex), negate, dir_only))
+    return rules
+
+
+class IgnoreMatcher:
+    """
+    Gitignore semantics for one workspace: ``.gitignore``/``.ignore`` in every directory
+    plus ``.git/info/exclude``, and ``always`` names (VCS dirs, ``node_modules``...).
+
+    Ignore files are read lazily per directory and re-read when their mtime changes.
+    Callers walking a tree should prune ignored directories; ``is_ignored`` also checks
+    ancestors so it is correct for arbitrary paths.
+    """
+
+    def __init__(self, root: Path, always: Iterable[str] = IGNORED_DIRS) -> None:
+        self.root = root
+        self.always = frozenset(always)
+        self._rules: Dict[str, Tuple[Tuple[int, ...], List[IgnoreRule]]] = {}
+        self._lock = threading.Lock()
+
+    def _read_rules(self, base: str) -> List[IgnoreRule]:
+        directory = self.root / base if base else self.root
+        sources = [directory / name for name in IGNORE_FILES]
+        if not base:
+            sources.insert(0, self.root / ".git" / "info" / "exclude")
+        stamps = []
+        for source in sources:
+            try:
+                stamps.append(source.stat().st_mtime_ns)
+            except OSError:
+                stamps.append(0)
+        key = tuple(stamps)
+        with self._lock:
+            cached = self._rules.get(base)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+        rules: List[IgnoreRule] = []
+        for source, stamp in zip(sources, stamps):
+            if stamp:
+                try:
+                    rules.extend(parse_ignore(source.read_text(errors="replace"), base))
+                except OSError:
+                    continue
+        with self._lock:
+            self._rules[base] = (key, rules)
+        return rules
+
+    def rules_for(self, directory: str) -> List[IgnoreRule]:
+        """Rules that apply inside ``directory``, from the root ignore file down."""
+        parts = directory.split("/") if directory else []
+        rules: List[IgnoreRule] = []
+        for depth in range(len(parts) + 1):
+            rules.extend(self._read_rules("/".join(parts[:depth])))
+        return rules
+
+    def matches(self, rel: str, is_dir: bool, rules: List[IgnoreRule]) -> bool:
+        """Decide ``rel`` against already collected ``rules`` (parents not checked)."""
+        if rel.rsplit("/", 1)[-1] in self.always:
+            return True
+        ignored = False
+        for rule in rules:
+            if rule.negate == ignored and rule.matches(rel, is_dir):
+                ignored = not rule.negate
+        return ignored
+
+    def is_ignored(self, rel: str, is_dir: bool = False) -> bool:
+        parts = rel.split("/")
+        for depth in range(1, len(parts) + 1):
+            prefix = "/".join(parts[:depth])
+            parent = "/".join(parts[: depth - 1])
+            leaf_is_dir = is_dir if depth == len(parts) else True
+            if self.matches(prefix, leaf_is_dir, self.rules_for(parent)):
+                return True
+        return False
+
+
+def is_ignore_file(name: str) -> bool:
+    return name in IGNORE_FILES
+
+
+def relpath(path: Path | str, root: Path) -> str:
+    """Posix path of ``path`` relative to ``root`` ("" for the root itself)."""
+    rel = os.path.relpath(path, root)
+    return "" if rel == "." else rel.replace(os.sep, "/")
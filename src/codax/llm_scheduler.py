@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
+
+from codax.config import Settings
+
+T = TypeVar("T")
+
+# Lower values are served first within a model's queue.
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+
+def estimate_tokens(*texts: Any) -> int:
+    """Cheap prompt-size estimate (~4 characters per token) for rate accounting."""
+    return sum(len(str(text)) for text in texts if text) // 4 + 1
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """Recognize provider 429s without importing provider SDKs."""
+    status = getattr(exc, "status_code", None) or getattr(
+        getattr(exc, "response", None), "status_code", None
+    )
+    return status == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(str(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Continuously refilled bucket holding at most one minute of ``per_minute`` capacity."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.stamp = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` is available; oversized amounts wait for a full bucket."""
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.level
+        return max(needed / self.rate, 0.0) if needed > 0 else 0.0
+
+    def take(self, amount: float) -> None:
+        # May go negative for oversized requests or usage corrections; refill repays it.
+        self.level -= amount
+
+
+@dataclass
+class _ModelState:
+    requests: TokenBucket | None
+    tokens: TokenBucket | None
+    queue: List[Tuple[int, int]] = field(default_factory=list)
+    paused_until: float = 0.0
+    strikes: int = 0
+    granted: int = 0
+    throttled: int = 0
+    wait_ms_total: float = 0.0
+    wait_ms_max: float = 0.0
+    max_depth: int = 0
+    by_priority: Dict[str, int] = field(default_factory=dict)
+
+
+class LlmScheduler:
+    """
+    Process-wide admission control for LLM calls.
+
+    Each model has a request bucket (``rpm``) and a token bucket (``tpm``) plus a
+    priority queue: waiting ``interactive`` calls are admitted before ``batch`` ones and
+    calls of equal priority are served FIFO. A 429 pauses the model with exponential
+    backoff (or the server's ``retry-after``) for every caller, not just the one that
+    hit it. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_retries: int = 3) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self._models: Dict[str, _ModelState] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = _ModelState(
+                requests=TokenBucket(self.rpm) if self.rpm > 0 else None,
+                tokens=TokenBucket(self.tpm) if self.tpm > 0 else None,
+            )
+        return state
+
+    def acquire(
+        self, model: str, tokens: int = 0, priority: str = "batch", requests: int = 1
+    ) -> float:
+        """Block until the call may proceed; returns the seconds spent waiting."""
+        rank = PRIORITIES.get(priority, PRIORITIES["batch"])
+        started = time.monotonic()
+        with self._cond:
+            state = self._state(model)
+            ticket = (rank, next(self._seq))
+            heapq.heappush(state.queue, ticket)
+            state.max_depth = max(state.max_depth, len(state.queue))
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = max(state.paused_until - now, 0.0)
+                    if state.queue[0] == ticket and wait == 0.0:
+                        if state.requests is not None:
+                            wait = state.requests.wait_time(requests, now)
+                        if state.tokens is not None and tokens:
+                            wait = max(wait, state.tokens.wait_time(tokens, now))
+                        if wait == 0.0:
+                            break
+                    # The head sleeps until its budget refills; others wait for it to go.
+                    self._cond.wait(timeout=wait if state.queue[0] == ticket else None)
+            finally:
+                state.queue.remove(ticket)
+                heapq.heapify(state.queue)
+                self._cond.notify_all()
+            if state.requests is not None:
+                state.requests.take(requests)
+            if state.tokens is not None:
+                state.tokens.take(tokens)
+            waited = time.monotonic() - started
+            state.granted += requests
+            state.wait_ms_total += waited * 1000
+            state.wait_ms_max = max(state.wait_ms_max, waited * 1000)
+            state.by_priority[priority] = state.by_priority.get(priority, 0) + requests
+        return waited
+
+    def settle(self, model: str, estimated: int, actual: int) -> None:
+        """Correct the token bucket once the provider reports real usage."""
+        with self._cond:
+            state = self._state(model)
+            if state.tokens is not None and actual:
+                state.tokens.take(actual - estimated)
+            state.strikes = 0
+
+    def throttled(self, model: str, retry_after: float | None = None) -> float:
+        """Record a 429 and pause the model; returns the pause in seconds."""
+        with self._cond:
+            state = self._state(model)
+            state.strikes += 1
+            state.throttled += 1
+            delay = retry_after
+            if delay is None:
+                delay = min(60.0, 2.0 ** (state.strikes - 1)) * (1 + random.uniform(0, 0.1))
+            state.paused_until = max(state.paused_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        return delay
+
+    def call(
+        self,
+        model: str,
+        fn: Callable[[], T],
+        tokens: int = 0,
+        priority: str = "batch",
+        requests: int = 1,
+        usage: Callable[[T], int] | None = None,
+    ) -> T:
+        """
+        Run ``fn`` under the model's limits, retrying 429s up to ``max_retries`` times.
+
+        ``usage`` maps the response to the tokens actually consumed so the bucket can be
+        corrected; other exceptions propagate unchanged.
+        """
+        attempt = 0
+        while True:
+            self.acquire(model, tokens, priority, requests)
+            try:
+                response = fn()
+            except Exception as exc:
+                if not is_rate_limit_error(exc) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.throttled(model, _retry_after(exc))
+                continue
+            self.settle(model, tokens, usage(response) if usage else 0)
+            return response
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model queue depth, admitted calls, 429s and wait times."""
+        with self._cond:
+            return {
+                model: {
+                    "queue_depth": len(state.queue),
+                    "max_queue_depth": state.max_depth,
+                    "granted": state.granted,
+                    "throttled": state.throttled,
+                    "wait_ms_total": round(state.wait_ms_total, 3),
+                    "wait_ms_max": round(state.wait_ms_max, 3),
+                    "wait_ms_avg": round(state.wait_ms_total / state.granted, 3)
+                    if state.granted
+                    else 0.0,
+                    "by_priority": dict(state.by_priority),
+                }
+                for model, state in self._models.items()
+            }
+
+
+_schedulers: Dict[Tuple[int, int, int], LlmScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(settings: Settings) -> LlmScheduler:
+    """Shared scheduler for these limits, so every tool and agent in the process queues together."""
+    key = (
+        settings.llm_requests_per_minute,
+        settings.llm_tokens_per_minute,
+        settings.llm_rate_limit_retries,
+    )
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = _schedulers[key] = LlmScheduler(*key)
+        return scheduler
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, ClassVar, Dict, Generic, List, Tuple, TypeVar
+
+from codax.grep_engine import get_pool
+from codax.workspace_index import get_workspace_index
+
+T = TypeVar("T")
+
+_FILES_SCHEMA = """
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY, rel TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL
+);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+class SyncedFileIndex(ABC, Generic[T]):
+    """
+    Per-workspace SQLite index whose rows are derived file by file.
+
+    ``sync`` re-extracts the files whose mtime or size changed since they were stored
+    (per the workspace index, or a fresh ``stat`` when it only polls), on the process
+    pool when there are many, and replaces their rows in one transaction. Subclasses
+    give the extra ``SCHEMA`` (tables keyed by ``file_id`` listed in ``FILE_TABLES``),
+    a module-level batch ``extract`` function, and ``_insert`` for one file's result.
+    """
+
+    SCHEMA: ClassVar[str]
+    SCHEMA_VERSION: ClassVar[int]
+    FILE_TABLES: ClassVar[Tuple[str, ...]]
+    BATCH: ClassVar[int] = 64
+
+    def __init__(self, root: Path, db_path: Path, workers: int = 0) -> None:
+        self.root = root.resolve()
+        self.db_path = db_path
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._files: Dict[str, Tuple[int, int, int]] = {}  # rel -> (id, mtime_ns, size)
+        self._synced: Tuple[int, int] | None = None  # (id of workspace index, generation)
+        self.stats = {"parsed": 0, "removed": 0}
+
+    # -- subclass hooks --------------------------------------------------------------
+
+    def wants(self, rel: str) -> bool:  # noqa: ARG002 - default: every indexed file
+        return True
+
+    @staticmethod
+    @abstractmethod
+    def extract(root: str, rels: List[str]) -> List[T]:
+        """Derive one result per relative path (runs on the process pool)."""
+
+    @abstractmethod
+    def _insert(self, conn: sqlite3.Connection, file_id: int, result: T) -> None:
+        """Insert the rows of one file's ``extract`` result."""
+
+    # -- syncing ---------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.DatabaseError:
+            row = None
+        if row is None or row[0] != self.SCHEMA_VERSION:
+            conn.close()
+            self.db_path.unlink(missing_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.executescript(_FILES_SCHEMA + self.SCHEMA)
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (self.SCHEMA_VERSION,))
+            conn.commit()
+        self._files = {
+            rel: (file_id, mtime_ns, size)
+            for file_id, rel, mtime_ns, size in conn.execute(
+                "SELECT id, rel, mtime_ns, size FROM files"
+            )
+        }
+        self._conn = conn
+        return conn
+
+    def _extract(self, rels: List[str]) -> List[T]:
+        workers = self.workers or os.cpu_count() or 1
+        extract = type(self).extract
+        if workers <= 1 or len(rels) < 2 * self.BATCH:
+            return extract(str(self.root), rels)
+        batches = [rels[i : i + self.BATCH] for i in range(0, len(rels), self.BATCH)]
+        results: List[T] = []
+        for batch in get_pool(workers).map(extract, [str(self.root)] * len(batches), batches):
+            results.extend(batch)
+        return results
+
+    def sync(self) -> bool:
+        """Bring the database up to date with the workspace; True if anything changed."""
+        with self._lock:
+            conn = self._connect()
+            workspace = get_workspace_index(self.root)
+            workspace.refresh()
+            state = (id(workspace), workspace.generation)
+            if workspace.watching and state == self._synced:
+                return False
+            live: Dict[str, Tuple[int, int]] = {}
+            for entry in workspace.files():
+                if not self.wants(entry.rel):
+                    continue
+                if workspace.watching:
+                    live[entry.rel] = (entry.mtime_ns, entry.size)
+                    continue
+                try:  # polling misses in-place edits: trust only a fresh stat
+                    stat = os.stat(self.root / entry.rel)
+                except OSError:
+                    continue
+                live[entry.rel] = (stat.st_mtime_ns, stat.st_size)
+            changed = [
+                rel
+                for rel, stamp in live.items()
+                if (known := self._files.get(rel)) is None or known[1:] != stamp
+            ]
+            removed = [rel for rel in self._files if rel not in live]
+            if changed or removed:
+                self._store(conn, changed, removed, live)
+            self._synced = state
+            return bool(changed or removed)
+
+    def _store(
+        self,
+        conn: sqlite3.Connection,
+        changed: List[str],
+        removed: List[str],
+        live: Dict[str, Tuple[int, int]],
+    ) -> None:
+        results = self._extract(changed)
+        with conn:
+            for rel in [*removed, *changed]:
+                known = self._files.pop(rel, None)
+                if known is not None:
+                    conn.execute("DELETE FROM files WHERE id = ?", (known[0],))
+                    for table in self.FILE_TABLES:
+                        conn.execute(f"DELETE FROM {table} WHERE file_id = ?", (known[0],))
+            for rel, result in zip(changed, results):
+                mtime_ns, size = live[rel]
+                file_id = conn.execute(
+                    "INSERT INTO files (rel, mtime_ns, size) VALUES (?, ?, ?)",
+                    (rel, mtime_ns, size),
+                ).lastrowid
+                assert file_id is not None
+                self._files[rel] = (file_id, mtime_ns, size)
+                self._insert(conn, file_id, result)
+        self.stats["parsed"] += len(changed)
+        self.stats["removed"] += len(removed)
+
+    def _query(self, sql: str, params: Any = ()) -> List[Any]:
+        with self._lock:
+            assert self._conn is not None
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._synced = None
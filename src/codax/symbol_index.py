@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import ast
+import os
+import sqlite3
+import threading
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from codax.sqlite_index import SyncedFileIndex
+
+PYTHON_SUFFIXES = (".py", ".pyi")
+# Larger files are recorded without symbols rather than parsed.
+MAX_FILE_BYTES = 4 * 1024 * 1024
+
+# (name, qualname, kind, line, end_line, col)
+SymbolRow = Tuple[str, str, str, int, int, int]
+# identifier -> flat [line, col, line, col, ...] of its uses in one file
+RefMap = Dict[str, List[int]]
+
+_SCHEMA = """
+CREATE TABLE symbols (
+    file_id INTEGER NOT NULL, name TEXT NOT NULL, qualname TEXT NOT NULL, kind TEXT NOT NULL,
+    line INTEGER NOT NULL, end_line INTEGER NOT NULL, col INTEGER NOT NULL
+);
+CREATE INDEX symbols_name ON symbols (name);
+CREATE INDEX symbols_qualname ON symbols (qualname);
+CREATE INDEX symbols_file ON symbols (file_id);
+CREATE TABLE refs (
+    name TEXT NOT NULL, file_id INTEGER NOT NULL, positions BLOB NOT NULL,
+    PRIMARY KEY (name, file_id)
+) WITHOUT ROWID;
+CREATE INDEX refs_file ON refs (file_id);
+"""
+
+
+@dataclass(frozen=True)
+class Symbol:
+    path: str  # posix path relative to the workspace root
+    name: str
+    qualname: str  # dotted scope path; the imported target for imports
+    kind: str  # class, function, method or import
+    line: int  # first line, decorators included
+    end_line: int
+    col: int
+
+
+@dataclass(frozen=True)
+class Reference:
+    path: str
+    name: str
+    line: int
+    col: int  # 0-based, like ast
+
+
+class _Collector(ast.NodeVisitor):
+    def __init__(self) -> None:
+        self.symbols: List[SymbolRow] = []
+        self.refs: RefMap = {}
+        self._scope: List[Tuple[str, bool]] = []  # (name, is_class)
+
+    def _ref(self, name: str, line: int, col: int) -> None:
+        self.refs.setdefault(name, []).extend((line, col))
+
+    def _define(
+        self, node: ast.ClassDef | ast.FunctionDef | ast.AsyncFunctionDef, kind: str
+    ) -> None:
+        qualname = ".".join([*(name for name, _ in self._scope), node.name])
+        start = min([node.lineno, *(decorator.lineno for decorator in node.decorator_list)])
+        self.symbols.append(
+            (node.name, qualname, kind, start, node.end_lineno or node.lineno, node.col_offset)
+        )
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self._define(node, "class")
+        for child in [*node.decorator_list, *node.bases, *node.keywords]:
+            self.visit(child)
+        self._scope.append((node.name, True))
+        for statement in node.body:
+            self.visit(statement)
+        self._scope.pop()
+
+    def _function(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        self._define(node, "method" if self._scope and self._scope[-1][1] else "function")
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+        if node.returns is not None:
+            self.visit(node.returns)
+        self._scope.append((node.name, False))
+        for statement in node.body:
+            self.visit(statement)
+        self._scope.pop()
+
+    visit_FunctionDef = _function
+    visit_AsyncFunctionDef = _function
+
+    def _import(self, node: ast.Import | ast.ImportFrom, bound: str, target: str) -> None:
+        end_line = node.end_lineno or node.lineno
+        self.symbols.append((bound, target, "import", node.lineno, end_line, node.col_offset))
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            bound = alias.asname or alias.name.split(".")[0]
+            self._import(node, bound, alias.name)
+            self._ref(alias.name.split(".")[0], alias.lineno, alias.col_offset)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        module = "." * node.level + (node.module or "")
+        for alias in node.names:
+            target = f"{module}.{alias.name}" if node.module else module + alias.name
+            self._import(node, alias.asname or alias.name, target)
+            if alias.name != "*":
+                self._ref(alias.name, alias.lineno, alias.col_offset)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        self._ref(node.id, node.lineno, node.col_offset)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        self.visit(node.value)
+        end_line = node.end_lineno or node.lineno
+        end_col = node.end_col_offset or 0
+        self._ref(node.attr, end_line, max(end_col - len(node.attr), 0))
+
+
+def parse_source(source: bytes) -> Tuple[List[SymbolRow], RefMap]:
+    """Definitions, imports and identifier uses of one Python file; empty if it fails to parse."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError, RecursionError):
+        return [], {}
+    collector = _Collector()
+    try:
+        collector.visit(tree)
+    except RecursionError:
+        return [], {}
+    return collector.symbols, collector.refs
+
+
+def parse_batch(root: str, rels: List[str]) -> List[Tuple[List[SymbolRow], RefMap]]:
+    out: List[Tuple[List[SymbolRow], RefMap]] = []
+    for rel in rels:
+        try:
+            with open(os.path.join(root, rel), "rb") as handle:
+                if os.fstat(handle.fileno()).st_size > MAX_FILE_BYTES:
+                    out.append(([], {}))
+                    continue
+                source = handle.read()
+        except OSError:
+            out.append(([], {}))
+            continue
+        out.append(parse_source(source))
+    return out
+
+
+class SymbolIndex(SyncedFileIndex[Tuple[List[SymbolRow], RefMap]]):
+    """SQLite index of the Python definitions and identifier uses in a workspace."""
+
+    SCHEMA = _SCHEMA
+    SCHEMA_VERSION = 1
+    FILE_TABLES = ("symbols", "refs")
+    extract = staticmethod(parse_batch)
+
+    def wants(self, rel: str) -> bool:
+        return rel.endswith(PYTHON_SUFFIXES)
+
+    def _insert(
+        self, conn: sqlite3.Connection, file_id: int, result: Tuple[List[SymbolRow], RefMap]
+    ) -> None:
+        symbols, refs = result
+        conn.executemany(
+            "INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((file_id, *symbol) for symbol in symbols),
+        )
+        conn.executemany(
+            "INSERT INTO refs VALUES (?, ?, ?)",
+            ((name, file_id, array("I", positions).tobytes()) for name, positions in refs.items()),
+        )
+
+    def find(self, name: str, kind: str | None = None, limit: int = 50) -> List[Symbol]:
+        """
+        Symbols whose name or dotted qualname is ``name`` (``*``/``?`` glob wildcards
+        allowed), optionally of one ``kind``, ordered by path and line.
+        """
+        self.sync()
+        op = "GLOB" if any(char in name for char in "*?[") else "="
+        sql = (
+            "SELECT f.rel, s.name, s.qualname, s.kind, s.line, s.end_line, s.col "
+            "FROM symbols s JOIN files f ON f.id = s.file_id "
+            f"WHERE (s.name {op} ? OR s.qualname {op} ?)"
+        )
+        params: List[object] = [name, name]
+        if kind:
+            sql += " AND s.kind = ?"
+            params.append(kind)
+        sql += " ORDER BY s.kind = 'import', f.rel, s.line LIMIT ?"
+        params.append(limit)
+        return [Symbol(*row) for row in self._query(sql, params)]
+
+    def references(self, name: str, limit: int = 100) -> Tuple[List[Reference], int]:
+        """Uses of identifier ``name`` (last part of a dotted name), and the total count."""
+        self.sync()
+        identifier = name.rsplit(".", 1)[-1]
+        rows = self._query(
+            "SELECT f.rel, r.positions FROM refs r JOIN files f ON f.id = r.file_id "
+            "WHERE r.name = ? ORDER BY f.rel",
+            (identifier,),
+        )
+        found: List[Reference] = []
+        total = 0
+        for rel, blob in rows:
+            positions = array("I")
+            positions.frombytes(blob)
+            pairs = sorted(zip(positions[::2], positions[1::2]))
+            total += len(pairs)
+            for line, col in pairs[: max(limit - len(found), 0)]:
+                found.append(Reference(rel, identifier, line, col))
+        return found, total
+
+
+_indexes: Dict[Tuple[str, str], SymbolIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_symbol_index(root: Path, db_path: Path, workers: int = 0) -> SymbolIndex:
+    """Symbol index shared by the symbol tools on ``root`` in this process."""
+    key = (str(root.resolve()), str(db_path))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = SymbolIndex(root, db_path, workers=workers)
+        return index
@@ -1,11 +1,14 @@
 from codax.config import Settings
 from codax.safety import build_policy
 from codax.tools.filesystem import (
+    EditFileTool,
     FsGlobTool,
     FsListTool,
     FsMkdirTool,
+    FsReadManyTool,
     FsReadTool,
     FsRemoveTool,
+    FsWriteManyTool,
     FsWriteTool,
 )
 from codax.tools.git_tools import (
@@ -19,9 +22,14 @@ from codax.tools.git_tools import (
 from codax.tools.http_tool import HttpTool
 from codax.tools.search_tool import SearchTool
 from codax.tools.shell import ShellTool
+from codax.tools.symbols import FindReferencesTool, FindSymbolTool
 from codax.tools.text_tools import AnalyzeTool, SummarizeTool
 from codax.tools.llm_node import LlmNodeTool
+from codax.tools.read_cache import ReadCache
+from codax.tools.retrieval import RetrieveCodeTool
 from codax.tools.workflow_tools import WorkflowRunTool, WorkflowValidateTool
+from codax.trigram_index import trigram_db_path
+from codax.workspace_index import index_db_path
 from codax.tools.advanced import (
     ApplyPatchTool,
     ExecCommandTool,
@@ -42,6 +50,9 @@ __all__ = [
     "WriteStdinTool",
     "FsReadTool",
     "FsWriteTool",
+    "FsReadManyTool",
+    "FsWriteManyTool",
+    "EditFileTool",
     "FsListTool",
     "FsMkdirTool",
     "FsRemoveTool",
@@ -57,6 +68,9 @@ __all__ = [
     "ApplyPatchTool",
     "UpdatePlanTool",
     "GrepFilesTool",
+    "FindSymbolTool",
+    "FindReferencesTool",
+    "RetrieveCodeTool",
     "ReadFileAdvancedTool",
     "ListDirAdvancedTool",
     "ViewImageTool",
@@ -66,29 +80,54 @@ __all__ = [
     "WorkflowValidateTool",
     "WorkflowRunTool",
     "LlmNodeTool",
+    "ReadCache",
     "build_tool_registry",
 ]
 
 
-def build_tool_registry(settings: Settings) -> dict[str, object]:
-    """Instantiate all tools with project settings and safety policy."""
+def build_tool_registry(
+    settings: Settings, read_cache: ReadCache | None = None
+) -> dict[str, object]:
+    """
+    Instantiate all tools with project settings and safety policy.
+
+    ``read_cache`` makes the read tools skip content this session has already seen.
+    """
     workspace = settings.workspace_root
     allow_network = settings.allow_network
     policy = build_policy(settings)
+    use_index = settings.workspace_index
+    workers = settings.process_pool_workers
+    symbol_db = index_db_path(settings.data_dir, workspace, "symbols")
     registry: dict[str, object] = {
         "shell": ShellTool(policy=policy, timeout=settings.request_timeout_seconds),
         "shell_command": ShellCommandTool(workspace, timeout=settings.request_timeout_seconds),
         "exec_command": ExecCommandTool(workspace, timeout_ms=settings.request_timeout_seconds * 1000),
         "write_stdin": WriteStdinTool(),
-        "fs_read": FsReadTool(workspace),
+        "fs_read": FsReadTool(workspace, read_cache=read_cache),
         "fs_write": FsWriteTool(workspace),
-        "fs_list": FsListTool(workspace),
+        "fs_read_many": FsReadManyTool(workspace, read_cache=read_cache),
+        "fs_write_many": FsWriteManyTool(workspace),
+        "edit_file": EditFileTool(workspace),
+        "fs_list": FsListTool(workspace, use_index=use_index),
         "fs_mkdir": FsMkdirTool(workspace),
         "fs_remove": FsRemoveTool(workspace, policy),
-        "fs_glob": FsGlobTool(workspace),
-        "grep_files": GrepFilesTool(workspace),
-        "read_file": ReadFileAdvancedTool(),
-        "list_dir": ListDirAdvancedTool(),
+        "fs_glob": FsGlobTool(workspace, use_index=use_index),
+        "grep_files": GrepFilesTool(
+            workspace,
+            use_index=use_index,
+            workers=workers,
+            trigram_db=(
+                trigram_db_path(settings.data_dir, workspace) if settings.trigram_index else None
+            ),
+        ),
+        "find_symbol": FindSymbolTool(workspace, symbol_db, workers=workers),
+        "find_references": FindReferencesTool(workspace, symbol_db, workers=workers),
+        "retrieve_code": RetrieveCodeTool(
+            workspace, index_db_path(settings.data_dir, workspace, "chunks"), workers=workers
+        ),
+        "read_file": ReadFileAdvancedTool(read_cache=read_cache),
+        "list_dir": ListDirAdvancedTool(workspace, use_index=use_index),
         "git_status": GitStatusTool(workspace),
         "git_diff": GitDiffTool(workspace),
         "git_show": GitShowTool(workspace),
@@ -106,6 +145,6 @@ def build_tool_registry(settings: Settings) -> dict[str, object]:
         "analyze": AnalyzeTool(),
         "llm_node": LlmNodeTool(settings),
         "workflow_validate": WorkflowValidateTool(workspace),
-        "workflow_run": WorkflowRunTool(workspace),
+        "workflow_run": WorkflowRunTool(workspace, settings=settings),
     }
     return registry
@@ -1,16 +1,36 @@
 from __future__ import annotations
 
+import base64
+import fnmatch
+import itertools
+import json
 import os
 import re
 import shutil
+import sqlite3
 import subprocess
 import threading
 import time
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
 
+from codax.grep_engine import BINARY_SNIFF, grep_files
+from codax.ignore import relpath
 from codax.tools.base import Tool, ToolResult
 from codax.tools.filesystem import _ensure_workspace
+from codax.tools.grep_lines import LineHit, PatternError, format_hits, rg_hits, scan_hits
+from codax.tools.line_index import LineIndex, get_line_index
+from codax.tools.process import run_process
+from codax.tools.pty_session import close_session, get_session, start_session
+from codax.tools.read_cache import ReadCache
+from codax.trigram_index import get_trigram_index
+from codax.workspace_index import get_workspace_index
+
+# Default time write_stdin waits for new output before returning.
+DEFAULT_WRITE_YIELD_MS = 250
+# Above this many trigram candidates rg walks the search root instead of a path list.
+RG_MAX_PATHS = 2000
 
 
 class ShellCommandTool(Tool):
@@ -32,14 +52,7 @@ class ShellCommandTool(Tool):
         cwd = _ensure_workspace(Path(workdir or "."), self.workspace_root)
         timeout = (timeout_ms / 1000.0) if timeout_ms else self.timeout
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                cwd=cwd,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-            )
+            result = run_process(command, shell=True, cwd=cwd, timeout=timeout)
             output = (result.stdout or "") + (result.stderr or "")
             return ToolResult(output=output, success=result.returncode == 0, metadata={"returncode": result.returncode})
         except subprocess.TimeoutExpired as exc:  # pragma: no cover
@@ -48,9 +61,7 @@ class ShellCommandTool(Tool):
 
 class ExecCommandTool(Tool):
     name = "exec_command"
-    description = "Run a command (pty-like) and return its output."
-    _session_counter = 0
-    _sessions: dict[int, str] = {}
+    description = "Run a command on a pty; long-running ones keep going as a session."
 
     def __init__(self, workspace_root: Path, timeout_ms: int = 60000) -> None:
         self.workspace_root = workspace_root
@@ -60,53 +71,106 @@ class ExecCommandTool(Tool):
         self,
         cmd: str,
         workdir: str | None = None,
-        shell: str | None = None,  # noqa: ARG002
-        login: bool | None = None,  # noqa: ARG002
-        yield_time_ms: int | None = None,  # noqa: ARG002
-        max_output_tokens: int | None = None,  # noqa: ARG002
+        shell: str | None = None,
+        login: bool | None = None,
+        yield_time_ms: int | None = None,
+        max_output_tokens: int | None = None,
         with_escalated_permissions: bool = False,  # noqa: ARG002
         justification: str | None = None,  # noqa: ARG002
     ) -> ToolResult:
+        """
+        Without ``yield_time_ms`` this blocks until the command exits (killing it after the
+        tool's timeout) and returns its output. With it, the output collected within that
+        time is returned under a status line, and a command still running keeps its session
+        (``success`` stays False until it exits with 0); poll it or send it input with
+        ``write_stdin(session_id, ...)``.
+        """
         cwd = _ensure_workspace(Path(workdir or "."), self.workspace_root)
+        argv = [shell or os.environ.get("SHELL") or "/bin/sh", "-lc" if login else "-c", cmd]
         try:
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                cwd=cwd,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout_ms / 1000.0,
-            )
-            output = (result.stdout or "") + (result.stderr or "")
-            return ToolResult(output=output, success=result.returncode == 0, metadata={"returncode": result.returncode})
-        except subprocess.TimeoutExpired as exc:  # pragma: no cover
-            return ToolResult(output=str(exc), success=False, metadata={"returncode": None})
-
-    @classmethod
-    def create_session(cls, initial_output: str | None = None) -> int:
-        cls._session_counter += 1
-        cls._sessions[cls._session_counter] = initial_output or ""
-        return cls._session_counter
+            session_id, _ = start_session(argv, cwd=cwd)
+        except OSError as exc:
+            return ToolResult(output=f"failed to start {argv[0]}: {exc}", success=False)
+        if yield_time_ms is None:
+            return _session_result(session_id, self.timeout_ms, max_output_tokens, blocking=True)
+        return _session_result(session_id, min(yield_time_ms, self.timeout_ms), max_output_tokens)
 
 
 class WriteStdinTool(Tool):
     name = "write_stdin"
-    description = "Write characters to an exec session (simplified)."
+    description = "Send input to an exec_command session and return its new output."
 
     def run(
         self,
         session_id: int,
         chars: str | None = None,
-        yield_time_ms: int | None = None,  # noqa: ARG002
-        max_output_tokens: int | None = None,  # noqa: ARG002
+        yield_time_ms: int | None = None,
+        max_output_tokens: int | None = None,
     ) -> ToolResult:
-        if session_id not in ExecCommandTool._sessions:
+        """
+        Write ``chars`` (may be empty, to just poll; ``\\x03`` interrupts) and return the
+        output produced since the previous call, after ``yield_time_ms`` (default 250ms).
+        """
+        session = get_session(session_id)
+        if session is None:
             return ToolResult(output="session not found", success=False, metadata=None)
-        log = ExecCommandTool._sessions[session_id]
         if chars:
-            log += chars
-            ExecCommandTool._sessions[session_id] = log
-        return ToolResult(output=log, success=True, metadata={"session_id": session_id})
+            try:
+                session.write(chars)
+            except OSError as exc:
+                return ToolResult(
+                    output=f"session {session_id} no longer accepts input: {exc}",
+                    success=False,
+                    metadata={"session_id": session_id, "returncode": session.returncode},
+                )
+        wait = DEFAULT_WRITE_YIELD_MS if yield_time_ms is None else yield_time_ms
+        return _session_result(session_id, wait, max_output_tokens)
+
+
+def _session_result(
+    session_id: int, wait_ms: int, max_output_tokens: int | None, blocking: bool = False
+) -> ToolResult:
+    """
+    Output of a session after up to ``wait_ms``. ``blocking`` callers get the bare output
+    and a command still running is killed as timed out; otherwise it keeps running.
+    """
+    session = get_session(session_id)
+    if session is None:
+        return ToolResult(output="session not found", success=False, metadata=None)
+    output, dropped = session.read(max(wait_ms, 0) / 1000.0)
+    truncated = dropped > 0
+    if dropped:
+        output = f"[... {dropped} earlier bytes dropped]\n{output}"
+    if max_output_tokens is not None and len(output) > max_output_tokens * 4:
+        keep = max_output_tokens * 4  # ~4 characters per token, as estimate_tokens
+        output = f"[... {len(output) - keep} characters truncated]\n{output[-keep:]}"
+        truncated = True
+    running = not session.finished
+    timed_out = blocking and running
+    if running and not blocking:
+        status = f"Process running with session ID {session_id}"
+    else:
+        close_session(session_id)
+        status = f"Process exited with code {session.returncode}"
+        running = False
+    if timed_out:
+        separator = "" if not output or output.endswith("\n") else "\n"
+        output += f"{separator}[timed out after {wait_ms / 1000:g}s; process killed]"
+    elif not blocking:
+        output = f"{status}\nOutput:\n{output}"
+    returncode = None if running or timed_out else session.returncode
+    return ToolResult(
+        output=output,
+        success=returncode == 0,
+        metadata={
+            "session_id": session_id if running else None,
+            "returncode": returncode,
+            "running": running,
+            "timed_out": timed_out,
+            "wall_time": round(time.monotonic() - session.started, 3),
+            "truncated": truncated,
+        },
+    )
 
 
 class ApplyPatchTool(Tool):
@@ -120,24 +184,14 @@ class ApplyPatchTool(Tool):
         # use git apply --check then apply
         repo = self.workspace_root
         try:
-            check = subprocess.run(
-                ["git", "-C", str(repo), "apply", "--check"],
-                input=input,
-                text=True,
-                capture_output=True,
-            )
+            check = run_process(["git", "-C", str(repo), "apply", "--check"], input=input)
             if check.returncode != 0:
                 return ToolResult(
                     output=(check.stdout or "") + (check.stderr or ""),
                     success=False,
                     metadata={"returncode": check.returncode},
                 )
-            apply = subprocess.run(
-                ["git", "-C", str(repo), "apply"],
-                input=input,
-                text=True,
-                capture_output=True,
-            )
+            apply = run_process(["git", "-C", str(repo), "apply"], input=input)
             output = (apply.stdout or "") + (apply.stderr or "")
             return ToolResult(output=output, success=apply.returncode == 0, metadata={"returncode": apply.returncode})
         except Exception as exc:  # pragma: no cover
@@ -162,10 +216,73 @@ class UpdatePlanTool(Tool):
 
 class GrepFilesTool(Tool):
     name = "grep_files"
-    description = "Find files whose contents match a pattern."
+    description = "Find files (or, in content mode, lines with context) matching a pattern."
 
-    def __init__(self, workspace_root: Path) -> None:
+    def __init__(
+        self,
+        workspace_root: Path,
+        use_index: bool = True,
+        workers: int = 0,
+        trigram_db: Path | None = None,
+    ) -> None:
         self.workspace_root = workspace_root
+        self.use_index = use_index
+        self.workers = workers
+        self.trigram_db = trigram_db
+
+    def _candidates(self, search_root: Path) -> Iterator[Path]:
+        """Files to scan without rg: non-ignored files from the workspace index."""
+        if search_root.is_file():
+            yield search_root
+            return
+        if not self.use_index:
+            for root, _, files in os.walk(search_root):
+                for fname in files:
+                    yield Path(root) / fname
+            return
+        index = get_workspace_index(self.workspace_root)
+        index.refresh()
+        for entry in index.files(relpath(search_root, index.root)):
+            yield index.root / entry.rel
+
+    def _narrowed(self, pattern: str, search_root: Path) -> List[str] | None:
+        """Files the trigram index says may match, or None to search everything."""
+        if self.trigram_db is None or not self.use_index or search_root.is_file():
+            return None
+        index = get_trigram_index(self.workspace_root, self.trigram_db, self.workers)
+        try:
+            return index.candidates(pattern, rel=relpath(search_root, index.root))
+        except (sqlite3.Error, OSError):
+            return None
+
+    def _rg_targets(
+        self, search_root: Path, narrowed: List[str] | None, include: str | None
+    ) -> Tuple[List[str], str | None] | None:
+        """
+        Paths to hand rg and the ``-g`` glob to apply, or None without rg. With a usable
+        narrowed list, these are its text files already filtered by ``include``.
+        """
+        if not shutil.which("rg"):
+            return None
+        if narrowed is None or len(narrowed) > RG_MAX_PATHS:
+            return [str(search_root)], include
+        # rg searches binary files it is given explicitly; its directory walk skips them.
+        candidates = self._local_candidates(search_root, narrowed, include)
+        return [fpath for fpath in candidates if not _sniff_binary(fpath)], None
+
+    def _local_candidates(
+        self, search_root: Path, narrowed: List[str] | None, include: str | None
+    ) -> Iterable[str]:
+        """Files to search in-process: the trigram-narrowed list or every indexed file."""
+        candidates: Iterable[str] = (
+            narrowed
+            if narrowed is not None
+            else (str(fpath) for fpath in self._candidates(search_root))
+        )
+        if include:
+            included = _include_filter(include)
+            candidates = (fpath for fpath in candidates if included(fpath))
+        return candidates
 
     def run(
         self,
@@ -173,29 +290,48 @@ class GrepFilesTool(Tool):
         include: str | None = None,
         path: str | None = None,
         limit: int | None = None,
+        output_mode: str = "files",
+        context: int = 0,
+        before: int | None = None,
+        after: int | None = None,
+        max_per_file: int | None = None,
     ) -> ToolResult:
+        """
+        ``output_mode="files"`` lists matching files (at most ``limit``). ``"content"``
+        returns up to ``limit`` matching lines as ``path:line:text`` with ``before``/``after``
+        (default ``context``) lines around them and at most ``max_per_file`` per file.
+        """
         search_root = _ensure_workspace(Path(path or "."), self.workspace_root)
         limit = limit or 100
+        if output_mode not in ("files", "content"):
+            return ToolResult(output=f"unknown output_mode: {output_mode}", success=False)
         try:
-            if shutil.which("rg"):
-                cmd = ["rg", "--files-with-matches", "-n", pattern, str(search_root)]
-                if include:
-                    cmd.extend(["-g", include])
-                proc = subprocess.run(cmd, capture_output=True, text=True)
+            narrowed = self._narrowed(pattern, search_root)
+            if output_mode == "content":
+                return self._content(
+                    pattern,
+                    search_root,
+                    narrowed,
+                    include,
+                    limit,
+                    context if before is None else before,
+                    context if after is None else after,
+                    max_per_file,
+                )
+            lines: List[str] = []
+            rg = self._rg_targets(search_root, narrowed, include)
+            if rg is not None and rg[0]:
+                cmd = ["rg", "--files-with-matches", "-e", pattern]
+                if rg[1]:
+                    cmd.extend(["-g", rg[1]])
+                proc = run_process([*cmd, "--", *rg[0]])
                 lines = proc.stdout.strip().splitlines() if proc.stdout else []
-            else:
-                lines = []
-                for root, _, files in os.walk(search_root):
-                    for fname in files:
-                        if include and not Path(fname).match(include):
-                            continue
-                        fpath = Path(root) / fname
-                        try:
-                            with fpath.open("r", encoding="utf-8") as handle:
-                                if re.search(pattern, handle.read()):
-                                    lines.append(str(fpath))
-                        except Exception:
-                            continue
+            elif rg is None:
+                candidates = self._local_candidates(search_root, narrowed, include)
+                try:
+                    lines = grep_files(pattern, candidates, limit, workers=self.workers)
+                except re.error as exc:
+                    return ToolResult(output=f"invalid pattern: {exc}", success=False)
             lines = lines[:limit]
             if not lines:
                 return ToolResult(output="no matches", success=False, metadata={"count": 0})
@@ -203,73 +339,406 @@ class GrepFilesTool(Tool):
         except Exception as exc:  # pragma: no cover
             return ToolResult(output=str(exc), success=False, metadata=None)
 
+    def _content(
+        self,
+        pattern: str,
+        search_root: Path,
+        narrowed: List[str] | None,
+        include: str | None,
+        limit: int,
+        before: int,
+        after: int,
+        max_per_file: int | None,
+    ) -> ToolResult:
+        try:
+            hits: List[LineHit] = []
+            truncated = False
+            rg = self._rg_targets(search_root, narrowed, include)
+            if rg is not None and rg[0]:
+                hits, truncated = rg_hits(
+                    pattern,
+                    search_root,
+                    limit=limit,
+                    before=before,
+                    after=after,
+                    max_per_file=max_per_file,
+                    include=rg[1],
+                    paths=rg[0],
+                )
+            elif rg is None:
+                hits, truncated = scan_hits(
+                    pattern,
+                    self._local_candidates(search_root, narrowed, include),
+                    limit=limit,
+                    before=before,
+                    after=after,
+                    max_per_file=max_per_file,
+                )
+        except PatternError as exc:
+            return ToolResult(output=f"invalid pattern: {exc}", success=False)
+        count = sum(hit.match for hit in hits)
+        if not count:
+            return ToolResult(output="no matches", success=False, metadata={"count": 0})
+        output = format_hits(hits)
+        if truncated:
+            output += f"\n[stopped after {limit} matches; narrow the search or raise limit]"
+        files = len({hit.path for hit in hits})
+        return ToolResult(
+            output=output,
+            success=True,
+            metadata={"count": count, "files": files, "truncated": truncated},
+        )
+
+
+def _sniff_binary(fpath: str) -> bool:
+    try:
+        with open(fpath, "rb") as handle:
+            return b"\0" in handle.read(BINARY_SNIFF)
+    except OSError:
+        return True
+
+
+def _include_filter(include: str) -> Callable[[str], bool]:
+    """``Path(name).match(include)`` for file paths, with the glob compiled once."""
+    if "/" in include:
+        return lambda fpath: Path(fpath).match(include)
+    regex = re.compile(fnmatch.translate(include))
+    return lambda fpath: regex.match(os.path.basename(fpath)) is not None
+
+
+# Lines scanned looking for an enclosing header or block end in indentation mode.
+MAX_BLOCK_SCAN = 20000
+_HEADER_PREFIXES = ("@", "#", "//", "/*", "*")
+_CLOSERS = ("}", ")", "]", "end")
+
+
+class _IndexedLines:
+    """Decoded, tab-expanded lines read through a ``LineIndex`` in cached chunks."""
+
+    CHUNK = 512
+
+    def __init__(self, index: LineIndex) -> None:
+        self.index = index
+        self.count = index.line_count
+        self._chunks: Dict[int, List[str]] = {}
+
+    def text(self, number: int) -> str:
+        chunk = (number - 1) // self.CHUNK
+        lines = self._chunks.get(chunk)
+        if lines is None:
+            raw = self.index.read_lines(chunk * self.CHUNK + 1, self.CHUNK)
+            lines = self._chunks[chunk] = [line.decode("utf-8") for line in raw]
+        return lines[(number - 1) % self.CHUNK]
+
+    def indent(self, number: int) -> int | None:
+        """Leading whitespace width (tabs as 4), or None for a blank line."""
+        line = self.text(number).expandtabs(4)
+        stripped = line.lstrip()
+        return len(line) - len(stripped) if stripped else None
+
+    def next_code(self, number: int, step: int) -> int | None:
+        """Nearest non-blank line from ``number`` moving by ``step`` (+1 or -1)."""
+        for _ in range(MAX_BLOCK_SCAN):
+            if not 1 <= number <= self.count:
+                return None
+            if self.indent(number) is not None:
+                return number
+            number += step
+        return None
+
+    def parent(self, number: int) -> int | None:
+        """Closest line above ``number`` that is indented less (its block header)."""
+        level = self.indent(number) or 0
+        candidate = number - 1
+        for _ in range(MAX_BLOCK_SCAN):
+            candidate_line = self.next_code(candidate, -1)
+            if candidate_line is None:
+                return None
+            if (self.indent(candidate_line) or 0) < level:
+                return candidate_line
+            candidate = candidate_line - 1
+        return None
+
+    def block_end(self, header: int, limit: int) -> int:
+        """Last line of the block opened by ``header``, scanning at most ``limit`` lines."""
+        level = self.indent(header) or 0
+        end = header
+        number = header + 1
+        while number <= min(self.count, header + limit):
+            indent = self.indent(number)
+            if indent is not None:
+                if indent <= level:
+                    if indent == level and self.text(number).strip().startswith(_CLOSERS):
+                        end = number  # closing brace/keyword belongs to the block
+                    break
+                end = number
+            number += 1
+        return end
+
 
 class ReadFileAdvancedTool(Tool):
     name = "read_file"
-    description = "Read a file with optional line slicing."
+    description = (
+        "Read numbered lines from a file: a window (mode=slice, offset/limit) or the "
+        "indentation block around a line (mode=indentation)."
+    )
+
+    def __init__(self, read_cache: ReadCache | None = None) -> None:
+        self.read_cache = read_cache
 
     def run(
         self,
         file_path: str,
         offset: int | None = None,
         limit: int | None = None,
-        mode: str | None = None,  # noqa: ARG002
-        indentation: dict[str, Any] | None = None,  # noqa: ARG002
+        mode: str | None = None,
+        indentation: dict[str, Any] | None = None,
+        dedup: bool = True,
     ) -> ToolResult:
+        """
+        Serve windows through a cached line-offset index: one seek and read per call.
+
+        ``indentation`` options (mode ``indentation``): ``anchor_line`` (default
+        ``offset``), ``max_levels`` enclosing blocks to climb above the anchor's own block,
+        ``include_siblings`` to widen to the parent's whole body, ``include_header`` to
+        keep decorators/comments directly above, and ``max_lines`` (default ``limit``).
+        With a session ``read_cache`` an unchanged window comes back as a marker.
+        """
         path = Path(file_path)
         if not path.exists():
             return ToolResult(output="file not found", success=False, metadata=None)
-        start = max((offset or 1), 1)
+        if mode not in (None, "slice", "indentation"):
+            return ToolResult(output=f"unknown mode '{mode}'", success=False, metadata=None)
+        read = partial(self._read_window, path, offset, limit, mode, indentation)
+        if self.read_cache is None:
+            return read()
+        if not dedup:
+            self.read_cache.forget(path.resolve())
+        options = tuple(sorted((indentation or {}).items()))
+        view = ("read_file", offset, limit, mode, options)
+        return self.read_cache.read(path.resolve(), view, file_path, read)
+
+    def _read_window(
+        self,
+        path: Path,
+        offset: int | None,
+        limit: int | None,
+        mode: str | None,
+        indentation: dict[str, Any] | None,
+    ) -> ToolResult:
         max_lines = limit or 200
         try:
-            with path.open("r", encoding="utf-8") as handle:
-                lines = handle.readlines()
+            lines = _IndexedLines(get_line_index(path))
+            if lines.count and "\0" in lines.text(1):
+                raise UnicodeDecodeError("utf-8", b"", 0, 1, "NUL byte")
+            if mode == "indentation":
+                options = dict(indentation or {})
+                anchor = int(options.get("anchor_line") or offset or 1)
+                max_lines = int(options.get("max_lines") or max_lines)
+                start, end = self._block(lines, anchor, options, max_lines)
+                extra: Dict[str, Any] = {"mode": "indentation", "anchor_line": anchor}
+            else:
+                start = max((offset or 1), 1)
+                end = min(start + max_lines - 1, lines.count)
+                extra = {}
+            window = [lines.text(n) for n in range(start, min(end, start + max_lines - 1) + 1)]
         except UnicodeDecodeError:
             return ToolResult(output="binary file blocked", success=False, metadata=None)
-        slice_lines = lines[start - 1 : start - 1 + max_lines]
-        numbered = [f"{i+start}: {line.rstrip()}" for i, line in enumerate(slice_lines)]
+        numbered = [f"{i+start}: {line.rstrip()}" for i, line in enumerate(window)]
         return ToolResult(
             output="\n".join(numbered),
             success=True,
-            metadata={"start": start, "returned": len(slice_lines)},
+            metadata={
+                "start": start,
+                "returned": len(window),
+                "total_lines": lines.count,
+                "more": start + len(window) - 1 < (end if mode == "indentation" else lines.count),
+                **extra,
+            },
         )
 
+    def _block(
+        self, lines: _IndexedLines, anchor: int, options: Dict[str, Any], max_lines: int
+    ) -> tuple[int, int]:
+        if lines.count == 0:
+            return 1, 0
+        anchor = min(max(anchor, 1), lines.count)
+        code = lines.next_code(anchor, 1) or lines.next_code(anchor, -1)
+        if code is None:
+            return anchor, anchor
+        # The anchor's own block: the anchor if it opens one, else its enclosing header.
+        following = lines.next_code(code + 1, 1)
+        opens = following is not None and (lines.indent(following) or 0) > (
+            lines.indent(code) or 0
+        )
+        header = code if opens else lines.parent(code) or code
+        for _ in range(max(int(options.get("max_levels", 0) or 0), 0)):
+            parent = lines.parent(header)
+            if parent is None:
+                break
+            header = parent
+        if options.get("include_siblings"):
+            parent = lines.parent(header)
+            if parent is None:
+                start, end = 1, lines.count
+            else:
+                start, end = parent + 1, lines.block_end(parent, MAX_BLOCK_SCAN)
+        else:
+            start, end = header, lines.block_end(header, MAX_BLOCK_SCAN)
+        if options.get("include_header", True):
+            level = lines.indent(start)
+            while start > 1 and lines.indent(start - 1) == level and lines.text(
+                start - 1
+            ).strip().startswith(_HEADER_PREFIXES):
+                start -= 1
+        return start, end
+
+
+# (name, is_dir, may_descend) of one directory's entries, sorted by name.
+_Children = List[Tuple[str, bool, bool]]
+
+
+def _encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if not isinstance(state, dict) or not {"dir", "depth", "after", "pos"} <= state.keys():
+        raise ValueError("invalid cursor")
+    return state
+
 
 class ListDirAdvancedTool(Tool):
     name = "list_dir"
     description = "List a directory with pagination."
 
+    def __init__(self, workspace_root: Path | None = None, use_index: bool = True) -> None:
+        self.workspace_root = workspace_root
+        self.use_index = use_index
+
     def run(
         self,
         dir_path: str,
         offset: int | None = None,
         limit: int | None = None,
         depth: int | None = None,
+        cursor: str | None = None,
     ) -> ToolResult:
-        start = max((offset or 1), 1)
+        """
+        Depth-first listing, produced lazily: only ``offset + limit`` entries are visited.
+
+        Gitignored and VCS/dependency directories inside the workspace are listed but not
+        descended into. When more entries remain, ``metadata["cursor"]`` resumes after the
+        last returned entry; it stays valid when entries are added or removed meanwhile.
+        """
         limit = limit or 100
         max_depth = depth or 1
         base = Path(dir_path)
         if not base.exists():
             return ToolResult(output="dir not found", success=False, metadata=None)
-        entries: list[str] = []
-
-        def walk(path: Path, current_depth: int) -> None:
-            if current_depth > max_depth or not path.is_dir():
-                return
-            for entry in sorted(path.iterdir()):
-                kind = "dir" if entry.is_dir() else "file"
-                entries.append(f"{entry}{'/' if entry.is_dir() else ''} [{kind}]")
-                if entry.is_dir():
-                    walk(entry, current_depth + 1)
-
-        walk(base, 1)
-        window = entries[start - 1 : start - 1 + limit]
-        return ToolResult(
-            output="\n".join(window),
-            success=True,
-            metadata={"count": len(entries), "returned": len(window), "more": len(entries) > start - 1 + limit},
-        )
+        after: List[str] = []
+        skip = max((offset or 1), 1) - 1
+        position = skip
+        if cursor:
+            try:
+                state = _decode_cursor(cursor)
+            except ValueError as exc:
+                return ToolResult(output=str(exc), success=False, metadata=None)
+            if state["dir"] != dir_path or state["depth"] != max_depth:
+                return ToolResult(
+                    output="cursor belongs to a different listing", success=False, metadata=None
+                )
+            after, skip, position = list(state["after"]), 0, int(state["pos"])
+        children = self._children_source(base)
+        walker = self._walk(base, "", 1, max_depth, after, children)
+        window = list(itertools.islice(walker, skip, skip + limit + 1))
+        more = len(window) > limit
+        window = window[:limit]
+        lines = [
+            f"{base / rel}{'/' if is_dir else ''} [{'dir' if is_dir else 'file'}]"
+            for rel, is_dir in window
+        ]
+        metadata: Dict[str, Any] = {"start": position + 1, "returned": len(window), "more": more}
+        if more and window:
+            metadata["cursor"] = _encode_cursor(
+                {
+                    "dir": dir_path,
+                    "depth": max_depth,
+                    "after": window[-1][0].split("/"),
+                    "pos": position + len(window),
+                }
+            )
+            lines.append(f"[more entries: cursor={metadata['cursor']}]")
+        return ToolResult(output="\n".join(lines), success=True, metadata=metadata)
+
+    def _walk(
+        self,
+        base: Path,
+        rel: str,
+        depth: int,
+        max_depth: int,
+        after: List[str],
+        children: Callable[[Path, str], _Children],
+    ) -> Iterator[Tuple[str, bool]]:
+        """Yield ``(rel, is_dir)`` in pre-order, resuming after the entry path ``after``."""
+        for name, is_dir, may_descend in children(base / rel if rel else base, rel):
+            resume: List[str] = []
+            emit = True
+            if after:
+                if name < after[0]:
+                    continue
+                if name == after[0]:  # already returned; only its remaining subtree is left
+                    resume, emit = after[1:], False
+                after = []
+            child = f"{rel}/{name}" if rel else name
+            if emit:
+                yield child, is_dir
+            if is_dir and may_descend and depth < max_depth:
+                yield from self._walk(base, child, depth + 1, max_depth, resume, children)
+
+    def _children_source(self, base: Path) -> Callable[[Path, str], _Children]:
+        root = self.workspace_root.resolve() if self.workspace_root is not None else None
+        resolved = base.resolve()
+        if root is None or not resolved.is_relative_to(root):
+            return lambda directory, rel: self._scan(directory)
+        index = get_workspace_index(root)
+        prefix = relpath(resolved, root)
+        use_index = self.use_index and index.built  # never trigger a full build for one page
+        if use_index:
+            index.refresh()  # once per listing: polling re-stats every indexed directory
+
+        def children(directory: Path, rel: str) -> _Children:
+            workspace_rel = "/".join(part for part in (prefix, rel) if part)
+            if use_index:
+                entries = index.children(workspace_rel)
+                if entries is not None:
+                    return [(e.name, e.is_dir, not e.ignored) for e in entries]
+            matcher = index.matcher
+            rules = matcher.rules_for(workspace_rel)
+            listing = []
+            for name, is_dir, descend in self._scan(directory):
+                child = f"{workspace_rel}/{name}" if workspace_rel else name
+                ignored = matcher.matches(child, is_dir, rules)
+                listing.append((name, is_dir, descend and not ignored))
+            return listing
+
+        return children
+
+    @staticmethod
+    def _scan(directory: Path) -> _Children:
+        try:
+            with os.scandir(directory) as scan:
+                # DirEntry caches its type: no extra stat per entry (symlinks are not followed
+                # into, which also keeps link cycles out of the walk).
+                items = [(item.name, item.is_dir(), not item.is_symlink()) for item in scan]
+        except OSError:
+            return []
+        items.sort()
+        return items
 
 
 class ViewImageTool(Tool):
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
-import glob
+import codecs
+import mmap
 import os
+import secrets
 import shutil
+import stat
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
 from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Sequence, Tuple
 
+from codax.ignore import relpath
 from codax.safety import ActionType, SafetyPolicy, guard_action
 from codax.tools.base import Tool, ToolResult
+from codax.tools.glob_engine import Listing, iter_glob, newest_first
+from codax.tools.read_cache import ReadCache
+from codax.workspace_index import WorkspaceIndex, get_workspace_index
 
 
 def _ensure_workspace(path: Path, workspace_root: Path) -> Path:
@@ -29,22 +41,236 @@ def _detect_binary(path: Path) -> bool:
         return False
 
 
+# Largest slice fs_read returns at once; bigger files must be read by range or tail.
+MAX_READ_BYTES = 16 * 1024 * 1024
+_DECODE_CHUNK = 1 << 20
+# Longest BOMs first: UTF-32-LE's BOM starts with UTF-16-LE's.
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+# Decodes any byte sequence; used when auto-detected UTF-8 turns out to be wrong.
+_FALLBACK_ENCODING = "latin-1"
+
+
+def _sniff_encoding(head: bytes) -> tuple[str, int]:
+    """Codec and BOM length from the first bytes of a file; BOM-less text starts as UTF-8."""
+    for bom, codec in _BOMS:
+        if head.startswith(bom):
+            return codec, len(bom)
+    return "utf-8", 0
+
+
+def _newline(codec: str) -> bytes:
+    encoded = "\n".encode(codec)
+    for bom, _ in _BOMS:
+        if encoded.startswith(bom) and len(encoded) > len(bom):
+            return encoded[len(bom) :]
+    return encoded
+
+
+def _decode_range(data: mmap.mmap, start: int, end: int, codec: str) -> str:
+    """Decode ``data[start:end]`` chunk by chunk without copying the whole range first."""
+    decoder = codecs.getincrementaldecoder(codec)()
+    parts = []
+    for position in range(start, end, _DECODE_CHUNK):
+        chunk = data[position : min(position + _DECODE_CHUNK, end)]
+        parts.append(decoder.decode(chunk, final=position + _DECODE_CHUNK >= end))
+    return "".join(parts)
+
+
+class _Layout:
+    """Where text starts in a mapped file and how to keep ranges on character boundaries."""
+
+    def __init__(self, data: mmap.mmap, codec: str, bom: int) -> None:
+        self.data = data
+        self.size = len(data)
+        self.codec = codec
+        self.start = bom
+        self.newline = _newline(codec)
+        self.width = len(self.newline)
+        self.utf8 = codecs.lookup(codec).name == "utf-8"
+
+    def align(self, position: int) -> int:
+        """Move ``position`` back to the start of the character it falls in."""
+        position = min(max(position, self.start), self.size)
+        if self.width > 1:
+            return position - (position - self.start) % self.width
+        if self.utf8:
+            floor = max(position - 3, self.start)
+            while position > floor and position < self.size and 0x80 <= self.data[position] < 0xC0:
+                position -= 1
+        return position
+
+    def _aligned(self, position: int) -> bool:
+        return (position - self.start) % self.width == 0
+
+    def line_start(self, end: int, lines: int, window: int) -> int:
+        """
+        Start of the last ``lines`` lines before ``end`` (a trailing newline ends a line).
+
+        Only the ``window`` bytes before ``end`` are searched; if the lines do not fit, the
+        returned start lies outside the window so the caller's size cap rejects it.
+        """
+        floor = max(self.start, end - window - self.width)
+        position = end
+        if end - self.width >= self.start and self.data[end - self.width : end] == self.newline:
+            position -= self.width
+        for _ in range(lines):
+            found = self.data.rfind(self.newline, floor, position)
+            while found >= 0 and not self._aligned(found):
+                found = self.data.rfind(self.newline, floor, found + self.width - 1)
+            if found < 0:
+                return self.start if floor == self.start else floor - 1
+            position = found
+        return position + self.width
+
+    def line_end(self, start: int, lines: int, window: int) -> int:
+        """End of ``lines`` lines from ``start`` (newlines included), searching ``window`` bytes."""
+        ceiling = min(self.size, start + window + self.width)
+        position = start
+        for _ in range(lines):
+            found = self.data.find(self.newline, position, ceiling)
+            while found >= 0 and not self._aligned(found):
+                found = self.data.find(self.newline, found + 1, ceiling)
+            if found < 0:
+                return self.size if ceiling == self.size else ceiling + 1
+            position = found + self.width
+        return position
+
+
 class FsReadTool(Tool):
     name = "fs_read"
-    description = "Read text file content from the workspace."
+    description = (
+        "Read text from a workspace file: whole files up to a size cap, or a byte range "
+        "(offset/length), the first `lines` lines from offset, or the last `tail` lines."
+    )
 
-    def __init__(self, workspace_root: Path) -> None:
+    def __init__(
+        self,
+        workspace_root: Path,
+        max_bytes: int = MAX_READ_BYTES,
+        read_cache: ReadCache | None = None,
+    ) -> None:
         self.workspace_root = workspace_root
+        self.max_bytes = max_bytes
+        self.read_cache = read_cache
 
-    def run(self, path: str, encoding: str = "utf-8") -> ToolResult:
+    def run(
+        self,
+        path: str,
+        encoding: str = "auto",
+        offset: int | None = None,
+        length: int | None = None,
+        tail: int | None = None,
+        lines: int | None = None,
+        dedup: bool = True,
+    ) -> ToolResult:
+        """
+        Read through ``mmap`` so only the requested range is touched, whatever the file size.
+
+        ``encoding="auto"`` honors a BOM and otherwise decodes as UTF-8, switching to
+        latin-1 when the range is not valid UTF-8. Ranges are moved back to character
+        boundaries. A slice larger than ``max_bytes`` is refused rather than truncated.
+        With a session ``read_cache``, re-reading an unchanged range returns a marker
+        (``dedup=False`` forces the content).
+        """
         target = _ensure_workspace(Path(path), self.workspace_root)
         if not target.exists():
             return ToolResult(output="File not found", success=False, metadata=None)
-        if _detect_binary(target):
+        if target.is_dir():
+            return ToolResult(output="Path is a directory", success=False, metadata=None)
+        read = partial(self._read_file, target, encoding, offset, length, tail, lines)
+        if self.read_cache is None:
+            return read()
+        if not dedup:
+            self.read_cache.forget(target)
+        view = ("fs_read", encoding, offset, length, tail, lines, self.max_bytes)
+        return self.read_cache.read(target, view, path, read)
+
+    def _read_file(
+        self,
+        target: Path,
+        encoding: str,
+        offset: int | None,
+        length: int | None,
+        tail: int | None,
+        lines: int | None,
+    ) -> ToolResult:
+        with target.open("rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size == 0:
+                return ToolResult(
+                    output="",
+                    success=True,
+                    metadata={"bytes_read": 0, "size": 0, "offset": 0, "end": 0, "eof": True},
+                )
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return self._read(data, encoding, offset, length, tail, lines)
+
+    def _read(
+        self,
+        data: mmap.mmap,
+        encoding: str,
+        offset: int | None,
+        length: int | None,
+        tail: int | None,
+        lines: int | None,
+    ) -> ToolResult:
+        auto = encoding == "auto"
+        if auto:
+            codec, bom = _sniff_encoding(data[:4])
+        else:
+            codec, bom = encoding, 0
+        try:
+            layout = _Layout(data, codec, bom)
+        except LookupError:
+            return ToolResult(output=f"Unknown encoding {encoding}", success=False, metadata=None)
+        if bom == 0 and b"\0" in data[:1024] and layout.width == 1:
             return ToolResult(output="Binary file blocked", success=False, metadata=None)
-        content = target.read_text(encoding=encoding)
+        size = layout.size
+        if tail is not None:
+            end = size
+            start = layout.line_start(end, max(tail, 0), self.max_bytes)
+        else:
+            start = layout.align(layout.start + max(offset or 0, 0))
+            if lines is not None:
+                end = layout.line_end(start, max(lines, 0), self.max_bytes)
+            else:
+                end = size if length is None else start + max(length, 0)
+            end = layout.align(end)
+        if end - start > self.max_bytes:
+            return ToolResult(
+                output=(
+                    f"Refusing to read {end - start} bytes from a {size}-byte file "
+                    f"(cap {self.max_bytes}); pass offset/length, lines or tail"
+                ),
+                success=False,
+                metadata={"size": size, "bytes": end - start, "max_bytes": self.max_bytes},
+            )
+        try:
+            content = _decode_range(data, start, end, codec)
+        except UnicodeDecodeError as exc:
+            if not auto:
+                return ToolResult(
+                    output=f"Cannot decode as {codec}: {exc.reason}", success=False, metadata=None
+                )
+            codec = _FALLBACK_ENCODING
+            content = _decode_range(data, start, end, codec)
         return ToolResult(
-            output=content, success=True, metadata={"bytes_read": len(content.encode(encoding))}
+            output=content,
+            success=True,
+            metadata={
+                "bytes_read": end - start,
+                "size": size,
+                "offset": start,
+                "end": end,
+                "encoding": codec,
+                "eof": end >= size,
+            },
         )
 
 
@@ -61,7 +287,8 @@ class FsWriteTool(Tool):
         target = _ensure_workspace(Path(path), self.workspace_root)
         target.parent.mkdir(parents=True, exist_ok=True)
         mode = "a" if append else "w"
-        target.open(mode, encoding=encoding).write(content)
+        with target.open(mode, encoding=encoding) as handle:
+            handle.write(content)
         return ToolResult(
             output="ok",
             success=True,
@@ -69,18 +296,409 @@ class FsWriteTool(Tool):
         )
 
 
+# Reads in flight at once for fs_read_many; mmap reads release the GIL while paging in.
+READ_MANY_WORKERS = 8
+# Bytes fs_read_many returns across all files unless the caller asks for another budget.
+READ_MANY_BUDGET = 4 * 1024 * 1024
+_READ_SPEC_KEYS = frozenset({"path", "encoding", "offset", "length", "tail", "lines"})
+
+
+class FsReadManyTool(Tool):
+    name = "fs_read_many"
+    description = (
+        "Read several workspace files in one call. Each item is a path or an object with "
+        "path and optional offset/length/lines/tail/encoding, as for fs_read."
+    )
+
+    def __init__(
+        self,
+        workspace_root: Path,
+        max_bytes: int = MAX_READ_BYTES,
+        total_bytes: int = READ_MANY_BUDGET,
+        workers: int = READ_MANY_WORKERS,
+        read_cache: ReadCache | None = None,
+    ) -> None:
+        self.workspace_root = workspace_root
+        self.max_bytes = max_bytes
+        self.total_bytes = total_bytes
+        self.workers = workers
+        self.read_cache = read_cache
+
+    def run(
+        self,
+        files: Sequence[str | Dict[str, Any]],
+        encoding: str = "auto",
+        max_bytes: int | None = None,
+        total_bytes: int | None = None,
+        dedup: bool = True,
+    ) -> ToolResult:
+        """
+        Read ``files`` on a thread pool and return them in request order.
+
+        ``max_bytes`` caps each file (a larger slice is an error for that file only) and
+        ``total_bytes`` the whole batch: a file is only read while it fits in what is left,
+        and once it is spent the remaining files are listed as skipped rather than read.
+        Files unchanged since this session read them come back as a one-line marker
+        unless ``dedup`` is off.
+        """
+        cap = min(max_bytes or self.max_bytes, self.max_bytes)
+        budget = total_bytes if total_bytes is not None else self.total_bytes
+        specs = [{"path": item} if isinstance(item, str) else dict(item) for item in files]
+
+        def read(spec: Dict[str, Any], limit: int) -> ToolResult:
+            unknown = sorted(set(spec) - _READ_SPEC_KEYS)
+            if "path" not in spec or unknown:
+                problem = f"unknown keys {unknown}" if unknown else "missing path"
+                return ToolResult(output=f"Invalid item: {problem}", success=False)
+            reader = FsReadTool(self.workspace_root, max_bytes=limit, read_cache=self.read_cache)
+            args = {"encoding": encoding, "dedup": dedup, **spec}
+            try:
+                return reader.run(**args)
+            except (OSError, ValueError) as exc:
+                return ToolResult(output=str(exc), success=False)
+
+        def most(spec: Dict[str, Any]) -> int:
+            """Upper bound on what reading ``spec`` returns: the file size, within the cap."""
+            try:
+                target = _ensure_workspace(Path(spec["path"]), self.workspace_root)
+                return min(target.stat().st_size, cap)
+            except (KeyError, TypeError, OSError, ValueError):
+                return 0
+
+        sections: List[str] = []
+        report: List[Dict[str, Any]] = []
+        spent = 0
+        exhausted = False
+        # Reads are started in order, each only while its file fits in what is left of the
+        # budget after the reads in flight; one that may not fit waits for them and then
+        # runs alone, capped at the remaining budget.
+        inflight: deque[Tuple[Future[ToolResult], int]] = deque()
+        reserved = submitted = 0
+        with ThreadPoolExecutor(max(1, min(self.workers, len(specs)))) as pool:
+            for index, spec in enumerate(specs):
+                path = str(spec.get("path"))
+                if exhausted:
+                    report.append({"path": path, "ok": False, "skipped": True})
+                    continue
+                while submitted < len(specs) and len(inflight) < self.workers:
+                    bound = most(specs[submitted])
+                    if spent + reserved + bound > budget:
+                        break
+                    inflight.append((pool.submit(read, specs[submitted], cap), bound))
+                    reserved += bound
+                    submitted += 1
+                over_budget = False
+                if index < submitted:
+                    future, bound = inflight.popleft()
+                    reserved -= bound
+                    result = future.result()
+                else:
+                    submitted += 1
+                    limit = min(cap, max(budget - spent, 0))
+                    result = read(spec, limit)
+                    needed = (result.metadata or {}).get("bytes") if limit < cap else None
+                    if needed is not None:
+                        # Refused under the remaining budget. Line counts are only searched
+                        # that far, so their size is a lower bound: too big either way.
+                        sized = spec.get("lines") is None and spec.get("tail") is None
+                        if sized and needed > cap:
+                            result = read(spec, cap)  # refused by the cap itself; say so
+                        else:
+                            over_budget = True
+                meta = result.metadata or {}
+                entry: Dict[str, Any] = {"path": path, "ok": result.success}
+                if result.success and spent + int(meta.get("bytes_read", 0)) > budget:
+                    over_budget = True  # the file grew since it was sized
+                if over_budget:
+                    entry.update(ok=False, skipped=True, size=meta.get("size"))
+                    sections.append(f"==> {path} <== skipped: total byte budget exhausted")
+                    exhausted = True
+                elif not result.success:
+                    entry["error"] = result.output
+                    sections.append(f"==> {path} <== error: {result.output}")
+                else:
+                    spent += int(meta.get("bytes_read", 0))
+                    entry.update(meta)
+                    sections.append(f"==> {path} <==\n{result.output}")
+                report.append(entry)
+        skipped = [entry["path"] for entry in report if entry.get("skipped")]
+        if skipped:
+            sections.append(f"[{len(skipped)} file(s) skipped: total byte budget {budget} reached]")
+        return ToolResult(
+            output="\n".join(sections),
+            success=any(entry["ok"] for entry in report) or not report,
+            metadata={"files": report, "bytes_read": spent, "skipped": skipped},
+        )
+
+
+def _open_temp(target: Path) -> Tuple[Path, int]:
+    """Create a sibling temp file for an atomic replace of ``target`` (umask applies)."""
+    temp = target.with_name(f".{target.name}.{os.getpid()}.{secrets.token_hex(4)}.tmp")
+    fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        os.chmod(temp, stat.S_IMODE(target.stat().st_mode))  # keep an existing file's mode
+    except FileNotFoundError:
+        pass
+    return temp, fd
+
+
+def _missing_dirs(directory: Path) -> List[Path]:
+    """``directory`` and its ancestors that do not exist yet, outermost first."""
+    missing: List[Path] = []
+    while not directory.is_dir():
+        missing.append(directory)
+        directory = directory.parent
+    return missing[::-1]
+
+
+def _fsync_dir(directory: Path) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class FsWriteManyTool(Tool):
+    name = "fs_write_many"
+    description = (
+        "Write several workspace files in one call; each item has path, content and "
+        "optional append. Nothing is written if any path is invalid."
+    )
+
+    def __init__(self, workspace_root: Path, workers: int = READ_MANY_WORKERS) -> None:
+        self.workspace_root = workspace_root
+        self.workers = workers
+
+    def run(
+        self, files: Sequence[Dict[str, Any]], encoding: str = "utf-8", durable: bool = True
+    ) -> ToolResult:
+        """
+        Validate every item, create missing directories in one pass, then write.
+
+        Every file, appended ones included (existing content copied, then the new content),
+        is written to a sibling temp file and renamed into place. A failure before the
+        rename pass therefore leaves every target untouched and removes the directories
+        this call created. Appends made by others between the copy and the rename are lost.
+        With ``durable`` all files are fsynced together on a thread pool, then each
+        directory once.
+        """
+        planned: List[Tuple[Path, bytes, bool]] = []
+        seen: set[Path] = set()
+        try:
+            for number, item in enumerate(files, 1):
+                if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+                    raise ValueError(f"item {number} needs a path string: {item!r}")
+                target = _ensure_workspace(Path(item["path"]), self.workspace_root)
+                if target in seen:
+                    raise ValueError(f"Duplicate path {item['path']}")
+                if target.is_dir():
+                    raise ValueError(f"Path is a directory: {item['path']}")
+                seen.add(target)
+                data = str(item.get("content", "")).encode(encoding)
+                planned.append((target, data, bool(item.get("append", False))))
+        except (LookupError, ValueError) as exc:
+            return ToolResult(output=f"Nothing written: {exc}", success=False, metadata=None)
+
+        directories = sorted({target.parent for target, _, _ in planned})
+        created = [directory for directory in directories if not directory.is_dir()]
+        made: List[Path] = []  # every directory created here, parents first
+        handles: List[Tuple[Path, Path, BinaryIO]] = []  # target, temp, handle
+        try:
+            for directory in created:
+                for missing in _missing_dirs(directory):
+                    missing.mkdir()
+                    made.append(missing)
+            for target, data, append in planned:
+                temp, fd = _open_temp(target)
+                handle: BinaryIO = os.fdopen(fd, "wb")
+                handles.append((target, temp, handle))
+                if append:
+                    try:
+                        with target.open("rb") as existing:
+                            for chunk in iter(partial(existing.read, 1 << 20), b""):
+                                handle.write(chunk)
+                    except FileNotFoundError:
+                        pass
+                handle.write(data)
+            for _, _, handle in handles:
+                handle.flush()
+            if durable and handles:
+                with ThreadPoolExecutor(max(1, min(self.workers, len(handles)))) as pool:
+                    list(pool.map(os.fsync, [handle.fileno() for _, _, handle in handles]))
+        except OSError as exc:
+            for _, staged, handle in handles:
+                handle.close()
+                staged.unlink(missing_ok=True)
+            for directory in reversed(made):
+                try:
+                    directory.rmdir()
+                except OSError:
+                    pass
+            return ToolResult(output=f"Nothing written: {exc}", success=False, metadata=None)
+        for _, _, handle in handles:
+            handle.close()
+        for target, staged, _ in handles:
+            os.replace(staged, target)
+        if durable:
+            for directory in directories:
+                _fsync_dir(directory)
+        report = [
+            {
+                "path": relpath(target, self.workspace_root),
+                "bytes_written": len(data),
+                "mode": "a" if append else "w",
+            }
+            for target, data, append in planned
+        ]
+        return ToolResult(
+            output=f"wrote {len(report)} file(s)",
+            success=True,
+            metadata={
+                "files": report,
+                "bytes_written": sum(len(data) for _, data, _ in planned),
+                "directories_created": len(created),
+            },
+        )
+
+
+def _line_of(text: str, index: int) -> int:
+    return text.count("\n", 0, index) + 1
+
+
+class EditFileTool(Tool):
+    name = "edit_file"
+    description = (
+        "Replace exact text in a workspace file: old/new, or edits=[{old, new, replace_all}] "
+        "applied in order. Each old must match exactly once unless replace_all is set."
+    )
+
+    def __init__(self, workspace_root: Path) -> None:
+        self.workspace_root = workspace_root
+
+    def run(
+        self,
+        path: str,
+        old: str | None = None,
+        new: str | None = None,
+        edits: Sequence[Dict[str, Any]] | None = None,
+        replace_all: bool = False,
+        encoding: str = "utf-8",
+    ) -> ToolResult:
+        """
+        Apply every edit in memory, then replace the file atomically (temp file + rename).
+
+        Nothing is written unless all edits apply. An empty ``old`` creates a missing file.
+        When the file uses CRLF line endings, ``\n`` in ``old``/``new`` is matched as CRLF.
+        """
+        if edits is None:
+            if old is None or new is None:
+                return ToolResult(output="Pass old and new, or edits", success=False)
+            edits = [{"old": old, "new": new, "replace_all": replace_all}]
+        if not edits:
+            return ToolResult(output="No edits given", success=False)
+        target = _ensure_workspace(Path(path), self.workspace_root)
+        if target.is_dir():
+            return ToolResult(output="Path is a directory", success=False)
+        exists = target.exists()
+        try:
+            text = target.read_bytes().decode(encoding) if exists else ""
+        except UnicodeDecodeError:
+            return ToolResult(output=f"Cannot decode {path} as {encoding}", success=False)
+        except LookupError:
+            return ToolResult(output=f"Unknown encoding {encoding}", success=False)
+        crlf = "\r\n" in text
+        changed_lines: List[int] = []
+        replacements = 0
+        for number, edit in enumerate(edits, start=1):
+            label = f"edit {number}" if len(edits) > 1 else "edit"
+            try:
+                before, after = str(edit["old"]), str(edit["new"])
+            except KeyError as exc:
+                return ToolResult(output=f"{label}: missing {exc.args[0]}", success=False)
+            if before == after:
+                return ToolResult(output=f"{label}: old and new are identical", success=False)
+            if not before:
+                if text:
+                    return ToolResult(
+                        output=f"{label}: empty old text only creates new files", success=False
+                    )
+                text = after
+                changed_lines.append(1)
+                replacements += 1
+                continue
+            if crlf and "\r\n" not in before:
+                before = before.replace("\n", "\r\n")
+                after = after.replace("\n", "\r\n")
+            count = text.count(before)
+            if count == 0:
+                return ToolResult(
+                    output=f"{label}: old text not found in {path} (it must match exactly)",
+                    success=False,
+                )
+            if count > 1 and not edit.get("replace_all", False):
+                positions: List[int] = []
+                start = text.find(before)
+                while start >= 0 and len(positions) < 10:
+                    positions.append(_line_of(text, start))
+                    start = text.find(before, start + 1)
+                return ToolResult(
+                    output=(
+                        f"{label}: old text matches {count} times (lines {positions}); add "
+                        "surrounding context to make it unique or set replace_all"
+                    ),
+                    success=False,
+                )
+            changed_lines.append(_line_of(text, text.find(before)))
+            text = text.replace(before, after)
+            replacements += count
+        try:
+            data = text.encode(encoding)
+        except UnicodeEncodeError:
+            return ToolResult(output=f"Cannot encode {path} as {encoding}", success=False)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp, fd = _open_temp(target)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temp, target)
+        except OSError as exc:
+            temp.unlink(missing_ok=True)
+            return ToolResult(output=f"Write failed: {exc}", success=False)
+        return ToolResult(
+            output=f"Applied {len(edits)} edit(s) to {path}",
+            success=True,
+            metadata={
+                "replacements": replacements,
+                "lines": changed_lines,
+                "created": not exists,
+                "bytes_written": len(data),
+            },
+        )
+
+
 class FsListTool(Tool):
     name = "fs_list"
     description = "List directory entries."
 
-    def __init__(self, workspace_root: Path) -> None:
+    def __init__(self, workspace_root: Path, use_index: bool = True) -> None:
         self.workspace_root = workspace_root
+        self.use_index = use_index
 
     def run(self, path: str) -> ToolResult:
         target = _ensure_workspace(Path(path), self.workspace_root)
         if not target.exists():
             return ToolResult(output="Path not found", success=False, metadata=None)
-        entries = sorted(os.listdir(target))
+        children = None
+        if self.use_index and target.is_dir():
+            index = get_workspace_index(self.workspace_root)
+            index.refresh()
+            children = index.children(relpath(target, index.root))
+        entries = [child.name for child in children] if children is not None else sorted(
+            os.listdir(target)
+        )
         return ToolResult(
             output="\n".join(entries),
             success=True,
@@ -130,17 +748,52 @@ class FsRemoveTool(Tool):
         return ToolResult(output="removed", success=True, metadata={"removed": True})
 
 
+def _index_listing(index: WorkspaceIndex, rel: str) -> Listing:
+    entries = index.children(rel)
+    return [(entry.name, entry.is_dir, False) for entry in entries or []]
+
+
 class FsGlobTool(Tool):
     name = "fs_glob"
     description = "Glob for files relative to the workspace."
 
-    def __init__(self, workspace_root: Path) -> None:
+    def __init__(self, workspace_root: Path, use_index: bool = True) -> None:
         self.workspace_root = workspace_root
+        self.use_index = use_index
+
+    def run(
+        self,
+        pattern: str,
+        limit: int | None = None,
+        sort: str = "name",
+        include_ignored: bool = False,
+    ) -> ToolResult:
+        """
+        Stream matches of ``pattern`` (``**`` spans directories), stopping after ``limit``.
 
-    def run(self, pattern: str) -> ToolResult:
-        base_pattern = str(_ensure_workspace(self.workspace_root / pattern, self.workspace_root))
-        matches = [Path(match).resolve() for match in glob.glob(base_pattern)]
-        rel_matches = [str(match.relative_to(self.workspace_root)) for match in matches]
+        Gitignored and VCS/dependency paths are skipped unless ``include_ignored`` is set;
+        ``sort="mtime"`` returns the newest matches first.
+        """
+        if sort not in ("name", "mtime"):
+            return ToolResult(output=f"Unknown sort: {sort}", success=False)
+        root = self.workspace_root.resolve()
+        base_pattern = _ensure_workspace(self.workspace_root / pattern, self.workspace_root)
+        index = get_workspace_index(root)
+        matcher = None if include_ignored else index.matcher
+        lister = None
+        if self.use_index and index.built:  # an existing index saves the directory reads
+            index.refresh()
+            lister = partial(_index_listing, index)
+        matches = iter_glob(root, relpath(base_pattern, root), matcher, lister)
+        keep = limit + 1 if limit is not None else None  # one extra match tells truncation
+        if sort == "mtime":
+            rel_matches = newest_first(root, matches, keep)
+        else:
+            rel_matches = list(islice(matches, keep))
+        truncated = limit is not None and len(rel_matches) > limit
+        rel_matches = rel_matches[:limit]
         return ToolResult(
-            output="\n".join(rel_matches), success=True, metadata={"matches": rel_matches}
+            output="\n".join(rel_matches),
+            success=True,
+            metadata={"matches": rel_matches, "truncated": truncated},
         )
@@ -1,12 +1,12 @@
 from __future__ import annotations
 
-import subprocess
 from pathlib import Path
 from typing import List
 
 from codax.safety import ActionType, SafetyPolicy, guard_action
 from codax.tools.base import Tool, ToolResult
 from codax.tools.filesystem import _ensure_workspace
+from codax.tools.process import run_process
 
 
 class _GitTool(Tool):
@@ -15,11 +15,7 @@ class _GitTool(Tool):
 
     def _run_git(self, args: List[str], repo_path: str | None = None) -> ToolResult:
         repo = _ensure_workspace(Path(repo_path or "."), self.workspace_root)
-        result = subprocess.run(
-            ["git", "-C", str(repo), *args],
-            capture_output=True,
-            text=True,
-        )
+        result = run_process(["git", "-C", str(repo), *args])
         output = (result.stdout or "") + (result.stderr or "")
         if len(output) > 4000:
             output = output[:4000] + "\n[truncated]"
@@ -70,24 +66,14 @@ class GitApplyPatchTool(_GitTool):
         check_args = ["git", "-C", str(repo), "apply"]
         if check:
             check_args.append("--check")
-        check_result = subprocess.run(
-            check_args,
-            input=patch,
-            text=True,
-            capture_output=True,
-        )
+        check_result = run_process(check_args, input=patch)
         if check_result.returncode != 0:
             output = (check_result.stdout or "") + (check_result.stderr or "")
             return ToolResult(
                 output=output, success=False, metadata={"returncode": check_result.returncode}
             )
 
-        apply_result = subprocess.run(
-            ["git", "-C", str(repo), "apply"],
-            input=patch,
-            text=True,
-            capture_output=True,
-        )
+        apply_result = run_process(["git", "-C", str(repo), "apply"], input=patch)
         output = (apply_result.stdout or "") + (apply_result.stderr or "")
         if len(output) > 4000:
             output = output[:4000] + "\n[truncated]"
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import fnmatch
+import heapq
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+
+from codax.ignore import IgnoreMatcher, IgnoreRule
+
+# (name, is_dir, is_symlink) of one directory's entries, sorted by name.
+Listing = List[Tuple[str, bool, bool]]
+
+
+class _Recursive:
+    """The ``**`` segment: zero or more directories."""
+
+
+RECURSIVE = _Recursive()
+
+
+@dataclass(frozen=True)
+class _Wildcard:
+    regex: re.Pattern[str]
+    hidden: bool  # pattern starts with "." so dotfiles may match
+
+    def matches(self, name: str) -> bool:
+        if name.startswith(".") and not self.hidden:
+            return False
+        return self.regex.match(name) is not None
+
+
+Segment = Union[str, _Wildcard, _Recursive]
+
+
+@dataclass(frozen=True)
+class GlobPattern:
+    source: str
+    segments: Tuple[Segment, ...]
+
+
+@lru_cache(maxsize=256)
+def compile_glob(pattern: str) -> GlobPattern:
+    """Split a posix glob into literal, wildcard and ``**`` segments, regexes compiled once."""
+    segments: List[Segment] = []
+    for part in pattern.split("/"):
+        if not part or part == ".":
+            continue
+        if part == "**":
+            if not segments or segments[-1] is not RECURSIVE:
+                segments.append(RECURSIVE)
+        elif any(char in part for char in "*?["):
+            segments.append(_Wildcard(re.compile(fnmatch.translate(part)), part.startswith(".")))
+        else:
+            segments.append(part)
+    return GlobPattern(pattern, tuple(segments))
+
+
+def scan_dir(directory: Path) -> Listing:
+    try:
+        with os.scandir(directory) as scan:
+            items = [(item.name, item.is_dir(), item.is_symlink()) for item in scan]
+    except OSError:
+        return []
+    items.sort()
+    return items
+
+
+def iter_glob(
+    root: Path,
+    pattern: GlobPattern | str,
+    matcher: IgnoreMatcher | None = None,
+    lister: Callable[[str], Listing] | None = None,
+) -> Iterator[str]:
+    """
+    Lazily yield posix paths (relative to ``root``) matching ``pattern``, depth-first in
+    name order.
+
+    ``*``/``?``/``[...]`` match within one component and skip dotfiles unless the segment
+    starts with "."; ``**`` matches any number of directories. With ``matcher``, ignored
+    entries are neither matched by wildcards nor descended into, while literal segments
+    still reach into ignored directories (``node_modules/pkg/*.js`` works). Symlinked
+    directories are not followed by ``**``.
+    """
+    compiled = compile_glob(pattern) if isinstance(pattern, str) else pattern
+    segments = compiled.segments
+    if not segments:
+        yield "."
+        return
+    list_dir = lister or (lambda rel: scan_dir(root / rel if rel else root))
+
+    rules: Dict[str, List[IgnoreRule]] = {}
+
+    def ignored(rel: str, parent: str, is_dir: bool) -> bool:
+        if matcher is None:
+            return False
+        if parent not in rules:  # ignore files are stat'ed once per directory per call
+            rules[parent] = matcher.rules_for(parent)
+        return matcher.matches(rel, is_dir, rules[parent])
+
+    def walk(rel: str, index: int) -> Iterator[str]:
+        segment = segments[index]
+        last = index == len(segments) - 1
+        if isinstance(segment, str):
+            child = f"{rel}/{segment}" if rel else segment
+            target = root / child
+            if last:
+                if os.path.lexists(target):
+                    yield child
+            elif os.path.isdir(target):
+                yield from walk(child, index + 1)
+            return
+        if isinstance(segment, _Wildcard):
+            for name, is_dir, _ in list_dir(rel):
+                if not segment.matches(name):
+                    continue
+                child = f"{rel}/{name}" if rel else name
+                if (last or is_dir) and ignored(child, rel, is_dir):
+                    continue
+                if last:
+                    yield child
+                elif is_dir:
+                    yield from walk(child, index + 1)
+            return
+        # "**": match here, then in every non-hidden, non-ignored subdirectory.
+        listing = list_dir(rel)
+        if last:
+            for name, is_dir, is_link in listing:
+                if name.startswith("."):
+                    continue
+                child = f"{rel}/{name}" if rel else name
+                if not ignored(child, rel, is_dir):
+                    yield child
+                    if is_dir and not is_link:
+                        yield from walk(child, index)
+            return
+        yield from walk(rel, index + 1)
+        for name, is_dir, is_link in listing:
+            if not is_dir or is_link or name.startswith("."):
+                continue
+            child = f"{rel}/{name}" if rel else name
+            if not ignored(child, rel, True):
+                yield from walk(child, index)
+
+    yield from walk("", 0)
+
+
+def newest_first(root: Path, matches: Iterator[str], limit: int | None) -> List[str]:
+    """Sort matches by mtime, newest first; with ``limit`` only the top entries are kept."""
+
+    def mtime(rel: str) -> int:
+        try:
+            return os.stat(root / rel, follow_symlinks=False).st_mtime_ns
+        except OSError:
+            return 0
+
+    if limit is None:
+        return sorted(matches, key=lambda rel: (-mtime(rel), rel))
+    return [rel for _, rel in heapq.nsmallest(limit, ((-mtime(rel), rel) for rel in matches))]
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import base64
+import json
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from codax.grep_engine import BINARY_SNIFF, compile_pattern
+from codax.tools.process import stream_process
+
+# Matched or context lines longer than this are cut when formatted.
+MAX_LINE_CHARS = 400
+
+
+@dataclass(slots=True)
+class LineHit:
+    path: str
+    line: int  # 1-based
+    text: str  # without the line terminator
+    match: bool  # False for a context line
+
+
+class PatternError(ValueError):
+    """The search pattern was rejected (by rg or by ``re``)."""
+
+
+def _field(value: Dict[str, Any]) -> str:
+    """rg --json encodes non-UTF-8 paths and lines as {"bytes": base64} instead of text."""
+    if "text" in value:
+        return str(value["text"])
+    return base64.b64decode(value["bytes"]).decode("utf-8", errors="replace")
+
+
+def rg_hits(
+    pattern: str,
+    root: Path,
+    *,
+    limit: int,
+    before: int = 0,
+    after: int = 0,
+    max_per_file: int | None = None,
+    include: str | None = None,
+    paths: Sequence[str] | None = None,
+) -> Tuple[List[LineHit], bool]:
+    """
+    Matching lines (plus context) from ``rg --json``, parsed as rg produces them; only
+    in ``paths`` (e.g. trigram-narrowed candidates) when given, else everywhere under ``root``.
+
+    rg is killed as soon as ``limit`` matches and the last one's trailing context have
+    been read. Returns the hits and whether the limit cut the search short.
+    """
+    cmd = ["rg", "--json", "--no-messages", "-B", str(before), "-A", str(after)]
+    if max_per_file:
+        cmd += ["-m", str(max_per_file)]
+    if include:
+        cmd += ["-g", include]
+    cmd += ["-e", pattern, "--", *(paths if paths is not None else [str(root)])]
+    hits: List[LineHit] = []
+    matches = 0
+    with tempfile.TemporaryFile() as errors, stream_process(cmd, stderr=errors) as proc:
+        assert proc.stdout is not None
+        for raw in proc.stdout:
+            event = json.loads(raw)
+            kind = event.get("type")
+            if kind not in ("match", "context"):
+                if matches >= limit:
+                    break
+                continue
+            data = event["data"]
+            hit = LineHit(
+                _field(data["path"]),
+                int(data["line_number"]),
+                _field(data["lines"]).rstrip("\r\n"),
+                kind == "match",
+            )
+            if matches >= limit:  # only the last match's contiguous trailing context
+                last = hits[-1]
+                if hit.match or hit.path != last.path or hit.line != last.line + 1:
+                    break
+                if hit.line - _last_match(hits).line > after:
+                    break
+            hits.append(hit)
+            if hit.match:
+                matches += 1
+                if matches >= limit and after == 0:
+                    break
+        else:
+            if proc.wait() == 2 and not hits:
+                errors.seek(0)
+                message = errors.read().decode("utf-8", errors="replace").strip()
+                if message:
+                    raise PatternError(message)
+    return hits, matches >= limit
+
+
+# Tokens whose meaning differs between a whole file and one line (string anchors,
+# negative lookarounds), which would make the whole-file prefilter drop real hits.
+_PER_LINE_ONLY = ("\\A", "\\Z", "(?!", "(?<!")
+
+
+def _last_match(hits: List[LineHit]) -> LineHit:
+    return next(hit for hit in reversed(hits) if hit.match)
+
+
+def scan_hits(
+    pattern: str,
+    paths: Iterable[str],
+    *,
+    limit: int,
+    before: int = 0,
+    after: int = 0,
+    max_per_file: int | None = None,
+) -> Tuple[List[LineHit], bool]:
+    """``rg_hits`` without rg: files are prefiltered as a whole, then split into lines."""
+    try:
+        regex = re.compile(pattern)
+        # Whole-file search with line anchors finds every file with a matching line,
+        # unless the pattern can see line ends that a single line hides from it.
+        prefilter = (
+            None
+            if any(token in pattern for token in _PER_LINE_ONLY)
+            else compile_pattern(pattern, re.MULTILINE)
+        )
+    except re.error as exc:
+        raise PatternError(str(exc)) from exc
+    hits: List[LineHit] = []
+    matches = 0
+    for path in paths:
+        try:
+            data = Path(path).read_bytes()
+        except OSError:
+            continue
+        if b"\0" in data[:BINARY_SNIFF]:
+            continue
+        if prefilter is not None and not prefilter.search(data):
+            continue
+        # Split on "\n" only, so line numbers agree with rg's; like rg, "$" does not
+        # match before a "\r", which is only dropped for display.
+        lines = data.decode("utf-8", "replace").split("\n")
+        if lines[-1] == "":
+            lines.pop()
+        cap = limit - matches
+        if max_per_file:
+            cap = min(cap, max_per_file)
+        matched: List[int] = []
+        for index, line in enumerate(lines):
+            if regex.search(line):
+                matched.append(index)
+                if len(matched) >= cap:
+                    break
+        if not matched:
+            continue
+        shown = sorted(
+            {
+                number
+                for index in matched
+                for number in range(max(0, index - before), min(len(lines), index + after + 1))
+            }
+        )
+        chosen = set(matched)
+        hits.extend(
+            LineHit(path, number + 1, lines[number].removesuffix("\r"), number in chosen)
+            for number in shown
+        )
+        matches += len(matched)
+        if matches >= limit:
+            return hits, True
+    return hits, False
+
+
+def format_hits(hits: List[LineHit]) -> str:
+    """grep -n style: ``path:line:text`` for matches, ``path-line-text`` for context."""
+    out: List[str] = []
+    previous: LineHit | None = None
+    for hit in hits:
+        if previous is not None and (hit.path != previous.path or hit.line != previous.line + 1):
+            out.append("--")
+        text = hit.text
+        if len(text) > MAX_LINE_CHARS:
+            text = text[:MAX_LINE_CHARS] + " [...]"
+        sep = ":" if hit.match else "-"
+        out.append(f"{hit.path}{sep}{hit.line}{sep}{text}")
+        previous = hit
+    return "\n".join(out)
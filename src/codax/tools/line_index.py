@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from pathlib import Path
+from typing import List, Tuple
+
+# Files whose line offsets are kept in memory at once (least recently used evicted).
+MAX_CACHED_INDEXES = 64
+
+
+class LineIndex:
+    """
+    Byte offset of every line start in a file, so any line window is one seek and one read.
+
+    ``offsets[i]`` is where line ``i + 1`` starts and the final entry is the file size.
+    An index is only valid for the ``(mtime_ns, size)`` it was built from.
+    """
+
+    def __init__(self, path: Path, mtime_ns: int, size: int, offsets: array[int]) -> None:
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, path: Path) -> LineIndex:
+        with path.open("rb") as handle:
+            stat = os.fstat(handle.fileno())
+            # Binary-mode line iteration splits on b"\n" in C; only lengths are kept.
+            offsets = array("Q", accumulate(map(len, handle), initial=0))
+        # A file written while it was indexed gets a stale stamp, so the next call rebuilds.
+        mtime_ns = stat.st_mtime_ns if offsets[-1] == stat.st_size else -1
+        return cls(path, mtime_ns, offsets[-1], offsets)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.offsets) - 1
+
+    def fresh(self, stat: os.stat_result) -> bool:
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+    def read_lines(self, start: int, count: int) -> List[bytes]:
+        """Raw lines ``start`` .. ``start + count - 1`` (1-based), newlines stripped."""
+        first = max(start, 1) - 1
+        last = min(first + max(count, 0), self.line_count)
+        if first >= last:
+            return []
+        with self.path.open("rb") as handle:
+            handle.seek(self.offsets[first])
+            data = handle.read(self.offsets[last] - self.offsets[first])
+        lines = data.split(b"\n")
+        if data.endswith(b"\n"):
+            lines.pop()
+        return [line.rstrip(b"\r") for line in lines]
+
+
+_indexes: OrderedDict[Tuple[str, int], LineIndex] = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_line_index(path: Path) -> LineIndex:
+    """Cached index for ``path``, rebuilt when its mtime or size changed."""
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_ino)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None and index.fresh(stat):
+            _indexes.move_to_end(key)
+            return index
+    index = LineIndex.build(path)
+    with _lock:
+        _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def clear_line_indexes() -> None:
+    with _lock:
+        _indexes.clear()
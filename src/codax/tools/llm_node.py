@@ -4,6 +4,12 @@ import json
 from typing import Any, Dict, List
 
 from codax.config import Settings
+from codax.llm_scheduler import (
+    _retry_after,
+    estimate_tokens,
+    get_scheduler,
+    is_rate_limit_error,
+)
 from codax.tools.base import Tool, ToolResult
 
 try:  # Optional dependency
@@ -12,6 +18,18 @@ except Exception:  # pragma: no cover - optional runtime dep
     ChatOpenAI = None  # type: ignore[assignment]
 
 
+def _usage(resp: Any) -> Dict[str, int]:
+    """Token usage reported by a LangChain message (``usage_metadata``), if any."""
+    usage = getattr(resp, "usage_metadata", None)
+    if not isinstance(usage, dict):
+        return {}
+    return {key: int(usage.get(key, 0) or 0) for key in ("input_tokens", "output_tokens")}
+
+
+def _total_tokens(resp: Any) -> int:
+    return sum(_usage(resp).values())
+
+
 def _fallback_response(user_message: str, json_schema: Dict[str, Any] | None = None) -> str:
     if json_schema:
         # Build a minimal JSON object using schema keys.
@@ -28,31 +46,27 @@ def _fallback_response(user_message: str, json_schema: Dict[str, Any] | None = N
     return " ".join(words[:40]) + ("..." if len(words) > 40 else "")
 
 
+def _is_rate_limited(response: Any) -> bool:
+    return isinstance(response, Exception) and is_rate_limit_error(response)
+
+
 class LlmNodeTool(Tool):
     name = "llm_node"
     description = "Single-turn LLM node with system/user prompts and optional JSON output."
     accepts_context = True
+    supports_batch = True
 
     def __init__(self, settings: Settings | None = None) -> None:
         self.settings = settings or Settings()
+        self.scheduler = get_scheduler(self.settings)
 
-    def run(  # type: ignore[override]
+    def _prompt(
         self,
-        system_prompt: str,
         user_message: str,
         tools: List[str] | None = None,
         json_schema: Dict[str, Any] | None = None,
-        temperature: float | None = None,
-        max_tokens: int = 512,
         context: Dict[str, Any] | None = None,
-        model: str | None = None,
-        reasoning: str | None = None,  # captured for metadata only
-    ) -> ToolResult:
-        temperature = temperature if temperature is not None else self.settings.temperature
-        model_used = "heuristic"
-        raw_content: str
-        effective_model = model or self.settings.model
-
+    ) -> str:
         prompt_message = user_message
         if json_schema:
             keys = ", ".join(json_schema.keys())
@@ -71,27 +85,27 @@ class LlmNodeTool(Tool):
         if tools:
             tool_list = tools if isinstance(tools, list) else [tools]
             prompt_message += "\nTools available: " + ", ".join(tool_list)
+        return prompt_message
 
-        if ChatOpenAI and self.settings.openai_api_key:
-            try:
-                llm = ChatOpenAI(
-                    model=effective_model,
-                    temperature=temperature,
-                    openai_api_key=self.settings.openai_api_key,
-                    max_tokens=max_tokens,
-                )
-                messages = [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt_message},
-                ]
-                resp = llm.invoke(messages)
-                raw_content = str(getattr(resp, "content", ""))
-                model_used = effective_model
-            except Exception:  # noqa: BLE001
-                raw_content = _fallback_response(prompt_message, json_schema)
-        else:
-            raw_content = _fallback_response(prompt_message, json_schema)
+    def _llm(self, model: str, temperature: float, max_tokens: int) -> Any:
+        if not (ChatOpenAI and self.settings.openai_api_key):
+            return None
+        return ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            openai_api_key=self.settings.openai_api_key,
+            max_tokens=max_tokens,
+        )
 
+    def _result(
+        self,
+        raw_content: str,
+        model_used: str,
+        json_schema: Dict[str, Any] | None,
+        tools: List[str] | None,
+        reasoning: str | None,
+        **extra: Any,
+    ) -> ToolResult:
         parsed: Any = None
         if json_schema:
             try:
@@ -106,5 +120,247 @@ class LlmNodeTool(Tool):
             "json_schema": bool(json_schema),
             "tools_available": tools or [],
             "reasoning": reasoning,
+            **extra,
         }
         return ToolResult(output=output_value, success=True, metadata=metadata)
+
+    def run(  # type: ignore[override]
+        self,
+        system_prompt: str,
+        user_message: str,
+        tools: List[str] | None = None,
+        json_schema: Dict[str, Any] | None = None,
+        temperature: float | None = None,
+        max_tokens: int = 512,
+        context: Dict[str, Any] | None = None,
+        model: str | None = None,
+        reasoning: str | None = None,  # captured for metadata only
+        priority: str = "batch",
+    ) -> ToolResult:
+        temperature = temperature if temperature is not None else self.settings.temperature
+        model_used = "heuristic"
+        usage: Dict[str, int] = {}
+        effective_model = model or self.settings.model
+        prompt_message = self._prompt(user_message, tools, json_schema, context)
+
+        raw_content = _fallback_response(prompt_message, json_schema)
+        try:
+            llm = self._llm(effective_model, temperature, max_tokens)
+            if llm is not None:
+                messages = [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt_message},
+                ]
+                resp = self.scheduler.call(
+                    effective_model,
+                    lambda: llm.invoke(messages),
+                    tokens=estimate_tokens(system_prompt, prompt_message) + max_tokens,
+                    priority=priority,
+                    usage=_total_tokens,
+                )
+                raw_content = str(getattr(resp, "content", ""))
+                model_used = effective_model
+                usage = _usage(resp)
+        except Exception:  # noqa: BLE001
+            pass
+
+        return self._result(raw_content, model_used, json_schema, tools, reasoning, usage=usage)
+
+    def run_batch(
+        self,
+        calls: List[Dict[str, Any]],
+        max_concurrency: int = 4,
+        pack: int = 0,
+    ) -> List[ToolResult]:
+        """
+        Execute many ``run`` argument sets with less per-request overhead.
+
+        Calls sharing model settings are coalesced through the client's ``batch`` with
+        bounded concurrency. With ``pack > 1``, up to ``pack`` calls that also share the
+        system prompt and schema are sent as one request that must answer with a JSON
+        array; packs whose response cannot be split back per item are re-sent unpacked.
+        Items rejected with a rate limit are re-sent after the scheduler's pause (up to
+        ``llm_rate_limit_retries`` times); items that still fail come back as failed
+        results. Results are returned in call order.
+        """
+        results: List[ToolResult | None] = [None] * len(calls)
+        groups: Dict[str, List[int]] = {}
+        for index, call in enumerate(calls):
+            key = json.dumps(
+                [
+                    call.get("model") or self.settings.model,
+                    call.get("temperature"),
+                    call.get("max_tokens", 512),
+                    call.get("system_prompt") if pack > 1 else None,
+                    call.get("json_schema") if pack > 1 else None,
+                ],
+                sort_keys=True,
+                default=str,
+            )
+            groups.setdefault(key, []).append(index)
+
+        for indexes in groups.values():
+            pending = indexes
+            if pack > 1:
+                pending = []
+                for start in range(0, len(indexes), pack):
+                    chunk = indexes[start : start + pack]
+                    packed = None
+                    if len(chunk) > 1:
+                        packed = self._run_packed([calls[i] for i in chunk])
+                    if packed is None:
+                        pending.extend(chunk)
+                        continue
+                    for i, result in zip(chunk, packed):
+                        results[i] = result
+            coalesced = self._run_coalesced([calls[i] for i in pending], max_concurrency)
+            for i, result in zip(pending, coalesced):
+                results[i] = result
+        return [result for result in results if result is not None]
+
+    def _run_coalesced(self, calls: List[Dict[str, Any]], max_concurrency: int) -> List[ToolResult]:
+        if not calls:
+            return []
+        first = calls[0]
+        model = first.get("model") or self.settings.model
+        temperature = first.get("temperature")
+        temperature = temperature if temperature is not None else self.settings.temperature
+        prompts = [
+            self._prompt(
+                call["user_message"],
+                call.get("tools"),
+                call.get("json_schema"),
+                call.get("context"),
+            )
+            for call in calls
+        ]
+        responses: List[Any] = [None] * len(calls)
+        llm: Any = None
+        batch_input = [
+            [
+                {"role": "system", "content": call["system_prompt"]},
+                {"role": "user", "content": prompt},
+            ]
+            for call, prompt in zip(calls, prompts)
+        ]
+        max_tokens = int(first.get("max_tokens", 512))
+        try:
+            llm = self._llm(model, temperature, max_tokens)
+        except Exception:  # noqa: BLE001 - no client: every item uses the heuristic
+            llm = None
+        todo = list(range(len(calls)))
+        attempt = 0
+        while llm is not None and todo:
+            inputs = [batch_input[i] for i in todo]
+            try:
+                answers = self.scheduler.call(
+                    model,
+                    lambda: llm.batch(
+                        inputs,
+                        config={"max_concurrency": max(1, max_concurrency)},
+                        return_exceptions=True,
+                    ),
+                    tokens=estimate_tokens(*inputs) + max_tokens * len(inputs),
+                    priority=str(first.get("priority", "batch")),
+                    requests=len(inputs),
+                    usage=lambda items: sum(
+                        _total_tokens(item) for item in items if not isinstance(item, Exception)
+                    ),
+                )
+            except Exception as exc:  # noqa: BLE001 - reported per item below
+                answers = [exc] * len(inputs)
+            for i, answer in zip(todo, answers):
+                responses[i] = answer
+            limited = [i for i in todo if _is_rate_limited(responses[i])]
+            if not limited or attempt >= self.scheduler.max_retries:
+                break
+            # Only the throttled items are re-sent, once the model's pause is over.
+            attempt += 1
+            self.scheduler.throttled(model, _retry_after(responses[limited[0]]))
+            todo = limited
+        results = []
+        for call, prompt, resp in zip(calls, prompts, responses):
+            if isinstance(resp, Exception):
+                results.append(
+                    ToolResult(
+                        output=f"{type(resp).__name__}: {resp}",
+                        success=False,
+                        metadata={"model": model, "batch": "coalesced", "usage": {}},
+                    )
+                )
+                continue
+            if resp is None:
+                raw, model_used = _fallback_response(prompt, call.get("json_schema")), "heuristic"
+            else:
+                raw, model_used = str(getattr(resp, "content", "")), model
+            results.append(
+                self._result(
+                    raw,
+                    model_used,
+                    call.get("json_schema"),
+                    call.get("tools"),
+                    call.get("reasoning"),
+                    batch="coalesced",
+                    usage=_usage(resp),
+                )
+            )
+        return results
+
+    def _run_packed(self, calls: List[Dict[str, Any]]) -> List[ToolResult] | None:
+        first = calls[0]
+        json_schema = first.get("json_schema")
+        model = first.get("model") or self.settings.model
+        temperature = first.get("temperature")
+        temperature = temperature if temperature is not None else self.settings.temperature
+        items = "\n".join(
+            f"[{i}] "
+            + json.dumps(
+                self._prompt(call["user_message"], call.get("tools"), None, call.get("context")),
+                ensure_ascii=False,
+            )
+            for i, call in enumerate(calls)
+        )
+        shape = f"a JSON object with keys: {', '.join(json_schema)}" if json_schema else "a string"
+        prompt = (
+            f"Process each of the {len(calls)} items below independently.\n"
+            f"Return only a JSON array of exactly {len(calls)} elements in item order; "
+            f"each element is {shape}.\nItems:\n{items}"
+        )
+        try:
+            max_tokens = int(first.get("max_tokens", 512)) * len(calls)
+            llm = self._llm(model, temperature, max_tokens)
+            if llm is None:
+                return None
+            messages = [
+                {"role": "system", "content": first["system_prompt"]},
+                {"role": "user", "content": prompt},
+            ]
+            resp = self.scheduler.call(
+                model,
+                lambda: llm.invoke(messages),
+                tokens=estimate_tokens(first["system_prompt"], prompt) + max_tokens,
+                priority=str(first.get("priority", "batch")),
+                usage=_total_tokens,
+            )
+            answers = json.loads(str(getattr(resp, "content", "")))
+        except Exception:  # noqa: BLE001 - caller falls back to unpacked requests
+            return None
+        if not isinstance(answers, list) or len(answers) != len(calls):
+            return None
+        results = []
+        for index, (call, answer) in enumerate(zip(calls, answers)):
+            raw = answer if isinstance(answer, str) else json.dumps(answer)
+            result = self._result(
+                raw,
+                model,
+                json_schema,
+                call.get("tools"),
+                call.get("reasoning"),
+                batch="packed",
+                # The shared request's usage is reported once, on the first item.
+                usage=_usage(resp) if index == 0 else {},
+            )
+            if json_schema and not isinstance(answer, str):
+                result.output = answer
+            results.append(result)
+        return results
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Sequence
+
+_ACTIVE_SCOPE: ContextVar["ProcessScope | None"] = ContextVar("codax_process_scope", default=None)
+
+
+def _kill_tree(proc: subprocess.Popen[Any]) -> None:
+    """Kill a child started in its own session together with everything it spawned."""
+    if proc.poll() is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
+        try:
+            proc.kill()
+        except OSError:
+            pass
+
+
+class ProcessScope:
+    """Tracks subprocesses started while the scope is active so they can be killed together."""
+
+    def __init__(self) -> None:
+        self._procs: set[subprocess.Popen[Any]] = set()
+        self._lock = threading.Lock()
+        self.killed = False
+
+    def register(self, proc: subprocess.Popen[Any]) -> None:
+        with self._lock:
+            if self.killed:
+                _kill_tree(proc)
+                return
+            self._procs.add(proc)
+
+    def discard(self, proc: subprocess.Popen[Any]) -> None:
+        with self._lock:
+            self._procs.discard(proc)
+
+    def kill(self) -> int:
+        """Kill every tracked process tree; later registrations are killed on arrival."""
+        with self._lock:
+            self.killed = True
+            procs = list(self._procs)
+            self._procs.clear()
+        for proc in procs:
+            _kill_tree(proc)
+        return len(procs)
+
+    @contextmanager
+    def activate(self) -> Iterator["ProcessScope"]:
+        token = _ACTIVE_SCOPE.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE_SCOPE.reset(token)
+
+
+def current_scope() -> ProcessScope | None:
+    return _ACTIVE_SCOPE.get()
+
+
+def run_process(
+    args: str | Sequence[str],
+    *,
+    shell: bool = False,
+    cwd: str | os.PathLike[str] | None = None,
+    input: str | None = None,  # noqa: A002 - mirrors subprocess.run
+    timeout: float | None = None,
+    env: dict[str, str] | None = None,
+) -> subprocess.CompletedProcess[str]:
+    """
+    `subprocess.run(capture_output=True, text=True)` replacement.
+
+    The child gets its own session so a timeout, or a kill of the active ProcessScope,
+    takes down the whole process tree instead of just the direct child.
+    """
+    proc = subprocess.Popen(
+        args,
+        shell=shell,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+    )
+    scope = current_scope()
+    if scope is not None:
+        scope.register(proc)
+    try:
+        stdout, stderr = proc.communicate(input, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill_tree(proc)
+        stdout, stderr = proc.communicate()
+        raise subprocess.TimeoutExpired(args, timeout or 0, output=stdout, stderr=stderr)
+    except BaseException:
+        _kill_tree(proc)
+        proc.wait()
+        raise
+    finally:
+        if scope is not None:
+            scope.discard(proc)
+    return subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+
+
+@contextmanager
+def stream_process(
+    args: Sequence[str],
+    *,
+    cwd: str | os.PathLike[str] | None = None,
+    stderr: Any = subprocess.DEVNULL,
+) -> Iterator[subprocess.Popen[bytes]]:
+    """
+    Start ``args`` with stdout piped for incremental (binary) reading.
+
+    Leaving the block kills the process tree if it is still running, so callers can stop
+    reading as soon as they have enough output.
+    """
+    proc = subprocess.Popen(
+        args,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=stderr,
+        start_new_session=True,
+    )
+    scope = current_scope()
+    if scope is not None:
+        scope.register(proc)
+    try:
+        yield proc
+    finally:
+        _kill_tree(proc)
+        if proc.stdout is not None:
+            proc.stdout.close()
+        proc.wait()
+        if scope is not None:
+            scope.discard(proc)
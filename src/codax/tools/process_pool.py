@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import atexit
+import json
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+from codax.tools.base import ToolResult
+
+if TYPE_CHECKING:
+    from codax.config import Settings
+
+# Payloads at least this large cross the process boundary through shared memory.
+SHM_THRESHOLD = 1 << 20
+
+Packed = Tuple[str, Any]
+
+_worker_settings: Dict[str, Any] = {}
+_worker_registry: Dict[str, Any] | None = None
+
+
+def _pack(obj: Any, threshold: int = SHM_THRESHOLD) -> Packed:
+    """Pickle ``obj``; large payloads go to a shared-memory block the receiver unlinks."""
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) < threshold:
+        return ("inline", data)
+    block = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        block.buf[: len(data)] = data
+        name = block.name
+    finally:
+        block.close()
+    try:  # Ownership moves to the receiver; stop this process' tracker from reaping it.
+        from multiprocessing import resource_tracker
+
+        tracked = name if name.startswith("/") else f"/{name}"
+        resource_tracker.unregister(tracked, "shared_memory")
+    except Exception:  # noqa: BLE001 - tracker internals differ across versions
+        pass
+    return ("shm", (name, len(data)))
+
+
+def _unpack(payload: Packed) -> Any:
+    kind, value = payload
+    if kind == "inline":
+        return pickle.loads(value)
+    name, size = value
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(block.buf[:size])
+    finally:
+        block.close()
+        block.unlink()
+    return pickle.loads(data)
+
+
+def _init_worker(settings_payload: Dict[str, Any]) -> None:
+    global _worker_settings
+    _worker_settings = settings_payload
+
+
+def _registry() -> Dict[str, Any]:
+    """Build the worker's own tool registry on first use and keep it for later tasks."""
+    global _worker_registry
+    if _worker_registry is None:
+        from codax.config import Settings
+        from codax.tools import build_tool_registry
+
+        _worker_registry = build_tool_registry(Settings(**_worker_settings))
+    return _worker_registry
+
+
+def _run_in_worker(tool_name: str, packed_args: Packed) -> Packed:
+    args = _unpack(packed_args)
+    tool = _registry().get(tool_name)
+    if tool is None:
+        result = ToolResult(output=f"tool '{tool_name}' unavailable in process pool", success=False)
+    else:
+        try:
+            result = tool.run(**args)
+        except Exception as exc:  # noqa: BLE001 - exceptions may not pickle; report as failure
+            result = ToolResult(output=f"{type(exc).__name__}: {exc}", success=False)
+    return _pack(result)
+
+
+class ToolProcessPool:
+    """
+    Warm process pool for CPU-bound tool calls.
+
+    Workers start with the serialized settings and lazily build their own tool registry,
+    so only the tool name, arguments and result cross process boundaries.
+    """
+
+    def __init__(self, settings: Settings, max_workers: int | None = None) -> None:
+        workers = max_workers or settings.process_pool_workers or os.cpu_count() or 1
+        self.max_workers = workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(settings.model_dump(),),
+        )
+
+    def run(self, tool_name: str, args: Dict[str, Any]) -> ToolResult:
+        future = self._executor.submit(_run_in_worker, tool_name, _pack(args))
+        result = _unpack(future.result())
+        if isinstance(result, ToolResult):
+            return result
+        return ToolResult(output=str(result), success=False)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pools: Dict[str, ToolProcessPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_process_pool(settings: Settings) -> ToolProcessPool:
+    """Return the warm pool for these settings, starting it on first use."""
+    key = json.dumps(settings.model_dump(mode="json"), sort_keys=True, default=str)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ToolProcessPool(settings)
+        return pool
+
+
+@atexit.register
+def shutdown_process_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
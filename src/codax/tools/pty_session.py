@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import atexit
+import codecs
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+from codax.tools.process import ProcessScope, _kill_tree, current_scope
+
+try:  # POSIX only
+    import pty
+except ImportError:  # pragma: no cover - Windows
+    pty = None  # type: ignore[assignment]
+
+# Unread output kept per session; older bytes are dropped (and reported) past this.
+MAX_BUFFER_BYTES = 1024 * 1024
+# Live sessions per process; starting one more closes the oldest finished, then oldest.
+MAX_SESSIONS = 32
+
+
+# Exec wrapper run in the child's new session: it makes the pty the controlling terminal
+# (so ^C, job control and terminal size work as in an interactive shell) and then execs
+# the command. Doing this in Python after fork (preexec_fn) can deadlock a threaded parent.
+_CTTY_EXEC = """
+import fcntl, os, sys, termios
+try:
+    fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+except OSError:
+    pass
+try:
+    os.execvp(sys.argv[1], sys.argv[1:])
+except OSError as exc:
+    sys.stderr.write(f"{sys.argv[1]}: {exc.strerror}\\n")
+    os._exit(127)
+"""
+
+
+class PtySession:
+    """
+    A process attached to a pseudo-terminal, with its output buffered by a reader thread.
+
+    ``read`` returns only the output produced since the previous ``read``.
+    """
+
+    def __init__(
+        self,
+        argv: Sequence[str],
+        cwd: str | os.PathLike[str] | None = None,
+        env: Dict[str, str] | None = None,
+    ) -> None:
+        if pty is None:
+            raise OSError("pty sessions need a POSIX system")
+        master, slave = pty.openpty()
+        try:
+            self.proc: subprocess.Popen[bytes] = subprocess.Popen(
+                [sys.executable, "-I", "-S", "-c", _CTTY_EXEC, *argv],
+                cwd=cwd,
+                env={**os.environ, "TERM": "dumb", **(env or {})},
+                stdin=slave,
+                stdout=slave,
+                stderr=slave,
+                start_new_session=True,
+                close_fds=True,
+            )
+        except BaseException:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        self._master = master
+        self._buffer = bytearray()
+        self._dropped = 0
+        # Characters split across reads (or by trimming) are completed on the next read.
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._eof = False
+        self._cond = threading.Condition()
+        self.started = time.monotonic()
+        self._scope: ProcessScope | None = current_scope()
+        if self._scope is not None:
+            self._scope.register(self.proc)
+        self._reader = threading.Thread(target=self._pump, name="codax-pty", daemon=True)
+        self._reader.start()
+
+    def _pump(self) -> None:
+        while True:
+            try:
+                data = os.read(self._master, 65536)
+            except OSError:  # EIO once every slave end is closed
+                data = b""
+            with self._cond:
+                if not data:
+                    self._eof = True
+                    self._cond.notify_all()
+                    return
+                self._buffer += data
+                excess = len(self._buffer) - MAX_BUFFER_BYTES
+                if excess > 0:
+                    while excess < len(self._buffer) and 0x80 <= self._buffer[excess] < 0xC0:
+                        excess += 1  # trim on a character boundary
+                    del self._buffer[:excess]
+                    self._dropped += excess
+                self._cond.notify_all()
+
+    @property
+    def returncode(self) -> int | None:
+        return self.proc.poll()
+
+    @property
+    def finished(self) -> bool:
+        """The process exited and all its output has been read."""
+        with self._cond:
+            return self._eof and not self._buffer and self.proc.poll() is not None
+
+    def write(self, data: str) -> None:
+        payload = data.encode("utf-8")
+        while payload:
+            written = os.write(self._master, payload)
+            payload = payload[written:]
+
+    def read(self, wait: float) -> Tuple[str, int]:
+        """
+        Output since the last call, after up to ``wait`` seconds (less if the process
+        exits first), and how many older bytes were dropped from the buffer meanwhile.
+        """
+        deadline = time.monotonic() + wait
+        with self._cond:
+            while not self._eof:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(min(remaining, 0.1))
+            dropped = self._dropped
+            if dropped:
+                self._decoder.reset()  # the rest of a pending character was dropped
+            text = self._decoder.decode(bytes(self._buffer), final=self._eof)
+            self._buffer.clear()
+            self._dropped = 0
+        if self._eof:
+            self._reap(deadline)
+        return text.replace("\r\n", "\n"), dropped
+
+    def _reap(self, deadline: float) -> None:
+        try:  # output ended; the exit status normally follows right away
+            self.proc.wait(timeout=max(deadline - time.monotonic(), 0.05))
+        except subprocess.TimeoutExpired:
+            pass
+
+    def close(self) -> None:
+        _kill_tree(self.proc)
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:  # pragma: no cover - unkillable child
+            pass
+        self._reader.join(timeout=1)
+        if not self._reader.is_alive():
+            os.close(self._master)
+        if self._scope is not None:
+            self._scope.discard(self.proc)
+
+
+_sessions: Dict[int, PtySession] = {}
+_sessions_lock = threading.Lock()
+_session_ids = itertools.count(1)
+
+
+def start_session(
+    argv: Sequence[str], cwd: str | os.PathLike[str] | None = None, **kwargs: Any
+) -> Tuple[int, PtySession]:
+    """Start ``argv`` on a new pty and register it under a fresh session id."""
+    session = PtySession(argv, cwd=cwd, **kwargs)
+    evicted: List[PtySession] = []
+    with _sessions_lock:
+        session_id = next(_session_ids)
+        _sessions[session_id] = session
+        while len(_sessions) > MAX_SESSIONS:
+            oldest = next(
+                (key for key, value in _sessions.items() if value.returncode is not None),
+                next(iter(_sessions)),
+            )
+            evicted.append(_sessions.pop(oldest))
+    for old in evicted:
+        old.close()
+    return session_id, session
+
+
+def get_session(session_id: int) -> PtySession | None:
+    with _sessions_lock:
+        return _sessions.get(session_id)
+
+
+def close_session(session_id: int) -> None:
+    with _sessions_lock:
+        session = _sessions.pop(session_id, None)
+    if session is not None:
+        session.close()
+
+
+@atexit.register
+def close_all_sessions() -> None:
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
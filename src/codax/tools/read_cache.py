@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import difflib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Hashable, Tuple
+
+from codax.tools.base import ToolResult
+
+# Characters of file content remembered per session before the oldest reads are dropped.
+MAX_CACHED_CHARS = 8 * 1024 * 1024
+# A diff is sent instead of the new content only when it is at most this share of it.
+MAX_DIFF_RATIO = 0.5
+
+
+@dataclass
+class _Snapshot:
+    mtime_ns: int
+    size: int
+    content: str
+
+
+class ReadCache:
+    """
+    What one agent session has already been shown, per file and read window.
+
+    A repeated read of an unchanged file (same ``mtime_ns`` and size) returns a short
+    marker instead of the content. When the file changed and ``diffs`` is on, a unified
+    diff against the previous read is returned if it is much smaller than the content.
+    """
+
+    def __init__(self, diffs: bool = True, max_chars: int = MAX_CACHED_CHARS) -> None:
+        self.diffs = diffs
+        self.max_chars = max_chars
+        self._entries: OrderedDict[Tuple[str, Hashable], _Snapshot] = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "diffs": 0, "misses": 0}
+
+    def read(
+        self, path: Path, view: Hashable, label: str, read: Callable[[], ToolResult]
+    ) -> ToolResult:
+        """Run ``read`` for ``path`` unless this ``view`` of it was already returned."""
+        key = (str(path), view)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return read()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and (previous.mtime_ns, previous.size) == stamp:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._unchanged(label)
+        result = read()
+        if not result.success:
+            return result
+        self._store(key, _Snapshot(*stamp, result.output))
+        if previous is not None and previous.content == result.output:  # touched, not edited
+            self.stats["hits"] += 1
+            return self._unchanged(label)
+        if previous is None or not self.diffs:
+            self.stats["misses"] += 1
+            return result
+        diff = "".join(
+            difflib.unified_diff(
+                previous.content.splitlines(keepends=True),
+                result.output.splitlines(keepends=True),
+                f"{label} (previous read)",
+                label,
+                n=2,
+            )
+        )
+        if len(diff) > MAX_DIFF_RATIO * len(result.output):
+            self.stats["misses"] += 1
+            return result
+        self.stats["diffs"] += 1
+        return ToolResult(
+            output=f"[{label} changed since you last read it; diff against that read]\n{diff}",
+            success=True,
+            metadata={**(result.metadata or {}), "diff": True},
+        )
+
+    @staticmethod
+    def _unchanged(label: str) -> ToolResult:
+        return ToolResult(
+            output=f"[{label} is unchanged since you last read it; content omitted]",
+            success=True,
+            metadata={"unchanged": True},
+        )
+
+    def _store(self, key: Tuple[str, Hashable], snapshot: _Snapshot) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._chars -= len(old.content)
+            if len(snapshot.content) > self.max_chars:
+                return
+            self._entries[key] = snapshot
+            self._chars += len(snapshot.content)
+            while self._chars > self.max_chars:
+                _, dropped = self._entries.popitem(last=False)
+                self._chars -= len(dropped.content)
+
+    def forget(self, path: Path | None = None) -> None:
+        """Drop everything remembered (about ``path``), e.g. after the context was trimmed."""
+        with self._lock:
+            for key in [key for key in self._entries if path is None or key[0] == str(path)]:
+                self._chars -= len(self._entries.pop(key).content)
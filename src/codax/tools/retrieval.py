@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, List
+
+from codax.code_search import CodeChunk, CodeSearchIndex, get_code_search_index
+from codax.tools.base import Tool, ToolResult
+
+# Characters of one chunk's text included in the output.
+MAX_CHUNK_CHARS = 4000
+
+
+class RetrieveCodeTool(Tool):
+    name = "retrieve_code"
+    description = "Find the workspace code most relevant to a natural-language or code query."
+
+    def __init__(self, workspace_root: Path, db_path: Path, workers: int = 0) -> None:
+        self.workspace_root = workspace_root
+        self.db_path = db_path
+        self.workers = workers
+
+    @property
+    def index(self) -> CodeSearchIndex:
+        return get_code_search_index(self.workspace_root, self.db_path, self.workers)
+
+    def run(self, query: str, k: int = 5) -> ToolResult:
+        """Top ``k`` chunks (functions, classes, sections) by BM25, each with its text."""
+        try:
+            chunks = self.index.search(query, k=max(k, 1))
+        except sqlite3.Error as exc:
+            return ToolResult(output=f"retrieval index error: {exc}", success=False)
+        if not chunks:
+            return ToolResult(
+                output="no relevant code found", success=False, metadata={"chunks": []}
+            )
+        root = self.index.root
+        sources: Dict[str, List[str]] = {}
+        sections = []
+        for chunk in chunks:
+            if chunk.path not in sources:
+                try:
+                    text = (root / chunk.path).read_text(encoding="utf-8", errors="replace")
+                except OSError:
+                    text = ""
+                sources[chunk.path] = text.split("\n")
+            body = "\n".join(sources[chunk.path][chunk.start - 1 : chunk.end])
+            if len(body) > MAX_CHUNK_CHARS:
+                body = body[:MAX_CHUNK_CHARS] + "\n[... chunk truncated]"
+            sections.append(f"==> {_header(root, chunk)} <==\n{body}")
+        return ToolResult(
+            output="\n\n".join(sections),
+            success=True,
+            metadata={
+                "chunks": [
+                    {
+                        "path": str(root / chunk.path),
+                        "start": chunk.start,
+                        "end": chunk.end,
+                        "title": chunk.title,
+                        "score": round(chunk.score, 3),
+                    }
+                    for chunk in chunks
+                ]
+            },
+        )
+
+
+def _header(root: Path, chunk: CodeChunk) -> str:
+    title = f" {chunk.title}" if chunk.title else ""
+    return f"{root / chunk.path}:{chunk.start}-{chunk.end}{title} (score {chunk.score:.2f})"
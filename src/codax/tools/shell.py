@@ -6,6 +6,7 @@ from typing import List
 
 from codax.safety import ActionType, SafetyPolicy, guard_action
 from codax.tools.base import Tool, ToolResult
+from codax.tools.process import run_process
 
 RISKY_TOKENS = {"rm", "rm -rf", "mkfs", ":(){", "shutdown", "reboot", "dd ", "chmod 777", "chown"}
 
@@ -49,14 +50,7 @@ class ShellTool(Tool):
 
         try:
             effective_timeout = timeout or self.timeout
-            result = subprocess.run(
-                command,
-                shell=True,
-                cwd=cwd,
-                capture_output=True,
-                timeout=effective_timeout,
-                text=True,
-            )
+            result = run_process(command, shell=True, cwd=cwd, timeout=effective_timeout)
             output = (result.stdout or "") + (result.stderr or "")
             success = result.returncode == 0
             if len(output) > 4000:
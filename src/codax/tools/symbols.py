@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, List
+
+from codax.symbol_index import SymbolIndex, get_symbol_index
+from codax.tools.base import Tool, ToolResult
+
+SYMBOL_KINDS = ("class", "function", "method", "import")
+
+
+class _SymbolTool(Tool):
+    def __init__(self, workspace_root: Path, db_path: Path, workers: int = 0) -> None:
+        self.workspace_root = workspace_root
+        self.db_path = db_path
+        self.workers = workers
+
+    @property
+    def index(self) -> SymbolIndex:
+        return get_symbol_index(self.workspace_root, self.db_path, self.workers)
+
+
+class FindSymbolTool(_SymbolTool):
+    name = "find_symbol"
+    description = "Locate Python class/function/method definitions and imports by name."
+
+    def run(self, name: str, kind: str | None = None, limit: int | None = None) -> ToolResult:
+        """
+        ``name`` is a bare or dotted name (``Foo.bar``), ``*``/``?`` wildcards allowed.
+        Each hit is ``path:start-end kind qualname``; read it with
+        ``read_file(path, offset=start, limit=end - start + 1)``.
+        """
+        if kind is not None and kind not in SYMBOL_KINDS:
+            return ToolResult(
+                output=f"unknown kind {kind!r}; use one of {', '.join(SYMBOL_KINDS)}",
+                success=False,
+            )
+        try:
+            symbols = self.index.find(name, kind=kind, limit=limit or 50)
+        except sqlite3.Error as exc:
+            return ToolResult(output=f"symbol index error: {exc}", success=False)
+        if not symbols:
+            return ToolResult(
+                output=f"no symbol named {name!r}", success=False, metadata={"count": 0}
+            )
+        root = self.index.root
+        lines = []
+        spans: List[Dict[str, object]] = []
+        for symbol in symbols:
+            path = str(root / symbol.path)
+            detail = symbol.qualname
+            if symbol.kind == "import" and not detail.endswith(f".{symbol.name}"):
+                detail = f"{symbol.name} = {detail}"  # aliased: show the bound name
+            lines.append(f"{path}:{symbol.line}-{symbol.end_line} {symbol.kind} {detail}")
+            spans.append(
+                {
+                    "path": path,
+                    "kind": symbol.kind,
+                    "qualname": symbol.qualname,
+                    "offset": symbol.line,
+                    "limit": symbol.end_line - symbol.line + 1,
+                }
+            )
+        return ToolResult(
+            output="\n".join(lines), success=True, metadata={"count": len(spans), "spans": spans}
+        )
+
+
+class FindReferencesTool(_SymbolTool):
+    name = "find_references"
+    description = "List the lines where a Python identifier is used (name-based, no types)."
+
+    def run(self, name: str, limit: int | None = None) -> ToolResult:
+        """Each use is ``path:line:col: source line``; dotted names match their last part."""
+        try:
+            refs, total = self.index.references(name, limit=limit or 100)
+        except sqlite3.Error as exc:
+            return ToolResult(output=f"symbol index error: {exc}", success=False)
+        if not refs:
+            return ToolResult(
+                output=f"no references to {name!r}", success=False, metadata={"count": 0}
+            )
+        root = self.index.root
+        sources: Dict[str, List[str]] = {}
+        lines = []
+        for ref in refs:
+            if ref.path not in sources:
+                try:
+                    text = (root / ref.path).read_text(encoding="utf-8", errors="replace")
+                except OSError:
+                    text = ""
+                sources[ref.path] = text.split("\n")
+            source = sources[ref.path]
+            code = source[ref.line - 1].strip() if ref.line <= len(source) else ""
+            lines.append(f"{root / ref.path}:{ref.line}:{ref.col + 1}: {code}")
+        if total > len(refs):
+            lines.append(f"[{total - len(refs)} more references; raise limit to see them]")
+        return ToolResult(
+            output="\n".join(lines),
+            success=True,
+            metadata={"count": len(refs), "total": total, "files": len(sources)},
+        )
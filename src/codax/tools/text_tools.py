@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Any
 
 from codax.config import Settings
+from codax.llm_scheduler import estimate_tokens, get_scheduler
 from codax.tools.base import Tool, ToolResult
 
 try:
@@ -11,7 +12,9 @@ except Exception:  # pragma: no cover - optional dependency at runtime
     ChatOpenAI = None  # type: ignore[assignment]
 
 
-def _run_llm_summary(text: str, settings: Settings, max_tokens: int) -> str | None:
+def _run_llm_summary(
+    text: str, settings: Settings, max_tokens: int, priority: str = "batch"
+) -> str | None:
     """Best-effort LLM summary; returns None if unavailable."""
     if not ChatOpenAI or not settings.openai_api_key:
         return None
@@ -22,7 +25,13 @@ def _run_llm_summary(text: str, settings: Settings, max_tokens: int) -> str | No
             openai_api_key=settings.openai_api_key,
             max_tokens=max_tokens,
         )
-        resp = llm.invoke(f"Summarize concisely:\n{text}")
+        prompt = f"Summarize concisely:\n{text}"
+        resp = get_scheduler(settings).call(
+            settings.model,
+            lambda: llm.invoke(prompt),
+            tokens=estimate_tokens(prompt) + max_tokens,
+            priority=priority,
+        )
         return str(resp.content) if resp else None
     except Exception:
         return None
@@ -35,14 +44,20 @@ class SummarizeTool(Tool):
     def __init__(self, settings: Settings | None = None) -> None:
         self.settings = settings or Settings()
 
-    def run(self, text: str, max_tokens: int = 512, style: str | None = None) -> ToolResult:
+    def run(
+        self,
+        text: str,
+        max_tokens: int = 512,
+        style: str | None = None,
+        priority: str = "batch",
+    ) -> ToolResult:
         words = text.split()
         limit = max(20, max_tokens)
         summary_words = words[:limit]
         suffix = "..." if len(words) > limit else ""
         heuristic = " ".join(summary_words) + suffix
         model_used = "heuristic"
-        llm_summary = _run_llm_summary(text, self.settings, max_tokens)
+        llm_summary = _run_llm_summary(text, self.settings, max_tokens, priority)
         output = llm_summary or heuristic
         if llm_summary:
             model_used = self.settings.model
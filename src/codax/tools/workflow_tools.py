@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import glob
+import io
+import itertools
 import json
+import random
 import re
-from dataclasses import dataclass
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, cast
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, cast
 
 try:  # CEL is optional; we fall back to simple lookups when missing.
     from cel import evaluate as cel_evaluate
@@ -13,17 +20,72 @@ except Exception:  # pragma: no cover - optional runtime dependency
 
 from codax.tools.base import Tool, ToolResult
 from codax.tools.filesystem import _ensure_workspace
+from codax.tools.process import ProcessScope
+from codax.tools.process_pool import get_process_pool
+
+if TYPE_CHECKING:
+    from codax.config import Settings
+    from codax.workflows.profiler import WorkflowProfiler
+
+
+def _yaml_loader() -> Any:
+    """Return the fastest safe YAML loader available (libyaml C loader when built)."""
+    try:
+        import yaml
+    except ModuleNotFoundError as exc:  # pragma: no cover - optional dep
+        raise RuntimeError("pyyaml is required for YAML workflows") from exc
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _parse_workflow(content: str, suffix: str) -> Dict[str, Any]:
+    """Parse workflow text according to the source file suffix."""
+    if suffix.lower() in {".yaml", ".yml"}:
+        import yaml
+
+        return cast(Dict[str, Any], yaml.load(content, Loader=_yaml_loader()) or {})
+    return cast(Dict[str, Any], json.loads(content))
 
 
 def _load_workflow(path: Path) -> Dict[str, Any]:
-    if path.suffix.lower() in {".yaml", ".yml"}:
+    return _parse_workflow(path.read_text(), path.suffix)
+
+
+def _validate_workflow(payload: Any) -> str | None:
+    """Return an error message when the definition violates schema v1, else None."""
+    if not isinstance(payload, dict) or "steps" not in payload:
+        return "workflow missing 'steps'"
+    if not isinstance(payload.get("steps"), list):
+        return "'steps' must be a list"
+    for index, step in enumerate(payload["steps"]):
+        if isinstance(step, dict) and (error := _validate_step(step)):
+            return f"step {step.get('id') or f'#{index}'}: {error}"
+    return None
+
+
+def _validate_step(step: Dict[str, Any]) -> str | None:
+    """Options that would be silently ignored or fail mid-run are definition errors."""
+    if step.get("batch"):
+        ignored = [key for key in ("retries", "timeout") if step.get(key) is not None]
+        if ignored:
+            return f"{' and '.join(ignored)} cannot be combined with batch"
+    backoff = step.get("retry_backoff")
+    if backoff is not None and not isinstance(backoff, (int, float, dict)):
+        return "retry_backoff must be a number of seconds or {base, max, jitter}"
+    if isinstance(backoff, dict):
+        for key, value in backoff.items():
+            if key not in ("base", "max", "jitter"):
+                return f"retry_backoff has unknown key {key!r}"
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return f"retry_backoff {key} must be a number"
+    retry_on = step.get("retry_on") or []
+    if not isinstance(retry_on, (str, list)):
+        return "retry_on must be an exception name, a pattern or a list of them"
+    for pattern in [retry_on] if isinstance(retry_on, str) else retry_on:
         try:
-            import yaml
-        except ModuleNotFoundError as exc:  # pragma: no cover - optional dep
-            raise RuntimeError("pyyaml is required for YAML workflows") from exc
-        return cast(Dict[str, Any], yaml.safe_load(path.read_text()) or {})
-    content = path.read_text()
-    return cast(Dict[str, Any], json.loads(content))
+            re.compile(str(pattern))
+        except re.error as exc:
+            return f"retry_on pattern {pattern!r} is invalid: {exc}"
+    return None
 
 
 def _resolve_path(expr: str, context: Dict[str, Any]) -> Any:
@@ -103,6 +165,56 @@ def _select_context(context: Dict[str, Any], keys: list[str]) -> Dict[str, Any]:
     return selected
 
 
+EventCallback = Callable[[Dict[str, Any]], None]
+
+# Streaming loop sources, consumed lazily; ``loop`` keeps its materialized-list semantics.
+STREAMING_LOOP_KEYS = ("loop_file", "loop_glob", "loop_lines")
+# Loads a validated definition for a sub-workflow path (e.g. ``WorkflowCache.load``).
+WorkflowLoader = Callable[[Path], Dict[str, Any]]
+MAX_SUBWORKFLOW_DEPTH = 8
+# How long a timed-out attempt may take to wind down after its processes are killed.
+ABANDON_GRACE_SECONDS = 0.5
+
+
+def _iter_file_items(path: Path) -> Iterator[Any]:
+    """Yield one item per line; JSON Lines files are decoded record by record."""
+    decode = path.suffix.lower() in {".jsonl", ".ndjson"}
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            if decode:
+                if line.strip():
+                    yield json.loads(line)
+            else:
+                yield line.rstrip("\r\n")
+
+
+def _iter_glob(root: Path, pattern: str) -> Iterator[str]:
+    """Workspace-relative matches of a ``loop_glob`` pattern; escaping patterns raise."""
+    if Path(pattern).is_absolute() or ".." in Path(pattern).parts:
+        raise ValueError(f"loop_glob pattern {pattern!r} escapes workspace")
+    base = _ensure_workspace(Path("."), root)
+    prefix = len(str(base)) + 1
+    return (match[prefix:] for match in glob.iglob(str(base / pattern), recursive=True))
+
+
+def _iter_lines(value: Any) -> Iterator[Any]:
+    if isinstance(value, StepRecord):
+        value = value.output
+    if isinstance(value, str):
+        for line in io.StringIO(value):
+            yield line.rstrip("\r\n")
+    elif isinstance(value, Iterable) and not isinstance(value, (bytes, dict)):
+        yield from value
+    elif value is not None:
+        yield value
+
+
+def _chunked(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
 @dataclass
 class StepRecord:
     output: Any
@@ -110,6 +222,89 @@ class StepRecord:
     success: bool
 
 
+class CancelToken:
+    """Workflow-level cancellation; cancelling kills subprocess trees of in-flight steps."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._scopes: set[ProcessScope] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+        with self._lock:
+            scopes = list(self._scopes)
+        for scope in scopes:
+            scope.kill()
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to ``seconds``; return True early if cancelled meanwhile."""
+        return self._event.wait(seconds)
+
+    def track(self, scope: ProcessScope) -> None:
+        with self._lock:
+            self._scopes.add(scope)
+        if self.cancelled:
+            scope.kill()
+
+    def untrack(self, scope: ProcessScope) -> None:
+        with self._lock:
+            self._scopes.discard(scope)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Step retry settings.
+
+    ``retry_backoff`` is ``{base, max, jitter}`` (seconds, seconds, fraction of the delay)
+    or a number used as ``base``; delays grow as ``base * 2**(attempt-1)`` capped at ``max``.
+    ``retry_on`` lists exception class names or regex patterns matched against the failure
+    output; when empty every failure is retried.
+    """
+
+    retries: int = 0
+    base: float = 0.5
+    max_delay: float = 30.0
+    jitter: float = 0.1
+    retry_on: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_step(cls, step: Dict[str, Any]) -> "RetryPolicy":
+        backoff = step.get("retry_backoff") or {}
+        if isinstance(backoff, (int, float)):
+            backoff = {"base": backoff}
+        retry_on = step.get("retry_on") or []
+        if isinstance(retry_on, str):
+            retry_on = [retry_on]
+        return cls(
+            retries=int(step.get("retries", 0)),
+            base=float(backoff.get("base", cls.base)),
+            max_delay=float(backoff.get("max", cls.max_delay)),
+            jitter=float(backoff.get("jitter", cls.jitter)),
+            retry_on=[str(item) for item in retry_on],
+        )
+
+    def delay(self, attempt: int) -> float:
+        if self.base <= 0:
+            return 0.0
+        delay = min(self.max_delay, self.base * 2.0 ** (attempt - 1))
+        return delay + random.uniform(0, self.jitter * delay)
+
+    def should_retry(self, result: ToolResult, error: BaseException | None) -> bool:
+        if not self.retry_on:
+            return True
+        names = {cls.__name__ for cls in type(error).__mro__} if error is not None else set()
+        for pattern in self.retry_on:
+            if pattern in names or re.search(pattern, str(result.output)):
+                return True
+        return False
+
+
 class WorkflowValidateTool(Tool):
     name = "workflow_validate"
     description = "Validate workflow file against schema v1."
@@ -126,15 +321,13 @@ class WorkflowValidateTool(Tool):
         except Exception as exc:  # noqa: BLE001
             return ToolResult(output=str(exc), success=False, metadata=None)
 
-        if not isinstance(payload, dict) or "steps" not in payload:
-            return ToolResult(output="workflow missing 'steps'", success=False, metadata=None)
-        steps = payload.get("steps")
-        if not isinstance(steps, list):
-            return ToolResult(output="'steps' must be a list", success=False, metadata=None)
+        error = _validate_workflow(payload)
+        if error:
+            return ToolResult(output=error, success=False, metadata=None)
         return ToolResult(
             output="valid",
             success=True,
-            metadata={"step_count": len(steps)},
+            metadata={"step_count": len(payload["steps"])},
         )
 
 
@@ -142,9 +335,31 @@ class WorkflowRunTool(Tool):
     name = "workflow_run"
     description = "Execute a workflow definition using the tool registry."
 
-    def __init__(self, workspace_root: Path) -> None:
+    def __init__(
+        self,
+        workspace_root: Path,
+        profiler: WorkflowProfiler | None = None,
+        settings: Settings | None = None,
+        loader: WorkflowLoader | None = None,
+    ) -> None:
         self.workspace_root = workspace_root
-        self.validator = WorkflowValidateTool(workspace_root)
+        self.profiler = profiler
+        self.settings = settings
+        self.loader = loader
+        # One entry per sub-workflow path, with the (mtime_ns, size) it was loaded at.
+        self._definitions: Dict[Path, tuple[int, int, Dict[str, Any]]] = {}
+        self._local = threading.local()
+
+    def _call(self, tool: Tool, args: Dict[str, Any], pooled: str | None) -> ToolResult:
+        """Run ``tool`` in-process, or as registry entry ``pooled`` on the warm process pool."""
+        if pooled is None:
+            return tool.run(**args)
+        settings = self.settings
+        if settings is None:
+            from codax.config import Settings
+
+            settings = self.settings = Settings(workspace_root=self.workspace_root)
+        return get_process_pool(settings).run(pooled, args)
 
     def _render_args(self, args: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         return {key: _render_value(val, context) for key, val in args.items()}
@@ -159,22 +374,79 @@ class WorkflowRunTool(Tool):
             value = _render_value(condition, context)
         return not bool(value)
 
-    def _run_step(
+    def _invoke(
+        self,
+        tool: Tool,
+        args: Dict[str, Any],
+        timeout: float | None,
+        cancel: CancelToken | None,
+        pooled: str | None = None,
+    ) -> tuple[ToolResult, BaseException | None]:
+        """
+        Run one attempt, converting exceptions to failed results.
+
+        With a timeout or cancel token the tool runs on a worker thread so the step can be
+        abandoned; subprocesses it started through ``run_process`` are killed with it. Calls
+        handed to the process pool are abandoned but keep their worker until they finish.
+        A timed-out attempt whose thread is still running after ``ABANDON_GRACE_SECONDS`` is
+        marked ``abandoned`` in the result metadata so the step is not retried on top of it.
+        """
+        scope = ProcessScope()
+        outcome: Dict[str, Any] = {}
+
+        def target() -> None:
+            with scope.activate():
+                try:
+                    outcome["result"] = self._call(tool, args, pooled)
+                except Exception as exc:  # noqa: BLE001 - surfaced as a failed attempt
+                    outcome["error"] = exc
+
+        if timeout is None and cancel is None:
+            target()
+        else:
+            if cancel is not None:
+                cancel.track(scope)
+            worker = threading.Thread(target=target, name=f"codax-step-{tool.name}", daemon=True)
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            try:
+                worker.start()
+                while worker.is_alive():
+                    wait = 0.05
+                    if deadline is not None:
+                        wait = min(wait, max(deadline - time.monotonic(), 0))
+                    worker.join(wait)
+                    if not worker.is_alive():
+                        break
+                    if cancel is not None and cancel.cancelled:
+                        scope.kill()
+                        return ToolResult(output="cancelled", success=False, metadata=None), None
+                    if deadline is not None and time.monotonic() >= deadline:
+                        scope.kill()
+                        worker.join(ABANDON_GRACE_SECONDS)
+                        error = TimeoutError(f"timed out after {timeout}s")
+                        meta = {"abandoned": True} if worker.is_alive() else None
+                        return ToolResult(output=str(error), success=False, metadata=meta), error
+            except KeyboardInterrupt:
+                if cancel is not None:
+                    cancel.cancel()
+                scope.kill()
+                raise
+            finally:
+                if cancel is not None:
+                    cancel.untrack(scope)
+        if "error" in outcome:
+            error = outcome["error"]
+            failure = ToolResult(output=f"{type(error).__name__}: {error}", success=False)
+            return failure, error
+        return cast(ToolResult, outcome["result"]), None
+
+    def _prepare_args(
         self,
         step: Dict[str, Any],
+        tool: Tool,
         registry: Dict[str, Tool],
         context: Dict[str, Any],
-        transcripts: list[str],
-    ) -> ToolResult:
-        step_id = step.get("id", "unknown")
-        tool_name = step.get("tool")
-        if not tool_name or tool_name not in registry:
-            return ToolResult(
-                output=f"step {step_id} references unknown tool '{tool_name}'",
-                success=False,
-                metadata={"step": step_id},
-            )
-        tool = registry[tool_name]
+    ) -> Dict[str, Any]:
         raw_args: Dict[str, Any] = step.get("args", {})
         rendered_args = self._render_args(raw_args, context)
 
@@ -189,24 +461,77 @@ class WorkflowRunTool(Tool):
             keys = step.get("context_keys")
             if isinstance(keys, list):
                 rendered_args["context"] = _select_context(context, keys)
+        return rendered_args
 
-        retries = int(step.get("retries", 0))
-        attempt = 0
+    def _run_step(
+        self,
+        step: Dict[str, Any],
+        registry: Dict[str, Tool],
+        context: Dict[str, Any],
+        transcripts: list[str],
+        cancel: CancelToken | None = None,
+    ) -> ToolResult:
+        step_id = step.get("id", "unknown")
+        tool_name = step.get("tool")
+        if not tool_name or tool_name not in registry:
+            return ToolResult(
+                output=f"step {step_id} references unknown tool '{tool_name}'",
+                success=False,
+                metadata={"step": step_id},
+            )
+        tool = registry[tool_name]
+        # CPU of this thread only: steps run concurrently, so process time would mix them.
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        rendered_args = self._prepare_args(step, tool, registry, context)
+        timing = (wall_start, cpu_start, (time.perf_counter() - wall_start) * 1000)
+
+        policy = RetryPolicy.from_step(step)
+        executor = step.get("executor")
+        if executor not in (None, "thread", "process"):
+            return ToolResult(
+                output=f"step {step_id} has unknown executor '{executor}'",
+                success=False,
+                metadata={"step": step_id},
+            )
+        pooled = tool_name if executor == "process" else None
+        timeout = float(step["timeout"]) if step.get("timeout") is not None else None
+        attempts: list[Dict[str, Any]] = []
         last_result: ToolResult | None = None
         allow_failure = bool(step.get("allow_failure", False))
-        while attempt <= retries:
-            attempt += 1
-            result = tool.run(**rendered_args)
+        for attempt in range(1, policy.retries + 2):
+            started = time.monotonic()
+            result, error = self._invoke(tool, rendered_args, timeout, cancel, pooled)
+            record: Dict[str, Any] = {
+                "attempt": attempt,
+                "duration_ms": round((time.monotonic() - started) * 1000, 3),
+                "success": result.success,
+                "error": type(error).__name__ if error is not None else None,
+            }
+            attempts.append(record)
             last_result = result
             transcripts.append(f"{step_id}:{tool_name}:{result.output}")
-            if result.success:
+            if result.success or attempt > policy.retries:
+                break
+            if (result.metadata or {}).get("abandoned"):
+                # The timed-out attempt is still running; a retry would run alongside it.
+                record["abandoned"] = True
                 break
+            if (cancel and cancel.cancelled) or not policy.should_retry(result, error):
+                break
+            delay = policy.delay(attempt)
+            record["backoff_ms"] = round(delay * 1000, 3)
+            if cancel is not None:
+                if cancel.wait(delay):
+                    break
+            else:
+                time.sleep(delay)
         if not last_result or not last_result.success:
-            if not allow_failure:
+            if not allow_failure or (cancel and cancel.cancelled):
+                self._profile(step_id, tool_name, *timing, attempts, rendered_args, last_result)
                 return ToolResult(
                     output=f"step {step_id} failed: {last_result.output if last_result else 'unknown'}",
                     success=False,
-                    metadata={"step": step_id, "transcript": transcripts},
+                    metadata={"step": step_id, "transcript": transcripts, "attempts": attempts},
                 )
             # Preserve failure output but mark as allowed so execution continues.
             last_result = ToolResult(
@@ -218,26 +543,459 @@ class WorkflowRunTool(Tool):
                     "step": step_id,
                 },
             )
+        last_result.metadata = {**(last_result.metadata or {}), "attempts": attempts}
+
+        self._record_step(step, last_result, context)
+        self._profile(step_id, tool_name, *timing, attempts, rendered_args, last_result)
+        return last_result
 
+    def _profile(
+        self,
+        step_id: str,
+        tool_name: str,
+        wall_start: float,
+        cpu_start: float,
+        render_ms: float,
+        attempts: list[Dict[str, Any]],
+        args: Dict[str, Any] | list[Dict[str, Any]],
+        result: ToolResult | list[ToolResult] | None,
+    ) -> None:
+        if self.profiler is None:
+            return
+        results = result if isinstance(result, list) else [result] if result else []
+        usage: Dict[str, int] = {}
+        for item in results:
+            for key, value in ((item.metadata or {}).get("usage") or {}).items():
+                usage[key] = usage.get(key, 0) + int(value or 0)
+        self.profiler.record(
+            getattr(self._local, "prefix", "") + step_id,
+            tool_name,
+            wall_ms=(time.perf_counter() - wall_start) * 1000,
+            cpu_ms=(time.thread_time() - cpu_start) * 1000,
+            render_ms=render_ms,
+            tool_ms=sum(float(attempt["duration_ms"]) for attempt in attempts),
+            retries=max(len(attempts) - 1, 0),
+            bytes_in=len(json.dumps(args, default=str)),
+            bytes_out=sum(len(str(item.output)) for item in results),
+            usage=usage,
+        )
+
+    def _record_step(
+        self, step: Dict[str, Any], result: ToolResult, context: Dict[str, Any]
+    ) -> None:
+        step_id = step.get("id", "unknown")
         if assign := step.get("assign"):
-            context[assign] = last_result.output
+            context[assign] = result.output
         # Always capture step output for rich templating.
-        step_record = StepRecord(output=last_result.output, metadata=last_result.metadata, success=last_result.success)
+        step_record = StepRecord(
+            output=result.output, metadata=result.metadata, success=result.success
+        )
         steps_map = context.setdefault("steps", {})
         steps_map[step_id] = step_record
         # convenience access e.g. {{FailingTest.output}}
         context[step_id] = step_record.output
-        return last_result
+
+    def _loop_values(self, step: Dict[str, Any], context: Dict[str, Any]) -> list[Any]:
+        """Materialize a classic ``loop`` value (list, JSON string or scalar) to a list."""
+        loop_values = _render_value(step["loop"], context)
+        if isinstance(loop_values, str):
+            try:
+                loop_values = json.loads(loop_values)
+            except Exception:
+                loop_values = [loop_values]
+        if not isinstance(loop_values, list):
+            loop_values = [loop_values]
+        return cast(list[Any], loop_values)
+
+    def _run_batched_loop(
+        self,
+        step: Dict[str, Any],
+        registry: Dict[str, Tool],
+        context: Dict[str, Any],
+        transcripts: list[str],
+        cancel: CancelToken | None,
+        on_event: EventCallback | None,
+    ) -> ToolResult | None:
+        """
+        Dispatch loop iterations to the tool's ``run_batch`` instead of one call per item.
+
+        ``batch`` is ``true`` or ``{size, max_concurrency, pack}``: ``size`` iterations are
+        rendered and dispatched together (default 16). Tools without ``run_batch`` run
+        per item as usual. Definitions combining ``batch`` with ``retries`` or ``timeout``
+        are rejected by ``_validate_workflow``. A failed item under ``allow_failure`` is
+        recorded like ``_run_step`` records it and the loop goes on.
+        """
+        step_id = step.get("id", "unknown")
+        tool_name = step.get("tool")
+        tool = registry.get(tool_name) if tool_name else None
+        if tool is None or not getattr(tool, "supports_batch", False):
+            if any(key in step for key in STREAMING_LOOP_KEYS):
+                return self._run_streaming_loop(
+                    step, registry, context, transcripts, cancel, on_event
+                )
+            loop_var = step.get("loop_var", "item")
+            for item in self._loop_values(step, context):
+                if cancel is not None and cancel.cancelled:
+                    return self._cancelled(step, transcripts)
+                context[loop_var] = item
+                result = self._run_step(step, registry, context, transcripts, cancel)
+                if not result.success:
+                    return result
+            return None
+
+        options = step["batch"] if isinstance(step["batch"], dict) else {}
+        size = max(int(options.get("size", 16)), 1)
+        max_concurrency = int(options.get("max_concurrency", 4))
+        pack = int(options.get("pack", 0))
+        loop_var = step.get("loop_var", "item")
+        allow_failure = bool(step.get("allow_failure", False))
+        processed = 0
+        try:
+            items: Iterable[Any]
+            if any(key in step for key in STREAMING_LOOP_KEYS):
+                items = self._loop_items(step, context)
+                batch_size = int(step.get("batch_size", 0) or 0)
+                if batch_size > 0:
+                    items = _chunked(items, batch_size)
+            else:
+                items = self._loop_values(step, context)
+            for chunk in _chunked(items, size):
+                if cancel is not None and cancel.cancelled:
+                    return self._cancelled(step, transcripts)
+                wall_start, cpu_start = time.perf_counter(), time.thread_time()
+                calls = []
+                for item in chunk:
+                    context[loop_var] = item
+                    calls.append(self._prepare_args(step, tool, registry, context))
+                render_ms = (time.perf_counter() - wall_start) * 1000
+                dispatched = time.perf_counter()
+                try:
+                    results = tool.run_batch(  # type: ignore[attr-defined]
+                        calls, max_concurrency=max_concurrency, pack=pack
+                    )
+                except Exception as exc:  # noqa: BLE001 - every call in the chunk failed
+                    failure = f"{type(exc).__name__}: {exc}"
+                    results = [ToolResult(output=failure, success=False) for _ in calls]
+                if len(results) < len(calls):
+                    missing = f"batch returned {len(results)} of {len(calls)} results"
+                    results = list(results) + [
+                        ToolResult(output=missing, success=False)
+                        for _ in range(len(calls) - len(results))
+                    ]
+                tool_ms = (time.perf_counter() - dispatched) * 1000
+                self._profile(
+                    step_id,
+                    str(tool_name),
+                    wall_start,
+                    cpu_start,
+                    render_ms,
+                    [{"duration_ms": tool_ms}],
+                    calls,
+                    results,
+                )
+                for item, result in zip(chunk, results):
+                    context[loop_var] = item
+                    transcripts.append(f"{step_id}:{tool_name}:{result.output}")
+                    if not result.success:
+                        if not allow_failure:
+                            return ToolResult(
+                                output=f"step {step_id} failed: {result.output}",
+                                success=False,
+                                metadata={"step": step_id, "transcript": transcripts},
+                            )
+                        result = ToolResult(
+                            output=result.output,
+                            success=True,
+                            metadata={
+                                **(result.metadata or {}),
+                                "allowed_failure": True,
+                                "step": step_id,
+                            },
+                        )
+                    self._record_step(step, result, context)
+                processed += len(chunk)
+                if on_event is not None:
+                    on_event({"type": "batch_progress", "step": step_id, "items": processed})
+        except (OSError, ValueError) as exc:
+            return ToolResult(
+                output=f"step {step_id} loop source failed: {exc}",
+                success=False,
+                metadata={"step": step_id, "transcript": transcripts},
+            )
+        return None
+
+    def _loop_items(self, step: Dict[str, Any], context: Dict[str, Any]) -> Iterator[Any]:
+        """Lazily iterate a streaming loop source (file, glob or lines of a prior output)."""
+        if "loop_file" in step:
+            rel = str(_render_value(step["loop_file"], context))
+            return _iter_file_items(_ensure_workspace(Path(rel), self.workspace_root))
+        if "loop_glob" in step:
+            pattern = str(_render_value(step["loop_glob"], context))
+            return _iter_glob(self.workspace_root, pattern)
+        return _iter_lines(_render_value(step["loop_lines"], context))
+
+    def _run_streaming_loop(
+        self,
+        step: Dict[str, Any],
+        registry: Dict[str, Tool],
+        context: Dict[str, Any],
+        transcripts: list[str],
+        cancel: CancelToken | None,
+        on_event: EventCallback | None,
+    ) -> ToolResult | None:
+        """
+        Run a step over a streaming source in constant memory.
+
+        With ``batch_size`` the loop variable is bound to a list of up to that many items.
+        Per-iteration transcripts are not retained; a single summary line is recorded and
+        ``loop_progress`` events report counters every batch (or ``progress_every`` items).
+        """
+        step_id = step.get("id", "unknown")
+        loop_var = step.get("loop_var", "item")
+        batch_size = int(step.get("batch_size", 0) or 0)
+        progress_every = max(int(step.get("progress_every", 1000)), 1)
+        processed = 0
+        iterations = 0
+        scratch: list[str] = []
+        try:
+            items: Iterable[Any] = self._loop_items(step, context)
+            if batch_size > 0:
+                items = _chunked(items, batch_size)
+                progress_every = 1
+            for value in items:
+                if cancel is not None and cancel.cancelled:
+                    return self._cancelled(step, transcripts)
+                context[loop_var] = value
+                scratch.clear()
+                result = self._run_step(step, registry, context, scratch, cancel)
+                iterations += 1
+                processed += len(value) if batch_size > 0 else 1
+                if not result.success:
+                    transcripts.extend(scratch)
+                    result.metadata = {**(result.metadata or {}), "transcript": transcripts}
+                    return result
+                if on_event is not None and iterations % progress_every == 0:
+                    on_event(
+                        {
+                            "type": "loop_progress",
+                            "step": step_id,
+                            "items": processed,
+                            "batches": iterations,
+                        }
+                    )
+        except (OSError, ValueError) as exc:
+            return ToolResult(
+                output=f"step {step_id} loop source failed: {exc}",
+                success=False,
+                metadata={"step": step_id, "transcript": transcripts},
+            )
+        counters = {"items": processed, "batches": iterations}
+        transcripts.append(f"{step_id}:loop:{processed} items")
+        record = context.get("steps", {}).get(step_id)
+        if isinstance(record, StepRecord):
+            record.metadata = {**(record.metadata or {}), "loop": counters}
+        if on_event is not None:
+            on_event({"type": "loop_done", "step": step_id, **counters})
+        return None
+
+    def _cancelled(self, step: Dict[str, Any], transcripts: list[str]) -> ToolResult:
+        step_id = step.get("id", "unknown")
+        transcripts.append(f"{step_id}:cancelled")
+        return ToolResult(
+            output="workflow cancelled",
+            success=False,
+            metadata={"step": step_id, "transcript": transcripts, "cancelled": True},
+        )
+
+    def _load_subworkflow(self, path: Path) -> Dict[str, Any]:
+        if self.loader is not None:
+            return self.loader(path)
+        stat = path.stat()
+        cached = self._definitions.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        definition = _load_workflow(path)
+        error = _validate_workflow(definition)
+        if error:
+            raise ValueError(error)
+        self._definitions[path] = (stat.st_mtime_ns, stat.st_size, definition)
+        return definition
+
+    def _run_subworkflow(
+        self,
+        step: Dict[str, Any],
+        registry: Dict[str, Tool],
+        context: Dict[str, Any],
+        transcripts: list[str],
+        cancel: CancelToken | None,
+        on_event: EventCallback | None,
+    ) -> ToolResult | None:
+        """
+        Run another workflow definition as one step, in its own context.
+
+        ``inputs`` are rendered against this context and become the child's params;
+        ``outputs`` maps names in this context to child step ids or context paths
+        (default: every child step's output). With ``loop`` the child runs once per
+        item, up to ``parallel`` at a time, and the step output is the list of results.
+        The registry, loader cache and runner are shared with the parent; child steps are
+        profiled as ``<step>/<child step>``.
+        """
+        step_id = step.get("id", "unknown")
+        depth = getattr(self._local, "depth", 0)
+        prefix = getattr(self._local, "prefix", "")
+        if depth >= MAX_SUBWORKFLOW_DEPTH:
+            return ToolResult(
+                output=f"step {step_id} exceeds sub-workflow depth {MAX_SUBWORKFLOW_DEPTH}",
+                success=False,
+                metadata={"step": step_id},
+            )
+        source = str(_render_value(step["workflow"], context))
+        try:
+            target = _ensure_workspace(Path(source), self.workspace_root)
+            definition = self._load_subworkflow(target)
+        except (OSError, ValueError) as exc:
+            return ToolResult(
+                output=f"step {step_id} failed to load workflow {source}: {exc}",
+                success=False,
+                metadata={"step": step_id},
+            )
+        looped = "loop" in step
+        loop_var = step.get("loop_var", "item")
+        items = self._loop_values(step, context) if looped else [None]
+
+        def call(item: Any) -> ToolResult:
+            scope = {**context, loop_var: item} if looped else context
+            inputs = _render_value(step.get("inputs") or {}, scope)
+            self._local.depth = depth + 1
+            self._local.prefix = f"{prefix}{step_id}/"  # child steps profile as <step>/<child>
+            try:
+                return self.run(
+                    source,
+                    params=inputs,
+                    registry=registry,
+                    definition=definition,
+                    cancel=cancel,
+                    on_event=on_event,
+                )
+            finally:
+                self._local.depth = depth
+                self._local.prefix = prefix
+
+        parallel = min(max(int(step.get("parallel", 1)), 1), len(items))
+        if parallel > 1:
+            with ThreadPoolExecutor(parallel, thread_name_prefix=f"codax-sub-{step_id}") as pool:
+                results = list(pool.map(call, items))
+        else:
+            results = [call(item) for item in items]
+
+        outputs = []
+        for index, result in enumerate(results):
+            prefix = f"{step_id}[{index}]" if looped else step_id
+            lines = (result.metadata or {}).get("transcript") or []
+            transcripts.extend(f"{prefix}/{line}" for line in lines)
+            if not result.success and not step.get("allow_failure", False):
+                return ToolResult(
+                    output=f"step {step_id} failed: {result.output}",
+                    success=False,
+                    metadata={"step": step_id, "transcript": transcripts},
+                )
+            outputs.append(self._subworkflow_outputs(step, result))
+        if not looped and step.get("outputs"):
+            context.update(outputs[0])
+        output: Any = outputs if looped else outputs[0]
+        metadata = {"workflow": source, "runs": len(results)}
+        self._record_step(step, ToolResult(output=output, success=True, metadata=metadata), context)
+        return None
+
+    def _subworkflow_outputs(self, step: Dict[str, Any], result: ToolResult) -> Dict[str, Any]:
+        child = (result.metadata or {}).get("context") or {}
+        records = child.get("steps", {})
+        mapping = step.get("outputs")
+        if not mapping:
+            return {sid: record.output for sid, record in records.items()}
+        values = {}
+        for name, key in mapping.items():
+            record = records.get(key)
+            values[name] = record.output if record is not None else _resolve_path(str(key), child)
+        return values
+
+    def execute_step(
+        self,
+        step: Dict[str, Any],
+        registry: Dict[str, Tool],
+        context: Dict[str, Any],
+        transcripts: list[str],
+        cancel: CancelToken | None = None,
+        on_event: EventCallback | None = None,
+        index: int | None = None,
+    ) -> ToolResult | None:
+        """
+        Run one workflow step (condition, loops, batching) against ``context``.
+
+        Returns ``None`` when the step succeeded or was skipped and the failed result
+        otherwise. Outputs are recorded into ``context`` as ``run`` does. With ``index`` an
+        unnamed step is recorded, profiled and reported as ``#<index>``, like the graph does.
+        """
+        if index is not None and not step.get("id"):
+            from codax.workflows.graph import step_id  # codax.workflows imports this module
+
+            step = {**step, "id": step_id(step, index)}
+        if self._should_skip(step.get("when"), context):
+            transcripts.append(f"{step.get('id','unknown')}:skipped")
+            return None
+
+        if "workflow" in step:
+            return self._run_subworkflow(step, registry, context, transcripts, cancel, on_event)
+
+        is_loop = "loop" in step or any(key in step for key in STREAMING_LOOP_KEYS)
+        if step.get("batch") and is_loop:
+            return self._run_batched_loop(step, registry, context, transcripts, cancel, on_event)
+
+        if any(key in step for key in STREAMING_LOOP_KEYS):
+            return self._run_streaming_loop(step, registry, context, transcripts, cancel, on_event)
+
+        if "loop" in step:
+            loop_var = step.get("loop_var", "item")
+            for item in self._loop_values(step, context):
+                if cancel is not None and cancel.cancelled:
+                    return self._cancelled(step, transcripts)
+                context[loop_var] = item
+                result = self._run_step(step, registry, context, transcripts, cancel)
+                if not result.success:
+                    return result
+            return None
+
+        result = self._run_step(step, registry, context, transcripts, cancel)
+        return None if result.success else result
 
     def run(
         self,
         path: str,
-        params: Dict[str, str] | None = None,
+        params: Dict[str, Any] | None = None,
         registry: Dict[str, Tool] | None = None,
+        definition: Dict[str, Any] | None = None,
+        cancel: CancelToken | None = None,
+        on_event: EventCallback | None = None,
     ) -> ToolResult:
-        validation = self.validator.run(path)
-        if not validation.success:
-            return validation
+        """
+        Execute a workflow.
+
+        When ``definition`` is given (e.g. from the compiled-definition cache) the file at
+        ``path`` is not read again; otherwise it is parsed exactly once. Cancelling ``cancel``
+        stops the run and kills subprocess trees started by in-flight steps. ``on_event``
+        receives progress events (e.g. ``loop_progress``) as plain dicts.
+        """
+        if definition is None:
+            target = _ensure_workspace(Path(path), self.workspace_root)
+            if not target.exists():
+                return ToolResult(output="workflow file not found", success=False, metadata=None)
+            try:
+                definition = _load_workflow(target)
+            except Exception as exc:  # noqa: BLE001
+                return ToolResult(output=str(exc), success=False, metadata=None)
+        error = _validate_workflow(definition)
+        if error:
+            return ToolResult(output=error, success=False, metadata=None)
         if registry is None:
             return ToolResult(
                 output="registry is required to execute workflow",
@@ -245,38 +1003,19 @@ class WorkflowRunTool(Tool):
                 metadata=None,
             )
 
-        workflow = _load_workflow(_ensure_workspace(Path(path), self.workspace_root))
+        workflow = definition
         steps = workflow.get("steps", [])
         context: Dict[str, Any] = dict(params or {})
         context.setdefault("steps", {})
         transcripts: list[str] = []
-        for step in steps:
-            condition = step.get("when")
-            if self._should_skip(condition, context):
-                transcripts.append(f"{step.get('id','unknown')}:skipped")
-                continue
-
-            if "loop" in step:
-                loop_values_raw = step["loop"]
-                loop_values = _render_value(loop_values_raw, context)
-                if isinstance(loop_values, str):
-                    try:
-                        loop_values = json.loads(loop_values)
-                    except Exception:
-                        loop_values = [loop_values]
-                if not isinstance(loop_values, list):
-                    loop_values = [loop_values]
-                loop_var = step.get("loop_var", "item")
-                for item in loop_values:
-                    context[loop_var] = item
-                    result = self._run_step(step, registry, context, transcripts)
-                    if not result.success:
-                        return result
-                continue
-
-            result = self._run_step(step, registry, context, transcripts)
-            if not result.success:
-                return result
+        for index, step in enumerate(steps):
+            if cancel is not None and cancel.cancelled:
+                return self._cancelled(step, transcripts)
+            failure = self.execute_step(
+                step, registry, context, transcripts, cancel, on_event, index
+            )
+            if failure is not None:
+                return failure
 
         return ToolResult(
             output="workflow completed",
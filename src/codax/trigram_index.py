@@ -0,0 +1,465 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+from array import array
+from pathlib import Path
+from re import _constants as sre_constants  # type: ignore[attr-defined]
+from re import _parser as sre_parse  # type: ignore[attr-defined]
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from codax.grep_engine import BINARY_SNIFF, get_pool
+from codax.workspace_index import get_workspace_index, index_db_path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+# Larger files are not indexed: they are always handed to the regex as candidates.
+MAX_FILE_BYTES = 1 << 20
+# Changed files applied in place per sync; more than this schedules a background rebuild.
+MAX_INCREMENTAL = 2000
+# Rebuild (compact) once replaced or removed file ids exceed this share of live files.
+COMPACT_RATIO = 0.25
+# Trigrams intersected per alternative, rarest first; the regex verifies the rest.
+MAX_LOOKUPS = 8
+# A regex expanding into more alternatives than this is not narrowed further.
+MAX_ALTERNATIVES = 16
+EXTRACT_BATCH = 256
+_SQL_CHUNK = 900
+
+# Disjunction of conjunctions of trigrams; None means "any file may match".
+Dnf = List[FrozenSet[int]] | None
+# trigram -> ascending file ids
+Postings = Dict[int, "array[int]"]
+_BIG_ENDIAN = sys.byteorder == "big"
+# ASCII letters that a case-insensitive str regex also matches as non-ASCII characters
+# (İ ı, K KELVIN SIGN, ſ LONG S), which the index only knows by their UTF-8 bytes.
+_UNICODE_FOLDED = frozenset(b"iksIKS")
+
+_SCHEMA = """
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY, rel TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, indexed INTEGER NOT NULL
+);
+CREATE TABLE postings (
+    trigram INTEGER NOT NULL, segment INTEGER NOT NULL, count INTEGER NOT NULL,
+    ids BLOB NOT NULL, PRIMARY KEY (trigram, segment)
+) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def trigrams(data: bytes) -> Set[int]:
+    """Distinct case-folded (ASCII) byte trigrams of ``data`` as little-endian 24-bit ints."""
+    padded = data.lower() + b"\0"
+    windows: Set[int] = set()
+    for offset in range(4):  # every 4-byte window, read as uint32 without a Python loop
+        words = array("I")
+        words.frombytes(padded[offset : offset + (len(padded) - offset) // 4 * 4])
+        if _BIG_ENDIAN:
+            words.byteswap()
+        windows.update(words)
+    return {window & 0xFFFFFF for window in windows}
+
+
+def extract_batch(first_id: int, paths: List[str]) -> Tuple[List[bool], Postings]:
+    """
+    Postings of ``paths`` numbered from ``first_id``, and whether each file was indexed
+    (not when too large or unreadable: such files must always be searched).
+    """
+    indexed: List[bool] = []
+    postings: Postings = {}
+    for file_id, path in enumerate(paths, first_id):
+        try:
+            with open(path, "rb") as handle:
+                if os.fstat(handle.fileno()).st_size > MAX_FILE_BYTES:
+                    indexed.append(False)
+                    continue
+                data = handle.read()
+        except OSError:
+            indexed.append(False)
+            continue
+        indexed.append(True)
+        if b"\0" in data[:BINARY_SNIFF]:
+            continue  # binary: matches nothing, like grep skips it
+        for gram in trigrams(data):
+            ids = postings.get(gram)
+            if ids is None:
+                postings[gram] = array("I", (file_id,))
+            else:
+                ids.append(file_id)
+    return indexed, postings
+
+
+def _and(left: Dnf, right: Dnf) -> Dnf:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if len(left) * len(right) > MAX_ALTERNATIVES:
+        return left if len(left) <= len(right) else right  # keep the cheaper constraint
+    return [a | b for a in left for b in right]
+
+
+def _sequence(items: Iterable[Tuple[Any, Any]], fold: bool = False) -> Dnf:
+    """
+    Required trigrams of a parsed pattern. With ``fold`` (case-insensitive), only literals
+    that fold like ``bytes.lower`` join a run: non-ASCII bytes and letters with non-ASCII
+    case variants end it, since the file may spell them in another case or encoding.
+    """
+    result: Dnf = None
+    run = bytearray()
+
+    def flush() -> None:
+        nonlocal result
+        if len(run) >= 3:
+            result = _and(result, [frozenset(trigrams(bytes(run)))])
+        run.clear()
+
+    for op, av in items:
+        if op is sre_constants.LITERAL and not (fold and (av >= 0x80 or av in _UNICODE_FOLDED)):
+            run.append(av)
+            continue
+        flush()
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, body = av
+            scoped = (fold or bool(add_flags & re.IGNORECASE)) and not del_flags & re.IGNORECASE
+            result = _and(result, _sequence(body, scoped))
+        elif op in (
+            sre_constants.MAX_REPEAT,
+            sre_constants.MIN_REPEAT,
+            sre_constants.POSSESSIVE_REPEAT,
+        ):
+            if av[0] >= 1:
+                result = _and(result, _sequence(av[2], fold))
+        elif op is sre_constants.ATOMIC_GROUP:
+            result = _and(result, _sequence(av, fold))
+        elif op is sre_constants.BRANCH:
+            branches = [_sequence(branch, fold) for branch in av[1]]
+            if all(branch is not None for branch in branches):
+                merged = [conj for branch in branches for conj in branch or []]
+                if len(merged) <= MAX_ALTERNATIVES:
+                    result = _and(result, merged)
+        # Anything else (classes, anchors, backrefs...) just ends the literal run.
+    flush()
+    return result
+
+
+def regex_query(pattern: str, flags: int = 0) -> Dnf:
+    """
+    Trigrams any match of ``pattern`` must contain, from its literal runs.
+
+    The pattern is parsed as bytes, like ``codax.grep_engine`` compiles it, so literals
+    fold case the same way the index does; case-insensitive literals the str regex could
+    match in other spellings (non-ASCII, ``k`` vs KELVIN SIGN, ...) contribute no trigrams.
+    Returns None when nothing can be required.
+    """
+    try:
+        parsed = sre_parse.parse(pattern.encode("utf-8"), flags)
+    except Exception:  # noqa: BLE001 - invalid patterns are reported by the regex search
+        return None
+    dnf = _sequence(list(parsed), bool(parsed.state.flags & re.IGNORECASE))
+    if dnf is None or any(not conj for conj in dnf):
+        return None
+    return dnf
+
+
+def _encode(ids: array[int]) -> bytes:
+    return zlib.compress(ids.tobytes(), 1)
+
+
+def _decode(blob: bytes) -> array[int]:
+    ids = array("I")
+    ids.frombytes(zlib.decompress(blob))
+    return ids
+
+
+def trigram_db_path(data_dir: Path, root: Path) -> Path:
+    return index_db_path(data_dir, root, "trigrams")
+
+
+class TrigramIndex:
+    """
+    On-disk trigram index of a workspace's non-ignored files, used to narrow regex search.
+
+    Each file's distinct case-folded trigrams are posted under increasing file ids in
+    SQLite (zlib-compressed uint32 arrays). ``build`` indexes everything on the process
+    pool and swaps the database in atomically. Afterwards every query syncs with the
+    inotify-backed workspace index: changed files get new ids in a new posting segment
+    and old ids are simply no longer resolvable, until enough are dead to rebuild.
+
+    ``candidates`` returns None whenever the answer could be incomplete — no usable
+    trigrams, no index yet, a rebuild running, too many changes, or no inotify (polling
+    cannot see in-place edits) — and callers then scan normally.
+    """
+
+    def __init__(self, root: Path, db_path: Path, workers: int = 0) -> None:
+        self.root = root.resolve()
+        self.db_path = db_path
+        self.workers = workers
+        self.workspace = get_workspace_index(self.root)
+        self._lock = threading.RLock()
+        self._conn: sqlite3.Connection | None = None
+        self._files: Dict[str, Tuple[int, int, int]] = {}  # rel -> (id, mtime_ns, size)
+        self._synced = -1  # workspace generation the database reflects
+        self._builder: threading.Thread | None = None
+        self._build_lock = threading.Lock()  # one build at a time, queries keep self._lock
+        self.stats = {"builds": 0, "updates": 0, "narrowed": 0, "fallbacks": 0}
+
+    # -- building --------------------------------------------------------------------
+
+    def _extract(self, first_id: int, paths: List[str]) -> Tuple[List[bool], Postings]:
+        workers = self.workers or os.cpu_count() or 1
+        if workers <= 1 or len(paths) < 2 * EXTRACT_BATCH:
+            return extract_batch(first_id, paths)
+        starts = range(0, len(paths), EXTRACT_BATCH)
+        indexed: List[bool] = []
+        postings: Postings = {}
+        for part_indexed, part in get_pool(workers).map(
+            extract_batch,
+            [first_id + start for start in starts],
+            [paths[start : start + EXTRACT_BATCH] for start in starts],
+        ):
+            indexed.extend(part_indexed)
+            for gram, ids in part.items():  # batches arrive in order: ids stay ascending
+                known = postings.get(gram)
+                if known is None:
+                    postings[gram] = ids
+                else:
+                    known.extend(ids)
+        return indexed, postings
+
+    def build(self) -> None:
+        """Index every non-ignored workspace file from scratch and swap the database in."""
+        with self._build_lock:
+            self._build()
+
+    def _build(self) -> None:
+        self.workspace.refresh()
+        generation = self.workspace.generation
+        entries = [(e.rel, e.mtime_ns, e.size) for e in self.workspace.files()]
+        indexed, postings = self._extract(1, [str(self.root / rel) for rel, _, _ in entries])
+        rows = [
+            (file_id, rel, mtime_ns, size, int(ok))
+            for file_id, ((rel, mtime_ns, size), ok) in enumerate(zip(entries, indexed), 1)
+        ]
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.db_path.with_name(f"{self.db_path.name}.{os.getpid()}.tmp")
+        temp.unlink(missing_ok=True)
+        conn = sqlite3.connect(temp)
+        try:
+            conn.executescript(_SCHEMA)
+            conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?)", rows)
+            conn.executemany(
+                "INSERT INTO postings VALUES (?, 0, ?, ?)",
+                ((gram, len(ids), _encode(ids)) for gram, ids in postings.items()),
+            )
+            meta = {"version": SCHEMA_VERSION, "next_id": len(rows) + 1, "segment": 0, "dead": 0}
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+            conn.commit()
+        finally:
+            conn.close()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            os.replace(temp, self.db_path)
+            self._open()
+            self._synced = generation
+            self.stats["builds"] += 1
+
+    def start_build(self) -> None:
+        """Rebuild on a background thread; queries fall back to plain scans meanwhile."""
+        with self._lock:
+            if self._builder is not None and self._builder.is_alive():
+                return
+
+            def run() -> None:
+                try:
+                    self.build()
+                except Exception:  # noqa: BLE001 - a failed build only disables narrowing
+                    logger.exception("trigram index build failed for %s", self.root)
+
+            self._builder = threading.Thread(target=run, name="codax-trigram-build", daemon=True)
+            self._builder.start()
+
+    @property
+    def building(self) -> bool:
+        return self._builder is not None and self._builder.is_alive()
+
+    # -- syncing ---------------------------------------------------------------------
+
+    def _open(self) -> bool:
+        if self._conn is not None:
+            return True
+        if not self.db_path.exists():
+            return False
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.DatabaseError:
+            version = None
+        if version is None or version[0] != SCHEMA_VERSION:
+            conn.close()
+            return False
+        self._files = {
+            rel: (file_id, mtime_ns, size)
+            for file_id, rel, mtime_ns, size in conn.execute(
+                "SELECT id, rel, mtime_ns, size FROM files"
+            )
+        }
+        self._conn = conn
+        return True
+
+    def _meta(self, key: str) -> int:
+        assert self._conn is not None
+        return int(self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0])
+
+    def _sync(self) -> bool:
+        generation = self.workspace.generation
+        if generation == self._synced:
+            return True
+        live = {entry.rel: (entry.mtime_ns, entry.size) for entry in self.workspace.files()}
+        changed = [
+            rel
+            for rel, stamp in live.items()
+            if (known := self._files.get(rel)) is None or known[1:] != stamp
+        ]
+        removed = [rel for rel in self._files if rel not in live]
+        if len(changed) + len(removed) > MAX_INCREMENTAL:
+            self.start_build()
+            return False
+        if changed or removed:
+            self._apply(changed, removed, live)
+        self._synced = generation
+        if self._meta("dead") > COMPACT_RATIO * max(len(self._files), 1):
+            self.start_build()  # keeps answering from the current database meanwhile
+        return True
+
+    def _apply(
+        self, changed: List[str], removed: List[str], live: Dict[str, Tuple[int, int]]
+    ) -> None:
+        assert self._conn is not None
+        first_id = self._meta("next_id")
+        indexed, postings = self._extract(first_id, [str(self.root / rel) for rel in changed])
+        segment = self._meta("segment") + 1
+        dead = self._meta("dead")
+        with self._conn as conn:
+            for rel in [*removed, *changed]:
+                known = self._files.pop(rel, None)
+                if known is not None:
+                    conn.execute("DELETE FROM files WHERE id = ?", (known[0],))
+                    dead += 1
+            for file_id, (rel, ok) in enumerate(zip(changed, indexed), first_id):
+                mtime_ns, size = live[rel]
+                conn.execute(
+                    "INSERT INTO files VALUES (?, ?, ?, ?, ?)",
+                    (file_id, rel, mtime_ns, size, int(ok)),
+                )
+                self._files[rel] = (file_id, mtime_ns, size)
+            conn.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?, ?)",
+                ((gram, segment, len(ids), _encode(ids)) for gram, ids in postings.items()),
+            )
+            conn.executemany(
+                "UPDATE meta SET value = ? WHERE key = ?",
+                [(first_id + len(changed), "next_id"), (segment, "segment"), (dead, "dead")],
+            )
+        self.stats["updates"] += 1
+
+    # -- querying --------------------------------------------------------------------
+
+    def _evaluate(self, dnf: List[FrozenSet[int]]) -> Set[int]:
+        assert self._conn is not None
+        matched: Set[int] = set()
+        for conj in dnf:
+            grams = list(conj)[:_SQL_CHUNK]  # any subset still bounds the answer
+            placeholders = ",".join("?" * len(grams))
+            counts = dict(
+                self._conn.execute(
+                    "SELECT trigram, SUM(count) FROM postings "
+                    f"WHERE trigram IN ({placeholders}) GROUP BY trigram",
+                    grams,
+                ).fetchall()
+            )
+            if len(counts) < len(grams):
+                continue  # some trigram occurs in no file
+            ids: Set[int] | None = None
+            for gram in sorted(grams, key=counts.__getitem__)[:MAX_LOOKUPS]:
+                found: Set[int] = set()
+                for (blob,) in self._conn.execute(
+                    "SELECT ids FROM postings WHERE trigram = ?", (gram,)
+                ):
+                    found.update(_decode(blob))
+                ids = found if ids is None else ids & found
+                if not ids:
+                    break
+            matched |= ids or set()
+        return matched
+
+    def _resolve(self, ids: Set[int]) -> List[str]:
+        assert self._conn is not None
+        ordered = sorted(ids)
+        rels: List[str] = []
+        for start in range(0, len(ordered), _SQL_CHUNK):
+            chunk = ordered[start : start + _SQL_CHUNK]
+            rels.extend(
+                rel
+                for (rel,) in self._conn.execute(
+                    f"SELECT rel FROM files WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                )
+            )
+        rels.extend(rel for (rel,) in self._conn.execute("SELECT rel FROM files WHERE indexed = 0"))
+        return rels
+
+    def candidates(self, pattern: str, flags: int = 0, rel: str = "") -> List[str] | None:
+        """
+        Absolute paths under ``rel`` that may match ``pattern``, sorted, or None when the
+        index cannot narrow this search (scan everything instead).
+        """
+        dnf = regex_query(pattern, flags)
+        with self._lock:
+            if dnf is None or self.building:
+                self.stats["fallbacks"] += 1
+                return None
+            if not self._open():
+                self.start_build()
+                self.stats["fallbacks"] += 1
+                return None
+            self.workspace.refresh()
+            if not self.workspace.watching or not self._sync():
+                self.stats["fallbacks"] += 1
+                return None
+            rels = self._resolve(self._evaluate(dnf))
+            self.stats["narrowed"] += 1
+        prefix = f"{rel}/" if rel else ""
+        return [
+            str(self.root / path)
+            for path in sorted(set(rels))
+            if not rel or path == rel or path.startswith(prefix)
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_indexes: Dict[Tuple[str, str], TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_trigram_index(root: Path, db_path: Path, workers: int = 0) -> TrigramIndex:
+    """Trigram index shared by every grep on ``root`` in this process."""
+    key = (str(root.resolve()), str(db_path))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = TrigramIndex(root, db_path, workers=workers)
+        return index
@@ -1,3 +1,18 @@
+from codax.workflows.cache import WorkflowCache, get_workflow_cache
 from codax.workflows.compiler import CompiledWorkflow, compile_workflow, load_and_compile, load_workflow
+from codax.workflows.distributed import WorkflowCoordinator, run_with_workers, run_worker
+from codax.workflows.queue import SqliteStepQueue, StepQueue
 
-__all__ = ["CompiledWorkflow", "compile_workflow", "load_and_compile", "load_workflow"]
+__all__ = [
+    "CompiledWorkflow",
+    "SqliteStepQueue",
+    "StepQueue",
+    "WorkflowCache",
+    "WorkflowCoordinator",
+    "compile_workflow",
+    "get_workflow_cache",
+    "load_and_compile",
+    "load_workflow",
+    "run_with_workers",
+    "run_worker",
+]
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+from codax.tools.workflow_tools import _parse_workflow, _validate_workflow
+
+
+@dataclass
+class _CacheEntry:
+    mtime_ns: int
+    size: int
+    digest: str
+    definition: Dict[str, Any]
+
+
+class WorkflowCache:
+    """
+    Cache of parsed and validated workflow definitions.
+
+    Entries are keyed by resolved path and validated against the file's mtime/size; when
+    those changed, the content hash decides whether a re-parse is needed. Definitions are
+    kept in memory and, when ``cache_dir`` is set, persisted as JSON so later processes
+    skip parsing and validation too. Returned definitions are shared: do not mutate them.
+    """
+
+    def __init__(self, cache_dir: Path | None = None) -> None:
+        self.cache_dir = cache_dir
+        self.stats: Dict[str, int] = {"memory": 0, "disk": 0, "parsed": 0}
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._lock = threading.Lock()
+
+    def _disk_path(self, key: str) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return self.cache_dir / f"{name}.json"
+
+    def _read_disk(self, key: str) -> _CacheEntry | None:
+        target = self._disk_path(key)
+        if target is None or not target.exists():
+            return None
+        try:
+            payload = json.loads(target.read_text(encoding="utf-8"))
+        except Exception:  # noqa: BLE001 - a corrupt cache entry is just a miss
+            return None
+        if not isinstance(payload, dict) or payload.get("path") != key:
+            return None
+        return _CacheEntry(
+            mtime_ns=int(payload.get("mtime_ns", -1)),
+            size=int(payload.get("size", -1)),
+            digest=str(payload.get("sha256", "")),
+            definition=payload.get("definition") or {},
+        )
+
+    def _write_disk(self, key: str, entry: _CacheEntry) -> None:
+        target = self._disk_path(key)
+        if target is None:
+            return
+        payload = {
+            "path": key,
+            "mtime_ns": entry.mtime_ns,
+            "size": entry.size,
+            "sha256": entry.digest,
+            "definition": entry.definition,
+        }
+        try:
+            data = json.dumps(payload)
+        except (TypeError, ValueError):
+            # Non-JSON YAML values (dates, sets...) stay memory-only.
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, target)
+
+    def load(self, path: str | Path) -> Dict[str, Any]:
+        """
+        Return the definition for ``path``, parsing and validating only on cache miss.
+
+        Raises FileNotFoundError when the file is missing and ValueError when invalid.
+        """
+        source = Path(path).expanduser().resolve()
+        stat = source.stat()
+        key = str(source)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                self.stats["memory"] += 1
+                return entry.definition
+
+            disk = self._read_disk(key) if entry is None else None
+            if disk and (disk.mtime_ns, disk.size) == (stat.st_mtime_ns, stat.st_size):
+                self._entries[key] = disk
+                self.stats["disk"] += 1
+                return disk.definition
+
+            raw = source.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            known = entry or disk
+            if known and known.digest == digest:
+                # Touched but unchanged: refresh the stat key, keep the parsed definition.
+                refreshed = _CacheEntry(stat.st_mtime_ns, stat.st_size, digest, known.definition)
+                self._entries[key] = refreshed
+                self._write_disk(key, refreshed)
+                self.stats["disk" if entry is None else "memory"] += 1
+                return refreshed.definition
+
+            try:
+                definition = _parse_workflow(raw.decode("utf-8"), source.suffix)
+            except Exception as exc:  # noqa: BLE001 - surface YAML/JSON errors uniformly
+                raise ValueError(f"{source}: {exc}") from exc
+            error = _validate_workflow(definition)
+            if error:
+                raise ValueError(f"{source}: {error}")
+            fresh = _CacheEntry(stat.st_mtime_ns, stat.st_size, digest, definition)
+            self._entries[key] = fresh
+            self._write_disk(key, fresh)
+            self.stats["parsed"] += 1
+            return definition
+
+    def clear(self) -> None:
+        """Drop in-memory entries (on-disk entries are revalidated on next load)."""
+        with self._lock:
+            self._entries.clear()
+
+
+@lru_cache()
+def get_workflow_cache(cache_dir: Path | None = None) -> WorkflowCache:
+    """Return the process-wide cache for ``cache_dir``."""
+    return WorkflowCache(cache_dir)
@@ -6,8 +6,10 @@ from pathlib import Path
 from typing import Any, Dict
 
 from codax.tools import build_tool_registry
-from codax.tools.workflow_tools import WorkflowRunTool, _load_workflow
+from codax.tools.workflow_tools import CancelToken, EventCallback, WorkflowRunTool, _load_workflow
 from codax.config import Settings
+from codax.workflows.cache import get_workflow_cache
+from codax.workflows.profiler import WorkflowProfiler
 
 
 def load_workflow(path: str | Path) -> Dict[str, Any]:
@@ -25,14 +27,30 @@ class CompiledWorkflow:
     definition: Dict[str, Any]
     settings: Settings
 
-    def run(self, params: Dict[str, str] | None = None) -> Dict[str, Any]:
+    def run(
+        self,
+        params: Dict[str, str] | None = None,
+        cancel: CancelToken | None = None,
+        on_event: EventCallback | None = None,
+        profiler: WorkflowProfiler | None = None,
+    ) -> Dict[str, Any]:
         registry = build_tool_registry(self.settings)
-        runner = WorkflowRunTool(self.settings.workspace_root)
+        runner = WorkflowRunTool(
+            self.settings.workspace_root,
+            profiler=profiler,
+            settings=self.settings,
+            loader=get_workflow_cache(workflow_cache_dir(self.settings)).load,
+        )
         result = runner.run(
             path=self.definition.get("__source__", ""),
             params=params or {},
             registry=registry,  # type: ignore[arg-type]
+            definition=self.definition,
+            cancel=cancel,
+            on_event=on_event,
         )
+        if profiler is not None:
+            profiler.finish()
         return {
             "success": result.success,
             "output": result.output,
@@ -51,8 +69,18 @@ def compile_workflow(definition: Dict[str, Any]) -> CompiledWorkflow:
     return CompiledWorkflow(definition=definition, settings=settings)
 
 
+def workflow_cache_dir(settings: Settings) -> Path:
+    """On-disk location of compiled workflow definitions."""
+    return settings.data_dir / "cache" / "workflows"
+
+
 def load_and_compile(path: str | Path, settings: Settings | None = None) -> CompiledWorkflow:
-    wf = load_workflow(path)
+    """
+    Load, validate and compile a workflow, reusing the compiled-definition cache.
+
+    Unchanged files (same path, mtime and content hash) are neither re-parsed nor
+    re-validated, in this process or in later ones sharing the same data dir.
+    """
     source_path = Path(path).resolve()
     if settings is None:
         settings = Settings(workspace_root=source_path.parent)
@@ -60,6 +88,10 @@ def load_and_compile(path: str | Path, settings: Settings | None = None) -> Comp
         # Respect explicitly provided workspace_root; only fill when unset.
         if settings.workspace_root is None:
             settings.workspace_root = source_path.parent
-    wf["__source__"] = str(Path(path).resolve())
+    if not source_path.exists():
+        raise FileNotFoundError(path)
+    # The cached definition is shared; copy before adding per-run keys.
+    wf = dict(get_workflow_cache(workflow_cache_dir(settings)).load(source_path))
+    wf["__source__"] = str(source_path)
     wf["__settings__"] = settings
     return compile_workflow(wf)
@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from codax.config import Settings
+from codax.tools import build_tool_registry
+from codax.tools.base import Tool, ToolResult
+from codax.tools.workflow_tools import (
+    CancelToken,
+    EventCallback,
+    StepRecord,
+    WorkflowRunTool,
+    _validate_workflow,
+)
+from codax.workflows.graph import dependency_graph, step_id
+from codax.workflows.queue import QueuedTask, SqliteStepQueue, StepQueue
+
+# Settings a queued step runs under, whichever worker picks it up.
+SAFETY_SETTINGS = ("safety_mode", "allow_network", "allow_git_commits")
+# Seconds in-flight steps may go without a live worker lease before the run fails.
+DEFAULT_STALL_TIMEOUT = 60.0
+
+
+def default_queue_path(settings: Settings) -> Path:
+    """One queue per workspace, so workers never see another tree's steps by default."""
+    root = str(Path(settings.workspace_root).resolve())
+    digest = hashlib.sha1(root.encode("utf-8")).hexdigest()[:16]
+    return settings.data_dir / "queue" / f"steps-{digest}.sqlite"
+
+
+def task_scope(settings: Settings) -> Dict[str, Any]:
+    """Workspace and safety settings published with each step for workers to honour."""
+    return {
+        "workspace": str(Path(settings.workspace_root).resolve()),
+        "settings": {name: getattr(settings, name) for name in SAFETY_SETTINGS},
+    }
+
+
+def dispatch_graph(definition: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Steps each step waits for before it is published.
+
+    ``dependency_graph`` only sees data references, not side effects such as files a step
+    writes for a later test run, so a step without ``depends_on`` also waits for every
+    step defined before it. Steps declaring ``depends_on`` (``[]`` for none) wait only for
+    those and the steps they reference, and may run ahead in parallel.
+    """
+    graph = dependency_graph(definition)
+    earlier: List[str] = []
+    for index, step in enumerate(definition.get("steps", [])):
+        sid = step_id(step, index)
+        if "depends_on" not in step:
+            graph[sid] = sorted(set(graph[sid]) | set(earlier))
+        earlier.append(sid)
+    return graph
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, StepRecord):
+        return {"__step_record__": [value.output, value.metadata, value.success]}
+    return str(value)
+
+
+def _hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "__step_record__" in obj:
+        return StepRecord(*obj["__step_record__"])
+    return obj
+
+
+def encode_context(context: Dict[str, Any]) -> str:
+    """Serialize a workflow context, keeping ``StepRecord`` entries addressable."""
+    return json.dumps(context, default=_default)
+
+
+def decode_context(payload: str) -> Dict[str, Any]:
+    return dict(json.loads(payload, object_hook=_hook))
+
+
+def execute_task(
+    task: QueuedTask, runner: WorkflowRunTool, registry: Dict[str, Tool]
+) -> Dict[str, Any]:
+    """Run a queued step against its context snapshot and return the context delta."""
+    step = task.payload["step"]
+    context = decode_context(task.payload["context"])
+    before = dict(context)
+    before_steps = dict(context.setdefault("steps", {}))
+    transcripts: List[str] = []
+    failure = runner.execute_step(step, registry, context, transcripts)
+    updates = {
+        key: value
+        for key, value in context.items()
+        if key != "steps" and (key not in before or before[key] is not value)
+    }
+    records = {
+        sid: record
+        for sid, record in context["steps"].items()
+        if before_steps.get(sid) is not record
+    }
+    return {
+        "success": failure is None,
+        "output": failure.output if failure is not None else None,
+        "updates": encode_context(updates),
+        "steps": encode_context(records),
+        "transcript": transcripts,
+    }
+
+
+class _Heartbeat:
+    """Renews a task lease from a background thread while the step runs."""
+
+    def __init__(self, queue: StepQueue, task_id: str, worker_id: str, lease: float) -> None:
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._beat, args=(queue, task_id, worker_id, lease), daemon=True
+        )
+
+    def _beat(self, queue: StepQueue, task_id: str, worker_id: str, lease: float) -> None:
+        while not self._stop.wait(lease / 3):
+            if not queue.heartbeat(task_id, worker_id, lease):
+                return
+
+    def __enter__(self) -> _Heartbeat:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(
+    queue: StepQueue,
+    settings: Settings,
+    worker_id: str | None = None,
+    lease_seconds: float = 30.0,
+    poll_interval: float = 0.1,
+    stop: Any = None,
+    max_idle: float | None = None,
+    max_tasks: int | None = None,
+) -> int:
+    """
+    Claim and execute queued workflow steps until stopped.
+
+    Steps published for another workspace fail with a refusal instead of running here;
+    the others run under the safety settings they were published with.
+
+    ``stop`` is any event-like object with ``is_set``; the worker also exits after
+    ``max_idle`` seconds without work or ``max_tasks`` tasks. Returns the task count.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    root = Path(settings.workspace_root).resolve()
+    # (runner, registry) per safety settings seen in task payloads
+    tools: Dict[str, Tuple[WorkflowRunTool, Dict[str, Tool]]] = {}
+    processed = 0
+    idle_since = time.monotonic()
+    while stop is None or not stop.is_set():
+        task = queue.claim(worker_id, lease_seconds)
+        if task is None:
+            if max_idle is not None and time.monotonic() - idle_since >= max_idle:
+                break
+            time.sleep(poll_interval)
+            continue
+        workspace = task.payload.get("workspace")
+        if workspace is not None and Path(workspace) != root:
+            result = {
+                "success": False,
+                "output": f"worker for {root} refused a step for workspace {workspace}",
+            }
+            queue.complete(task.id, worker_id, result)
+            processed += 1
+            idle_since = time.monotonic()
+            continue
+        overrides = task.payload.get("settings") or {}
+        key = json.dumps(overrides, sort_keys=True)
+        if key not in tools:
+            effective = settings.model_copy(update=overrides)
+            registry: Dict[str, Tool] = build_tool_registry(effective)  # type: ignore[assignment]
+            tools[key] = (WorkflowRunTool(effective.workspace_root, settings=effective), registry)
+        runner, registry = tools[key]
+        with _Heartbeat(queue, task.id, worker_id, lease_seconds):
+            try:
+                result = execute_task(task, runner, registry)
+            except Exception as exc:  # noqa: BLE001 - reported to the coordinator
+                result = {"success": False, "output": f"{type(exc).__name__}: {exc}"}
+        queue.complete(task.id, worker_id, result)
+        processed += 1
+        idle_since = time.monotonic()
+        if max_tasks is not None and processed >= max_tasks:
+            break
+    return processed
+
+
+class WorkflowCoordinator:
+    """
+    Publishes ready steps to a queue and merges worker results into the run context.
+
+    A step becomes ready once every step it waits for (see ``dispatch_graph``) has
+    completed, so steps declared independent run concurrently on however many workers
+    poll the queue. Workers receive a snapshot of the context at publish time and, given
+    ``settings``, the workspace root and safety settings the step must run with. The run
+    fails once in-flight steps have gone ``stall_timeout`` seconds without any worker
+    holding a live lease on them (every worker dead or none started).
+    """
+
+    def __init__(
+        self,
+        queue: StepQueue,
+        poll_interval: float = 0.02,
+        settings: Settings | None = None,
+        stall_timeout: float = DEFAULT_STALL_TIMEOUT,
+    ) -> None:
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.scope = task_scope(settings) if settings is not None else {}
+        self.stall_timeout = stall_timeout
+
+    def run(
+        self,
+        definition: Dict[str, Any],
+        params: Dict[str, str] | None = None,
+        cancel: CancelToken | None = None,
+        on_event: EventCallback | None = None,
+    ) -> ToolResult:
+        error = _validate_workflow(definition)
+        if error:
+            return ToolResult(output=error, success=False, metadata=None)
+        steps = definition["steps"]
+        graph = dispatch_graph(definition)
+        pending = {step_id(step, index): step for index, step in enumerate(steps)}
+        inflight: Dict[str, str] = {}
+        done: set[str] = set()
+        context: Dict[str, Any] = dict(params or {})
+        context.setdefault("steps", {})
+        transcripts: List[str] = []
+        run_id = uuid.uuid4().hex
+        stalled_since: float | None = None
+        try:
+            while pending or inflight:
+                if cancel is not None and cancel.cancelled:
+                    transcripts.append("coordinator:cancelled")
+                    return ToolResult(
+                        output="workflow cancelled",
+                        success=False,
+                        metadata={"transcript": transcripts, "cancelled": True},
+                    )
+                for sid in [sid for sid in pending if all(dep in done for dep in graph[sid])]:
+                    task_id = f"{run_id}:{sid}"
+                    payload = {
+                        "step": {"id": sid, **pending.pop(sid)},
+                        "context": encode_context(context),
+                        **self.scope,
+                    }
+                    self.queue.publish(run_id, task_id, payload)
+                    inflight[task_id] = sid
+                    if on_event is not None:
+                        on_event({"type": "step_queued", "step": sid})
+                finished = self.queue.results(inflight)
+                if not finished:
+                    if inflight:
+                        if self.queue.leased(inflight):
+                            stalled_since = None
+                        elif stalled_since is None:
+                            stalled_since = time.monotonic()
+                        elif time.monotonic() - stalled_since >= self.stall_timeout:
+                            return ToolResult(
+                                output=(
+                                    f"no worker held steps {sorted(inflight.values())} for "
+                                    f"{self.stall_timeout:g}s; are any workers running?"
+                                ),
+                                success=False,
+                                metadata={"transcript": transcripts},
+                            )
+                        time.sleep(self.poll_interval)
+                    elif pending:  # nothing runnable and nothing running
+                        return ToolResult(
+                            output=f"unsatisfiable dependencies: {sorted(pending)}",
+                            success=False,
+                            metadata={"transcript": transcripts},
+                        )
+                    continue
+                stalled_since = None
+                for task_id, result in finished.items():
+                    sid = inflight.pop(task_id)
+                    transcripts.extend(result.get("transcript", []))
+                    if not result.get("success"):
+                        return ToolResult(
+                            output=result.get("output") or f"step {sid} failed",
+                            success=False,
+                            metadata={"step": sid, "transcript": transcripts},
+                        )
+                    context.update(decode_context(result["updates"]))
+                    context["steps"].update(decode_context(result["steps"]))
+                    done.add(sid)
+                    if on_event is not None:
+                        on_event({"type": "step_done", "step": sid})
+        finally:
+            self.queue.purge(run_id)
+        return ToolResult(
+            output="workflow completed",
+            success=True,
+            metadata={"transcript": transcripts, "params": params or {}, "context": context},
+        )
+
+
+def _worker_main(queue_path: str, settings_payload: Dict[str, Any], stop: Any) -> None:
+    queue = SqliteStepQueue(Path(queue_path))
+    try:
+        run_worker(queue, Settings(**settings_payload), stop=stop)
+    finally:
+        queue.close()
+
+
+def start_local_workers(
+    queue_path: Path, settings: Settings, count: int
+) -> Tuple[List[Any], Any]:
+    """Spawn ``count`` worker processes on ``queue_path``; set the returned event to stop them."""
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    processes = [
+        ctx.Process(
+            target=_worker_main,
+            args=(str(queue_path), settings.model_dump(), stop),
+            name=f"codax-worker-{index}",
+            daemon=True,
+        )
+        for index in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes, stop
+
+
+def run_with_workers(
+    definition: Dict[str, Any],
+    settings: Settings,
+    workers: int,
+    queue_path: Path | None = None,
+    params: Dict[str, str] | None = None,
+    cancel: CancelToken | None = None,
+    on_event: EventCallback | None = None,
+) -> ToolResult:
+    """Coordinate a run over a SQLite queue served by ``workers`` local processes."""
+    path = queue_path or default_queue_path(settings)
+    queue = SqliteStepQueue(path)
+    processes, stop = start_local_workers(path, settings, workers) if workers > 0 else ([], None)
+    try:
+        coordinator = WorkflowCoordinator(queue, settings=settings)
+        return coordinator.run(definition, params, cancel, on_event)
+    finally:
+        if stop is not None:
+            stop.set()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        queue.close()
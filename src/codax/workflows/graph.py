@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+_TEMPLATE = re.compile(r"\{\{\s*([^}]+?)\s*\}\}")
+_STEP_KEY = re.compile(r"steps\s*\[\s*['\"]([^'\"]+)['\"]\s*\]")
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_STRING = re.compile(r"'[^']*'|\"[^\"]*\"")
+# Identifiers not reached through attribute access (``a.b`` yields only ``a``).
+_ROOT_IDENT = re.compile(r"(?<![\w.])[A-Za-z_][A-Za-z0-9_]*")
+# Step keys whose values are rendered or evaluated against the workflow context.
+_EXPR_KEYS = ("args", "loop", "loop_file", "loop_glob", "loop_lines", "inputs", "workflow")
+
+
+def step_id(step: Dict[str, Any], index: int) -> str:
+    """Stable identifier for a step; unnamed steps are addressed by position."""
+    return str(step.get("id") or f"#{index}")
+
+
+def _strings(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def _names_in_expr(expr: str) -> set[str]:
+    names = set(_STEP_KEY.findall(expr))
+    names.update(_IDENT.findall(_STEP_KEY.sub("", expr)))
+    return names
+
+
+def root_names(expr: str) -> set[str]:
+    """Top-level context names an expression reads, ignoring string literals and attributes."""
+    return set(_ROOT_IDENT.findall(_STRING.sub("''", expr)))
+
+
+def step_refs(expr: str) -> set[str]:
+    """Step ids addressed as ``steps['X']`` in an expression."""
+    return set(_STEP_KEY.findall(expr))
+
+
+def template_expressions(step: Dict[str, Any]) -> List[str]:
+    """All ``{{expr}}`` expressions a step renders, plus its ``when`` condition."""
+    exprs: List[str] = []
+    for key in _EXPR_KEYS:
+        for text in _strings(step.get(key)):
+            exprs.extend(_TEMPLATE.findall(text))
+    when = step.get("when")
+    if isinstance(when, str):
+        exprs.append(when)
+    return exprs
+
+
+def referenced_names(step: Dict[str, Any]) -> set[str]:
+    """Names a step reads from the context: template identifiers and ``context_keys``."""
+    names: set[str] = set()
+    for expr in template_expressions(step):
+        names.update(_names_in_expr(expr))
+    keys = step.get("context_keys")
+    if isinstance(keys, list):
+        names.update(str(key) for key in keys)
+    return names
+
+
+def dependency_graph(definition: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Map each step id to the earlier steps whose outputs it consumes.
+
+    A step produces its id (``steps['X']`` / ``{{X}}``), its ``assign`` variable and the
+    names its sub-workflow ``outputs`` map into the context; references resolve to the
+    most recent earlier producer, mirroring sequential runs.
+    Ordering-only dependencies (side effects) are declared with ``depends_on``.
+    """
+    producers: Dict[str, str] = {}
+    graph: Dict[str, List[str]] = {}
+    for index, step in enumerate(definition.get("steps", [])):
+        sid = step_id(step, index)
+        names = referenced_names(step)
+        explicit = step.get("depends_on") or []
+        names.update([explicit] if isinstance(explicit, str) else map(str, explicit))
+        deps = sorted({producers[name] for name in names if name in producers})
+        graph[sid] = [dep for dep in deps if dep != sid]
+        producers[sid] = sid
+        for name in produced_names(step):
+            producers[name] = sid
+    return graph
+
+
+def produced_names(step: Dict[str, Any]) -> List[str]:
+    """Context names a step writes besides its id: ``assign`` and mapped ``outputs``."""
+    names = [str(step["assign"])] if step.get("assign") else []
+    outputs = step.get("outputs")
+    if "workflow" in step and "loop" not in step and isinstance(outputs, dict):
+        names.extend(str(name) for name in outputs)
+    return names
+
+
+def dependents(graph: Dict[str, List[str]], roots: Iterable[str]) -> set[str]:
+    """Return ``roots`` plus every step that transitively depends on them."""
+    reverse: Dict[str, List[str]] = {}
+    for sid, deps in graph.items():
+        for dep in deps:
+            reverse.setdefault(dep, []).append(sid)
+    seen: set[str] = set()
+    stack = [root for root in roots if root in graph]
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        stack.extend(reverse.get(current, []))
+    return seen
+
+
+def critical_path(
+    graph: Dict[str, List[str]], durations: Dict[str, float]
+) -> Tuple[List[str], float]:
+    """
+    Longest duration-weighted chain through the dependency DAG.
+
+    This is the lower bound on wall time if independent steps ran in parallel.
+    """
+    finish: Dict[str, float] = {}
+    parent: Dict[str, str | None] = {}
+    for sid, deps in graph.items():  # insertion order is topological
+        best = max(deps, key=lambda dep: finish.get(dep, 0.0), default=None)
+        parent[sid] = best
+        finish[sid] = durations.get(sid, 0.0) + (finish.get(best, 0.0) if best else 0.0)
+    if not finish:
+        return [], 0.0
+    tail: str | None = max(finish, key=lambda sid: finish[sid])
+    total = finish[tail] if tail else 0.0
+    path: List[str] = []
+    while tail is not None:
+        path.append(tail)
+        tail = parent.get(tail)
+    return list(reversed(path)), total
@@ -0,0 +1,464 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from codax.config import Settings
+from codax.llm_scheduler import estimate_tokens
+from codax.tools.filesystem import _ensure_workspace
+from codax.tools.workflow_tools import (
+    MAX_SUBWORKFLOW_DEPTH,
+    STREAMING_LOOP_KEYS,
+    WorkflowLoader,
+    _iter_glob,
+    _load_workflow,
+    _render_value,
+)
+from codax.workflows.graph import (
+    _strings,
+    critical_path,
+    dependency_graph,
+    produced_names,
+    root_names,
+    step_id,
+    step_refs,
+    template_expressions,
+)
+
+# Tools that make a paid model call per invocation.
+LLM_TOOLS = frozenset({"llm_node", "summarize"})
+# Per-call latency assumed for tools with no recorded history.
+DEFAULT_LATENCY_MS = {
+    "llm_node": 4000.0,
+    "summarize": 3000.0,
+    "shell": 1000.0,
+    "shell_command": 1000.0,
+    "exec_command": 1000.0,
+    "search": 1500.0,
+    "http": 1000.0,
+    "fetch_url": 1000.0,
+}
+FALLBACK_LATENCY_MS = 50.0
+# Output size assumed for steps whose output cannot be predicted (~1 KB of text).
+DEFAULT_OUTPUT_TOKENS = 256
+DEFAULT_MAX_TOKENS = 512
+# Names the template/CEL evaluators resolve without the workflow context.
+EXPR_BUILTINS = frozenset(
+    {
+        "steps",
+        "None",
+        "True",
+        "False",
+        "null",
+        "true",
+        "false",
+        "and",
+        "or",
+        "not",
+        "in",
+        "is",
+        "size",
+        "has",
+        "int",
+        "string",
+        "len",
+    }
+)
+_TEMPLATE = re.compile(r"\{\{\s*([^}]+?)\s*\}\}")
+_PROMPT_ARGS = ("system_prompt", "user_message", "text")
+
+
+@dataclass
+class ToolStats:
+    """Per-call means for one tool, aggregated from past profiled runs."""
+
+    calls: int
+    wall_ms: float
+    output_tokens: int
+
+
+def latency_history_path(settings: Settings) -> Path:
+    return settings.data_dir / "profiles" / "tool_latency.json"
+
+
+def load_history(path: Path) -> Dict[str, ToolStats]:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    stats: Dict[str, ToolStats] = {}
+    for tool, item in (payload.get("tools") or {}).items():
+        calls = int(item.get("calls", 0))
+        if calls <= 0:
+            continue
+        # Tools without token usage still report output bytes; ~4 bytes per token.
+        tokens = item.get("output_tokens") or item.get("bytes_out", 0) // 4
+        stats[tool] = ToolStats(
+            calls=calls,
+            wall_ms=float(item.get("wall_ms", 0.0)) / calls,
+            output_tokens=int(tokens) // calls,
+        )
+    return stats
+
+
+def record_history(path: Path, profile: Dict[str, Any]) -> Path:
+    """Fold a ``WorkflowProfiler.to_dict()`` payload into the per-tool totals at ``path``."""
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        payload = {}
+    tools = payload.setdefault("tools", {})
+    for step in profile.get("steps", []):
+        totals = tools.setdefault(
+            step["tool"], {"calls": 0, "wall_ms": 0.0, "bytes_out": 0, "output_tokens": 0}
+        )
+        totals["calls"] += int(step.get("iterations", 0))
+        totals["wall_ms"] = round(totals["wall_ms"] + float(step.get("wall_ms", 0.0)), 3)
+        totals["bytes_out"] += int(step.get("bytes_out", 0))
+        totals["output_tokens"] += int(step.get("output_tokens", 0))
+    payload["version"] = 1
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+    return path
+
+
+@dataclass
+class StepPlan:
+    step: str
+    tool: str
+    iterations: int | None  # None: depends on runtime data
+    llm_calls: int
+    prompt_tokens: int
+    output_tokens: int
+    call_ms: float
+    serial_ms: float
+    wall_ms: float
+    latency_source: str
+    depends_on: List[str] = field(default_factory=list)
+    issues: List[str] = field(default_factory=list)
+
+
+@dataclass
+class WorkflowPlan:
+    steps: List[StepPlan]
+    issues: List[str]
+    serial_ms: float
+    parallel_ms: float
+    critical_path: List[str]
+
+    @property
+    def llm_calls(self) -> int:
+        return sum(step.llm_calls for step in self.steps)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(step.prompt_tokens for step in self.steps)
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(step.output_tokens for step in self.steps)
+
+    @property
+    def unknown_loops(self) -> List[str]:
+        return [step.step for step in self.steps if step.iterations is None]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "serial_ms": round(self.serial_ms, 3),
+            "parallel_ms": round(self.parallel_ms, 3),
+            "critical_path": self.critical_path,
+            "issues": self.issues,
+            "steps": [asdict(step) for step in self.steps],
+        }
+
+    def report(self) -> str:
+        """Human-readable estimate, one line per step, with any issues last."""
+        lines = [
+            f"plan: {len(self.steps)} steps, {self.llm_calls} LLM calls, "
+            f"~{self.prompt_tokens} prompt / ~{self.output_tokens} output tokens",
+            f"  expected wall time: serial {self.serial_ms / 1000:.1f} s, "
+            f"parallel {self.parallel_ms / 1000:.1f} s "
+            f"(critical path: {' -> '.join(self.critical_path) or '-'})",
+        ]
+        for step in self.steps:
+            count = "?" if step.iterations is None else str(step.iterations)
+            lines.append(
+                f"    {step.step:<24} {step.tool:<14} x{count:<5} llm {step.llm_calls:<4} "
+                f"tokens {step.prompt_tokens:>7} {step.serial_ms / 1000:>8.1f} s "
+                f"({step.latency_source})"
+            )
+        if self.unknown_loops:
+            lines.append(
+                "  loop length unknown until run time (counted once): "
+                + ", ".join(self.unknown_loops)
+            )
+        if self.issues:
+            lines.append(f"  {len(self.issues)} issue(s):")
+            lines.extend(f"    - {issue}" for issue in self.issues)
+        return "\n".join(lines)
+
+
+class _Planner:
+    def __init__(
+        self,
+        root: Path,
+        history: Dict[str, ToolStats],
+        loader: WorkflowLoader | None,
+        tools: Iterable[str] | None,
+    ) -> None:
+        self.root = root
+        self.history = history
+        self.loader = loader
+        self.tools = set(tools) if tools is not None else None
+
+    def load(self, path: Path) -> Dict[str, Any]:
+        return self.loader(path) if self.loader is not None else _load_workflow(path)
+
+    def plan(self, definition: Dict[str, Any], params: Dict[str, Any], depth: int) -> WorkflowPlan:
+        graph = dependency_graph(definition)
+        known = set(params) | EXPR_BUILTINS
+        step_ids: set[str] = set()
+        # Estimated output tokens per produced name, used to size prompts that reference it.
+        sizes: Dict[str, int] = {key: estimate_tokens(value) for key, value in params.items()}
+        plans: List[StepPlan] = []
+        issues: List[str] = []
+        for index, step in enumerate(definition.get("steps", [])):
+            sid = step_id(step, index)
+            loop_var = str(step.get("loop_var", "item"))
+            looping = "loop" in step or any(key in step for key in STREAMING_LOOP_KEYS)
+            scope = known | {loop_var} if looping else known
+            problems = self._unresolved(step, scope, step_ids)
+            item = self._plan_step(step, sid, params, sizes, depth)
+            item.depends_on = graph.get(sid, [])
+            item.issues = problems + item.issues
+            issues.extend(f"{sid}: {problem}" for problem in item.issues)
+            plans.append(item)
+            step_ids.add(sid)
+            produced = [sid, *produced_names(step)]
+            known.update(produced)
+            if looping:
+                known.add(loop_var)  # the loop variable stays bound after the loop
+            for name in produced:
+                sizes[name] = item.output_tokens // max(item.iterations or 1, 1) or (
+                    DEFAULT_OUTPUT_TOKENS
+                )
+        durations = {item.step: item.wall_ms for item in plans}
+        path, parallel = critical_path(graph, durations)
+        return WorkflowPlan(
+            steps=plans,
+            issues=issues,
+            serial_ms=sum(item.serial_ms for item in plans),
+            parallel_ms=parallel,
+            critical_path=path,
+        )
+
+    def _unresolved(self, step: Dict[str, Any], known: set[str], step_ids: set[str]) -> List[str]:
+        problems: List[str] = []
+        tool = step.get("tool")
+        if "workflow" not in step and self.tools is not None and tool not in self.tools:
+            problems.append(f"unknown tool '{tool}'")
+        missing: set[str] = set()
+        for expr in template_expressions(step):
+            missing.update(name for name in root_names(expr) if name not in known)
+            for ref in sorted(step_refs(expr) - step_ids):
+                problems.append(f"references steps['{ref}'] which has not run yet")
+        keys = step.get("context_keys")
+        if isinstance(keys, list):
+            missing.update(str(key) for key in keys if str(key) not in known)
+        problems.extend(f"unresolved reference '{name}'" for name in sorted(missing))
+        return problems
+
+    def _iterations(self, step: Dict[str, Any], params: Dict[str, Any]) -> int | None:
+        """Loop length when it is known before running (literal or param-only), else None."""
+        if "loop" in step:
+            value = self._static_value(step["loop"], params)
+            if value is None:
+                return None
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    return 1
+            count = len(value) if isinstance(value, list) else 1
+        elif "loop_file" in step:
+            path = self._static_value(step["loop_file"], params)
+            if path is None:
+                return None
+            try:
+                target = _ensure_workspace(Path(str(path)), self.root)
+                with target.open("rb") as handle:
+                    count = sum(1 for _ in handle)
+            except (OSError, ValueError):
+                return None
+        elif "loop_glob" in step:
+            pattern = self._static_value(step["loop_glob"], params)
+            if not isinstance(pattern, str):
+                return None
+            try:  # counted like the runner iterates it; escaping patterns fail there
+                count = sum(1 for _ in _iter_glob(self.root, pattern))
+            except (OSError, ValueError):
+                return None
+        elif "loop_lines" in step:
+            lines = self._static_value(step["loop_lines"], params)
+            if lines is None:
+                return None
+            count = len(str(lines).splitlines()) if isinstance(lines, str) else len(lines)
+        else:
+            return 1
+        batch_size = int(step.get("batch_size", 0) or 0)
+        if batch_size > 0 and not step.get("batch"):
+            count = math.ceil(count / batch_size)
+        return count
+
+    def _static_value(self, value: Any, params: Dict[str, Any]) -> Any:
+        """Render ``value`` when every template in it only reads params, else None."""
+        allowed = set(params) | (EXPR_BUILTINS - {"steps"})
+        for text in _strings(value):
+            for expr in _TEMPLATE.findall(text):
+                if not root_names(expr) <= allowed:
+                    return None
+        return _render_value(value, params)
+
+    def _latency(self, tool: str) -> tuple[float, str]:
+        stats = self.history.get(tool)
+        if stats is not None:
+            return stats.wall_ms, f"history n={stats.calls}"
+        return DEFAULT_LATENCY_MS.get(tool, FALLBACK_LATENCY_MS), "default"
+
+    def _prompt_tokens(self, step: Dict[str, Any], sizes: Dict[str, int]) -> int:
+        args = step.get("args") or {}
+        tokens = 0
+        for key in _PROMPT_ARGS:
+            text = args.get(key)
+            if not isinstance(text, str):
+                continue
+            tokens += estimate_tokens(_TEMPLATE.sub("", text))
+            for expr in _TEMPLATE.findall(text):
+                tokens += self._expr_tokens(expr, sizes)
+        if isinstance(args.get("json_schema"), dict):
+            tokens += estimate_tokens(json.dumps(args["json_schema"]))
+        keys = step.get("context_keys")
+        if isinstance(keys, list):
+            tokens += sum(sizes.get(str(key), DEFAULT_OUTPUT_TOKENS) + 4 for key in keys)
+        return tokens
+
+    def _expr_tokens(self, expr: str, sizes: Dict[str, int]) -> int:
+        refs = step_refs(expr)
+        names = refs or (root_names(expr) - EXPR_BUILTINS)
+        if not names:
+            return 0
+        return max(sizes.get(name, DEFAULT_OUTPUT_TOKENS) for name in names)
+
+    def _plan_step(
+        self,
+        step: Dict[str, Any],
+        sid: str,
+        params: Dict[str, Any],
+        sizes: Dict[str, int],
+        depth: int,
+    ) -> StepPlan:
+        iterations = self._iterations(step, params)
+        runs = iterations if iterations is not None else 1
+        if "workflow" in step:
+            return self._plan_subworkflow(step, sid, params, iterations, depth)
+        tool = str(step.get("tool"))
+        call_ms, source = self._latency(tool)
+        llm = tool in LLM_TOOLS
+        args = step.get("args") or {}
+        prompt = self._prompt_tokens(step, sizes) if llm else 0
+        if llm:
+            output = int(args.get("max_tokens") or DEFAULT_MAX_TOKENS)
+        else:
+            stats = self.history.get(tool)
+            output = stats.output_tokens if stats is not None else DEFAULT_OUTPUT_TOKENS
+        calls = runs
+        concurrency = 1
+        batch = step.get("batch")
+        if batch and runs > 1:
+            options = batch if isinstance(batch, dict) else {}
+            pack = int(options.get("pack", 0) or 0)
+            if llm and pack > 1:
+                calls = math.ceil(runs / pack)
+            concurrency = max(int(options.get("max_concurrency", 4) or 1), 1)
+        serial = call_ms * calls
+        return StepPlan(
+            step=sid,
+            tool=tool,
+            iterations=iterations,
+            llm_calls=calls if llm else 0,
+            prompt_tokens=prompt * runs,
+            output_tokens=output * runs,
+            call_ms=call_ms,
+            serial_ms=serial,
+            wall_ms=call_ms * math.ceil(calls / concurrency),
+            latency_source=source,
+        )
+
+    def _plan_subworkflow(
+        self,
+        step: Dict[str, Any],
+        sid: str,
+        params: Dict[str, Any],
+        iterations: int | None,
+        depth: int,
+    ) -> StepPlan:
+        empty = StepPlan(sid, "workflow", iterations, 0, 0, 0, 0.0, 0.0, 0.0, "sub-workflow")
+        if depth >= MAX_SUBWORKFLOW_DEPTH:
+            empty.issues.append(f"exceeds sub-workflow depth {MAX_SUBWORKFLOW_DEPTH}")
+            return empty
+        source = self._static_value(step["workflow"], params)
+        if source is None:
+            return empty  # path chosen at run time
+        try:
+            definition = self.load(_ensure_workspace(Path(str(source)), self.root))
+        except (OSError, ValueError) as exc:
+            empty.issues.append(f"cannot load workflow {source}: {exc}")
+            return empty
+        # Inputs that can be rendered now are passed on; the rest count as known but opaque.
+        inputs = step.get("inputs") or {}
+        child_params = {
+            str(key): value if (value := self._static_value(raw, params)) is not None else ""
+            for key, raw in inputs.items()
+        }
+        child = self.plan(definition, child_params, depth + 1)
+        runs = iterations if iterations is not None else 1
+        parallel = max(min(int(step.get("parallel", 1)), runs), 1)
+        empty.issues.extend(f"{source}: {issue}" for issue in child.issues)
+        empty.llm_calls = child.llm_calls * runs
+        empty.prompt_tokens = child.prompt_tokens * runs
+        empty.output_tokens = child.output_tokens * runs
+        empty.call_ms = child.parallel_ms
+        empty.serial_ms = child.serial_ms * runs
+        empty.wall_ms = child.parallel_ms * math.ceil(runs / parallel)
+        return empty
+
+
+def plan_workflow(
+    definition: Dict[str, Any],
+    root: Path,
+    params: Dict[str, Any] | None = None,
+    history: Dict[str, ToolStats] | None = None,
+    loader: WorkflowLoader | None = None,
+    tools: Iterable[str] | None = None,
+) -> WorkflowPlan:
+    """
+    Statically estimate a workflow run without calling any tool.
+
+    Loops whose length is fixed by literals, params, files or globs are expanded; LLM
+    prompts are sized from their templates and ``context_keys``; per-call latency comes
+    from ``history`` (see ``record_history``) or defaults. Serial time sums every step,
+    parallel time is the critical path through the dependency graph. References to
+    names no earlier step or param provides (and tools missing from ``tools``) are
+    reported as issues.
+    """
+    planner = _Planner(root.resolve(), history or {}, loader, tools)
+    return planner.plan(definition, dict(params or {}), 0)
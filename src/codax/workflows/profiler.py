@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+from codax.workflows.graph import critical_path, dependency_graph, step_id
+
+# Per-iteration samples kept per step; totals always cover every iteration.
+MAX_ITERATION_SAMPLES = 1000
+
+
+@dataclass
+class StepProfile:
+    step: str
+    tool: str
+    iterations: int = 0
+    wall_ms: float = 0.0
+    cpu_ms: float = 0.0
+    render_ms: float = 0.0
+    tool_ms: float = 0.0
+    retries: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    samples: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class WorkflowProfiler:
+    """Collects per-step / per-iteration measurements from ``WorkflowRunTool``."""
+
+    def __init__(self) -> None:
+        self.steps: Dict[str, StepProfile] = {}
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+
+    def record(
+        self,
+        step: str,
+        tool: str,
+        *,
+        wall_ms: float,
+        cpu_ms: float,
+        render_ms: float,
+        tool_ms: float,
+        retries: int = 0,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+        usage: Dict[str, Any] | None = None,
+    ) -> None:
+        profile = self.steps.setdefault(step, StepProfile(step=step, tool=tool))
+        input_tokens = int((usage or {}).get("input_tokens", 0) or 0)
+        output_tokens = int((usage or {}).get("output_tokens", 0) or 0)
+        profile.iterations += 1
+        profile.wall_ms += wall_ms
+        profile.cpu_ms += cpu_ms
+        profile.render_ms += render_ms
+        profile.tool_ms += tool_ms
+        profile.retries += retries
+        profile.bytes_in += bytes_in
+        profile.bytes_out += bytes_out
+        profile.input_tokens += input_tokens
+        profile.output_tokens += output_tokens
+        if len(profile.samples) < MAX_ITERATION_SAMPLES:
+            profile.samples.append(
+                {
+                    "wall_ms": round(wall_ms, 3),
+                    "cpu_ms": round(cpu_ms, 3),
+                    "render_ms": round(render_ms, 3),
+                    "tool_ms": round(tool_ms, 3),
+                    "retries": retries,
+                    "bytes_in": bytes_in,
+                    "bytes_out": bytes_out,
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                }
+            )
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def to_dict(self, definition: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        """JSON-ready profile; with ``definition`` the critical path is included."""
+        end = self.finished if self.finished is not None else time.perf_counter()
+        steps = [asdict(profile) for profile in self.steps.values()]
+        totals = {
+            key: round(sum(float(item[key]) for item in steps), 3)
+            for key in ("wall_ms", "cpu_ms", "render_ms", "tool_ms")
+        }
+        for key in ("retries", "bytes_in", "bytes_out", "input_tokens", "output_tokens"):
+            totals[key] = sum(int(item[key]) for item in steps)
+        payload: Dict[str, Any] = {
+            "version": 1,
+            "total_wall_ms": round((end - self.started) * 1000, 3),
+            "totals": totals,
+            "steps": steps,
+        }
+        if definition is not None:
+            graph = dependency_graph(definition)
+            durations = {sid: p.wall_ms for sid, p in self.steps.items()}
+            path, length = critical_path(graph, durations)
+            payload["dependencies"] = graph
+            payload["critical_path"] = {"steps": path, "wall_ms": round(length, 3)}
+            order = [step_id(step, i) for i, step in enumerate(definition.get("steps", []))]
+            rank = {sid: position for position, sid in enumerate(order)}
+            payload["steps"].sort(key=lambda item: rank.get(item["step"], len(order)))
+        return payload
+
+    def write_json(self, path: Path, definition: Dict[str, Any] | None = None) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(definition), indent=2), encoding="utf-8")
+        return path
+
+    def report(self, definition: Dict[str, Any] | None = None, top: int = 10) -> str:
+        """Human-readable summary: hot steps, render vs tool time, critical path."""
+        data = self.to_dict(definition)
+        totals = data["totals"]
+        lines = [
+            f"profile: total wall {data['total_wall_ms']:.1f} ms, cpu {totals['cpu_ms']:.1f} ms"
+        ]
+        lines.append(
+            f"  rendering {totals['render_ms']:.1f} ms vs tools {totals['tool_ms']:.1f} ms; "
+            f"retries {totals['retries']}; tokens in/out "
+            f"{totals['input_tokens']}/{totals['output_tokens']}"
+        )
+        lines.append(f"  top {top} slowest steps:")
+        hottest = sorted(data["steps"], key=lambda item: item["wall_ms"], reverse=True)[:top]
+        for item in hottest:
+            lines.append(
+                f"    {item['step']:<24} {item['tool']:<14} {item['wall_ms']:>10.1f} ms "
+                f"x{item['iterations']} (render {item['render_ms']:.1f} ms, "
+                f"bytes {item['bytes_in']}/{item['bytes_out']})"
+            )
+        if "critical_path" in data:
+            path = data["critical_path"]
+            lines.append(
+                f"  critical path ({path['wall_ms']:.1f} ms): " + " -> ".join(path["steps"])
+            )
+        return "\n".join(lines)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+
+@dataclass
+class QueuedTask:
+    id: str
+    run_id: str
+    payload: Dict[str, Any]
+    attempts: int = 1
+
+
+class StepQueue(ABC):
+    """
+    Work queue between a workflow coordinator and its workers.
+
+    Workers ``claim`` a task under a lease, renew it with ``heartbeat`` while running and
+    report with ``complete``. Tasks whose lease expires become claimable again, so a
+    crashed worker's step is retried elsewhere (up to ``max_attempts``).
+    """
+
+    @abstractmethod
+    def publish(self, run_id: str, task_id: str, payload: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float) -> QueuedTask | None: ...
+
+    @abstractmethod
+    def heartbeat(self, task_id: str, worker_id: str, lease_seconds: float) -> bool: ...
+
+    @abstractmethod
+    def complete(self, task_id: str, worker_id: str, result: Dict[str, Any]) -> bool: ...
+
+    @abstractmethod
+    def results(self, task_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]: ...
+
+    @abstractmethod
+    def purge(self, run_id: str) -> None: ...
+
+    @abstractmethod
+    def leased(self, task_ids: Iterable[str]) -> bool:
+        """Whether any of the tasks is held by a worker whose lease has not expired."""
+
+    def close(self) -> None:  # noqa: B027 - optional hook
+        """Release backend resources."""
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'ready',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, created);
+CREATE INDEX IF NOT EXISTS tasks_run ON tasks (run_id);
+"""
+
+
+class SqliteStepQueue(StepQueue):
+    """Local queue in a WAL-mode SQLite file; safe to share between processes on one host."""
+
+    def __init__(self, path: Path, max_attempts: int = 3) -> None:
+        self.path = path
+        self.max_attempts = max_attempts
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def publish(self, run_id: str, task_id: str, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks (id, run_id, payload, created) VALUES (?, ?, ?, ?)",
+                (task_id, run_id, json.dumps(payload), time.time()),
+            )
+
+    def claim(self, worker_id: str, lease_seconds: float) -> QueuedTask | None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'failed', result = ? WHERE status = 'leased' "
+                    "AND lease_until < ? AND attempts >= ?",
+                    (
+                        json.dumps({"success": False, "output": "lease expired too many times"}),
+                        now,
+                        self.max_attempts,
+                    ),
+                )
+                row = self._conn.execute(
+                    "SELECT id, run_id, payload, attempts FROM tasks WHERE status = 'ready' "
+                    "OR (status = 'leased' AND lease_until < ?) ORDER BY created LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (worker_id, now + lease_seconds, row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        payload = json.loads(row[2])
+        return QueuedTask(id=row[0], run_id=row[1], payload=payload, attempts=row[3] + 1)
+
+    def heartbeat(self, task_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_until = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + lease_seconds, task_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, task_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Record a result; ignored if the lease was lost to another worker meanwhile."""
+        status = "done" if result.get("success") else "failed"
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, lease_until = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (status, json.dumps(result, default=str), task_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def results(self, task_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        ids: List[str] = list(task_ids)
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, result FROM tasks WHERE id IN ({marks}) "  # noqa: S608
+                "AND status IN ('done', 'failed')",
+                ids,
+            ).fetchall()
+        return {row[0]: json.loads(row[1]) for row in rows}
+
+    def purge(self, run_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE run_id = ?", (run_id,))
+
+    def leased(self, task_ids: Iterable[str]) -> bool:
+        ids: List[str] = list(task_ids)
+        if not ids:
+            return False
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM tasks WHERE id IN ({marks}) "  # noqa: S608
+                "AND status = 'leased' AND lease_until >= ? LIMIT 1",
+                [*ids, time.time()],
+            ).fetchone()
+        return row is not None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
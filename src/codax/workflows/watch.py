@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import fnmatch
+import shlex
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+
+from codax.fswatch import create_watcher, wait_for_changes
+from codax.tools import build_tool_registry
+from codax.tools.base import Tool, ToolResult
+from codax.tools.workflow_tools import (
+    CancelToken,
+    EventCallback,
+    WorkflowRunTool,
+    _render_value,
+)
+from codax.workflows.cache import get_workflow_cache
+from codax.workflows.compiler import CompiledWorkflow, workflow_cache_dir
+from codax.workflows.graph import dependency_graph, dependents, step_id
+
+# Argument names that carry workspace paths.
+PATH_ARGS = ("path", "paths", "file_path", "dir_path", "workdir", "repo_path")
+# Tools whose path arguments are outputs: changes to them never trigger the step itself.
+WRITE_TOOLS = frozenset({"fs_write", "fs_mkdir", "fs_remove", "fs_write_many", "edit_file"})
+SHELL_TOOLS = frozenset({"shell", "shell_command", "exec_command"})
+# Step keys (besides args) naming files the step depends on.
+_PATH_KEYS = ("loop_file", "loop_glob", "workflow", "watch")
+
+
+def _strings(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def step_paths(step: Dict[str, Any], context: Dict[str, Any], root: Path) -> List[str]:
+    """
+    Workspace-relative paths or globs a step touches, rendered against ``context``.
+
+    Sources: path-like args, loop files/globs, sub-workflow files, existing paths named
+    in shell commands (e.g. ``cd tmp/tests && pytest``) and an explicit ``watch`` list.
+    """
+    rendered = _render_value(
+        {key: step[key] for key in ("args", *_PATH_KEYS) if key in step},
+        context,
+    )
+    args = rendered.get("args") or {}
+    found: List[str] = []
+    if isinstance(args, dict):
+        for key in PATH_ARGS:
+            found.extend(_strings(args.get(key)))
+        if step.get("tool") in SHELL_TOOLS:
+            for text in _strings(args.get("command") or args.get("cmd")):
+                try:
+                    words = shlex.split(text)
+                except ValueError:
+                    words = text.split()
+                found.extend(w for w in words if "/" in w and (root / w).exists())
+    for key in _PATH_KEYS:
+        found.extend(_strings(rendered.get(key)))
+    return [_normalize(item) for item in found if item and "{{" not in item]
+
+
+def _normalize(item: str) -> str:
+    item = item.strip()
+    while item.startswith("./"):
+        item = item[2:]
+    return item.rstrip("/") or "."
+
+
+def _matches(rel: str, pattern: str) -> bool:
+    pattern = pattern.rstrip("/")
+    if pattern == ".":
+        return True
+    if any(ch in pattern for ch in "*?["):
+        return fnmatch.fnmatch(rel, pattern) or fnmatch.fnmatch(rel, pattern + "/*")
+    return rel == pattern or rel.startswith(pattern + "/")
+
+
+def affected_steps(
+    definition: Dict[str, Any],
+    context: Dict[str, Any],
+    changed: Iterable[Path],
+    root: Path,
+) -> List[str]:
+    """
+    Steps to re-run after ``changed`` files, in definition order.
+
+    A step is hit when it reads a changed path; hits spread to steps consuming their
+    outputs (``dependency_graph``) and to steps reading files a re-run step writes.
+    """
+    steps = definition.get("steps", [])
+    ids = [step_id(step, index) for index, step in enumerate(steps)]
+    rels = set()
+    for path in changed:
+        try:
+            rels.add(Path(path).resolve().relative_to(root).as_posix())
+        except ValueError:
+            continue
+    if "." in rels or "" in rels:  # watcher overflow: assume everything changed
+        return ids
+    paths = {sid: step_paths(step, context, root) for sid, step in zip(ids, steps)}
+    writes = {sid: step.get("tool") in WRITE_TOOLS for sid, step in zip(ids, steps)}
+    hit = {
+        sid
+        for sid in ids
+        if not writes[sid] and any(_matches(rel, p) for rel in rels for p in paths[sid])
+    }
+    graph = dependency_graph(definition)
+    selected = dependents(graph, hit)
+    # File-level propagation: a re-run writer dirties the files later readers consume.
+    for index, sid in enumerate(ids):
+        if sid not in selected or not writes[sid]:
+            continue
+        for later in ids[index + 1 :]:
+            if writes[later] or later in selected:
+                continue
+            if any(_matches(w, p) or _matches(p, w) for w in paths[sid] for p in paths[later]):
+                selected |= dependents(graph, [later])
+    return [sid for sid in ids if sid in selected]
+
+
+class WatchSession:
+    """
+    Keeps one registry, runner and context alive across re-runs of a workflow.
+
+    ``run_all`` executes every step; ``run_slice`` re-executes only the given step ids
+    against the context left by previous runs.
+    """
+
+    def __init__(
+        self,
+        compiled: CompiledWorkflow,
+        params: Dict[str, Any] | None = None,
+        registry: Dict[str, Tool] | None = None,
+    ) -> None:
+        self.compiled = compiled
+        self.root = Path(compiled.settings.workspace_root).resolve()
+        self.registry: Dict[str, Tool] = registry or build_tool_registry(  # type: ignore[assignment]
+            compiled.settings
+        )
+        self.runner = WorkflowRunTool(
+            self.root,
+            settings=compiled.settings,
+            loader=get_workflow_cache(workflow_cache_dir(compiled.settings)).load,
+        )
+        self.params = dict(params or {})
+        self.context: Dict[str, Any] = {}
+
+    @property
+    def definition(self) -> Dict[str, Any]:
+        return self.compiled.definition
+
+    def run_all(
+        self, cancel: CancelToken | None = None, on_event: EventCallback | None = None
+    ) -> ToolResult:
+        self.context = {**self.params, "steps": {}}
+        return self._run(None, cancel, on_event)
+
+    def run_slice(
+        self,
+        ids: Iterable[str],
+        cancel: CancelToken | None = None,
+        on_event: EventCallback | None = None,
+    ) -> ToolResult:
+        return self._run(set(ids), cancel, on_event)
+
+    def _run(
+        self,
+        only: set[str] | None,
+        cancel: CancelToken | None,
+        on_event: EventCallback | None,
+    ) -> ToolResult:
+        transcripts: List[str] = []
+        for index, step in enumerate(self.definition.get("steps", [])):
+            if only is not None and step_id(step, index) not in only:
+                continue
+            if cancel is not None and cancel.cancelled:
+                return ToolResult(output="workflow cancelled", success=False, metadata=None)
+            failure = self.runner.execute_step(
+                step, self.registry, self.context, transcripts, cancel, on_event, index
+            )
+            if failure is not None:
+                return failure
+        return ToolResult(
+            output="workflow completed",
+            success=True,
+            metadata={"transcript": transcripts},
+        )
+
+    def affected(self, changed: Iterable[Path]) -> List[str]:
+        return affected_steps(self.definition, self.context, changed, self.root)
+
+
+def watch_workflow(
+    session: WatchSession,
+    on_result: Callable[[List[str] | None, ToolResult], None],
+    debounce: float = 0.3,
+    stop: threading.Event | None = None,
+    force_polling: bool = False,
+    reload: Callable[[], CompiledWorkflow] | None = None,
+) -> None:
+    """
+    Run the workflow, then re-run affected slices whenever watched files change.
+
+    ``on_result`` receives the re-run step ids (``None`` for a full run) and the result.
+    Changes made while a slice runs (typically its own writes) are discarded. When the
+    definition file itself changes, ``reload`` supplies the new compiled workflow and
+    everything re-runs; a definition that fails to load is reported and the old one kept.
+    """
+    source = session.definition.get("__source__")
+    source_path = Path(source).resolve() if source else None
+    on_result(None, session.run_all())
+    watcher = create_watcher(session.root, force_polling=force_polling)
+    try:
+        while stop is None or not stop.is_set():
+            changed = wait_for_changes(watcher, debounce=debounce, stop=stop)
+            if not changed:
+                continue
+            resolved = {path.resolve() for path in changed}
+            if source_path is not None and source_path in resolved and reload is not None:
+                try:
+                    session.compiled = reload()
+                except (FileNotFoundError, ValueError) as exc:
+                    # Keep watching with the previous definition until the file is fixed.
+                    on_result(None, ToolResult(output=str(exc), success=False, metadata=None))
+                    continue
+                result, ids = session.run_all(), None
+            else:
+                ids = session.affected(resolved)
+                if not ids:
+                    continue
+                result = session.run_slice(ids)
+            watcher.changes(0)  # drop events caused by the run itself
+            on_result(ids, result)
+    finally:
+        watcher.close()
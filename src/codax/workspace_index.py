@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from codax.fswatch import InotifyWatcher
+from codax.ignore import IGNORE_FILES, IgnoreMatcher
+
+# Workspaces indexed at once; the least recently used one is closed (with its watcher).
+MAX_INDEXES = 8
+
+
+@dataclass(slots=True)
+class IndexEntry:
+    rel: str  # posix path relative to the workspace root
+    name: str
+    is_dir: bool
+    size: int
+    mtime_ns: int
+    ignored: bool
+    binary: bool | None = None  # sniffed lazily, reset when the file changes
+
+
+@dataclass(slots=True)
+class _DirNode:
+    entries: Dict[str, IndexEntry]
+    stamp: Tuple[int, ...]  # directory mtime plus its ignore files' mtimes
+
+
+def _join(parent: str, name: str) -> str:
+    return f"{parent}/{name}" if parent else name
+
+
+def _stamp(directory: Path) -> Tuple[int, ...]:
+    stamps = []
+    for path in (directory, *(directory / name for name in IGNORE_FILES)):
+        try:
+            stamps.append(path.stat().st_mtime_ns)
+        except OSError:
+            stamps.append(0)
+    return tuple(stamps)
+
+
+class WorkspaceIndex:
+    """
+    In-memory tree of a workspace: every directory's entries with size, mtime, gitignore
+    status and (lazily) a binary flag.
+
+    Built by one walk on first use. Gitignored and VCS/dependency directories are recorded
+    as ignored entries but not descended into. ``refresh`` brings the tree up to date:
+    with inotify only the directories that reported events are rescanned; otherwise
+    (or when watches run out) directories whose mtime or ignore files changed are
+    rescanned. In polling mode an in-place edit refreshes a file's size/mtime only when
+    its directory is rescanned; listings and content reads are unaffected.
+    """
+
+    def __init__(self, root: Path, watch: bool = True) -> None:
+        self.root = root.resolve()
+        self.matcher = IgnoreMatcher(self.root)
+        self.watch = watch
+        self._dirs: Dict[str, _DirNode] = {}
+        self._lock = threading.RLock()
+        self._watcher: InotifyWatcher | None = None
+        self._built = False
+        self.stats = {"builds": 0, "rescans": 0}
+        # Bumped whenever a refresh rescanned anything; lets derived indexes skip syncing.
+        self.generation = 0
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    @property
+    def watching(self) -> bool:
+        """True when inotify keeps file sizes/mtimes current (polling misses in-place edits)."""
+        return self._watcher is not None
+
+    # -- maintenance -----------------------------------------------------------------
+
+    def refresh(self) -> None:
+        """Build on first call, then apply changes made since the previous call."""
+        with self._lock:
+            if not self._built:
+                self._build()
+            elif self._watcher is not None:
+                self._apply_events()
+            else:
+                self._poll()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+            self._dirs.clear()
+            self._built = False
+
+    def _build(self) -> None:
+        if self.watch and self._watcher is None:
+            try:
+                watcher = InotifyWatcher(self.root)  # before the walk: no change is missed
+            except (OSError, AttributeError):
+                watcher = None
+            if watcher is not None and not watcher.complete:
+                watcher.close()
+                watcher = None
+            self._watcher = watcher
+        self._dirs.clear()
+        self._scan_tree("")
+        self._built = True
+        self.stats["builds"] += 1
+        self.generation += 1
+
+    def _scan_tree(self, rel: str) -> None:
+        stack = [rel]
+        while stack:
+            stack.extend(self._scan_dir(stack.pop()))
+
+    def _drop_tree(self, rel: str) -> None:
+        prefix = rel + "/"
+        for key in [key for key in self._dirs if key == rel or key.startswith(prefix)]:
+            del self._dirs[key]
+
+    def _scan_dir(self, rel: str) -> List[str]:
+        """(Re)scan one directory; returns newly indexed subdirectories to scan."""
+        directory = self.root / rel if rel else self.root
+        self.stats["rescans"] += 1
+        rules = self.matcher.rules_for(rel)
+        previous = self._dirs.get(rel)
+        entries: Dict[str, IndexEntry] = {}
+        try:
+            stamp = _stamp(directory)
+            with os.scandir(directory) as scan:
+                for item in scan:
+                    try:
+                        is_dir = item.is_dir(follow_symlinks=False)
+                        stat = item.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    child = _join(rel, item.name)
+                    old = previous.entries.get(item.name) if previous else None
+                    unchanged = old is not None and (old.mtime_ns, old.size) == (
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                    )
+                    binary = old.binary if old is not None and unchanged else None
+                    entries[item.name] = IndexEntry(
+                        rel=child,
+                        name=item.name,
+                        is_dir=is_dir,
+                        size=stat.st_size,
+                        mtime_ns=stat.st_mtime_ns,
+                        ignored=self.matcher.matches(child, is_dir, rules),
+                        binary=binary,
+                    )
+        except OSError:
+            self._drop_tree(rel)
+            return []
+        self._dirs[rel] = _DirNode(entries, stamp)
+        pending = []
+        for name, entry in entries.items():
+            if entry.is_dir and not entry.ignored:
+                if entry.rel not in self._dirs:
+                    pending.append(entry.rel)
+            elif entry.rel in self._dirs:
+                self._drop_tree(entry.rel)  # removed, replaced by a file, or now ignored
+        if previous is not None:
+            for name, old in previous.entries.items():
+                if old.is_dir and name not in entries:
+                    self._drop_tree(old.rel)
+        if previous is not None and previous.stamp[1:] != stamp[1:]:
+            # Ignore rules changed: every descendant's ignored flag may have changed.
+            for name, entry in entries.items():
+                if entry.is_dir and not entry.ignored:
+                    self._drop_tree(entry.rel)
+                    pending.append(entry.rel)
+            pending = list(dict.fromkeys(pending))
+        return pending
+
+    def _rescan(self, dirs: set[str]) -> None:
+        if dirs:
+            self.generation += 1
+        for rel in sorted(dirs, key=lambda item: item.count("/")):
+            if rel in self._dirs:
+                self._scan_tree(rel)
+
+    def _apply_events(self) -> None:
+        assert self._watcher is not None
+        changed: set[Path] = set()
+        while batch := self._watcher.changes(0):
+            changed |= batch
+        if not changed:
+            return
+        if self.root in changed or not self._watcher.complete:  # overflow or lost watches
+            if not self._watcher.complete:
+                self._watcher.close()
+                self._watcher = None
+            self._build()
+            return
+        dirs: set[str] = set()
+        for path in changed:
+            rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+            if rel.startswith(".."):
+                continue
+            dirs.add(rel.rpartition("/")[0])
+            if rel in self._dirs:
+                dirs.add(rel)
+        self._rescan(dirs)
+
+    def _poll(self) -> None:
+        stale = set()
+        for rel, node in list(self._dirs.items()):
+            if _stamp(self.root / rel if rel else self.root) != node.stamp:
+                stale.add(rel)
+        self._rescan(stale)
+
+    # -- queries ---------------------------------------------------------------------
+
+    def entry(self, rel: str) -> IndexEntry | None:
+        parent, _, name = rel.rpartition("/")
+        with self._lock:
+            node = self._dirs.get(parent)
+            return node.entries.get(name) if node is not None else None
+
+    def is_indexed(self, rel: str) -> bool:
+        with self._lock:
+            return rel in self._dirs
+
+    def children(self, rel: str) -> List[IndexEntry] | None:
+        """
+        Entries of directory ``rel`` sorted by name, or None when it does not exist.
+
+        Ignored directories are not indexed; their listing is read from disk each time.
+        """
+        with self._lock:
+            node = self._dirs.get(rel)
+            if node is not None:
+                return [node.entries[name] for name in sorted(node.entries)]
+        directory = self.root / rel if rel else self.root
+        try:
+            with os.scandir(directory) as scan:
+                items = sorted(scan, key=lambda item: item.name)
+                listing = []
+                for item in items:
+                    try:
+                        stat = item.stat(follow_symlinks=False)
+                        is_dir = item.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    listing.append(
+                        IndexEntry(
+                            _join(rel, item.name),
+                            item.name,
+                            is_dir,
+                            stat.st_size,
+                            stat.st_mtime_ns,
+                            ignored=True,
+                        )
+                    )
+                return listing
+        except OSError:
+            return None
+
+    def walk(
+        self, rel: str = "", max_depth: int | None = None, include_ignored: bool = False
+    ) -> Iterator[Tuple[IndexEntry, int]]:
+        """Depth-first ``(entry, depth)`` pairs below ``rel`` in name order (depth 1 = child)."""
+        stack: List[Tuple[str, int]] = [(rel, 0)]
+        while stack:
+            current, depth = stack.pop()
+            children = self.children(current) or []
+            if not include_ignored:
+                children = [child for child in children if not child.ignored]
+            pending = []
+            for child in children:
+                yield child, depth + 1
+                if child.is_dir and (max_depth is None or depth + 1 < max_depth):
+                    if not child.ignored or include_ignored:
+                        pending.append((child.rel, depth + 1))
+            stack.extend(reversed(pending))
+
+    def files(self, rel: str = "", include_ignored: bool = False) -> Iterator[IndexEntry]:
+        for entry, _ in self.walk(rel, include_ignored=include_ignored):
+            if not entry.is_dir:
+                yield entry
+
+    def is_binary(self, entry: IndexEntry) -> bool:
+        if entry.binary is None:
+            try:
+                with (self.root / entry.rel).open("rb") as handle:
+                    entry.binary = b"\0" in handle.read(1024)
+            except OSError:
+                entry.binary = False
+        return entry.binary
+
+
+def index_db_path(data_dir: Path, root: Path, kind: str) -> Path:
+    """Where the on-disk ``kind`` index (trigrams, symbols...) of workspace ``root`` lives."""
+    digest = hashlib.sha1(str(Path(root).resolve()).encode("utf-8")).hexdigest()[:16]
+    return data_dir / "index" / f"{kind}-{digest}.sqlite"
+
+
+_indexes: OrderedDict[Tuple[str, bool], WorkspaceIndex] = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_workspace_index(root: Path, watch: bool = True) -> WorkspaceIndex:
+    """Index shared by every tool working on ``root`` in this process."""
+    key = (str(Path(root).resolve()), watch)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = WorkspaceIndex(Path(key[0]), watch=watch)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)[1].close()
+        return index
+
+
+@atexit.register
+def close_workspace_indexes() -> None:
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.close()
+        _indexes.clear()
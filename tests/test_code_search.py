@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pytest
+
+from codax.agent import runner
+from codax.code_search import MAX_CHUNK_LINES, CodeSearchIndex, chunk_text, tokenize
+from codax.config import Settings
+from codax.tools.retrieval import RetrieveCodeTool
+from codax.workspace_index import close_workspace_indexes
+
+MODULE = '''\
+"""Token bucket helpers."""
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate):
+        self.rate = rate
+
+    def take(self, tokens):
+        return tokens <= self.rate
+
+
+def refill_bucket(bucket, seconds):
+    bucket.rate += seconds
+'''
+
+
+@pytest.fixture(autouse=True)
+def _fresh_indexes():
+    close_workspace_indexes()
+    yield
+    close_workspace_indexes()
+
+
+def test_tokenize_and_chunk_boundaries() -> None:
+    assert tokenize("parseHTTPResponse snake_case x") == [
+        "parsehttpresponse", "parse", "http", "response", "snake_case", "snake", "case"
+    ]
+    assert chunk_text("mod.py", MODULE) == [
+        (1, 4, '"""Token bucket helpers."""'),  # module code before the first definition
+        (5, 10, "class TokenBucket"),
+        (13, 14, "def refill_bucket"),  # blank gaps are dropped
+    ]
+    long_class = "class Big:\n" + "".join(
+        f"    def m{i}(self):\n" + "        pass\n" * 9 for i in range(10)
+    )
+    spans = chunk_text("big.py", long_class)
+    assert spans[0] == (1, 1, "class Big") and spans[1] == (2, 11, "def Big.m0")
+    markdown = "# Title\nintro\n\n## Install\n" + "step\n" * (MAX_CHUNK_LINES + 5)
+    assert [span[:2] for span in chunk_text("README.md", markdown)] == [
+        (1, 3), (4, MAX_CHUNK_LINES + 3), (MAX_CHUNK_LINES + 4, MAX_CHUNK_LINES + 9)
+    ]
+
+
+def test_synced_index_requires_subclass_hooks(tmp_path: Path) -> None:
+    from codax.sqlite_index import SyncedFileIndex
+
+    class Partial(SyncedFileIndex[int]):
+        SCHEMA = ""
+        SCHEMA_VERSION = 1
+        FILE_TABLES = ()
+
+    with pytest.raises(TypeError, match="_insert"):
+        Partial(tmp_path, tmp_path / "x.sqlite")  # type: ignore[abstract]
+
+
+def test_bm25_ranks_matching_chunks_and_follows_edits(tmp_path: Path) -> None:
+    (tmp_path / "bucket.py").write_text(MODULE)
+    (tmp_path / "notes.md").write_text("# Notes\nNothing about rates here.\n")
+    db = tmp_path / ".data" / "chunks.sqlite"
+    (tmp_path / ".gitignore").write_text(".data/\n")
+    index = CodeSearchIndex(tmp_path, db)
+    best = index.search("refill the token bucket", k=3)
+    assert [(hit.path, hit.title) for hit in best][0] == ("bucket.py", "def refill_bucket")
+    assert best[0].score > best[1].score > best[2].score
+    assert index.search("take tokens at a rate", k=1)[0].title == "class TokenBucket"
+    assert index.search("nonexistentword") == []
+
+    (tmp_path / "notes.md").write_text("# Notes\nrefill refill refill quota\n")
+    index.close()  # a fresh instance reads the same database and only re-indexes notes.md
+    again = CodeSearchIndex(tmp_path, db)
+    assert again.search("refill quota", k=1)[0].path == "notes.md"
+    assert again.stats["parsed"] == 1
+
+    tool = RetrieveCodeTool(tmp_path, db)
+    result = tool.run("TokenBucket take", k=1)
+    assert result.output.startswith(f"==> {tmp_path / 'bucket.py'}:5-10 class TokenBucket")
+    assert "def take(self, tokens):" in result.output
+
+
+def test_agent_run_prefetches_top_chunks(tmp_path: Path) -> None:
+    (tmp_path / "bucket.py").write_text(MODULE)
+    settings = Settings(
+        _env_file=None, workspace_root=tmp_path, data_dir=tmp_path / ".data", retrieval_prefetch=1
+    )
+    result = runner.create_agent_graph(settings).run("how does refill_bucket work?")
+    assert [chunk["title"] for chunk in result["metadata"]["retrieved"]] == ["def refill_bucket"]
+    assert result["summary"].startswith("Workspace code that may be relevant")
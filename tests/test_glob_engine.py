@@ -0,0 +1,68 @@
+import os
+from pathlib import Path
+
+from codax.ignore import IgnoreMatcher
+from codax.tools.filesystem import FsGlobTool
+from codax.tools.glob_engine import compile_glob, iter_glob
+
+
+def _touch(root: Path, *paths: str) -> None:
+    for rel in paths:
+        target = root / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("x", encoding="utf-8")
+
+
+def test_iter_glob_segments_and_pruning(tmp_path: Path) -> None:
+    _touch(
+        tmp_path,
+        "a.py",
+        ".hidden.py",
+        "pkg/b.py",
+        "pkg/sub/c.py",
+        "pkg/sub/c.txt",
+        "pkg/.cache/d.py",
+        "dist/e.py",
+        "node_modules/lib/f.py",
+        "logs/x.log",
+    )
+    (tmp_path / ".gitignore").write_text("dist/\n*.log\n", encoding="utf-8")
+    matcher = IgnoreMatcher(tmp_path)
+
+    def glob(pattern: str, ignore: bool = True) -> list[str]:
+        return list(iter_glob(tmp_path, pattern, matcher if ignore else None))
+
+    assert glob("**/*.py") == ["a.py", "pkg/b.py", "pkg/sub/c.py"]
+    assert glob("**/*.py", ignore=False) == [
+        "a.py",
+        "dist/e.py",
+        "node_modules/lib/f.py",
+        "pkg/b.py",
+        "pkg/sub/c.py",
+    ]
+    assert glob("pkg/*/c.*") == ["pkg/sub/c.py", "pkg/sub/c.txt"]
+    assert glob(".*.py") == [".hidden.py"]
+    assert glob("pkg/.cache/*.py") == ["pkg/.cache/d.py"]
+    assert glob("node_modules/*/*.py") == ["node_modules/lib/f.py"]
+    assert glob("pkg/**") == ["pkg/b.py", "pkg/sub", "pkg/sub/c.py", "pkg/sub/c.txt"]
+    assert glob("logs/*") == [] and glob("logs/x.log") == ["logs/x.log"]
+    assert compile_glob("**/**/*.py") is compile_glob("**/**/*.py")
+    assert len(compile_glob("**/**/*.py").segments) == 2
+
+
+def test_fs_glob_limit_and_mtime_sort(tmp_path: Path) -> None:
+    _touch(tmp_path, *(f"src/m{i}.py" for i in range(5)))
+    for i in range(5):
+        os.utime(tmp_path / f"src/m{i}.py", ns=(i * 10**9, (10 - i) * 10**9))
+    tool = FsGlobTool(tmp_path)
+    limited = tool.run("**/*.py", limit=2)
+    assert limited.metadata == {"matches": ["src/m0.py", "src/m1.py"], "truncated": True}
+    assert tool.run("src/*.py", sort="mtime", limit=3).output.splitlines() == [
+        "src/m0.py",
+        "src/m1.py",
+        "src/m2.py",
+    ]
+    assert tool.run("src/*.py", limit=10).metadata["truncated"] is False
+    assert tool.run("src/*.py", sort="mtime", limit=3).metadata["truncated"] is True
+    assert tool.run("src/*.py", sort="mtime", limit=5).metadata["truncated"] is False
+    assert not tool.run("*.py", sort="size").success
@@ -0,0 +1,65 @@
+import re
+import shutil
+from pathlib import Path
+
+import pytest
+
+from codax import grep_engine
+from codax.grep_engine import grep_files
+from codax.tools.advanced import GrepFilesTool
+
+
+def _corpus(root: Path, count: int) -> list[str]:
+    paths = []
+    for index in range(count):
+        path = root / f"f{index:03}.txt"
+        path.write_bytes(b"needle\n" if index % 3 == 0 else b"hay\n")
+        paths.append(str(path))
+    return paths
+
+
+def test_grep_files_in_process_keeps_order_and_limit(tmp_path: Path) -> None:
+    paths = _corpus(tmp_path, 12)
+    (tmp_path / "bin.dat").write_bytes(b"\0needle")
+    (tmp_path / "latin.txt").write_bytes(b"caf\xe9 needle")
+    paths += [str(tmp_path / "bin.dat"), str(tmp_path / "latin.txt")]
+    hits = grep_files(r"need\w+", paths, limit=100)
+    assert [Path(hit).name for hit in hits] == [
+        "f000.txt", "f003.txt", "f006.txt", "f009.txt", "latin.txt"
+    ]
+    assert grep_files("needle", paths, limit=2) == hits[:2]
+    with pytest.raises(re.error):
+        grep_files("(", paths, limit=1)
+
+
+def test_grep_files_matches_non_ascii_text_like_str_regex(tmp_path: Path) -> None:
+    path = tmp_path / "fr.txt"
+    path.write_text("café crème\nNAÏVE\n", encoding="utf-8")
+    (tmp_path / "ascii.txt").write_text("coffee cream\n", encoding="utf-8")
+    paths = [str(path), str(tmp_path / "ascii.txt")]
+    for pattern in (r"caf\w ", "cr.me", r"cr\wme", "(?i)naïve", "[éè]", r"\u00e8", "crème"):
+        assert grep_files(pattern, paths, limit=10) == [str(path)], pattern
+    assert grep_files(r"caf\W", paths, limit=10) == []  # é is a word character
+    assert grep_files(r"(?i)CREAM|crème", paths, limit=10) == paths
+
+
+def test_grep_files_parallel_stops_at_limit(tmp_path: Path, monkeypatch) -> None:
+    paths = _corpus(tmp_path, 90)
+    monkeypatch.setattr(grep_engine, "PARALLEL_MIN_FILES", 4)
+    monkeypatch.setattr(grep_engine, "BATCH_FILES", 5)
+    expected = [path for index, path in enumerate(paths) if index % 3 == 0]
+    assert grep_files("needle", paths, limit=1000, workers=2) == expected
+    assert grep_files("needle", paths, limit=4, workers=2) == expected[:4]
+    assert grep_files("needle", paths, limit=7, workers=1) == expected[:7]
+
+
+def test_grep_tool_fallback_filters_and_reports_bad_patterns(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("needle\n")
+    (tmp_path / "pkg" / "b.txt").write_text("needle\n")
+    tool = GrepFilesTool(tmp_path)
+    result = tool.run("needle", include="*.py")
+    assert result.output == str(tmp_path / "pkg" / "a.py")
+    assert tool.run("needle", path="pkg/b.txt").metadata == {"count": 1}
+    assert tool.run("(", include="*.py").output.startswith("invalid pattern")
@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from codax.tools.advanced import GrepFilesTool
+from codax.tools.grep_lines import rg_hits
+
+
+def _event(kind: str, path: str, line: int, text: str) -> str:
+    data = {"path": {"text": path}, "lines": {"text": text + "\n"}, "line_number": line}
+    return json.dumps({"type": kind, "data": data})
+
+
+def test_content_mode_without_rg_shows_context_and_caps(tmp_path: Path, monkeypatch) -> None:
+    (tmp_path / "a.py").write_text("one\nhit 1\ntwo\nthree\nfour\nhit 2\nhit 3\n")
+    (tmp_path / "b.py").write_text("hit 4\r\nfive\f six\r\nhit 5\n")
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    tool = GrepFilesTool(tmp_path)
+    a, b = tmp_path / "a.py", tmp_path / "b.py"
+    result = tool.run(pattern=r"hit \d", output_mode="content", context=1, max_per_file=2)
+    assert result.output.split("\n") == [
+        f"{a}-1-one",
+        f"{a}:2:hit 1",
+        f"{a}-3-two",
+        "--",
+        f"{a}-5-four",
+        f"{a}:6:hit 2",
+        f"{a}-7-hit 3",  # past the per-file cap, so only context
+        "--",
+        f"{b}:1:hit 4",
+        f"{b}-2-five\f six",
+        f"{b}:3:hit 5",
+    ]
+    assert result.metadata == {"count": 4, "files": 2, "truncated": False}
+    limited = tool.run(pattern="hit", output_mode="content", limit=2, after=0)
+    assert limited.output.splitlines()[:2] == [f"{a}:2:hit 1", "--"]
+    assert limited.metadata and limited.metadata["truncated"]
+    assert tool.run(pattern="(", output_mode="content").output.startswith("invalid pattern")
+
+
+def test_content_mode_without_rg_honours_line_anchors(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "m.py"
+    path.write_text("x = 1\ndef foo():\n    y = 1\r\n")
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    tool = GrepFilesTool(tmp_path)
+    assert tool.run(pattern=r"^def foo", output_mode="content").output == f"{path}:2:def foo():"
+    assert tool.run(pattern=r"x = 1$", output_mode="content").output == f"{path}:1:x = 1"
+    assert tool.run(pattern=r"\Adef", output_mode="content").output == f"{path}:2:def foo():"
+    # as in rg, "$" does not match before a CRLF's "\r"
+    assert tool.run(pattern=r"y = 1$", output_mode="content").output == "no matches"
+
+
+def test_rg_json_stream_is_cut_once_limit_is_reached(tmp_path: Path, monkeypatch) -> None:
+    events = [
+        json.dumps({"type": "begin", "data": {"path": {"text": "x.py"}}}),
+        _event("match", "x.py", 3, "hit"),
+        _event("context", "x.py", 4, "after"),
+        _event("match", "x.py", 5, "hit again"),
+        _event("context", "x.py", 6, "after 2"),
+        _event("context", "x.py", 7, "after 3"),
+        _event("context", "x.py", 9, "before next"),
+        _event("match", "x.py", 10, "never read"),
+    ]
+    fake = tmp_path / "bin" / "rg"
+    fake.parent.mkdir()
+    body = "".join(f"printf '%s\\n' '{event}'\n" for event in events)
+    fake.write_text(f"#!/bin/sh\n{body}exec sleep 30\n")
+    fake.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{fake.parent}{os.pathsep}{os.environ['PATH']}")
+    started = time.monotonic()
+    hits, truncated = rg_hits("hit", tmp_path, limit=2, after=2)
+    assert time.monotonic() - started < 10
+    assert truncated
+    assert [(hit.line, hit.match) for hit in hits] == [
+        (3, True), (4, False), (5, True), (6, False), (7, False)
+    ]
@@ -50,3 +50,117 @@ def test_llm_node_receives_context(monkeypatch) -> None:
 
     assert result.success
     assert result.output == "context-ok"
+
+
+class _BatchChat:
+    instances: list["_BatchChat"] = []
+
+    def __init__(self, **kwargs: object) -> None:
+        self.kwargs = kwargs
+        self.batches: list[tuple[list, dict]] = []
+        self.invokes: list = []
+        _BatchChat.instances.append(self)
+
+    def batch(self, inputs, config=None, return_exceptions=False):
+        self.batches.append((inputs, config))
+        return [types.SimpleNamespace(content=f"answer:{msgs[1]['content']}") for msgs in inputs]
+
+    def invoke(self, messages):
+        self.invokes.append(messages)
+        return types.SimpleNamespace(content='[{"label": "a"}, {"label": "b"}]')
+
+
+def test_llm_node_run_batch_coalesces_calls(monkeypatch) -> None:
+    _BatchChat.instances = []
+    monkeypatch.setattr(llm_node, "ChatOpenAI", _BatchChat)
+    tool = LlmNodeTool(Settings(openai_api_key="dummy-key", model="stub-model"))
+    calls = [{"system_prompt": "s", "user_message": f"item {i}"} for i in range(3)]
+    results = tool.run_batch(calls, max_concurrency=2)
+    assert [r.output for r in results] == ["answer:item 0", "answer:item 1", "answer:item 2"]
+    assert len(_BatchChat.instances) == 1
+    inputs, config = _BatchChat.instances[0].batches[0]
+    assert len(inputs) == 3 and config == {"max_concurrency": 2}
+    assert results[0].metadata["batch"] == "coalesced"
+
+
+def test_llm_node_run_batch_packs_items(monkeypatch) -> None:
+    _BatchChat.instances = []
+    monkeypatch.setattr(llm_node, "ChatOpenAI", _BatchChat)
+    tool = LlmNodeTool(Settings(openai_api_key="dummy-key", model="stub-model"))
+    schema = {"label": ""}
+    calls = [
+        {"system_prompt": "classify", "user_message": m, "json_schema": schema} for m in ("x", "y")
+    ]
+    results = tool.run_batch(calls, pack=2)
+    assert [r.output for r in results] == [{"label": "a"}, {"label": "b"}]
+    assert results[1].metadata["batch"] == "packed"
+    assert sum(len(chat.invokes) for chat in _BatchChat.instances) == 1
+
+    # A response that cannot be split per item falls back to coalesced requests.
+    three = calls + [{"system_prompt": "classify", "user_message": "z", "json_schema": schema}]
+    results = tool.run_batch(three, pack=3)
+    assert [r.metadata["batch"] for r in results] == ["coalesced"] * 3
+
+
+class _RateLimited(Exception):
+    status_code = 429
+    response = types.SimpleNamespace(status_code=429, headers={"retry-after": "0.01"})
+
+
+class _ThrottledChat:
+    batches: list[list[str]] = []
+
+    def __init__(self, **kwargs: object) -> None:
+        pass
+
+    def batch(self, inputs, config=None, return_exceptions=False):
+        messages = [msgs[1]["content"] for msgs in inputs]
+        _ThrottledChat.batches.append(messages)
+        # "b" is throttled once; "c" stays throttled; "d" fails for another reason.
+        return [
+            _RateLimited()
+            if m == "c" or (m == "b" and len(_ThrottledChat.batches) == 1)
+            else ValueError("bad request") if m == "d"
+            else types.SimpleNamespace(content=f"answer:{m}")
+            for m in messages
+        ]
+
+
+def test_llm_node_run_batch_resends_throttled_items(monkeypatch) -> None:
+    _ThrottledChat.batches = []
+    monkeypatch.setattr(llm_node, "ChatOpenAI", _ThrottledChat)
+    settings = Settings(
+        openai_api_key="dummy-key", model="throttled-model", llm_rate_limit_retries=2
+    )
+    tool = LlmNodeTool(settings)
+    results = tool.run_batch([{"system_prompt": "s", "user_message": m} for m in "abcd"])
+    assert _ThrottledChat.batches == [["a", "b", "c", "d"], ["b", "c"], ["c"]]
+    assert [r.success for r in results] == [True, True, False, False]
+    assert [r.output for r in results[:2]] == ["answer:a", "answer:b"]
+    assert results[2].output.startswith("_RateLimited")
+    assert results[3].output == "ValueError: bad request"
+    assert results[3].metadata["model"] == "throttled-model"
+
+
+def test_llm_node_run_batch_heuristic_without_key() -> None:
+    tool = LlmNodeTool(Settings(openai_api_key=None))
+    results = tool.run_batch([{"system_prompt": "s", "user_message": "one two"}], pack=4)
+    assert results[0].output == "one two"
+    assert results[0].metadata["model"] == "heuristic"
+
+
+def test_llm_node_reports_token_usage(monkeypatch) -> None:
+    class UsageChat:
+        def __init__(self, **_: object) -> None:
+            pass
+
+        def invoke(self, messages):
+            return types.SimpleNamespace(
+                content="ok",
+                usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15},
+            )
+
+    monkeypatch.setattr(llm_node, "ChatOpenAI", UsageChat)
+    tool = LlmNodeTool(Settings(openai_api_key="dummy-key", model="stub-model"))
+    result = tool.run(system_prompt="s", user_message="u")
+    assert result.metadata["usage"] == {"input_tokens": 12, "output_tokens": 3}
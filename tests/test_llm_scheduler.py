@@ -0,0 +1,106 @@
+import threading
+import time
+
+from codax.config import Settings
+from codax.llm_scheduler import LlmScheduler, get_scheduler, is_rate_limit_error
+from codax.tools import llm_node
+from codax.tools.llm_node import LlmNodeTool
+
+
+class _RateLimited(Exception):
+    def __init__(self, retry_after: str | None = None) -> None:
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        headers = {"retry-after": retry_after}
+        self.response = type("Resp", (), {"status_code": 429, "headers": headers})()
+
+
+def test_request_bucket_delays_when_exhausted() -> None:
+    scheduler = LlmScheduler(rpm=600)  # one request per 0.1s once the burst is spent
+    assert scheduler.acquire("m") < 0.05
+    scheduler._models["m"].requests.level = 0
+    waited = scheduler.acquire("m")
+    assert 0.05 <= waited < 1.0
+    metrics = scheduler.metrics()["m"]
+    assert metrics["granted"] == 2 and metrics["queue_depth"] == 0
+    assert metrics["wait_ms_max"] >= 50
+
+
+def test_token_bucket_limits_large_prompts() -> None:
+    scheduler = LlmScheduler(tpm=6000)  # 100 tokens/s
+    scheduler.acquire("m", tokens=6000)
+    started = time.monotonic()
+    scheduler.acquire("m", tokens=10)
+    assert time.monotonic() - started >= 0.05
+
+
+def test_interactive_calls_jump_ahead_of_batch() -> None:
+    scheduler = LlmScheduler(rpm=600)
+    scheduler.acquire("m")
+    scheduler._models["m"].requests.level = -1  # ~0.2s until the next admission
+    order: list[str] = []
+
+    def call(name: str, priority: str) -> None:
+        scheduler.acquire("m", priority=priority)
+        order.append(name)
+
+    threads = [threading.Thread(target=call, args=(f"batch{i}", "batch")) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    urgent = threading.Thread(target=call, args=("interactive", "interactive"))
+    urgent.start()
+    for thread in [*threads, urgent]:
+        thread.join()
+    assert order[0] == "interactive"
+    assert scheduler.metrics()["m"]["max_queue_depth"] == 3
+    assert scheduler.metrics()["m"]["by_priority"] == {"batch": 3, "interactive": 1}
+
+
+def test_rate_limit_errors_back_off_and_retry() -> None:
+    scheduler = LlmScheduler(max_retries=2)
+    calls = {"n": 0}
+
+    def flaky() -> str:
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise _RateLimited(retry_after="0.05")
+        return "ok"
+
+    started = time.monotonic()
+    assert scheduler.call("m", flaky) == "ok"
+    assert time.monotonic() - started >= 0.05
+    assert scheduler.metrics()["m"]["throttled"] == 1
+    assert is_rate_limit_error(_RateLimited())
+    assert not is_rate_limit_error(ValueError("boom"))
+
+
+def test_rate_limit_retries_are_bounded() -> None:
+    scheduler = LlmScheduler(max_retries=1)
+
+    def always() -> str:
+        raise _RateLimited(retry_after="0")
+
+    try:
+        scheduler.call("m", always)
+    except _RateLimited:
+        pass
+    else:  # pragma: no cover - the error must surface
+        raise AssertionError("expected rate limit error")
+    assert scheduler.metrics()["m"]["throttled"] == 1
+
+
+def test_llm_node_calls_go_through_shared_scheduler(monkeypatch) -> None:
+    class FakeChat:
+        def __init__(self, **_: object) -> None:
+            pass
+
+        def invoke(self, messages):
+            return type("Resp", (), {"content": "ok", "usage_metadata": None})()
+
+    monkeypatch.setattr(llm_node, "ChatOpenAI", FakeChat)
+    settings = Settings(openai_api_key="k", model="sched-model", llm_requests_per_minute=1000)
+    scheduler = get_scheduler(settings)
+    assert LlmNodeTool(settings).scheduler is scheduler
+    LlmNodeTool(settings).run(system_prompt="s", user_message="hi", priority="interactive")
+    assert scheduler.metrics()["sched-model"]["by_priority"]["interactive"] >= 1
@@ -16,6 +16,7 @@ from codax.tools import (
     ViewImageTool,
     WriteStdinTool,
 )
+from codax.tools.line_index import get_line_index
 
 
 def test_shell_command_runs(tmp_path: Path) -> None:
@@ -30,11 +31,15 @@ def test_exec_command_and_write_stdin(tmp_path: Path) -> None:
     result = exec_tool.run("echo ping", workdir=str(tmp_path))
     assert result.success
     assert "ping" in result.output
-    session_id = ExecCommandTool.create_session("init")
+    assert result.metadata["session_id"] is None
+    session = exec_tool.run("cat", workdir=str(tmp_path), yield_time_ms=100)
+    session_id = session.metadata["session_id"]
+    assert session.metadata["running"] and session_id
     writer = WriteStdinTool()
-    wres = writer.run(session_id, chars="more")
-    assert wres.success
+    wres = writer.run(session_id, chars="more\n", yield_time_ms=500)
+    assert wres.metadata["running"]
     assert "more" in wres.output
+    writer.run(session_id, chars="\x04")
 
 
 def test_apply_patch(tmp_path: Path) -> None:
@@ -86,6 +91,48 @@ def test_read_file_advanced(tmp_path: Path) -> None:
     assert "line2" in res.output
 
 
+def test_read_file_advanced_index_tracks_changes(tmp_path: Path) -> None:
+    f = tmp_path / "a.txt"
+    f.write_text("".join(f"line{i}\n" for i in range(1, 1001)), encoding="utf-8")
+    tool = ReadFileAdvancedTool()
+    res = tool.run(str(f), offset=500, limit=2)
+    assert res.output == "500: line500\n501: line501"
+    assert res.metadata["total_lines"] == 1000 and res.metadata["more"] is True
+    index = get_line_index(f)
+    assert index.line_count == 1000 and get_line_index(f) is index
+    f.write_text("first\r\nsecond", encoding="utf-8")  # size and mtime change
+    assert get_line_index(f) is not index
+    assert tool.run(str(f)).output == "1: first\n2: second"
+
+
+def test_read_file_advanced_indentation_mode(tmp_path: Path) -> None:
+    f = tmp_path / "m.py"
+    f.write_text(
+        "class Foo:\n"
+        "    @property\n"
+        "    def bar(self):\n"
+        "        x = 1\n"
+        "\n"
+        "        return x\n"
+        "\n"
+        "    def baz(self):\n"
+        "        return 2\n",
+        encoding="utf-8",
+    )
+    tool = ReadFileAdvancedTool()
+
+    def lines(**options) -> list[int]:
+        res = tool.run(str(f), mode="indentation", indentation=options)
+        return [int(line.split(":")[0]) for line in res.output.splitlines()]
+
+    assert lines(anchor_line=4) == [2, 3, 4, 5, 6]
+    assert lines(anchor_line=4, include_header=False) == [3, 4, 5, 6]
+    assert lines(anchor_line=4, max_levels=1) == list(range(1, 10))
+    assert lines(anchor_line=9, include_siblings=True) == list(range(2, 10))
+    assert lines(anchor_line=4, max_lines=2) == [2, 3]
+    assert not tool.run(str(f), mode="fancy").success
+
+
 def test_list_dir_advanced(tmp_path: Path) -> None:
     (tmp_path / "dir").mkdir()
     (tmp_path / "dir" / "f.txt").write_text("x", encoding="utf-8")
@@ -95,6 +142,40 @@ def test_list_dir_advanced(tmp_path: Path) -> None:
     assert "f.txt" in res.output
 
 
+def test_list_dir_pages_lazily_with_cursor(tmp_path: Path, monkeypatch) -> None:
+    for top in ("a", "b", "c"):
+        for sub in ("x", "y"):
+            (tmp_path / top / sub).mkdir(parents=True)
+            (tmp_path / top / sub / "f.txt").write_text("x", encoding="utf-8")
+    (tmp_path / "node_modules" / "dep").mkdir(parents=True)
+    tool = ListDirAdvancedTool(tmp_path)
+    full = tool.run(str(tmp_path), depth=3, limit=1000)
+    assert not full.metadata["more"]
+    assert f"{tmp_path / 'node_modules'}/ [dir]" in full.output and "dep" not in full.output
+
+    pages, cursor = [], None
+    while True:
+        page = tool.run(str(tmp_path), depth=3, limit=4, cursor=cursor)
+        pages += [line for line in page.output.splitlines() if not line.startswith("[more")]
+        cursor = page.metadata.get("cursor")
+        if cursor is None:
+            break
+        (tmp_path / "a" / "x" / "late.txt").write_text("x", encoding="utf-8")  # already passed
+    assert pages == full.output.splitlines()
+    now = tool.run(str(tmp_path), depth=3, limit=1000).output.splitlines()
+    assert tool.run(str(tmp_path), offset=3, limit=2, depth=3).output.splitlines()[:2] == now[2:4]
+
+    scanned = []
+    original = ListDirAdvancedTool._scan
+    monkeypatch.setattr(
+        ListDirAdvancedTool, "_scan", staticmethod(lambda d: scanned.append(d) or original(d))
+    )
+    first = tool.run(str(tmp_path), depth=3, limit=2)
+    assert first.metadata["more"] and len(scanned) == 3  # root, a/ and a/x/ only
+    assert not tool.run(str(tmp_path / "a"), cursor=first.metadata["cursor"]).success
+    assert not tool.run(str(tmp_path), cursor="bogus").success
+
+
 def test_view_image(tmp_path: Path) -> None:
     img = tmp_path / "img.png"
     img.write_bytes(b"\x89PNG")
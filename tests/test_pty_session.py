@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from codax.tools import ExecCommandTool, WriteStdinTool
+from codax.tools.pty_session import PtySession, get_session
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="needs a pty")
+
+
+def _send_until(writer: WriteStdinTool, session_id: int, chars: str, needle: str) -> str:
+    seen = writer.run(session_id, chars=chars).output.split("Output:\n", 1)[1]
+    deadline = time.monotonic() + 10
+    while needle not in seen and time.monotonic() < deadline:
+        seen += writer.run(session_id, yield_time_ms=100).output.split("Output:\n", 1)[1]
+    return seen
+
+
+def test_long_running_command_keeps_its_session(tmp_path: Path) -> None:
+    tool = ExecCommandTool(tmp_path)
+    writer = WriteStdinTool()
+    result = tool.run("echo start; sleep 30", yield_time_ms=300)
+    session_id = result.metadata["session_id"]
+    assert not result.success and result.metadata["running"]  # not done yet
+    assert result.output.startswith(f"Process running with session ID {session_id}")
+    assert "start" in result.output
+    # only new output on the next poll, and interrupting ends the process
+    assert "start" not in writer.run(session_id, yield_time_ms=50).output
+    done = writer.run(session_id, chars="\x03", yield_time_ms=5000)
+    assert done.metadata["running"] is False
+    assert done.metadata["returncode"] != 0
+    assert get_session(session_id) is None
+    assert writer.run(session_id).output == "session not found"
+
+
+def test_interactive_repl_and_terminal(tmp_path: Path) -> None:
+    tool = ExecCommandTool(tmp_path)
+    writer = WriteStdinTool()
+    result = tool.run(f"{sys.executable} -q -i", yield_time_ms=200)
+    session_id = result.metadata["session_id"]
+    line = "import os; print(os.isatty(0), 6 * 7)\n"
+    assert "True 42" in _send_until(writer, session_id, line, "True 42")
+    done = writer.run(session_id, chars="exit()\n", yield_time_ms=5000)
+    assert done.output.startswith("Process exited with code 0")
+    assert done.success
+
+
+def test_exit_status_shell_and_output_cap(tmp_path: Path) -> None:
+    tool = ExecCommandTool(tmp_path)
+    failed = tool.run("echo oops; exit 3")
+    assert not failed.success
+    assert failed.metadata == {
+        "session_id": None,
+        "returncode": 3,
+        "running": False,
+        "timed_out": False,
+        "wall_time": failed.metadata["wall_time"],
+        "truncated": False,
+    }
+    assert failed.output == "oops\n"  # blocking call: the bare output, as before
+    assert failed.metadata["wall_time"] < 5  # returns as soon as the command exits
+    shell = tool.run("echo $0", shell="/bin/sh", yield_time_ms=5000)
+    assert shell.output.startswith("Process exited with code 0\nOutput:\n")
+    assert "/bin/sh" in shell.output
+    capped = tool.run("seq 1 2000", max_output_tokens=10)
+    assert capped.metadata["truncated"]
+    assert capped.output.rstrip().endswith("2000")
+    assert "characters truncated" in capped.output
+
+
+def test_blocking_call_waits_and_times_out(tmp_path: Path) -> None:
+    slow = ExecCommandTool(tmp_path).run("sleep 1; echo done")
+    assert slow.success and slow.output == "done\n"
+    hung = ExecCommandTool(tmp_path, timeout_ms=300).run("echo partial; sleep 30")
+    assert not hung.success
+    assert hung.metadata["timed_out"] and hung.metadata["returncode"] is None
+    assert hung.output.startswith("partial\n[timed out after 0.3s")
+
+
+def test_sessions_start_concurrently_from_threads(tmp_path: Path) -> None:
+    tool = ExecCommandTool(tmp_path)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda n: tool.run(f"echo run-{n}"), range(24)))
+    assert [result.output for result in results] == [f"run-{n}\n" for n in range(24)]
+
+
+def test_character_split_across_reads_is_decoded_whole(tmp_path: Path) -> None:
+    script = (
+        "import os, time; os.write(1, b'\\xf0\\x9f'); time.sleep(0.5);"
+        " os.write(1, b'\\x98\\x80 done')"
+    )
+    session = PtySession([sys.executable, "-c", script], cwd=tmp_path)
+    try:
+        deadline = time.monotonic() + 5
+        text = ""
+        while not session._decoder.getstate()[0] and time.monotonic() < deadline:
+            text += session.read(0.05)[0]
+        assert text == ""  # only the first half arrived: nothing to show yet
+        while "done" not in text and time.monotonic() < deadline:
+            text += session.read(0.1)[0]
+        assert text == "\U0001f600 done"
+    finally:
+        session.close()
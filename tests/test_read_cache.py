@@ -0,0 +1,74 @@
+import os
+from pathlib import Path
+
+from codax.config import Settings
+from codax.tools import build_tool_registry
+from codax.tools.advanced import ReadFileAdvancedTool
+from codax.tools.filesystem import FsReadManyTool, FsReadTool
+from codax.tools.read_cache import ReadCache
+
+
+def _bump(path: Path, text: str) -> None:
+    before = path.stat().st_mtime_ns
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(before + 10**9, before + 10**9))
+
+
+def test_repeated_reads_return_marker_or_diff(tmp_path: Path) -> None:
+    target = tmp_path / "mod.py"
+    body = [f"line {i}\n" for i in range(40)]
+    target.write_text("".join(body), encoding="utf-8")
+    cache = ReadCache()
+    reader = FsReadTool(tmp_path, read_cache=cache)
+
+    assert reader.run("mod.py").output == "".join(body)
+    again = reader.run("mod.py")
+    assert again.metadata == {"unchanged": True}
+    assert again.output == "[mod.py is unchanged since you last read it; content omitted]"
+    assert reader.run("mod.py", lines=2).output == "line 0\nline 1\n"  # another window
+
+    body[20] = "line twenty\n"
+    _bump(target, "".join(body))
+    diff = reader.run("mod.py")
+    assert diff.metadata["diff"] is True
+    assert "-line 20\n+line twenty\n" in diff.output and "line 5\n" not in diff.output
+
+    _bump(target, "".join(body))  # touched only
+    assert reader.run("mod.py").metadata == {"unchanged": True}
+    assert reader.run("mod.py", dedup=False).output == "".join(body)
+
+    _bump(target, "rewritten\n")
+    assert reader.run("mod.py").output == "rewritten\n"  # diff would be larger than content
+    assert cache.stats == {"hits": 2, "diffs": 1, "misses": 4}
+
+
+def test_read_file_and_read_many_share_the_session_cache(tmp_path: Path) -> None:
+    (tmp_path / "a.txt").write_text("alpha\nbeta\n", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("gamma\n", encoding="utf-8")
+    cache = ReadCache(diffs=False)
+    read_file = ReadFileAdvancedTool(read_cache=cache)
+    path = str(tmp_path / "a.txt")
+    assert read_file.run(path).output == "1: alpha\n2: beta"
+    assert read_file.run(path).metadata == {"unchanged": True}
+    assert read_file.run(path, offset=2).output == "2: beta"
+
+    many = FsReadManyTool(tmp_path, read_cache=cache)
+    assert "gamma" in many.run(["a.txt", "b.txt"]).output
+    second = many.run(["a.txt", "b.txt"])
+    assert [entry.get("unchanged") for entry in second.metadata["files"]] == [True, True]
+    assert "alpha" in many.run(["a.txt"], dedup=False).output
+
+
+def test_cache_is_bounded_and_wired_per_registry(tmp_path: Path) -> None:
+    cache = ReadCache(max_chars=10)
+    reader = FsReadTool(tmp_path, read_cache=cache)
+    for name in ("one", "two", "three"):
+        (tmp_path / name).write_text(name * 2, encoding="utf-8")
+        reader.run(name)
+    assert reader.run("three").metadata == {"unchanged": True}
+    assert reader.run("one").output == "oneone"  # evicted
+
+    registry = build_tool_registry(Settings(workspace_root=tmp_path), read_cache=cache)
+    assert registry["fs_read"].read_cache is cache  # type: ignore[attr-defined]
+    plain = build_tool_registry(Settings(workspace_root=tmp_path))
+    assert plain["fs_read"].read_cache is None  # type: ignore[attr-defined]
@@ -0,0 +1,82 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from codax.symbol_index import SymbolIndex, parse_source
+from codax.tools.symbols import FindReferencesTool, FindSymbolTool
+from codax.workspace_index import close_workspace_indexes
+
+SOURCE = b'''\
+import os.path as osp
+from .base import Tool, helper as h
+
+
+@decorate
+class Parser(Tool):
+    def parse(self, text):
+        return helper(text)
+
+    async def close(self):
+        self.parse("")
+
+
+def helper(value):
+    return osp.join(value)
+'''
+
+
+@pytest.fixture(autouse=True)
+def _fresh_indexes():
+    close_workspace_indexes()
+    yield
+    close_workspace_indexes()
+
+
+def test_parse_source_spans_and_uses() -> None:
+    symbols, refs = parse_source(SOURCE)
+    assert [row[:5] for row in symbols] == [
+        ("osp", "os.path", "import", 1, 1),
+        ("Tool", ".base.Tool", "import", 2, 2),
+        ("h", ".base.helper", "import", 2, 2),
+        ("Parser", "Parser", "class", 5, 11),
+        ("parse", "Parser.parse", "method", 7, 8),
+        ("close", "Parser.close", "method", 10, 11),
+        ("helper", "helper", "function", 14, 15),
+    ]
+    assert refs["helper"] == [2, 24, 8, 15]  # the import and the call, not the def
+    assert refs["parse"] == [11, 13]  # attribute position, col of "parse"
+    assert parse_source(b"def broken(:\n") == ([], {})
+
+
+def test_tools_follow_file_changes(tmp_path: Path) -> None:
+    pkg = tmp_path / "pkg"
+    pkg.mkdir()
+    (pkg / "mod.py").write_bytes(SOURCE)
+    (pkg / "use.py").write_text("from pkg.mod import helper\n\nhelper(1)\n")
+    db = tmp_path / ".data" / "symbols.sqlite"
+    finder = FindSymbolTool(tmp_path, db)
+    result = finder.run("Parser.parse")
+    assert result.output == f"{pkg / 'mod.py'}:7-8 method Parser.parse"
+    assert result.metadata and result.metadata["spans"][0]["limit"] == 2
+    assert finder.run("helper", kind="function").output == f"{pkg / 'mod.py'}:14-15 function helper"
+    assert finder.run("Pars*", kind="class").metadata["count"] == 1
+    assert "import h = .base.helper" in finder.run("h").output
+    assert not finder.run("Missing").success
+
+    refs = FindReferencesTool(tmp_path, db).run("mod.helper")
+    assert refs.output.splitlines() == [
+        f"{pkg / 'mod.py'}:2:25: from .base import Tool, helper as h",
+        f"{pkg / 'mod.py'}:8:16: return helper(text)",
+        f"{pkg / 'use.py'}:1:21: from pkg.mod import helper",
+        f"{pkg / 'use.py'}:3:1: helper(1)",
+    ]
+
+    (pkg / "use.py").write_text("def helper():\n    pass\n")
+    stamp = os.stat(pkg / "use.py").st_mtime_ns + 1_000_000_000
+    os.utime(pkg / "use.py", ns=(stamp, stamp))
+    (pkg / "mod.py").unlink()
+    assert finder.run("helper").output == f"{pkg / 'use.py'}:1-2 function helper"
+    index = SymbolIndex(tmp_path, db)  # a new process reuses the parsed rows
+    assert index.find("helper")[0].path == "pkg/use.py"
+    assert index.stats["parsed"] == 0
@@ -39,3 +39,26 @@ def test_shell_tool_timeout(tmp_path) -> None:
     result = tool.run(f'"{sys.executable}" -c "import time; time.sleep(2)"', cwd=str(tmp_path))
     assert not result.success
     assert "timed out" in result.output or "Timeout" in result.output
+
+
+def test_run_process_timeout_kills_process_tree(tmp_path) -> None:
+    import subprocess
+    import time
+
+    import pytest
+
+    from codax.tools.process import ProcessScope, run_process
+
+    marker = tmp_path / "late.txt"
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_process(f"(sleep 1; touch {marker}) & wait", shell=True, timeout=0.2)
+    time.sleep(1.2)
+    assert not marker.exists()
+    assert time.monotonic() - started < 3
+
+    scope = ProcessScope()
+    scope.kill()
+    with scope.activate():
+        result = run_process("sleep 5", shell=True)
+    assert result.returncode != 0
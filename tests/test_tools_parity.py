@@ -3,17 +3,22 @@ from __future__ import annotations
 import json
 import subprocess
 from pathlib import Path
+from typing import Any, List
 
 import httpx
+import pytest
 
 from codax.config import Settings
-from codax.tools import build_tool_registry
+from codax.tools import build_tool_registry, filesystem
 from codax.tools.filesystem import (
+    EditFileTool,
     FsGlobTool,
     FsListTool,
     FsMkdirTool,
+    FsReadManyTool,
     FsReadTool,
     FsRemoveTool,
+    FsWriteManyTool,
     FsWriteTool,
 )
 from codax.tools.git_tools import (
@@ -58,6 +63,125 @@ def test_filesystem_tools(tmp_path: Path) -> None:
     assert removal.success is True
 
 
+def test_fs_read_many_orders_caps_and_budgets(tmp_path: Path) -> None:
+    for name in "abcd":
+        (tmp_path / f"{name}.txt").write_text(name * 10, encoding="utf-8")
+    (tmp_path / "big.txt").write_text("x" * 100, encoding="utf-8")
+    reader = FsReadManyTool(tmp_path, max_bytes=20, total_bytes=25, workers=3)
+    result = reader.run(
+        [{"path": "big.txt", "lines": 1}, "a.txt", "missing.txt", "b.txt", "c.txt"]
+    )
+    assert result.output.splitlines()[1:3] == ["==> a.txt <==", "aaaaaaaaaa"]
+    files = result.metadata["files"]
+    assert [entry["ok"] for entry in files] == [False, True, False, True, False]
+    assert files[0]["error"].startswith("Refusing to read")
+    assert files[2]["error"] == "File not found"
+    assert result.metadata["skipped"] == ["c.txt"] and result.metadata["bytes_read"] == 20
+    ranged = FsReadManyTool(tmp_path).run([{"path": "d.txt", "offset": 8}, {"bogus": 1}])
+    assert ranged.output.startswith("==> d.txt <==\ndd")
+    assert ranged.metadata["files"][1]["error"] == "Invalid item: unknown keys ['bogus']"
+
+
+def test_fs_read_many_does_not_read_past_the_budget(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    decoded: List[int] = []
+    real = filesystem._decode_range
+
+    def counting(data: Any, start: int, end: int, codec: str) -> str:
+        decoded.append(end - start)
+        return real(data, start, end, codec)
+
+    monkeypatch.setattr(filesystem, "_decode_range", counting)
+    for name, size in (("a", 10), ("big", 40), ("b", 5), ("huge", 90)):
+        (tmp_path / f"{name}.txt").write_text("x" * size, encoding="utf-8")
+    reader = FsReadManyTool(tmp_path, max_bytes=50, total_bytes=25, workers=4)
+    result = reader.run(["a.txt", "huge.txt", "big.txt", "b.txt"])
+    assert decoded == [10]
+    files = result.metadata["files"]
+    assert files[1]["error"].startswith("Refusing to read 90 bytes")
+    assert "(cap 50)" in files[1]["error"]
+    assert files[2] == {"path": "big.txt", "ok": False, "skipped": True, "size": 40}
+    assert result.metadata["skipped"] == ["big.txt", "b.txt"]
+    assert result.metadata["bytes_read"] == 10
+
+
+def test_fs_write_many_is_all_or_nothing(tmp_path: Path) -> None:
+    writer = FsWriteManyTool(tmp_path)
+    (tmp_path / "keep.txt").write_text("old", encoding="utf-8")
+    (tmp_path / "keep.txt").chmod(0o640)
+    result = writer.run(
+        [
+            {"path": "keep.txt", "content": "new"},
+            {"path": "a/b/c.txt", "content": "deep"},
+            {"path": "a/b/d.txt", "content": "sib"},
+            {"path": "log.txt", "content": "1\n", "append": True},
+        ]
+    )
+    assert result.success and result.metadata["directories_created"] == 1
+    assert (tmp_path / "keep.txt").read_text(encoding="utf-8") == "new"
+    assert (tmp_path / "keep.txt").stat().st_mode & 0o777 == 0o640
+    assert (tmp_path / "a/b/d.txt").read_text(encoding="utf-8") == "sib"
+    writer.run([{"path": "log.txt", "content": "2\n", "append": True}], durable=False)
+    assert (tmp_path / "log.txt").read_text(encoding="utf-8") == "1\n2\n"
+    assert not list(tmp_path.glob(".*.tmp"))
+
+    bad = writer.run([{"path": "keep.txt", "content": "lost"}, {"path": "../escape.txt"}])
+    assert not bad.success and "Nothing written" in bad.output
+    dup = writer.run([{"path": "x.txt", "content": "1"}, {"path": "x.txt", "content": "2"}])
+    for malformed in ([{"path": "x.txt", "content": "1"}, "y.txt"], [{"content": "1"}]):
+        invalid = writer.run(malformed)  # type: ignore[arg-type]
+        assert not invalid.success and "needs a path string" in invalid.output
+    assert not dup.success and not (tmp_path / "x.txt").exists()
+    assert (tmp_path / "keep.txt").read_text(encoding="utf-8") == "new"
+
+    # A failure while staging undoes everything, appends and new directories included.
+    failed = writer.run(
+        [
+            {"path": "log.txt", "content": "3\n", "append": True},
+            {"path": "new/dir/f.txt", "content": "x"},
+            {"path": "n" * 250, "content": "x"},  # its temp file name is too long
+        ]
+    )
+    assert not failed.success and "Nothing written" in failed.output
+    assert (tmp_path / "log.txt").read_text(encoding="utf-8") == "1\n2\n"
+    assert not (tmp_path / "new").exists()
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_fs_read_ranges_encodings_and_cap(tmp_path: Path) -> None:
+    (tmp_path / "log.txt").write_text("one\ntwo\nthree\n", encoding="utf-8")
+    reader = FsReadTool(tmp_path, max_bytes=64)
+    tail = reader.run("log.txt", tail=2)
+    assert tail.output == "two\nthree\n"
+    assert tail.metadata == {
+        "bytes_read": 10, "size": 14, "offset": 4, "end": 14, "encoding": "utf-8", "eof": True
+    }
+    assert reader.run("log.txt", offset=4, lines=1).output == "two\n"
+    assert reader.run("log.txt", offset=4, length=3).output == "two"
+
+    (tmp_path / "utf8.txt").write_bytes("héllo".encode())
+    # Offsets inside a multi-byte character move back to its first byte.
+    assert reader.run("utf8.txt", offset=2, length=2).output == "é"
+    (tmp_path / "utf16.txt").write_text("a\nb\nc\n", encoding="utf-16")
+    utf16 = reader.run("utf16.txt", tail=1)
+    assert utf16.output == "c\n" and utf16.metadata["encoding"] == "utf-16-le"
+    (tmp_path / "latin.txt").write_bytes("café".encode("latin-1"))
+    latin = reader.run("latin.txt")
+    assert latin.output == "café" and latin.metadata["encoding"] == "latin-1"
+    assert not reader.run("latin.txt", encoding="utf-8").success
+
+    (tmp_path / "big.txt").write_text("x" * 100 + "\nend\n")
+    capped = reader.run("big.txt")
+    assert not capped.success and "cap 64" in capped.output
+    assert reader.run("big.txt", tail=1).output == "end\n"
+    assert not reader.run("big.txt", tail=2).success
+    (tmp_path / "empty.txt").write_text("")
+    assert reader.run("empty.txt").output == ""
+    (tmp_path / "bin.dat").write_bytes(b"\0\1\2")
+    assert reader.run("bin.dat").output == "Binary file blocked"
+
+
 def test_shell_tool(tmp_path: Path) -> None:
     settings = Settings(workspace_root=tmp_path)
     registry = build_tool_registry(settings)
@@ -238,11 +362,17 @@ def test_build_tool_registry(tmp_path: Path) -> None:
         "write_stdin",
         "fs_read",
         "fs_write",
+        "fs_read_many",
+        "fs_write_many",
+        "edit_file",
         "fs_list",
         "fs_mkdir",
         "fs_remove",
         "fs_glob",
         "grep_files",
+        "find_symbol",
+        "find_references",
+        "retrieve_code",
         "read_file",
         "list_dir",
         "git_status",
@@ -265,3 +395,47 @@ def test_build_tool_registry(tmp_path: Path) -> None:
         "workflow_run",
     }
     assert set(registry) == expected_keys
+
+
+def test_edit_file_replaces_unique_blocks_atomically(tmp_path: Path) -> None:
+    editor = EditFileTool(tmp_path)
+    target = tmp_path / "app.py"
+    target.write_bytes(b"def f():\r\n    return 1\r\n\r\ndef g():\r\n    return 1\r\n")
+    target.chmod(0o755)
+
+    ambiguous = editor.run("app.py", old="    return 1", new="    return 2")
+    assert not ambiguous.success and "matches 2 times (lines [2, 5])" in ambiguous.output
+    missing = editor.run("app.py", old="return 3", new="return 4")
+    assert not missing.success and "not found" in missing.output
+
+    result = editor.run(
+        "app.py",
+        edits=[
+            {"old": "def g():\n    return 1", "new": "def g():\n    return 2"},
+            {"old": "f()", "new": "h()", "replace_all": True},
+        ],
+    )
+    assert result.success, result.output
+    assert result.metadata == {
+        "replacements": 2, "lines": [4, 1], "created": False, "bytes_written": 50
+    }
+    assert target.read_bytes() == b"def h():\r\n    return 1\r\n\r\ndef g():\r\n    return 2\r\n"
+    assert target.stat().st_mode & 0o777 == 0o755
+    assert not list(tmp_path.glob(".*.tmp"))
+
+    failed = editor.run(
+        "app.py", edits=[{"old": "def h", "new": "def k"}, {"old": "nope", "new": ""}]
+    )
+    assert not failed.success and failed.output.startswith("edit 2:")
+    assert b"def h" in target.read_bytes()
+
+    created = editor.run("new/mod.py", old="", new="x = 1\n")
+    assert created.metadata["created"] and (tmp_path / "new/mod.py").read_text() == "x = 1\n"
+    assert not editor.run("new/mod.py", old="", new="y").success
+    assert not editor.run("app.py", old="a", new="a").success
+
+    latin = tmp_path / "latin.txt"
+    latin.write_bytes(b"caf\xe9\n")
+    unencodable = editor.run("latin.txt", old="caf\xe9", new="caf\u2615", encoding="latin-1")
+    assert not unencodable.success and "Cannot encode" in unencodable.output
+    assert latin.read_bytes() == b"caf\xe9\n"
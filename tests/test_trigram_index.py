@@ -0,0 +1,143 @@
+import os
+import re
+import shutil
+from pathlib import Path
+
+import pytest
+
+from codax import trigram_index
+from codax.tools.advanced import GrepFilesTool
+from codax.trigram_index import TrigramIndex, regex_query, trigrams
+from codax.workspace_index import close_workspace_indexes
+
+
+@pytest.fixture(autouse=True)
+def _fresh_indexes():
+    close_workspace_indexes()
+    yield
+    close_workspace_indexes()
+
+
+def _tri(text: str) -> frozenset[int]:
+    return frozenset(trigrams(text.encode()))
+
+
+def test_regex_query_requires_literal_trigrams() -> None:
+    assert regex_query("needle") == [_tri("needle")]
+    assert regex_query(r"def\s+(parse_\w+)") == [_tri("def") | _tri("parse_")]
+    assert regex_query("foo|barbaz") == [_tri("foo"), _tri("barbaz")]
+    assert regex_query("(?:abc)+x") == [_tri("abc")]
+    assert regex_query("Needle", re.IGNORECASE) == [_tri("needle")]
+    assert regex_query(r"\w+") is None
+    assert regex_query("ab|cde") is None  # one branch can match without any trigram
+    assert regex_query("(?:abc)?") is None
+    assert regex_query("(") is None
+    # Case-insensitive literals with non-ASCII spellings (É/é, K/KELVIN SIGN) add nothing.
+    assert regex_query("(?i)ÉCOLE normale") == [_tri("cole normale")]
+    assert regex_query("(?i:Kelvin)-scale") == [_tri("elv") | _tri("-scale")]
+
+
+def _index(tmp_path: Path) -> TrigramIndex:
+    index = TrigramIndex(tmp_path, tmp_path / ".data" / "trigrams.sqlite")
+    index.workspace.refresh()
+    if not index.workspace.watching:
+        pytest.skip("trigram narrowing needs inotify")
+    return index
+
+
+def test_candidates_follow_incremental_changes(tmp_path: Path, monkeypatch) -> None:
+    (tmp_path / ".gitignore").write_text(".data/\n")
+    (tmp_path / "a.py").write_text("def parse_args(): pass\n")
+    (tmp_path / "b.py").write_text("def render(): pass\n")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "c.py").write_text("PARSE_ARGS = 1\n")
+    (tmp_path / "big.log").write_text("x" * 64)
+    monkeypatch.setattr(trigram_index, "MAX_FILE_BYTES", 32)
+    index = _index(tmp_path)
+    assert index.candidates("parse_args") is None  # nothing built yet: scan everything
+    assert index._builder is not None
+    index._builder.join(10)
+    names = lambda hits: [Path(hit).relative_to(tmp_path).as_posix() for hit in hits]  # noqa: E731
+    # big.log is over the size cap, so it is always a candidate.
+    assert names(index.candidates("parse_args")) == ["a.py", "big.log", "pkg/c.py"]
+    assert names(index.candidates("parse_args", rel="pkg")) == ["pkg/c.py"]
+    assert index.candidates(r"\d+") is None
+
+    (tmp_path / "b.py").write_text("def render(): parse_args()\n")
+    (tmp_path / "a.py").unlink()
+    assert names(index.candidates("parse_args")) == ["b.py", "big.log", "pkg/c.py"]
+    assert index.stats["updates"] == 1
+    # Two of three indexed files were replaced: a compacting rebuild was scheduled.
+    assert index._builder is not None
+    index._builder.join(10)
+    assert index.stats["builds"] == 2
+    assert names(index.candidates("render")) == ["b.py", "big.log"]
+    index.close()
+
+
+def test_grep_files_tool_verifies_narrowed_candidates(tmp_path: Path, monkeypatch) -> None:
+    (tmp_path / ".gitignore").write_text(".data/\n")
+    (tmp_path / "a.txt").write_text("needle in a haystack\n")
+    (tmp_path / "b.txt").write_text("ELDEEN needle? no: nee dle\n")
+    (tmp_path / "c.txt").write_text("hay\n")
+    db = tmp_path / ".data" / "trigrams.sqlite"
+    _index(tmp_path)
+    trigram_index.get_trigram_index(tmp_path, db).build()
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    tool = GrepFilesTool(tmp_path, trigram_db=db)
+    result = tool.run(pattern=r"needle\b")
+    assert result.output.splitlines() == [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
+    assert tool.run(pattern=r"nee\s+dle").output == str(tmp_path / "b.txt")
+    assert tool.run(pattern="haystack", include="*.py").output == "no matches"
+
+
+def test_anchored_patterns_agree_with_and_without_narrowing(tmp_path: Path, monkeypatch) -> None:
+    (tmp_path / ".gitignore").write_text(".data/\n")
+    (tmp_path / "a.py").write_text("x = 1\ndef foo():\n    pass\n")
+    (tmp_path / "b.py").write_text("call(def foo)\n")
+    db = tmp_path / ".data" / "trigrams.sqlite"
+    _index(tmp_path)
+    trigram_index.get_trigram_index(tmp_path, db).build()
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    a = str(tmp_path / "a.py")
+    for tool in (GrepFilesTool(tmp_path), GrepFilesTool(tmp_path, trigram_db=db)):
+        assert tool.run(pattern="^def foo").output == a
+        assert tool.run(pattern="x = 1$").output == a
+
+
+def test_narrowed_candidates_are_handed_to_rg(tmp_path: Path, monkeypatch) -> None:
+    (tmp_path / ".gitignore").write_text(".data/\nbin/\n")
+    (tmp_path / "a.py").write_text("def foo(): pass\n")
+    (tmp_path / "b.py").write_text("nothing here\n")
+    (tmp_path / "c.txt").write_text("def foo\n")
+    db = tmp_path / ".data" / "trigrams.sqlite"
+    _index(tmp_path)
+    trigram_index.get_trigram_index(tmp_path, db).build()
+    args = tmp_path / ".data" / "args"
+    fake = tmp_path / "bin" / "rg"
+    fake.parent.mkdir()
+    fake.write_text(f'#!/bin/sh\nprintf "%s\\n" "$@" > {args}\nexit 1\n')
+    fake.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{fake.parent}{os.pathsep}{os.environ['PATH']}")
+    tool = GrepFilesTool(tmp_path, trigram_db=db)
+    tool.run(pattern="^def foo", include="*.py")
+    assert args.read_text().split("\n")[-3:] == ["--", str(tmp_path / "a.py"), ""]
+    tool.run(pattern=r"\w+", include="*.py")  # no trigrams: rg walks the tree itself
+    assert args.read_text().split("\n")[-5:] == ["-g", "*.py", "--", str(tmp_path), ""]
+
+
+def test_case_insensitive_non_ascii_agrees_with_and_without_narrowing(
+    tmp_path: Path, monkeypatch
+) -> None:
+    (tmp_path / ".gitignore").write_text(".data/\n")
+    (tmp_path / "fr.txt").write_text("une école\n", encoding="utf-8")
+    (tmp_path / "si.txt").write_text("300 \u212aELVIN\n", encoding="utf-8")
+    (tmp_path / "en.txt").write_text("a school\n", encoding="utf-8")
+    db = tmp_path / ".data" / "trigrams.sqlite"
+    _index(tmp_path)
+    trigram_index.get_trigram_index(tmp_path, db).build()
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    for pattern, name in (("(?i)ÉCOLE", "fr.txt"), ("(?i)kelvin", "si.txt")):
+        plain = GrepFilesTool(tmp_path).run(pattern=pattern)
+        narrowed = GrepFilesTool(tmp_path, trigram_db=db).run(pattern=pattern)
+        assert plain.output == narrowed.output == str(tmp_path / name)
@@ -0,0 +1,179 @@
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from codax.cli import app
+from codax.tools.text_tools import AnalyzeTool
+from codax.tools.workflow_tools import WorkflowRunTool
+from codax.workflows import compiler
+from codax.workflows.planner import (
+    DEFAULT_LATENCY_MS,
+    load_history,
+    plan_workflow,
+    record_history,
+)
+from codax.workflows.profiler import WorkflowProfiler
+
+EXAMPLES = Path(__file__).resolve().parent.parent / "examples"
+
+
+def _llm(step_id: str, message: str, **extra) -> dict:
+    args = {"system_prompt": "sys", "user_message": message, "max_tokens": 100}
+    return {"id": step_id, "tool": "llm_node", "args": args, **extra}
+
+
+def test_plan_expands_known_loops_and_counts_llm_calls(tmp_path) -> None:
+    (tmp_path / "items.txt").write_text("a\nb\nc\nd\n")
+    definition = {
+        "steps": [
+            _llm("literal", "{{item}}", loop=["x", "y", "z"]),
+            _llm("from_param", "{{item}}", loop="{{TOPICS}}"),
+            _llm("from_file", "{{item}}", loop_file="items.txt"),
+            _llm("runtime", "{{item}}", loop="{{steps['literal'].output}}"),
+            _llm("packed", "{{item}}", loop=list(range(10)), batch={"pack": 5}),
+        ]
+    }
+    plan = plan_workflow(definition, tmp_path, params={"TOPICS": '["p", "q"]'})
+    counts = {step.step: (step.iterations, step.llm_calls) for step in plan.steps}
+    assert counts == {
+        "literal": (3, 3),
+        "from_param": (2, 2),
+        "from_file": (4, 4),
+        "runtime": (None, 1),
+        "packed": (10, 2),
+    }
+    assert plan.llm_calls == 12
+    assert plan.unknown_loops == ["runtime"]
+    assert plan.issues == []
+
+
+def test_plan_counts_loop_glob_like_the_runner(tmp_path) -> None:
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.md").write_text("a")
+    (tmp_path / "docs" / "b.md").write_text("b")
+    definition = {
+        "steps": [
+            _llm("docs", "{{item}}", loop_glob="docs/*.md"),
+            _llm("absolute", "{{item}}", loop_glob=str(tmp_path / "docs" / "*.md")),
+            _llm("parent", "{{item}}", loop_glob="../*.md"),
+        ]
+    }
+    plan = plan_workflow(definition, tmp_path)
+    counts = {step.step: step.iterations for step in plan.steps}
+    assert counts == {"docs": 2, "absolute": None, "parent": None}
+
+
+def test_plan_sizes_prompts_from_templates_and_context_keys(tmp_path) -> None:
+    long_param = "word " * 400  # ~500 tokens
+    definition = {
+        "steps": [
+            _llm("short", "hello"),
+            _llm("templated", "{{DOC}}"),
+            _llm("keyed", "hello", context_keys=["DOC", "short"]),
+        ]
+    }
+    plan = plan_workflow(definition, tmp_path, params={"DOC": long_param})
+    tokens = {step.step: step.prompt_tokens for step in plan.steps}
+    assert tokens["short"] < 10
+    assert tokens["templated"] >= 500
+    # DOC plus the max_tokens-sized output of ``short``.
+    assert tokens["keyed"] >= 500 + 100
+    assert plan.output_tokens == 300
+
+
+def test_plan_flags_unresolved_references_and_unknown_tools(tmp_path) -> None:
+    definition = {
+        "steps": [
+            _llm("early", "{{steps['late'].output}} {{MISSING}}", context_keys=["nope"]),
+            {"id": "late", "tool": "analyze", "args": {"text": "{{early}}"}},
+            {"id": "bogus", "tool": "no_such_tool", "args": {}},
+        ]
+    }
+    plan = plan_workflow(definition, tmp_path, tools=["llm_node", "analyze"])
+    assert plan.issues == [
+        "early: references steps['late'] which has not run yet",
+        "early: unresolved reference 'MISSING'",
+        "early: unresolved reference 'nope'",
+        "bogus: unknown tool 'no_such_tool'",
+    ]
+
+
+def test_plan_uses_recorded_history_for_serial_and_parallel_time(tmp_path) -> None:
+    profiler = WorkflowProfiler()
+    runner = WorkflowRunTool(tmp_path, profiler=profiler)
+    run_def = {"steps": [{"id": "a", "tool": "analyze", "args": {"text": "one two"}}]}
+    assert runner.run("", registry={"analyze": AnalyzeTool()}, definition=run_def).success
+    history_path = record_history(tmp_path / "history.json", profiler.to_dict())
+    record_history(history_path, profiler.to_dict())
+    history = load_history(history_path)
+    assert history["analyze"].calls == 2
+
+    definition = {
+        "steps": [
+            _llm("left", "a"),
+            _llm("right", "b"),
+            _llm("join", "{{left}} {{right}}"),
+            {"id": "stats", "tool": "analyze", "args": {"text": "{{join}}"}},
+        ]
+    }
+    plan = plan_workflow(definition, tmp_path, history=history)
+    llm_ms = DEFAULT_LATENCY_MS["llm_node"]
+    stats = plan.steps[-1]
+    assert stats.latency_source == "history n=2" and stats.call_ms == history["analyze"].wall_ms
+    assert plan.serial_ms == 3 * llm_ms + stats.call_ms
+    assert plan.parallel_ms == 2 * llm_ms + stats.call_ms
+    assert plan.critical_path[-2:] == ["join", "stats"]
+
+
+def test_plan_expands_sub_workflows(tmp_path) -> None:
+    lib = tmp_path / "lib.yaml"
+    lib.write_text(
+        "steps:\n"
+        "  - id: ask\n"
+        "    tool: llm_node\n"
+        "    args: {system_prompt: s, user_message: '{{TOPIC}} {{OTHER}}', max_tokens: 50}\n",
+        encoding="utf-8",
+    )
+    definition = {
+        "steps": [
+            {
+                "id": "fan",
+                "workflow": "lib.yaml",
+                "loop": ["a", "b", "c", "d"],
+                "parallel": 2,
+                "inputs": {"TOPIC": "{{item}}"},
+            }
+        ]
+    }
+    plan = plan_workflow(definition, tmp_path)
+    fan = plan.steps[0]
+    assert (fan.iterations, fan.llm_calls, fan.output_tokens) == (4, 4, 200)
+    assert fan.serial_ms == 4 * DEFAULT_LATENCY_MS["llm_node"]
+    assert fan.wall_ms == 2 * DEFAULT_LATENCY_MS["llm_node"]
+    assert plan.issues == ["fan: lib.yaml: ask: unresolved reference 'OTHER'"]
+
+
+def test_example_workflow_plans_cleanly_with_params() -> None:
+    definition = compiler.load_workflow(EXAMPLES / "ttd_workflow.yaml")
+    plan = plan_workflow(definition, EXAMPLES.parent, params={"FEATURE": "dark mode"})
+    assert plan.issues == []
+    assert plan.llm_calls == 5
+    assert 0 < plan.parallel_ms < plan.serial_ms
+
+
+def test_cli_plan_reports_without_running(tmp_path) -> None:
+    wf = tmp_path / "wf.yaml"
+    wf.write_text(
+        "steps:\n"
+        "  - id: write\n"
+        "    tool: fs_write\n"
+        "    args: {path: out.txt, content: '{{NAME}}'}\n",
+        encoding="utf-8",
+    )
+    result = CliRunner().invoke(app, ["workflow", str(wf), "--plan"])
+    assert result.exit_code == 1
+    assert "unresolved reference 'NAME'" in result.stdout
+    ok = CliRunner().invoke(app, ["workflow", str(wf), "--plan", "-p", "NAME=x"])
+    assert ok.exit_code == 0, ok.stdout
+    assert "expected wall time" in ok.stdout
+    assert not (tmp_path / "out.txt").exists()
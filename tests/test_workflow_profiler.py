@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from codax.cli import app
+from codax.config import get_settings
+from codax.tools.base import Tool, ToolResult
+from codax.tools.text_tools import AnalyzeTool
+from codax.tools.workflow_tools import WorkflowRunTool
+from codax.workflows import compiler
+from codax.workflows.graph import critical_path, dependency_graph, dependents
+from codax.workflows.profiler import WorkflowProfiler
+
+EXAMPLES = Path(__file__).resolve().parent.parent / "examples"
+
+
+def test_dependency_graph_from_templates_assign_and_context_keys() -> None:
+    definition = {
+        "steps": [
+            {"id": "scan", "tool": "fs_list", "args": {"path": "src"}},
+            {"id": "read", "tool": "fs_read", "args": {"path": "x"}, "assign": "text"},
+            {
+                "id": "plan",
+                "tool": "llm_node",
+                "args": {"user_message": "{{steps['scan'].output}}"},
+            },
+            {
+                "id": "echo",
+                "tool": "shell",
+                "args": {"command": "echo {{text}}"},
+                "when": "plan != None",
+            },
+            {"id": "wrap", "tool": "llm_node", "context_keys": ["echo"]},
+        ]
+    }
+    graph = dependency_graph(definition)
+    assert graph == {
+        "scan": [], "read": [], "plan": ["scan"], "echo": ["plan", "read"], "wrap": ["echo"]
+    }
+    assert dependents(graph, ["read"]) == {"read", "echo", "wrap"}
+    path, total = critical_path(graph, {"scan": 5, "read": 1, "plan": 10, "echo": 1, "wrap": 2})
+    assert path == ["scan", "plan", "echo", "wrap"]
+    assert total == 18
+
+
+def test_dependency_graph_of_example_workflow() -> None:
+    definition = compiler.load_workflow(EXAMPLES / "ttd_workflow.yaml")
+    graph = dependency_graph(definition)
+    assert graph["PlanSubtasks"] == ["DecomposeFeature"]
+    assert set(graph["WrapUp"]) == {"FirstTestRun", "PassingTestRun", "Plan"}
+
+
+def test_profiler_records_steps_iterations_and_critical_path(tmp_path) -> None:
+    definition = {
+        "steps": [
+            {"id": "a", "tool": "analyze", "args": {"text": "one two"}},
+            {"id": "b", "tool": "analyze", "loop": ["x", "y"], "args": {"text": "{{a}} {{item}}"}},
+        ]
+    }
+    profiler = WorkflowProfiler()
+    runner = WorkflowRunTool(tmp_path, profiler=profiler)
+    assert runner.run("", registry={"analyze": AnalyzeTool()}, definition=definition).success
+    profiler.finish()
+    data = profiler.to_dict(definition)
+    steps = {item["step"]: item for item in data["steps"]}
+    assert steps["b"]["iterations"] == 2 and len(steps["b"]["samples"]) == 2
+    assert steps["a"]["bytes_in"] > 0 and steps["a"]["bytes_out"] > 0
+    assert data["critical_path"]["steps"] == ["a", "b"]
+    report = profiler.report(definition, top=1)
+    assert "critical path" in report and "top 1 slowest" in report
+
+    out = profiler.write_json(tmp_path / "p.json", definition)
+    assert json.loads(out.read_text())["version"] == 1
+
+
+class _SleepTool(Tool):
+    name = "sleep"
+    description = "Sleep without using CPU."
+
+    def run(self, seconds: float) -> ToolResult:
+        time.sleep(seconds)
+        return ToolResult(output="slept", success=True)
+
+
+def test_profiler_cpu_time_excludes_other_threads(tmp_path) -> None:
+    stop = threading.Event()
+
+    def spin() -> None:
+        while not stop.is_set():
+            pass
+
+    profiler = WorkflowProfiler()
+    runner = WorkflowRunTool(tmp_path, profiler=profiler)
+    definition = {"steps": [{"id": "nap", "tool": "sleep", "args": {"seconds": 0.3}}]}
+    spinner = threading.Thread(target=spin)
+    spinner.start()
+    try:
+        assert runner.run("", registry={"sleep": _SleepTool()}, definition=definition).success
+    finally:
+        stop.set()
+        spinner.join()
+    assert profiler.steps["nap"].wall_ms >= 300
+    assert profiler.steps["nap"].cpu_ms < 100
+
+
+def test_profiler_names_unnamed_steps_like_the_graph(tmp_path) -> None:
+    definition = {
+        "steps": [
+            {"tool": "analyze", "args": {"text": "one"}},
+            {"tool": "analyze", "args": {"text": "two"}},
+        ]
+    }
+    profiler = WorkflowProfiler()
+    runner = WorkflowRunTool(tmp_path, profiler=profiler)
+    result = runner.run("", registry={"analyze": AnalyzeTool()}, definition=definition)
+    assert result.success
+    assert set(result.metadata["context"]["steps"]) == {"#0", "#1"}
+    profiler.finish()
+    data = profiler.to_dict(definition)
+    assert sorted(item["step"] for item in data["steps"]) == ["#0", "#1"]
+    assert set(data["critical_path"]["steps"]) <= {"#0", "#1"}
+
+
+def test_cli_workflow_profile_writes_json(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    get_settings.cache_clear()  # the CLI must see DATA_DIR, not settings cached earlier
+    history = tmp_path / "data" / "profiles" / "tool_latency.json"
+    wf = tmp_path / "wf.yaml"
+    wf.write_text(
+        "steps:\n  - id: a\n    tool: analyze\n    args:\n      text: hi\n", encoding="utf-8"
+    )
+    plain = CliRunner().invoke(app, ["workflow", str(wf)])
+    assert plain.exit_code == 0, plain.stdout
+    assert not history.exists()  # only profiled runs record latency history
+    out = tmp_path / "profile.json"
+    result = CliRunner().invoke(app, ["workflow", str(wf), "--profile", "--profile-out", str(out)])
+    assert result.exit_code == 0, result.stdout
+    assert "critical path" in result.stdout
+    assert json.loads(out.read_text())["steps"][0]["step"] == "a"
+    assert history.exists()
+    get_settings.cache_clear()
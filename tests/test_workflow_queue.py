@@ -0,0 +1,199 @@
+import threading
+import time
+
+from codax.config import Settings
+from codax.tools.workflow_tools import StepRecord
+from codax.workflows import distributed
+from codax.workflows.distributed import (
+    WorkflowCoordinator,
+    decode_context,
+    default_queue_path,
+    dispatch_graph,
+    encode_context,
+    run_worker,
+)
+from codax.workflows.graph import dependency_graph
+from codax.workflows.queue import SqliteStepQueue
+
+
+def _settings(tmp_path) -> Settings:
+    return Settings(
+        workspace_root=tmp_path, data_dir=tmp_path / "data", config_file=tmp_path / "config.toml"
+    )
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(tmp_path) -> None:
+    queue = SqliteStepQueue(tmp_path / "q.sqlite")
+    queue.publish("run", "run:a", {"step": {"id": "a"}})
+    first = queue.claim("w1", lease_seconds=0.05)
+    assert first is not None and first.attempts == 1
+    assert queue.claim("w2", lease_seconds=5) is None
+    time.sleep(0.1)
+    second = queue.claim("w2", lease_seconds=5)
+    assert second is not None and second.id == "run:a" and second.attempts == 2
+    assert not queue.heartbeat("run:a", "w1", 5)
+    assert not queue.complete("run:a", "w1", {"success": True})
+    assert queue.complete("run:a", "w2", {"success": True, "output": "ok"})
+    assert queue.results(["run:a"]) == {"run:a": {"success": True, "output": "ok"}}
+    queue.purge("run")
+    assert queue.results(["run:a"]) == {}
+
+
+def test_task_fails_after_max_lease_expiries(tmp_path) -> None:
+    queue = SqliteStepQueue(tmp_path / "q.sqlite", max_attempts=1)
+    queue.publish("run", "run:a", {})
+    assert queue.claim("w1", lease_seconds=0.01) is not None
+    time.sleep(0.05)
+    assert queue.claim("w2", lease_seconds=5) is None
+    assert queue.results(["run:a"])["run:a"]["success"] is False
+
+
+def test_context_roundtrip_keeps_step_records() -> None:
+    context = {"x": 1, "steps": {"a": StepRecord(output="out", metadata={"k": 1}, success=True)}}
+    decoded = decode_context(encode_context(context))
+    assert decoded["steps"]["a"] == context["steps"]["a"]
+
+
+def test_depends_on_adds_ordering_edges() -> None:
+    definition = {"steps": [{"id": "a"}, {"id": "b"}, {"id": "c", "depends_on": ["a", "b"]}]}
+    assert dependency_graph(definition) == {"a": [], "b": [], "c": ["a", "b"]}
+
+
+def test_steps_without_depends_on_keep_definition_order() -> None:
+    definition = {
+        "steps": [
+            {"id": "write", "tool": "fs_write"},
+            {"id": "test", "tool": "shell"},
+            {"id": "x", "depends_on": []},
+            {"id": "y", "depends_on": ["x"], "args": {"v": "{{write}}"}},
+        ]
+    }
+    assert dispatch_graph(definition) == {
+        "write": [], "test": ["write"], "x": [], "y": ["write", "x"]
+    }
+
+
+def test_coordinator_fails_when_no_worker_holds_the_steps(tmp_path) -> None:
+    queue = SqliteStepQueue(tmp_path / "q.sqlite")
+    coordinator = WorkflowCoordinator(queue, poll_interval=0.01, stall_timeout=0.2)
+    started = time.monotonic()
+    result = coordinator.run({"steps": [{"id": "a", "tool": "fs_read", "args": {"path": "x"}}]})
+    assert not result.success
+    assert "no worker held steps ['a']" in result.output
+    assert time.monotonic() - started < 5
+
+    # A worker that claimed the step and died: its lease expires and nobody renews it.
+    queue.publish("run", "run:a", {"step": {"id": "a"}})
+    assert queue.claim("dead", lease_seconds=0.05) is not None
+    assert queue.leased(["run:a"])
+    time.sleep(0.1)
+    assert not queue.leased(["run:a"])
+
+
+def test_coordinator_runs_steps_on_workers(tmp_path) -> None:
+    (tmp_path / "one.txt").write_text("first", encoding="utf-8")
+    (tmp_path / "two.txt").write_text("second", encoding="utf-8")
+    settings = _settings(tmp_path)
+    queue_path = tmp_path / "q.sqlite"
+    stop = threading.Event()
+    counts: list[int] = []
+
+    def serve() -> None:
+        worker_queue = SqliteStepQueue(queue_path)
+        counts.append(run_worker(worker_queue, settings, stop=stop, poll_interval=0.01))
+        worker_queue.close()
+
+    workers = [threading.Thread(target=serve) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    definition = {
+        "steps": [
+            {"id": "a", "tool": "fs_read", "args": {"path": "one.txt"}, "assign": "first"},
+            {"id": "b", "tool": "fs_read", "args": {"path": "two.txt"}},
+            {
+                "id": "c",
+                "tool": "fs_write",
+                "args": {"path": "out.txt", "content": "{{first}}+{{b}}"},
+            },
+        ]
+    }
+    events: list[dict] = []
+    try:
+        result = WorkflowCoordinator(SqliteStepQueue(queue_path)).run(
+            definition, on_event=events.append
+        )
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+    assert result.success, result.output
+    assert (tmp_path / "out.txt").read_text(encoding="utf-8") == "first+second"
+    assert result.metadata["context"]["steps"]["c"].success
+    assert sum(counts) == 3
+    # No depends_on: each step is published only after the previous one finished.
+    assert [(e["type"], e["step"]) for e in events] == [
+        (kind, sid) for sid in "abc" for kind in ("step_queued", "step_done")
+    ]
+
+
+def test_coordinator_reports_step_failure(tmp_path) -> None:
+    settings = _settings(tmp_path)
+    queue = SqliteStepQueue(tmp_path / "q.sqlite")
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=run_worker, args=(SqliteStepQueue(tmp_path / "q.sqlite"), settings),
+        kwargs={"stop": stop, "poll_interval": 0.01},
+    )
+    worker.start()
+    try:
+        result = WorkflowCoordinator(queue).run(
+            {"steps": [{"id": "a", "tool": "fs_read", "args": {"path": "missing.txt"}}]}
+        )
+    finally:
+        stop.set()
+        worker.join()
+    assert not result.success
+    assert "step a failed" in result.output
+
+
+def test_workers_refuse_other_workspaces_and_adopt_step_safety(tmp_path, monkeypatch) -> None:
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "in.txt").write_text("from a", encoding="utf-8")
+    coordinator_settings = _settings(tmp_path / "a")
+    coordinator_settings.allow_network = False
+    assert default_queue_path(coordinator_settings) != default_queue_path(
+        _settings(tmp_path / "b")
+    )
+    queue_path = tmp_path / "shared.sqlite"
+    definition = {"steps": [{"id": "a", "tool": "fs_read", "args": {"path": "in.txt"}}]}
+
+    def run_against(worker_settings: Settings):
+        stop = threading.Event()
+        worker = threading.Thread(
+            target=run_worker,
+            args=(SqliteStepQueue(queue_path), worker_settings),
+            kwargs={"stop": stop, "poll_interval": 0.01},
+        )
+        worker.start()
+        try:
+            coordinator = WorkflowCoordinator(
+                SqliteStepQueue(queue_path), settings=coordinator_settings
+            )
+            return coordinator.run(definition)
+        finally:
+            stop.set()
+            worker.join()
+
+    refused = run_against(_settings(tmp_path / "b"))
+    assert not refused.success and "refused a step for workspace" in refused.output
+
+    seen: list[Settings] = []
+    real_build = distributed.build_tool_registry
+    monkeypatch.setattr(
+        distributed, "build_tool_registry", lambda s: seen.append(s) or real_build(s)
+    )
+    ok = run_against(_settings(tmp_path / "a"))  # the worker itself allows network
+    assert ok.success, ok.output
+    assert ok.metadata["context"]["steps"]["a"].output == "from a"
+    assert [s.allow_network for s in seen] == [False]
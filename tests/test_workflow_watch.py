@@ -0,0 +1,130 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from codax.config import Settings
+from codax.fswatch import InotifyWatcher, PollingWatcher, create_watcher, wait_for_changes
+from codax.tools.filesystem import FsReadTool, FsWriteTool
+from codax.tools.text_tools import AnalyzeTool
+from codax.workflows.compiler import CompiledWorkflow
+from codax.workflows.watch import WatchSession, affected_steps, step_paths, watch_workflow
+
+DEFINITION = {
+    "steps": [
+        {"id": "read_a", "tool": "fs_read", "args": {"path": "src/a.txt"}},
+        {"id": "stats", "tool": "analyze", "args": {"text": "{{steps['read_a'].output}}"}},
+        {
+            "id": "write",
+            "tool": "fs_write",
+            "args": {"path": "out/report.txt", "content": "{{stats}}"},
+        },
+        {"id": "read_report", "tool": "fs_read", "args": {"path": "out/report.txt"}},
+        {"id": "read_b", "tool": "fs_read", "args": {"path": "./src/b.txt"}},
+    ]
+}
+
+
+def _session(tmp_path: Path) -> WatchSession:
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.txt").write_text("alpha beta")
+    (tmp_path / "src" / "b.txt").write_text("gamma")
+    settings = Settings(workspace_root=tmp_path, data_dir=tmp_path / ".data")
+    registry = {
+        "fs_read": FsReadTool(tmp_path),
+        "fs_write": FsWriteTool(tmp_path),
+        "analyze": AnalyzeTool(),
+    }
+    return WatchSession(CompiledWorkflow(dict(DEFINITION), settings), registry=registry)
+
+
+@pytest.mark.parametrize(
+    "factory", [lambda root: PollingWatcher(root, interval=0.05), InotifyWatcher]
+)
+def test_watchers_report_writes(tmp_path, factory) -> None:
+    (tmp_path / "node_modules").mkdir()
+    with factory(tmp_path) as watcher:
+        (tmp_path / "node_modules" / "x.js").write_text("ignored")
+        (tmp_path / "new").mkdir()
+        (tmp_path / "new" / "file.txt").write_text("hello")
+        changed = wait_for_changes(watcher, debounce=0.2, timeout=5)
+    assert tmp_path / "new" / "file.txt" in changed
+    assert not any("node_modules" in path.parts for path in changed)
+
+
+def test_wait_for_changes_debounces_bursts(tmp_path) -> None:
+    watcher = create_watcher(tmp_path, poll_interval=0.05)
+
+    def burst() -> None:
+        for index in range(3):
+            (tmp_path / f"f{index}.txt").write_text(str(index))
+            time.sleep(0.05)
+
+    thread = threading.Thread(target=burst)
+    thread.start()
+    changed = wait_for_changes(watcher, debounce=0.3, timeout=5)
+    thread.join()
+    watcher.close()
+    assert {path.name for path in changed} == {"f0.txt", "f1.txt", "f2.txt"}
+
+
+def test_step_paths_cover_args_shell_and_watch(tmp_path) -> None:
+    (tmp_path / "tmp" / "tests").mkdir(parents=True)
+    step = {
+        "tool": "shell",
+        "args": {"command": "cd tmp/tests && pytest missing/dir"},
+        "watch": ["docs/*.md"],
+        "loop_file": "{{list}}",
+    }
+    paths = step_paths(step, {"list": "items.txt"}, tmp_path)
+    assert paths == ["tmp/tests", "items.txt", "docs/*.md"]
+
+
+def test_affected_steps_follow_outputs_and_written_files(tmp_path) -> None:
+    root = tmp_path
+    ids = affected_steps(DEFINITION, {}, [root / "src" / "a.txt"], root)
+    assert ids == ["read_a", "stats", "write", "read_report"]
+    assert affected_steps(DEFINITION, {}, [root / "src" / "b.txt"], root) == ["read_b"]
+    # A writer is not re-triggered by its own output file, but later readers are.
+    assert affected_steps(DEFINITION, {}, [root / "out" / "report.txt"], root) == ["read_report"]
+    assert affected_steps(DEFINITION, {}, [root / "elsewhere.txt"], root) == []
+    assert len(affected_steps(DEFINITION, {}, [root], root)) == len(DEFINITION["steps"])
+
+
+def test_run_slice_reuses_context(tmp_path) -> None:
+    session = _session(tmp_path)
+    assert session.run_all().success
+    (tmp_path / "src" / "b.txt").write_text("delta epsilon")
+    ids = session.affected([tmp_path / "src" / "b.txt"])
+    result = session.run_slice(ids)
+    assert result.success
+    assert [line.split(":")[0] for line in result.metadata["transcript"]] == ["read_b"]
+    assert session.context["steps"]["read_b"].output == "delta epsilon"
+    assert session.context["steps"]["read_a"].output == "alpha beta"
+
+
+def test_watch_workflow_reruns_affected_slice(tmp_path) -> None:
+    session = _session(tmp_path)
+    results: list = []
+    stop = threading.Event()
+
+    def on_result(ids, result) -> None:
+        results.append((ids, result.success))
+        if len(results) == 1:  # the watcher starts after the initial run reports
+            edit = lambda: (tmp_path / "src" / "a.txt").write_text("changed text here")  # noqa: E731
+            threading.Timer(0.5, edit).start()
+        else:
+            stop.set()
+
+    thread = threading.Thread(
+        target=watch_workflow,
+        args=(session, on_result),
+        kwargs={"debounce": 0.1, "stop": stop, "force_polling": True},
+    )
+    thread.start()
+    thread.join(timeout=15)
+    stop.set()
+    assert results[0] == (None, True)
+    assert results[1] == (["read_a", "stats", "write", "read_report"], True)
+    assert session.context["steps"]["read_a"].output == "changed text here"
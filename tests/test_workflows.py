@@ -1,11 +1,14 @@
 import json
+import os
+from typing import Any
 
 from codax.config import Settings
-from codax.tools.llm_node import LlmNodeTool
-from codax.tools.workflow_tools import StepRecord, _render_value, _select_context, WorkflowRunTool
+from codax.tools import build_tool_registry
 from codax.tools.base import Tool, ToolResult
-from typing import Any
+from codax.tools.llm_node import LlmNodeTool
+from codax.tools.workflow_tools import StepRecord, WorkflowRunTool, _render_value, _select_context
 from codax.workflows import compiler
+from codax.workflows.profiler import WorkflowProfiler
 
 
 def test_load_workflow_parses_json(tmp_path) -> None:
@@ -72,3 +75,483 @@ def test_tools_star_expands_in_runner(tmp_path) -> None:
     assert result.success
     assert isinstance(echo.seen_tools, list)
     assert set(echo.seen_tools) == set(registry.keys())
+
+
+def test_workflow_cache_hits_memory_then_disk(tmp_path) -> None:
+    from codax.workflows.cache import WorkflowCache
+
+    wf = tmp_path / "wf.yaml"
+    wf.write_text("steps:\n  - id: a\n    tool: analyze\n", encoding="utf-8")
+    cache = WorkflowCache(tmp_path / "cache")
+    first = cache.load(wf)
+    assert first["steps"][0]["id"] == "a"
+    assert cache.load(wf) is first
+    assert cache.stats == {"memory": 1, "disk": 0, "parsed": 1}
+
+    # A fresh process-equivalent cache reuses the on-disk entry without parsing.
+    other = WorkflowCache(tmp_path / "cache")
+    assert other.load(wf) == first
+    assert other.stats["disk"] == 1 and other.stats["parsed"] == 0
+
+
+def test_workflow_cache_reparses_changed_content(tmp_path) -> None:
+    import os
+
+    from codax.workflows.cache import WorkflowCache
+
+    wf = tmp_path / "wf.json"
+    wf.write_text(json.dumps({"steps": []}), encoding="utf-8")
+    cache = WorkflowCache()
+    cache.load(wf)
+    stat = wf.stat()
+    # Touch without changing content: hash matches, no re-parse.
+    os.utime(wf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    cache.load(wf)
+    assert cache.stats["parsed"] == 1
+    wf.write_text(json.dumps({"steps": [{"id": "x", "tool": "analyze"}]}), encoding="utf-8")
+    assert cache.load(wf)["steps"][0]["id"] == "x"
+    assert cache.stats["parsed"] == 2
+
+
+def test_workflow_cache_rejects_invalid_definition(tmp_path) -> None:
+    import pytest
+
+    from codax.workflows.cache import WorkflowCache
+
+    wf = tmp_path / "wf.json"
+    wf.write_text(json.dumps({"steps": "nope"}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        WorkflowCache().load(wf)
+
+
+def test_compiled_workflow_does_not_reread_source(tmp_path) -> None:
+    wf_path = tmp_path / "wf.json"
+    step = {"id": "a", "tool": "analyze", "args": {"text": "x y"}}
+    wf_path.write_text(json.dumps({"steps": [step]}))
+    settings = Settings(workspace_root=tmp_path, data_dir=tmp_path / "data")
+    compiled = compiler.load_and_compile(wf_path, settings=settings)
+    wf_path.unlink()
+    result = compiled.run()
+    assert result["success"] is True
+    assert result["metadata"]["context"]["a"] == "words=2, characters=3, reading_time_minutes=0.01"
+
+
+class _FlakyTool(Tool):
+    name = "flaky"
+    description = "fails until the configured attempt"
+
+    def __init__(self, succeed_on: int, error: Exception | None = None) -> None:
+        self.calls = 0
+        self.succeed_on = succeed_on
+        self.error = error
+
+    def run(self, **kwargs: Any) -> ToolResult:  # type: ignore[override]
+        self.calls += 1
+        if self.calls >= self.succeed_on:
+            return ToolResult(output="ok", success=True, metadata=None)
+        if self.error is not None:
+            raise self.error
+        return ToolResult(output="HTTP 503 unavailable", success=False, metadata=None)
+
+
+def _run_steps(tmp_path, steps, registry, **kwargs):
+    runner = WorkflowRunTool(tmp_path)
+    return runner.run("", registry=registry, definition={"steps": steps}, **kwargs)
+
+
+def test_retries_back_off_and_record_attempts(tmp_path) -> None:
+    flaky = _FlakyTool(succeed_on=3)
+    step = {
+        "id": "s",
+        "tool": "flaky",
+        "retries": 3,
+        "retry_backoff": {"base": 0.01, "max": 0.02, "jitter": 0},
+    }
+    result = _run_steps(tmp_path, [step], {"flaky": flaky})
+    assert result.success
+    attempts = result.metadata["context"]["steps"]["s"].metadata["attempts"]
+    assert [a["success"] for a in attempts] == [False, False, True]
+    assert attempts[0]["backoff_ms"] == 10.0
+    assert attempts[1]["backoff_ms"] == 20.0
+
+
+def test_retry_on_filters_errors(tmp_path) -> None:
+    flaky = _FlakyTool(succeed_on=2, error=KeyError("nope"))
+    step = {
+        "id": "s",
+        "tool": "flaky",
+        "retries": 2,
+        "retry_backoff": 0,
+        "retry_on": ["ConnectionError"],
+    }
+    result = _run_steps(tmp_path, [step], {"flaky": flaky})
+    assert not result.success
+    assert flaky.calls == 1
+    assert result.metadata["attempts"][0]["error"] == "KeyError"
+
+    matching = _FlakyTool(succeed_on=2, error=ConnectionResetError("reset"))
+    result = _run_steps(tmp_path, [step], {"flaky": matching})
+    assert result.success and matching.calls == 2
+
+
+def test_invalid_retry_options_are_definition_errors(tmp_path) -> None:
+    flaky = _FlakyTool(succeed_on=1)
+    cases = {
+        "retry_on pattern '(' is invalid": {"retry_on": ["ConnectionError", "("]},
+        "retry_backoff must be a number": {"retry_backoff": "exponential"},
+        "retry_backoff has unknown key 'factor'": {"retry_backoff": {"factor": 2}},
+        "retry_backoff base must be a number": {"retry_backoff": {"base": "1s"}},
+    }
+    for message, options in cases.items():
+        step = {"id": "s", "tool": "flaky", "retries": 1, **options}
+        result = _run_steps(tmp_path, [step], {"flaky": flaky})
+        assert not result.success and result.output.startswith(f"step s: {message}")
+    assert flaky.calls == 0
+
+
+def test_step_timeout_kills_subprocess(tmp_path) -> None:
+    import time
+
+    from codax.tools.advanced import ShellCommandTool
+
+    step = {
+        "id": "slow",
+        "tool": "shell_command",
+        "timeout": 0.3,
+        "args": {"command": "sleep 5 & sleep 5; echo done", "timeout_ms": 10000},
+    }
+    started = time.monotonic()
+    result = _run_steps(tmp_path, [step], {"shell_command": ShellCommandTool(tmp_path)})
+    assert not result.success
+    assert "timed out" in result.output
+    assert result.metadata["attempts"][0]["error"] == "TimeoutError"
+    assert time.monotonic() - started < 3
+
+
+class _SlowTool(Tool):
+    name = "slow"
+    description = "blocks without any subprocess to kill"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def run(self, **kwargs: Any) -> ToolResult:  # type: ignore[override]
+        import time
+
+        self.calls += 1
+        time.sleep(1.5)
+        return ToolResult(output="late", success=True, metadata=None)
+
+
+def test_timed_out_step_still_running_is_not_retried(tmp_path) -> None:
+    slow = _SlowTool()
+    step = {"id": "s", "tool": "slow", "timeout": 0.1, "retries": 2, "retry_backoff": 0}
+    result = _run_steps(tmp_path, [step], {"slow": slow})
+    assert not result.success
+    assert slow.calls == 1
+    attempts = result.metadata["attempts"]
+    assert len(attempts) == 1
+    assert attempts[0]["error"] == "TimeoutError" and attempts[0]["abandoned"]
+
+
+def test_cancel_token_interrupts_in_flight_step(tmp_path) -> None:
+    import threading
+
+    from codax.tools.advanced import ShellCommandTool
+    from codax.tools.workflow_tools import CancelToken
+
+    cancel = CancelToken()
+    threading.Timer(0.2, cancel.cancel).start()
+    steps = [
+        {
+            "id": "slow",
+            "tool": "shell_command",
+            "args": {"command": "sleep 5", "timeout_ms": 10000},
+        },
+        {"id": "never", "tool": "shell_command", "args": {"command": "echo never"}},
+    ]
+    registry = {"shell_command": ShellCommandTool(tmp_path)}
+    result = _run_steps(tmp_path, steps, registry, cancel=cancel)
+    assert not result.success
+    assert "never" not in "\n".join(result.metadata["transcript"])
+
+
+class _CollectTool(Tool):
+    name = "collect"
+    description = "records the rendered value"
+
+    def __init__(self) -> None:
+        self.seen: list[Any] = []
+
+    def run(self, value: Any = None, **kwargs: Any) -> ToolResult:  # type: ignore[override]
+        self.seen.append(value)
+        return ToolResult(output=str(value), success=True, metadata=None)
+
+
+def test_loop_file_streams_jsonl_in_batches(tmp_path) -> None:
+    data = tmp_path / "items.jsonl"
+    data.write_text("\n".join(json.dumps({"n": i}) for i in range(7)) + "\n", encoding="utf-8")
+    collect = _CollectTool()
+    events: list[dict] = []
+    step = {
+        "id": "c",
+        "tool": "collect",
+        "loop_file": "items.jsonl",
+        "batch_size": 3,
+        "args": {"value": "{{item}}"},
+    }
+    result = _run_steps(tmp_path, [step], {"collect": collect}, on_event=events.append)
+    assert result.success
+    assert [len(batch) for batch in collect.seen] == [3, 3, 1]
+    assert collect.seen[2] == [{"n": 6}]
+    assert [e["items"] for e in events if e["type"] == "loop_progress"] == [3, 6, 7]
+    assert events[-1] == {"type": "loop_done", "step": "c", "items": 7, "batches": 3}
+    assert result.metadata["transcript"] == ["c:loop:7 items"]
+    assert result.metadata["context"]["steps"]["c"].metadata["loop"]["items"] == 7
+
+
+def test_loop_glob_and_loop_lines(tmp_path) -> None:
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("", encoding="utf-8")
+    (tmp_path / "pkg" / "b.py").write_text("", encoding="utf-8")
+    (tmp_path / "pkg" / "c.txt").write_text("", encoding="utf-8")
+    collect = _CollectTool()
+    lines = _CollectTool()
+    steps = [
+        {
+            "id": "files",
+            "tool": "collect",
+            "loop_glob": "**/*.py",
+            "loop_var": "f",
+            "args": {"value": "{{f}}"},
+        },
+        {"id": "src", "tool": "collect", "args": {"value": "x\ny\nz"}},
+        {
+            "id": "each",
+            "tool": "lines",
+            "loop_lines": "{{steps['src'].output}}",
+            "args": {"value": "{{item}}"},
+        },
+    ]
+    result = _run_steps(tmp_path, steps, {"collect": collect, "lines": lines})
+    assert result.success
+    assert sorted(collect.seen[:2]) == ["pkg/a.py", "pkg/b.py"]
+    assert lines.seen == ["x", "y", "z"]
+
+
+def test_loop_source_errors_fail_the_step(tmp_path) -> None:
+    step = {"id": "c", "tool": "collect", "loop_file": "missing.jsonl"}
+    result = _run_steps(tmp_path, [step], {"collect": _CollectTool()})
+    assert not result.success
+    assert "loop source failed" in result.output
+    escaping = {"id": "g", "tool": "collect", "loop_glob": "../*"}
+    assert not _run_steps(tmp_path, [escaping], {"collect": _CollectTool()}).success
+
+
+def test_batched_llm_loop_dispatches_chunks(tmp_path) -> None:
+    class CountingLlm(LlmNodeTool):
+        def __init__(self) -> None:
+            super().__init__(Settings(openai_api_key=None))
+            self.batches: list[int] = []
+
+        def run_batch(self, calls, max_concurrency=4, pack=0):  # type: ignore[override]
+            self.batches.append(len(calls))
+            return super().run_batch(calls, max_concurrency=max_concurrency, pack=pack)
+
+    llm = CountingLlm()
+    events: list[dict] = []
+    step = {
+        "id": "classify",
+        "tool": "llm_node",
+        "loop": ["alpha", "beta", "gamma"],
+        "batch": {"size": 2},
+        "assign": "label",
+        "args": {"system_prompt": "s", "user_message": "{{item}}"},
+    }
+    result = _run_steps(tmp_path, [step], {"llm_node": llm}, on_event=events.append)
+    assert result.success
+    assert llm.batches == [2, 1]
+    assert result.metadata["context"]["label"] == "gamma"
+    outputs = [line.split(":")[-1] for line in result.metadata["transcript"]]
+    assert outputs == ["alpha", "beta", "gamma"]
+    assert events[-1] == {"type": "batch_progress", "step": "classify", "items": 3}
+
+
+def test_batch_flag_falls_back_for_plain_tools(tmp_path) -> None:
+    collect = _CollectTool()
+    step = {
+        "id": "c",
+        "tool": "collect",
+        "loop": [1, 2],
+        "batch": True,
+        "args": {"value": "{{item}}"},
+    }
+    result = _run_steps(tmp_path, [step], {"collect": collect})
+    assert result.success and collect.seen == [1, 2]
+
+
+class _BrokenBatchTool(_CollectTool):
+    name = "broken"
+    supports_batch = True
+
+    def run_batch(self, calls, max_concurrency=4, pack=0):  # type: ignore[no-untyped-def]
+        if any(call["value"] == 2 for call in calls):
+            raise RuntimeError("provider down")
+        return [ToolResult(output=f"ok:{call['value']}", success=True) for call in calls]
+
+
+def test_batch_failures_are_reported_per_item(tmp_path) -> None:
+    step = {
+        "id": "b",
+        "tool": "broken",
+        "loop": [1, 2, 3],
+        "batch": {"size": 2},
+        "allow_failure": True,
+        "args": {"value": "{{item}}"},
+    }
+    result = _run_steps(tmp_path, [step], {"broken": _BrokenBatchTool()})
+    assert result.success
+    assert result.metadata["transcript"] == [
+        "b:broken:RuntimeError: provider down",
+        "b:broken:RuntimeError: provider down",
+        "b:broken:ok:3",
+    ]
+
+    allowed = _run_steps(tmp_path, [{**step, "loop": [2]}], {"broken": _BrokenBatchTool()})
+    record = allowed.metadata["context"]["steps"]["b"].metadata
+    assert record["allowed_failure"] is True and record["step"] == "b"
+
+
+def test_batch_with_retries_or_timeout_is_rejected(tmp_path) -> None:
+    step = {"id": "b", "tool": "collect", "loop": [1], "batch": True, "retries": 2}
+    result = _run_steps(tmp_path, [step], {"collect": _CollectTool()})
+    assert not result.success
+    assert result.output == "step b: retries cannot be combined with batch"
+    unnamed = {"tool": "collect", "loop": [1], "batch": True, "timeout": 5}
+    assert _run_steps(tmp_path, [unnamed], {}).output == (
+        "step #0: timeout cannot be combined with batch"
+    )
+
+
+def test_process_pool_payload_roundtrip_uses_shared_memory() -> None:
+    from codax.tools import process_pool
+
+    payload = {"blob": "x" * 4096}
+    packed = process_pool._pack(payload, threshold=1024)
+    assert packed[0] == "shm"
+    assert process_pool._unpack(packed) == payload
+    assert process_pool._pack(payload)[0] == "inline"
+
+
+def test_process_executor_runs_step_in_worker(tmp_path) -> None:
+    (tmp_path / "data.txt").write_text("hello pool", encoding="utf-8")
+    settings = Settings(
+        workspace_root=tmp_path,
+        data_dir=tmp_path / "data",
+        config_file=tmp_path / "config.toml",
+        process_pool_workers=1,
+    )
+    registry = build_tool_registry(settings)
+    steps = [
+        {"id": "read", "tool": "fs_read", "executor": "process", "args": {"path": "data.txt"}},
+        {"id": "missing", "tool": "_local", "executor": "process", "allow_failure": True},
+    ]
+    registry["_local"] = registry["fs_read"]
+    runner = WorkflowRunTool(tmp_path, settings=settings)
+    result = runner.run("", registry=registry, definition={"steps": steps})
+    assert result.success
+    steps_map = result.metadata["context"]["steps"]
+    assert "hello pool" in str(steps_map["read"].output)
+    assert "unavailable in process pool" in str(steps_map["missing"].output)
+
+
+def test_unknown_executor_fails_step(tmp_path) -> None:
+    step = {"id": "s", "tool": "flaky", "executor": "gpu"}
+    result = _run_steps(tmp_path, [step], {"flaky": _FlakyTool(1)})
+    assert not result.success
+    assert "unknown executor" in result.output
+
+
+def _write_child(tmp_path, name="child.json"):
+    child = {
+        "steps": [
+            {"id": "upper", "tool": "collect", "args": {"value": "{{WORD}}!"}},
+            {"id": "note", "tool": "collect", "args": {"value": "{{upper}}?"}},
+        ]
+    }
+    (tmp_path / name).write_text(json.dumps(child), encoding="utf-8")
+
+
+def test_subworkflow_maps_inputs_and_outputs(tmp_path) -> None:
+    _write_child(tmp_path)
+    collect = _CollectTool()
+    steps = [
+        {
+            "id": "sub",
+            "workflow": "child.json",
+            "inputs": {"WORD": "{{word}}"},
+            "outputs": {"shout": "note"},
+        },
+        {"id": "after", "tool": "collect", "args": {"value": "{{shout}}"}},
+    ]
+    result = _run_steps(tmp_path, steps, {"collect": collect}, params={"word": "hi"})
+    assert result.success, result.output
+    context = result.metadata["context"]
+    assert context["sub"] == {"shout": "hi!?"}
+    assert "word" in context and "WORD" not in context  # child context stays isolated
+    assert collect.seen[-1] == "hi!?"
+    assert "sub/upper:collect:hi!" in result.metadata["transcript"]
+
+
+def test_parallel_subworkflows_share_loaded_definition(tmp_path) -> None:
+    _write_child(tmp_path)
+    loads: list[Any] = []
+
+    def loader(path):
+        loads.append(path)
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    runner = WorkflowRunTool(tmp_path, loader=loader)
+    step = {
+        "id": "fan",
+        "workflow": "child.json",
+        "loop": ["a", "b", "c"],
+        "loop_var": "w",
+        "parallel": 3,
+        "inputs": {"WORD": "{{w}}"},
+        "outputs": {"out": "upper"},
+    }
+    result = runner.run("", registry={"collect": _CollectTool()}, definition={"steps": [step]})
+    assert result.success, result.output
+    assert result.metadata["context"]["fan"] == [{"out": "a!"}, {"out": "b!"}, {"out": "c!"}]
+    assert len(loads) == 1
+
+
+def test_subworkflow_cache_keeps_one_entry_per_path_and_profiles_children(tmp_path) -> None:
+    _write_child(tmp_path)
+    profiler = WorkflowProfiler()
+    runner = WorkflowRunTool(tmp_path, profiler=profiler)
+    step = {"id": "sub", "workflow": "child.json", "inputs": {"WORD": "a"}}
+    registry = {"collect": _CollectTool()}
+    assert runner.run("", registry=registry, definition={"steps": [step]}).success
+    child = tmp_path / "child.json"
+    child.write_text(
+        json.dumps({"steps": [{"id": "upper", "tool": "collect", "args": {"value": "edited"}}]}),
+        encoding="utf-8",
+    )
+    os.utime(child, ns=(child.stat().st_atime_ns, child.stat().st_mtime_ns + 10**9))
+    result = runner.run("", registry=registry, definition={"steps": [step]})
+    assert result.metadata["context"]["sub"] == {"upper": "edited"}
+    assert list(runner._definitions) == [child]
+    assert set(profiler.steps) == {"sub/upper", "sub/note"}
+
+
+def test_subworkflow_failures_and_recursion_surface(tmp_path) -> None:
+    (tmp_path / "self.json").write_text(
+        json.dumps({"steps": [{"id": "again", "workflow": "self.json"}]}), encoding="utf-8"
+    )
+    result = _run_steps(tmp_path, [{"id": "loop", "workflow": "self.json"}], {})
+    assert not result.success
+    assert "sub-workflow depth" in result.output
+    missing = _run_steps(tmp_path, [{"id": "m", "workflow": "nope.json"}], {})
+    assert not missing.success and "failed to load workflow" in missing.output
@@ -0,0 +1,119 @@
+import shutil
+import time
+from pathlib import Path
+
+from codax.ignore import IgnoreMatcher, parse_ignore
+from codax.tools.advanced import GrepFilesTool, ListDirAdvancedTool
+from codax.tools.filesystem import FsGlobTool, FsListTool
+from codax.workspace_index import WorkspaceIndex, get_workspace_index
+
+
+def _tree(root: Path) -> None:
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "pkg" / "mod.py").write_text("needle\n")
+    (root / "src" / "main.py").write_text("needle\n")
+    (root / "build").mkdir()
+    (root / "build" / "out.py").write_text("needle\n")
+    (root / "node_modules" / "dep").mkdir(parents=True)
+    (root / "node_modules" / "dep" / "index.js").write_text("needle\n")
+    (root / ".git").mkdir()
+    (root / ".git" / "HEAD").write_text("ref\n")
+    (root / "blob.bin").write_bytes(b"needle\0\1\2")
+    (root / "debug.log").write_text("needle\n")
+    (root / ".gitignore").write_text("build/\n*.log\n")
+
+
+def _files(index: WorkspaceIndex) -> list[str]:
+    return sorted(entry.rel for entry in index.files())
+
+
+def test_parse_ignore_handles_negation_anchoring_and_globstar(tmp_path) -> None:
+    (tmp_path / "sub").mkdir()
+    (tmp_path / ".gitignore").write_text("*.log\n!keep.log\n/top.txt\ndocs/**/*.md\ncache/\n")
+    (tmp_path / "sub" / ".ignore").write_text("local.txt\n")
+    matcher = IgnoreMatcher(tmp_path)
+    assert matcher.is_ignored("a/b/trace.log")
+    assert not matcher.is_ignored("keep.log")
+    assert matcher.is_ignored("top.txt") and not matcher.is_ignored("sub/top.txt")
+    assert matcher.is_ignored("docs/x/y/readme.md") and not matcher.is_ignored("docs/readme.txt")
+    assert matcher.is_ignored("cache", is_dir=True) and not matcher.is_ignored("cache")
+    assert matcher.is_ignored("cache/inner.py")
+    assert matcher.is_ignored("sub/local.txt") and not matcher.is_ignored("local.txt")
+    assert matcher.is_ignored("node_modules/x.js")
+    rule = parse_ignore("a/*.py", base="pkg")[0]
+    assert rule.matches("pkg/a/x.py", False) and not rule.matches("a/x.py", False)
+
+
+def test_index_prunes_ignored_directories(tmp_path) -> None:
+    _tree(tmp_path)
+    index = WorkspaceIndex(tmp_path, watch=False)
+    index.refresh()
+    assert _files(index) == [".gitignore", "blob.bin", "src/main.py", "src/pkg/mod.py"]
+    assert not index.is_indexed("node_modules") and not index.is_indexed("build")
+    assert index.entry("build").ignored and index.entry("debug.log").ignored
+    assert index.is_binary(index.entry("blob.bin"))
+    assert not index.is_binary(index.entry("src/main.py"))
+
+
+def _check_incremental(index: WorkspaceIndex, root: Path) -> None:
+    index.refresh()
+    (root / "src" / "new.py").write_text("x\n")
+    (root / "src" / "pkg" / "deep").mkdir()
+    (root / "src" / "pkg" / "deep" / "leaf.py").write_text("x\n")
+    (root / "src" / "main.py").unlink()
+    time.sleep(0.05)
+    index.refresh()
+    assert _files(index) == [
+        ".gitignore",
+        "blob.bin",
+        "src/new.py",
+        "src/pkg/deep/leaf.py",
+        "src/pkg/mod.py",
+    ]
+    shutil.rmtree(root / "src" / "pkg")
+    (root / ".gitignore").write_text("build/\n*.log\n*.bin\n")
+    time.sleep(0.05)
+    index.refresh()
+    assert _files(index) == [".gitignore", "src/new.py"]
+    assert not index.is_indexed("src/pkg")
+
+
+def test_index_refreshes_from_inotify(tmp_path) -> None:
+    _tree(tmp_path)
+    index = WorkspaceIndex(tmp_path)
+    try:
+        _check_incremental(index, tmp_path)
+        assert index.stats["builds"] == 1
+    finally:
+        index.close()
+
+
+def test_index_refreshes_by_polling(tmp_path) -> None:
+    _tree(tmp_path)
+    _check_incremental(WorkspaceIndex(tmp_path, watch=False), tmp_path)
+
+
+def test_tools_read_through_the_index(tmp_path, monkeypatch) -> None:
+    _tree(tmp_path)
+    listing = FsListTool(tmp_path)
+    glob = FsGlobTool(tmp_path)
+    assert listing.run("src").output.splitlines() == ["main.py", "pkg"]
+    assert glob.run("**/*.py").output.splitlines() == ["src/main.py", "src/pkg/mod.py"]
+    (tmp_path / "src" / "added.py").write_text("x\n")
+    assert "src/added.py" in glob.run("src/*.py").output.splitlines()
+    assert "added.py" in listing.run("src").output.splitlines()
+    assert glob.run("node_modules/*/*.js").output == "node_modules/dep/index.js"
+
+    index = get_workspace_index(tmp_path)
+    refreshes = []
+    monkeypatch.setattr(index, "refresh", lambda: refreshes.append(1))
+    dirs = ListDirAdvancedTool(tmp_path).run(str(tmp_path), depth=3)
+    assert f"{tmp_path / 'node_modules'}/ [dir]" in dirs.output
+    assert "index.js" not in dirs.output and "pkg/mod.py [file]" in dirs.output
+    assert len(refreshes) == 1  # once per listing, not per directory visited
+    monkeypatch.undo()
+
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    grep = GrepFilesTool(tmp_path).run("needle", path=str(tmp_path))
+    found = sorted(Path(line).relative_to(tmp_path).as_posix() for line in grep.output.splitlines())
+    assert found == ["src/main.py", "src/pkg/mod.py"]